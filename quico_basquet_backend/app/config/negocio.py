@@ -0,0 +1,182 @@
+"""
+Configuración de precios y del negocio en memoria.
+
+config/precios.json se lee una sola vez y queda como una instantánea inmutable. Un hilo
+revisa la fecha de modificación del archivo cada PRECIOS_RECARGA_SEGUNDOS y, si cambió,
+arma una instantánea nueva y la reemplaza de una vez (un solo cambio de referencia), así
+cada cálculo de precio ve la configuración vieja o la nueva completa, nunca una mezcla.
+Si el archivo nuevo es inválido se sigue usando la última configuración válida.
+
+El archivo acepta el formato plano de siempre ({"basquet": 26000, "voley": 15000}) o uno
+con secciones: {"precios": {...}, "descuento_suscripcion": 5, "semanas_por_mes": 4}.
+"""
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+from typing import Mapping, Optional
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+DEPORTE_POR_DEFECTO = "basquet"
+# Nombres alternativos que aparecen en configuraciones viejas
+ALIAS_DEPORTES = {"volley": "voley", "básquet": "basquet", "vóley": "voley"}
+CLAVES_GENERALES = ("precios", "descuento_suscripcion", "semanas_por_mes")
+
+@dataclass(frozen=True)
+class ConfiguracionNegocio:
+    precios_por_hora: Mapping[str, float]
+    descuento_suscripcion: float
+    semanas_por_mes: int = 4
+    origen: str = "defecto"  # "archivo" o "defecto"
+    version: Optional[float] = None  # mtime del archivo leído
+    cargada: datetime = field(default_factory=datetime.now)
+
+    def precio_por_hora(self, deporte: str) -> float:
+        """Precio por hora del deporte (el de básquet si el deporte no está configurado)"""
+        clave = normalizar_deporte(deporte)
+        return self.precios_por_hora.get(clave, self.precios_por_hora.get(DEPORTE_POR_DEFECTO, settings.PRECIO_BASQUET_POR_HORA))
+
+    def resumen(self) -> dict:
+        return {
+            "precios_por_hora": dict(self.precios_por_hora),
+            "descuento_suscripcion": self.descuento_suscripcion,
+            "semanas_por_mes": self.semanas_por_mes,
+            "origen": self.origen,
+            "archivo": settings.PRECIOS_CONFIG_PATH,
+            "cargada": self.cargada.isoformat(),
+        }
+
+def normalizar_deporte(deporte: str) -> str:
+    clave = (deporte or "").strip().lower()
+    return ALIAS_DEPORTES.get(clave, clave)
+
+def configuracion_por_defecto() -> ConfiguracionNegocio:
+    return ConfiguracionNegocio(
+        precios_por_hora=MappingProxyType({
+            "basquet": settings.PRECIO_BASQUET_POR_HORA,
+            "voley": settings.PRECIO_VOLLEY_POR_HORA,
+        }),
+        descuento_suscripcion=settings.DESCUENTO_SUSCRIPCION
+    )
+
+def _numero(valor, nombre: str, minimo: float = 0, maximo: Optional[float] = None) -> float:
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+        raise ValueError(f"'{nombre}' debe ser un número")
+    if valor < minimo or (maximo is not None and valor > maximo):
+        raise ValueError(f"'{nombre}' fuera de rango: {valor}")
+    return float(valor)
+
+def leer_configuracion(ruta: str) -> ConfiguracionNegocio:
+    """Arma una instantánea desde el archivo. Lanza OSError o ValueError si no se puede usar"""
+    version = os.stat(ruta).st_mtime
+    with open(ruta, "r", encoding="utf-8") as f:
+        datos = json.load(f)
+    if not isinstance(datos, dict):
+        raise ValueError("El archivo de precios debe ser un objeto JSON")
+
+    defecto = configuracion_por_defecto()
+    seccion_precios = datos.get("precios") if isinstance(datos.get("precios"), dict) else None
+    crudos = seccion_precios if seccion_precios is not None else datos
+
+    precios = dict(defecto.precios_por_hora)
+    for deporte, precio in crudos.items():
+        if seccion_precios is None and deporte in CLAVES_GENERALES:
+            continue
+        precios[normalizar_deporte(deporte)] = _numero(precio, f"precio de {deporte}")
+
+    return ConfiguracionNegocio(
+        precios_por_hora=MappingProxyType(precios),
+        descuento_suscripcion=_numero(datos.get("descuento_suscripcion", defecto.descuento_suscripcion), "descuento_suscripcion", 0, 100),
+        semanas_por_mes=int(_numero(datos.get("semanas_por_mes", defecto.semanas_por_mes), "semanas_por_mes", 1)),
+        origen="archivo",
+        version=version
+    )
+
+_actual: Optional[ConfiguracionNegocio] = None
+# mtime del último archivo inválido, para no volver a leerlo (ni loguearlo) hasta que cambie
+_version_invalida: Optional[float] = None
+_recarga_lock = threading.Lock()
+
+def configuracion_actual() -> ConfiguracionNegocio:
+    """Instantánea vigente; la primera llamada carga el archivo"""
+    configuracion = _actual
+    if configuracion is None:
+        recargar_configuracion()
+        configuracion = _actual
+    return configuracion
+
+def recargar_configuracion(forzar: bool = False) -> bool:
+    """
+    Relee el archivo si cambió desde la última carga y reemplaza la instantánea.
+    Retorna True si se cambió la configuración.
+    """
+    global _actual, _version_invalida
+    ruta = settings.PRECIOS_CONFIG_PATH
+    with _recarga_lock:
+        vigente = _actual
+        try:
+            version = os.stat(ruta).st_mtime
+        except OSError:
+            # Sin archivo se usan los valores de settings
+            if vigente is None or vigente.origen != "defecto":
+                if vigente is not None:
+                    logger.warning(f"⚙️ No se encontró {ruta}, se usan los precios por defecto")
+                _actual = configuracion_por_defecto()
+                return True
+            return False
+
+        if not forzar and vigente is not None and version in (vigente.version, _version_invalida):
+            return False
+
+        try:
+            nueva = leer_configuracion(ruta)
+        except (OSError, ValueError) as e:
+            # json.JSONDecodeError es un ValueError
+            logger.error(f"⚙️ Configuración de precios inválida en {ruta}, se mantiene la anterior: {e}")
+            _version_invalida = version
+            if vigente is None:
+                _actual = configuracion_por_defecto()
+            return False
+
+        _actual = nueva
+        logger.info(f"⚙️ Configuración de precios cargada desde {ruta}: {dict(nueva.precios_por_hora)}")
+        return True
+
+class VigilanteConfiguracion(threading.Thread):
+    """Hilo que revisa periódicamente si el archivo de precios cambió"""
+
+    def __init__(self, intervalo_segundos: float):
+        super().__init__(name="configuracion-negocio", daemon=True)
+        self.intervalo_segundos = intervalo_segundos
+        self._detener = threading.Event()
+
+    def detener(self) -> None:
+        self._detener.set()
+
+    def run(self) -> None:
+        while not self._detener.wait(self.intervalo_segundos):
+            try:
+                recargar_configuracion()
+            except Exception as e:
+                logger.error(f"Error revisando la configuración de precios: {e}")
+
+_vigilante: Optional[VigilanteConfiguracion] = None
+
+def iniciar_configuracion() -> None:
+    global _vigilante
+    configuracion_actual()
+    if settings.PRECIOS_RECARGA_SEGUNDOS > 0 and _vigilante is None:
+        _vigilante = VigilanteConfiguracion(settings.PRECIOS_RECARGA_SEGUNDOS)
+        _vigilante.start()
+
+def detener_configuracion() -> None:
+    global _vigilante
+    if _vigilante is not None:
+        vigilante, _vigilante = _vigilante, None
+        vigilante.detener()
+        vigilante.join(timeout=5)
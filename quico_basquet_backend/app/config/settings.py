@@ -18,6 +18,10 @@ class Settings:
     SECRET_KEY: str = os.getenv("SECRET_KEY", "tu_clave_secreta_aqui_cambiala_en_produccion")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+
+    # Configuración de hash de contraseñas
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    BCRYPT_MAX_CONCURRENCIA: int = int(os.getenv("BCRYPT_MAX_CONCURRENCIA", str(os.cpu_count() or 2)))
     
     # Configuración de Firebase
     FIREBASE_CREDENTIALS_PATH: str = os.getenv("FIREBASE_CREDENTIALS_PATH", "")
@@ -30,6 +34,21 @@ class Settings:
     SENDGRID_API_KEY: str = os.getenv("SENDGRID_API_KEY", "")
     FROM_EMAIL: str = os.getenv("FROM_EMAIL", "noreply@quicobasquet.com")
     FROM_NAME: str = os.getenv("FROM_NAME", "Quico Básquet")
+    SENDGRID_API_URL: str = os.getenv("SENDGRID_API_URL", "https://api.sendgrid.com")
+
+    # Proveedores de email: SMTP reutilizable y circuit breaker por proveedor
+    SMTP_HOST: str = os.getenv("SMTP_HOST", "smtp.gmail.com")
+    SMTP_PORT: int = int(os.getenv("SMTP_PORT", "587"))
+    SMTP_STARTTLS: bool = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+    EMAIL_TIMEOUT_SEGUNDOS: float = float(os.getenv("EMAIL_TIMEOUT_SEGUNDOS", "10"))
+    EMAIL_CIRCUITO_UMBRAL_FALLOS: int = int(os.getenv("EMAIL_CIRCUITO_UMBRAL_FALLOS", "3"))
+    EMAIL_CIRCUITO_SEGUNDOS_ABIERTO: int = int(os.getenv("EMAIL_CIRCUITO_SEGUNDOS_ABIERTO", "60"))
+
+    # Avisos al administrador: resumen periódico en lugar de un email por evento
+    EMAIL_ADMIN_RESUMEN: bool = os.getenv("EMAIL_ADMIN_RESUMEN", "true").lower() == "true"
+    EMAIL_ADMIN_RESUMEN_MINUTOS: int = int(os.getenv("EMAIL_ADMIN_RESUMEN_MINUTOS", "30"))
+    # Tipos que se envían en el momento (confirmacion_reserva, cancelacion_reserva, confirmacion_suscripcion, cancelacion_suscripcion)
+    EMAIL_ADMIN_TIPOS_URGENTES: str = os.getenv("EMAIL_ADMIN_TIPOS_URGENTES", "")
     
     # Configuración de datos bancarios
     DATOS_BANCARIOS: dict = {
@@ -44,6 +63,22 @@ class Settings:
     TWILIO_ACCOUNT_SID: str = os.getenv("TWILIO_ACCOUNT_SID", "")
     TWILIO_AUTH_TOKEN: str = os.getenv("TWILIO_AUTH_TOKEN", "")
     TWILIO_PHONE_NUMBER: str = os.getenv("TWILIO_PHONE_NUMBER", "")
+    TWILIO_API_URL: str = os.getenv("TWILIO_API_URL", "https://api.twilio.com")
+    WHATSAPP_CODIGO_PAIS: str = os.getenv("WHATSAPP_CODIGO_PAIS", "549")  # prefijo para números locales (Argentina móvil)
+
+    # Despacho de notificaciones por canal: concurrencia, mensajes por segundo y tamaño de lote
+    EMAIL_MAX_CONCURRENCIA: int = int(os.getenv("EMAIL_MAX_CONCURRENCIA", "4"))
+    EMAIL_ENVIOS_POR_SEGUNDO: float = float(os.getenv("EMAIL_ENVIOS_POR_SEGUNDO", "10"))
+    EMAIL_TAMANO_LOTE: int = int(os.getenv("EMAIL_TAMANO_LOTE", "100"))  # SendGrid acepta hasta 1000 destinatarios por envío
+    WHATSAPP_MAX_CONCURRENCIA: int = int(os.getenv("WHATSAPP_MAX_CONCURRENCIA", "2"))
+    WHATSAPP_ENVIOS_POR_SEGUNDO: float = float(os.getenv("WHATSAPP_ENVIOS_POR_SEGUNDO", "5"))
+    WHATSAPP_TAMANO_LOTE: int = int(os.getenv("WHATSAPP_TAMANO_LOTE", "20"))
+    # Usuarios por tanda en el envío en segundo plano (el progreso se guarda al terminar cada una)
+    NOTIFICACIONES_TAMANO_TANDA: int = int(os.getenv("NOTIFICACIONES_TAMANO_TANDA", "200"))
+    # Un envío sin avances en este tiempo se considera abandonado (debe superar lo que tarda una tanda)
+    NOTIFICACIONES_LEASE_SEGUNDOS: int = int(os.getenv("NOTIFICACIONES_LEASE_SEGUNDOS", "300"))
+    # Cada cuánto se buscan envíos pendientes o abandonados para retomarlos (0 lo desactiva)
+    NOTIFICACIONES_BARRIDO_SEGUNDOS: int = int(os.getenv("NOTIFICACIONES_BARRIDO_SEGUNDOS", "60"))
     
     # Configuración de horarios
     HORARIO_APERTURA: str = "08:00"
@@ -55,7 +90,47 @@ class Settings:
     
     # Configuración de descuentos
     DESCUENTO_SUSCRIPCION: float = 5.0
-    
+
+    # Archivo de precios (se carga una vez y se recarga en memoria si cambia; 0 desactiva la revisión)
+    PRECIOS_CONFIG_PATH: str = os.getenv("PRECIOS_CONFIG_PATH", "config/precios.json")
+    PRECIOS_RECARGA_SEGUNDOS: int = int(os.getenv("PRECIOS_RECARGA_SEGUNDOS", "30"))
+
+    # Configuración de respuestas (listados grandes)
+    RESPUESTAS_RAPIDAS: bool = os.getenv("RESPUESTAS_RAPIDAS", "false").lower() == "true"
+    COMPRESION_TAMANO_MINIMO: int = int(os.getenv("COMPRESION_TAMANO_MINIMO", "1024"))  # bytes
+    COMPRESION_NIVEL_GZIP: int = int(os.getenv("COMPRESION_NIVEL_GZIP", "6"))
+
+    # Disponibilidad en vivo (SSE): LISTEN/NOTIFY para repartir eventos entre workers
+    DISPONIBILIDAD_LISTEN_NOTIFY: bool = os.getenv("DISPONIBILIDAD_LISTEN_NOTIFY", "true").lower() == "true"
+    DISPONIBILIDAD_HEARTBEAT_SEGUNDOS: int = int(os.getenv("DISPONIBILIDAD_HEARTBEAT_SEGUNDOS", "15"))
+
+    # Idempotency-Key en la creación de reservas y suscripciones
+    IDEMPOTENCIA_TTL_HORAS: int = int(os.getenv("IDEMPOTENCIA_TTL_HORAS", "24"))
+    IDEMPOTENCIA_ESPERA_SEGUNDOS: int = int(os.getenv("IDEMPOTENCIA_ESPERA_SEGUNDOS", "30"))
+
+    # Caches calientes (usuarios autenticados, libro de precios, horarios de los próximos días)
+    CACHE_USUARIOS_TTL_SEGUNDOS: int = int(os.getenv("CACHE_USUARIOS_TTL_SEGUNDOS", "300"))
+    CACHE_USUARIOS_MAXIMO: int = int(os.getenv("CACHE_USUARIOS_MAXIMO", "2000"))
+    CACHE_PRECIOS_TTL_SEGUNDOS: int = int(os.getenv("CACHE_PRECIOS_TTL_SEGUNDOS", "600"))
+    CACHE_HORARIOS_TTL_SEGUNDOS: int = int(os.getenv("CACHE_HORARIOS_TTL_SEGUNDOS", "300"))
+    CACHE_HORARIOS_DIAS: int = int(os.getenv("CACHE_HORARIOS_DIAS", "7"))
+    # Instantánea en disco de esos caches (msgpack), validada contra la versión de las tablas
+    SNAPSHOT_CACHES: bool = os.getenv("SNAPSHOT_CACHES", "true").lower() == "true"
+    SNAPSHOT_CACHES_PATH: str = os.getenv("SNAPSHOT_CACHES_PATH", ".cache/caches.msgpack")
+    SNAPSHOT_CACHES_MINUTOS: int = int(os.getenv("SNAPSHOT_CACHES_MINUTOS", "10"))
+
+    # Semanas cerradas del mapa de ocupación: los cambios de otros workers se ven al vencer el TTL
+    OCUPACION_CACHE_TTL_SEGUNDOS: int = int(os.getenv("OCUPACION_CACHE_TTL_SEGUNDOS", "3600"))
+
+    # Extensión del horizonte de ocurrencias de suscripciones sin fecha de fin (además del arranque; 0 la desactiva)
+    OCURRENCIAS_EXTENSION_HORAS: float = float(os.getenv("OCURRENCIAS_EXTENSION_HORAS", "24"))
+
+    # Reconciliación periódica del rollup de ingresos contra reservas y suscripciones (0 la desactiva)
+    INGRESOS_RECONCILIAR_HORAS: float = float(os.getenv("INGRESOS_RECONCILIAR_HORAS", "24"))
+
+    # Resumen del panel de administración (se invalida en cada cambio de reservas o pagos)
+    RESUMEN_ADMIN_TTL_SEGUNDOS: int = int(os.getenv("RESUMEN_ADMIN_TTL_SEGUNDOS", "30"))
+
     @classmethod
     def validate_configuration(cls) -> List[str]:
         """Validar configuración y retornar lista de errores"""
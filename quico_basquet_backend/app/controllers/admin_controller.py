@@ -1,12 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
 from app.models.reserva import Reserva
 from app.models.user import User
 from app.services.email_service import send_email
-from app.data.database import get_db
+from app.data.database import get_db, engine
+from app.data.consultas import estadisticas_cache
 from app.services.auth_service import require_admin
-from typing import List
+from app.utils.respuestas import respuesta_listado, respuestas_rapidas_habilitadas, formato_listado
+from app.services.export_service import exportar_reservas, exportar_suscripciones, FORMATOS_EXPORTACION
+from app.services.ingresos_service import obtener_ingresos, reconstruir_ingresos, DIMENSIONES_INGRESOS
+from app.services.ocupacion_service import calcular_ocupacion
+from app.services.resumen_service import obtener_resumen
+from app.services.ocurrencias_service import regenerar_ocurrencias
+from app.services.importacion_service import importar_reservas_csv
+from app.services.proveedores_email import estado_proveedores
+from app.services.avisos_admin_service import avisos_pendientes
+from app.config.negocio import configuracion_actual, recargar_configuracion
+from app.services.snapshot_service import estado_caches
+from app.schemas.ingreso import IngresoAgrupadoOut
+from typing import List, Optional
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
@@ -18,8 +32,13 @@ class UserListItem(BaseModel):
     telefono: str = None
 
 @router.get("/usuarios", response_model=List[UserListItem])
-def obtener_lista_usuarios(db: Session = Depends(get_db), admin=Depends(require_admin)):
+def obtener_lista_usuarios(db: Session = Depends(get_db), admin=Depends(require_admin), formato: str = Depends(formato_listado)):
     """Obtener lista de usuarios para el selector de notificaciones"""
+    if formato != "json" or respuestas_rapidas_habilitadas():
+        # Solo las columnas necesarias, serializadas sin revalidar
+        usuarios = db.query(User.id, User.nombre, User.email, User.telefono).filter(User.rol != "admin").all()
+        return respuesta_listado(usuarios, UserListItem, formato)
+
     usuarios = db.query(User).filter(User.rol != "admin").all()
     return [
         UserListItem(
@@ -61,4 +80,146 @@ El equipo de Quico Básquet
             """
             if send_email(user.email, subject, message):
                 enviados += 1
-    return {"recordatorios_enviados": enviados} 
\ No newline at end of file
+    return {"recordatorios_enviados": enviados}
+
+
+def _respuesta_exportacion(generador, nombre: str, formato: str) -> StreamingResponse:
+    extension = "csv" if formato == "csv" else "ndjson"
+    return StreamingResponse(
+        generador,
+        media_type=FORMATOS_EXPORTACION[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}.{extension}"'}
+    )
+
+@router.get("/export/reservas")
+def exportar_reservas_endpoint(
+    formato: str = Query("csv", description="Formato de exportación: csv o ndjson"),
+    fecha_desde: Optional[date] = Query(None, description="Fecha inicial (YYYY-MM-DD)"),
+    fecha_hasta: Optional[date] = Query(None, description="Fecha final (YYYY-MM-DD)"),
+    cancha_id: Optional[int] = Query(None, description="ID de la cancha"),
+    estado_pago: Optional[str] = Query(None, description="Estado de pago"),
+    admin=Depends(require_admin)
+):
+    """Exportar reservas en streaming (solo para administradores)"""
+    if formato not in FORMATOS_EXPORTACION:
+        raise HTTPException(status_code=400, detail=f"Formato inválido. Formatos válidos: {list(FORMATOS_EXPORTACION)}")
+
+    generador = exportar_reservas(
+        formato,
+        fecha_desde=fecha_desde,
+        fecha_hasta=fecha_hasta,
+        cancha_id=cancha_id,
+        estado_pago=estado_pago
+    )
+    return _respuesta_exportacion(generador, "reservas", formato)
+
+@router.get("/export/suscripciones")
+def exportar_suscripciones_endpoint(
+    formato: str = Query("csv", description="Formato de exportación: csv o ndjson"),
+    fecha_desde: Optional[date] = Query(None, description="Fecha inicial (YYYY-MM-DD)"),
+    fecha_hasta: Optional[date] = Query(None, description="Fecha final (YYYY-MM-DD)"),
+    cancha_id: Optional[int] = Query(None, description="ID de la cancha"),
+    estado_pago: Optional[str] = Query(None, description="Estado de pago"),
+    admin=Depends(require_admin)
+):
+    """Exportar suscripciones en streaming (solo para administradores)"""
+    if formato not in FORMATOS_EXPORTACION:
+        raise HTTPException(status_code=400, detail=f"Formato inválido. Formatos válidos: {list(FORMATOS_EXPORTACION)}")
+
+    generador = exportar_suscripciones(
+        formato,
+        fecha_desde=fecha_desde,
+        fecha_hasta=fecha_hasta,
+        cancha_id=cancha_id,
+        estado_pago=estado_pago
+    )
+    return _respuesta_exportacion(generador, "suscripciones", formato)
+
+@router.get("/ingresos", response_model=List[IngresoAgrupadoOut])
+def obtener_ingresos_endpoint(
+    agrupar_por: str = Query("mes", description=f"Dimensiones separadas por coma: {', '.join(DIMENSIONES_INGRESOS)}"),
+    mes_desde: Optional[date] = Query(None, description="Mes inicial (YYYY-MM-DD, se toma el mes)"),
+    mes_hasta: Optional[date] = Query(None, description="Mes final (YYYY-MM-DD, se toma el mes)"),
+    cancha_id: Optional[int] = Query(None, description="ID de la cancha"),
+    estado_pago: Optional[str] = Query(None, description="Estado de pago"),
+    db: Session = Depends(get_db),
+    admin=Depends(require_admin)
+):
+    """Ingresos agregados desde el rollup mensual (solo para administradores)"""
+    dimensiones = [d.strip() for d in agrupar_por.split(",") if d.strip()]
+    try:
+        return obtener_ingresos(db, dimensiones, mes_desde, mes_hasta, cancha_id, estado_pago)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/ingresos/recalcular")
+def recalcular_ingresos_endpoint(db: Session = Depends(get_db), admin=Depends(require_admin)):
+    """Reconstruir el rollup de ingresos desde el historial completo (solo para administradores)"""
+    filas = reconstruir_ingresos(db)
+    return {"message": "Rollup de ingresos recalculado", "filas": filas}
+
+@router.post("/ocurrencias/regenerar")
+def regenerar_ocurrencias_endpoint(db: Session = Depends(get_db), admin=Depends(require_admin)):
+    """Regenerar las fechas materializadas de todas las suscripciones activas (solo para administradores)"""
+    total = regenerar_ocurrencias(db)
+    return {"message": "Ocurrencias de suscripciones regeneradas", "ocurrencias": total}
+
+@router.get("/resumen")
+def obtener_resumen_endpoint(db: Session = Depends(get_db), admin=Depends(require_admin)):
+    """KPIs del panel (reservas e ingresos de hoy y del mes, pagos pendientes, suscripciones y usuarios) en una sola query"""
+    return obtener_resumen(db)
+
+@router.get("/metricas/consultas")
+def metricas_consultas_endpoint(admin=Depends(require_admin)):
+    """Tasa de aciertos del compiled cache de SQLAlchemy desde el arranque (solo para administradores)"""
+    return estadisticas_cache.resumen(engine)
+
+@router.get("/metricas/email")
+def metricas_email_endpoint(admin=Depends(require_admin)):
+    """Estado del circuito de cada proveedor de email y avisos esperando el resumen (solo para administradores)"""
+    return {**estado_proveedores(), "avisos_admin_pendientes": avisos_pendientes()}
+
+@router.get("/metricas/caches")
+def metricas_caches_endpoint(admin=Depends(require_admin)):
+    """Entradas y aciertos de los caches calientes y si se guardan en disco (solo para administradores)"""
+    return estado_caches()
+
+@router.get("/configuracion")
+def configuracion_endpoint(admin=Depends(require_admin)):
+    """Precios y descuento de suscripción vigentes en memoria (solo para administradores)"""
+    return configuracion_actual().resumen()
+
+@router.post("/configuracion/recargar")
+def recargar_configuracion_endpoint(admin=Depends(require_admin)):
+    """Releer el archivo de precios sin esperar a la próxima revisión (solo para administradores)"""
+    cambio = recargar_configuracion(forzar=True)
+    return {"recargada": cambio, **configuracion_actual().resumen()}
+
+@router.post("/import/reservas")
+def importar_reservas_endpoint(
+    archivo: UploadFile = File(..., description="CSV con cancha_id, fecha, hora_inicio, hora_fin, deporte, nombre_cliente"),
+    simular: bool = Query(False, description="Validar el archivo sin crear las reservas"),
+    db: Session = Depends(get_db),
+    admin=Depends(require_admin)
+):
+    """Importar reservas telefónicas desde un CSV con reporte por fila (solo para administradores)"""
+    try:
+        return importar_reservas_csv(db, archivo.file.read(), admin.id, simular)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/ocupacion")
+def obtener_ocupacion_endpoint(
+    fecha_desde: Optional[date] = Query(None, description="Fecha inicial (YYYY-MM-DD). Por defecto, 8 semanas atrás"),
+    fecha_hasta: Optional[date] = Query(None, description="Fecha final (YYYY-MM-DD). Por defecto, hoy"),
+    cancha_id: Optional[int] = Query(None, description="ID de la cancha"),
+    db: Session = Depends(get_db),
+    admin=Depends(require_admin)
+):
+    """Utilización por día y hora, horas pico y capacidad ociosa (solo para administradores)"""
+    fecha_hasta = fecha_hasta or date.today()
+    fecha_desde = fecha_desde or fecha_hasta - timedelta(weeks=8)
+    try:
+        return calcular_ocupacion(db, fecha_desde, fecha_hasta, cancha_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from app.data.database import get_db
 from app.services.auth_service import get_current_user
@@ -7,10 +7,13 @@ from app.schemas.notification import NotificationCreate, NotificationOut, Notifi
 from app.crud.notification import (
     crear_notificacion, 
     actualizar_resultados_notificacion, 
-    obtener_historial_notificaciones
+    obtener_historial_notificaciones,
+    obtener_estadisticas_notificaciones as calcular_estadisticas_notificaciones,
+    obtener_notificacion_por_id
 )
-from app.services.email_service import enviar_notificacion_masiva
-from typing import List
+from app.services.envios_notificacion_service import contar_audiencia, encolar_envio, obtener_progreso
+from app.services.segmentos_service import contar_segmento, listar_segmentos
+from typing import List, Optional
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
@@ -20,77 +23,52 @@ def enviar_notificacion(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Enviar notificación masiva por email (solo para administradores)"""
+    """
+    Programar una notificación masiva por email y/o WhatsApp según la preferencia de cada
+    usuario (solo para administradores). Responde enseguida; el avance se consulta en
+    /notifications/{id}/progress.
+    """
     if current_user.rol != "admin":
         raise HTTPException(status_code=403, detail="Acceso denegado. Solo administradores pueden enviar notificaciones.")
     
     try:
-        # Crear registro en el historial
-        db_notification = crear_notificacion(db, notification_data, current_user.id)
-        
-        # Determinar destinatarios
-        if notification_data.destinatarios == "todos":
-            usuarios = db.query(User).filter(User.email.isnot(None)).all()
-        elif notification_data.destinatarios == "activos":
-            # Usuarios que han hecho reservas en los últimos 30 días
-            from datetime import datetime, timedelta
-            from app.models.reserva import Reserva
-            
-            fecha_limite = datetime.now() - timedelta(days=30)
-            usuarios_activos = db.query(Reserva.user_id).filter(
-                Reserva.fecha >= fecha_limite.date()
-            ).distinct().all()
-            
-            user_ids = [u[0] for u in usuarios_activos]
-            usuarios = db.query(User).filter(
-                User.id.in_(user_ids),
-                User.email.isnot(None)
-            ).all()
-        elif notification_data.destinatarios == "especifico":
+        if notification_data.destinatarios == "especifico":
             if not notification_data.usuario_id_especifico:
                 raise HTTPException(status_code=400, detail="ID de usuario requerido para notificación específica")
             usuario = db.query(User).filter(User.id == notification_data.usuario_id_especifico).first()
             if not usuario:
                 raise HTTPException(status_code=404, detail="Usuario no encontrado")
-            if not usuario.email:
+            if not usuario.email and not usuario.telefono:
                 raise HTTPException(status_code=400, detail="El usuario no tiene email registrado")
-            usuarios = [usuario]
         else:
-            raise HTTPException(status_code=400, detail="Tipo de destinatarios inválido")
+            # Valida el segmento y sus parámetros antes de crear el registro
+            try:
+                contar_segmento(db, notification_data.destinatarios, notification_data.segmento_parametros)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        
+        # Crear registro en el historial (queda pendiente hasta que el worker lo envíe)
+        db_notification = crear_notificacion(db, notification_data, current_user.id, estado="pendiente")
         
-        # Obtener emails de destinatarios
-        emails_destinatarios = [usuario.email for usuario in usuarios if usuario.email]
+        # Solo cuentan los usuarios con algún destino (email o teléfono para WhatsApp)
+        total = contar_audiencia(db, db_notification)
         
-        if not emails_destinatarios:
+        if not total:
             # Actualizar notificación como fallida
             actualizar_resultados_notificacion(
                 db, db_notification.id, 0, 0, 0, "error"
             )
             raise HTTPException(status_code=400, detail="No hay destinatarios con email válido")
         
-        # Enviar notificaciones por email
-        resultados = enviar_notificacion_masiva(
-            emails_destinatarios, 
-            notification_data.asunto, 
-            notification_data.mensaje, 
-            notification_data.tipo
-        )
-        
-        # Actualizar resultados en la base de datos
-        actualizar_resultados_notificacion(
-            db, 
-            db_notification.id, 
-            resultados["exitosos"], 
-            resultados["fallidos"], 
-            len(emails_destinatarios),
-            "enviado"
-        )
+        actualizar_resultados_notificacion(db, db_notification.id, 0, 0, total, "pendiente")
+        encolar_envio(db_notification.id)
         
         return {
-            "mensaje": "Notificación enviada exitosamente",
-            "enviados_exitosos": resultados["exitosos"],
-            "enviados_fallidos": resultados["fallidos"],
-            "total_destinatarios": len(emails_destinatarios),
+            "mensaje": "Notificación programada, el envío continúa en segundo plano",
+            "enviados_exitosos": 0,
+            "enviados_fallidos": 0,
+            "total_destinatarios": total,
+            "estado": "pendiente",
             "notification_id": db_notification.id
         }
         
@@ -102,19 +80,36 @@ def enviar_notificacion(
             actualizar_resultados_notificacion(
                 db, db_notification.id, 0, 0, 0, "error"
             )
-        raise HTTPException(status_code=500, detail=f"Error al enviar notificaciones: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al programar notificaciones: {str(e)}")
+
+@router.get("/{notification_id}/progress", response_model=dict)
+def obtener_progreso_notificacion(
+    notification_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Enviados, fallidos y restantes de una notificación en curso (solo para administradores)"""
+    if current_user.rol != "admin":
+        raise HTTPException(status_code=403, detail="Acceso denegado. Solo administradores pueden ver notificaciones.")
+    
+    notificacion = obtener_notificacion_por_id(db, notification_id)
+    if not notificacion:
+        raise HTTPException(status_code=404, detail="Notificación no encontrada")
+    return obtener_progreso(db, notificacion)
 
 @router.get("/history", response_model=List[NotificationHistory])
 def obtener_historial_notificaciones_endpoint(
+    skip: int = Query(0, ge=0, description="Cantidad de notificaciones a saltear"),
+    limit: int = Query(50, ge=1, le=100, description="Cantidad máxima de notificaciones a devolver"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Obtener historial de notificaciones (solo para administradores)"""
+    """Obtener historial paginado de notificaciones con preview del mensaje (solo para administradores)"""
     if current_user.rol != "admin":
         raise HTTPException(status_code=403, detail="Acceso denegado. Solo administradores pueden ver el historial.")
     
     try:
-        notificaciones = obtener_historial_notificaciones(db, limit=50)
+        notificaciones = obtener_historial_notificaciones(db, limit=limit, skip=skip)
         return notificaciones
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener historial: {str(e)}")
@@ -129,42 +124,47 @@ def obtener_estadisticas_notificaciones(
         raise HTTPException(status_code=403, detail="Acceso denegado. Solo administradores pueden ver estadísticas.")
     
     try:
-        from sqlalchemy import func
-        from app.models.notification import Notification
-        
-        # Estadísticas generales
-        total_notificaciones = db.query(func.count(Notification.id)).scalar()
-        total_enviados = db.query(func.sum(Notification.enviados_exitosos)).scalar() or 0
-        total_fallidos = db.query(func.sum(Notification.enviados_fallidos)).scalar() or 0
-        
-        # Notificaciones por tipo
-        notificaciones_por_tipo = db.query(
-            Notification.tipo,
-            func.count(Notification.id).label('cantidad')
-        ).group_by(Notification.tipo).all()
-        
-        # Últimas 7 notificaciones
-        ultimas_notificaciones = db.query(Notification).order_by(
-            Notification.fecha_envio.desc()
-        ).limit(7).all()
-        
-        return {
-            "total_notificaciones": total_notificaciones,
-            "total_enviados": total_enviados,
-            "total_fallidos": total_fallidos,
-            "tasa_exito": (total_enviados / (total_enviados + total_fallidos) * 100) if (total_enviados + total_fallidos) > 0 else 0,
-            "por_tipo": {tipo: cantidad for tipo, cantidad in notificaciones_por_tipo},
-            "ultimas_notificaciones": [
-                {
-                    "id": n.id,
-                    "tipo": n.tipo,
-                    "asunto": n.asunto,
-                    "fecha_envio": n.fecha_envio,
-                    "enviados_exitosos": n.enviados_exitosos,
-                    "estado": n.estado
-                }
-                for n in ultimas_notificaciones
-            ]
-        }
+        return calcular_estadisticas_notificaciones(db)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al obtener estadísticas: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error al obtener estadísticas: {str(e)}")
+
+@router.get("/segmentos", response_model=List[dict])
+def obtener_segmentos(current_user: User = Depends(get_current_user)):
+    """Segmentos de audiencia disponibles y sus parámetros (solo para administradores)"""
+    if current_user.rol != "admin":
+        raise HTTPException(status_code=403, detail="Acceso denegado. Solo administradores pueden ver segmentos.")
+    return listar_segmentos()
+
+@router.get("/segmentos/{nombre}/conteo", response_model=dict)
+def contar_destinatarios_segmento(
+    nombre: str,
+    dias: Optional[int] = Query(None, ge=1, description="Ventana en días para activos, cancha y deporte"),
+    cancha_id: Optional[int] = Query(None, description="Cancha del segmento cancha"),
+    deporte: Optional[str] = Query(None, description="Deporte del segmento deporte"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Cantidad de destinatarios de un segmento antes de enviar (solo para administradores)"""
+    if current_user.rol != "admin":
+        raise HTTPException(status_code=403, detail="Acceso denegado. Solo administradores pueden ver segmentos.")
+    
+    parametros = {k: v for k, v in {"dias": dias, "cancha_id": cancha_id, "deporte": deporte}.items() if v is not None}
+    try:
+        return {"segmento": nombre, "parametros": parametros, "total_destinatarios": contar_segmento(db, nombre, parametros)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/{notification_id}", response_model=NotificationOut)
+def obtener_notificacion_endpoint(
+    notification_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Obtener una notificación con el mensaje completo (solo para administradores)"""
+    if current_user.rol != "admin":
+        raise HTTPException(status_code=403, detail="Acceso denegado. Solo administradores pueden ver notificaciones.")
+    
+    notificacion = obtener_notificacion_por_id(db, notification_id)
+    if not notificacion:
+        raise HTTPException(status_code=404, detail="Notificación no encontrada")
+    return notificacion
@@ -1,17 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks, Request, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.schemas.reserva import ReservaCreate, ReservaOut, ReservaInternal, MetodoPagoEnum, ReservaCombinadaOut
-from app.crud.reserva import crear_reserva, listar_reservas_usuario, cancelar_reserva, listar_reservas_por_cancha_fecha, reactivar_reserva, listar_reservas_desde_fecha, buscar_reservas_por_usuario
+from app.schemas.reserva import ReservaCreate, ReservaOut, ReservaInternal, MetodoPagoEnum, ReservaCombinadaOut, CambioMasivoReservas, ResultadoCambioReserva
+from app.crud.reserva import crear_reserva, listar_reservas_usuario, cancelar_reserva, listar_reservas_por_cancha_fecha, reactivar_reserva, listar_reservas_desde_fecha, buscar_reservas_por_usuario, actualizar_reservas_masivo
 from app.services.suscripcion_service import obtener_suscripciones_activas_por_fecha
-from app.data.database import get_db
+from app.data.database import get_db, SessionLocal
+from app.config.settings import settings
+from app.services.disponibilidad_service import broadcaster, horarios_ocupados
+from app.services.idempotencia_service import ejecutar_idempotente
 from app.services.auth_service import get_current_user
 from app.services.pago_service import obtener_info_pago
 from app.services.email_service import send_reservation_cancellation_email_admin, send_reservation_confirmation_email, send_reservation_cancellation_email, send_email, send_reservation_confirmation_email_admin
 from app.services.precio_service import calcular_precio_reserva
 from app.models.user import User
+from app.models.reserva import Reserva
 from app.models.cancha import Cancha
-from typing import List
-from datetime import datetime
+from app.utils.respuestas import respuesta_listado, formato_listado
+from typing import List, Optional
+from datetime import datetime, date
 
 router = APIRouter(prefix="/reservas", tags=["Reservas"])
 
@@ -20,8 +29,17 @@ def crear_reserva_endpoint(
     reserva_in: ReservaCreate, 
     background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
+    """Crear una reserva. Con Idempotency-Key, los reintentos devuelven la respuesta original"""
+    return ejecutar_idempotente(
+        idempotency_key, current_user.id, "POST /reservas/", reserva_in.model_dump(),
+        lambda: _crear_reserva(reserva_in, background_tasks, current_user, db),
+        ReservaOut, db, Reserva
+    )
+
+def _crear_reserva(reserva_in: ReservaCreate, background_tasks: BackgroundTasks, current_user: User, db: Session):
     try:
         print("🚀 === CREACIÓN DE RESERVA ===")
         print(f"👤 Usuario: {current_user.id} ({current_user.nombre})")
@@ -138,19 +156,91 @@ def listar_mis_reservas(current_user: User = Depends(get_current_user), db: Sess
     return reservas
 
 @router.get("/cancha/{cancha_id}", response_model=List[ReservaOut])
-def listar_reservas_por_cancha_fecha_endpoint(cancha_id: int, date: str, db: Session = Depends(get_db)):
-    return listar_reservas_por_cancha_fecha(db, cancha_id, date)
+def listar_reservas_por_cancha_fecha_endpoint(cancha_id: int, date: str, db: Session = Depends(get_db), formato: str = Depends(formato_listado)):
+    return respuesta_listado(listar_reservas_por_cancha_fecha(db, cancha_id, date), ReservaOut, formato)
+
+@router.get("/cancha/{cancha_id}/stream")
+async def disponibilidad_en_vivo_endpoint(cancha_id: int, fecha: date, request: Request):
+    """
+    Stream SSE con la ocupación de la cancha en la fecha: un evento "snapshot" inicial
+    y luego eventos "ocupado"/"liberado" a medida que se crean, cancelan o reactivan
+    reservas y suscripciones.
+    """
+    cola = broadcaster.suscribir(cancha_id, fecha)
+
+    def snapshot():
+        db = SessionLocal()
+        try:
+            return horarios_ocupados(db, cancha_id, fecha)
+        finally:
+            db.close()
+
+    async def eventos():
+        try:
+            ocupados = await run_in_threadpool(snapshot)
+            yield "retry: 3000\n"
+            yield f"event: snapshot\ndata: {json.dumps({'cancha_id': cancha_id, 'fecha': fecha.isoformat(), 'ocupados': ocupados})}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    evento = await asyncio.wait_for(cola.get(), timeout=settings.DISPONIBILIDAD_HEARTBEAT_SEGUNDOS)
+                except asyncio.TimeoutError:
+                    # Comentario SSE: mantiene viva la conexión a través de proxies
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {evento['tipo']}\ndata: {json.dumps(evento)}\n\n"
+        finally:
+            broadcaster.desuscribir(cancha_id, fecha, cola)
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/fecha/{fecha}", response_model=List[ReservaOut])
-def listar_reservas_por_fecha_endpoint(fecha: str, cancha_id: int, db: Session = Depends(get_db)):
+def listar_reservas_por_fecha_endpoint(fecha: str, cancha_id: int, db: Session = Depends(get_db), formato: str = Depends(formato_listado)):
     reservas = listar_reservas_por_cancha_fecha(db, cancha_id, fecha)
-    return reservas
+    return respuesta_listado(reservas, ReservaOut, formato)
+
+@router.get("/buscar", response_model=List[ReservaOut])
+def buscar_reservas_endpoint(
+    q: str = Query(..., min_length=2, description="Nombre, email o nombre del cliente"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Buscar reservas por usuario o cliente, ordenadas por relevancia (solo para administradores)"""
+    if current_user.rol != "admin":
+        raise HTTPException(status_code=403, detail="Acceso denegado. Solo administradores pueden buscar reservas.")
+    
+    return buscar_reservas_por_usuario(db, q, skip=skip, limit=limit)
+
+@router.get("/autocompletar-cliente", response_model=List[str])
+def autocompletar_cliente_endpoint(
+    q: str = Query(..., min_length=1, description="Prefijo del nombre del cliente"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Sugerencias de nombre de cliente para el formulario de reservas del administrador"""
+    if current_user.rol != "admin":
+        raise HTTPException(status_code=403, detail="Acceso denegado. Solo administradores pueden usar el autocompletado.")
+    
+    from app.services.busqueda_service import autocompletar_nombre_cliente
+    return autocompletar_nombre_cliente(db, q)
+
+def _id_numerico(fila: dict) -> dict:
+    """En los formatos en columnas el id es siempre numérico: "suscripcion_12" pasa a 12 (la columna tipo ya lo distingue)"""
+    if isinstance(fila["id"], str):
+        fila["id"] = int(fila["id"].rsplit("_", 1)[-1])
+    return fila
 
 @router.get("/all", response_model=List[ReservaCombinadaOut])
 def listar_todas_reservas_endpoint(
     current_user: User = Depends(get_current_user), 
     db: Session = Depends(get_db),
-    fecha: str = Query(None, description="Fecha en formato YYYY-MM-DD. Si no se especifica, se obtienen todas las reservas")
+    fecha: str = Query(None, description="Fecha en formato YYYY-MM-DD. Si no se especifica, se obtienen todas las reservas"),
+    formato: str = Depends(formato_listado)
 ):
     """Obtener todas las reservas y suscripciones del día (solo para administradores)"""
     if current_user.rol != "admin":
@@ -179,11 +269,8 @@ def listar_todas_reservas_endpoint(
         if fecha:
             try:
                 fecha_dt = datetime.strptime(fecha, "%Y-%m-%d")
-                # Obtener suscripciones de todas las canchas para esa fecha
-                suscripciones = []
-                for cancha in canchas:
-                    suscripciones_cancha = obtener_suscripciones_activas_por_fecha(db, fecha_dt, cancha.id)
-                    suscripciones.extend(suscripciones_cancha)
+                # Obtener suscripciones de todas las canchas para esa fecha (una sola query por ocurrencias)
+                suscripciones = obtener_suscripciones_activas_por_fecha(db, fecha_dt)
                 
                 # Convertir suscripciones a formato de reserva para el frontend
                 for suscripcion in suscripciones:
@@ -215,7 +302,7 @@ def listar_todas_reservas_endpoint(
                 print(f"❌ Error al procesar fecha: {e}")
                 # Si hay error con la fecha, continuar solo con reservas
         
-        return reservas
+        return respuesta_listado(reservas, ReservaCombinadaOut, formato, _id_numerico)
         
     except Exception as e:
         print(f"❌ Error al obtener reservas y suscripciones: {e}")
@@ -223,6 +310,29 @@ def listar_todas_reservas_endpoint(
         print(f"🔍 Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
+@router.patch("/bulk", response_model=List[ResultadoCambioReserva])
+def actualizar_reservas_masivo_endpoint(
+    cambio: CambioMasivoReservas, 
+    current_user: User = Depends(get_current_user), 
+    db: Session = Depends(get_db)
+):
+    """Aplicar el mismo cambio de estado, estado de pago o precio a muchas reservas (solo para administradores)"""
+    if current_user.rol != "admin":
+        raise HTTPException(status_code=403, detail="Acceso denegado. Solo administradores pueden actualizar reservas.")
+    
+    ids = list(dict.fromkeys(cambio.ids))
+    try:
+        actualizadas = actualizar_reservas_masivo(db, ids, cambio.model_dump(exclude={"ids"}))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return [
+        {"id": reserva_id, "resultado": "actualizada", "reserva": actualizadas[reserva_id]}
+        if reserva_id in actualizadas else
+        {"id": reserva_id, "resultado": "no_encontrada", "reserva": None}
+        for reserva_id in ids
+    ]
+
 @router.patch("/{reserva_id}/estado", response_model=ReservaOut)
 def actualizar_estado_reserva_endpoint(
     reserva_id: int, 
@@ -310,7 +420,9 @@ def cancelar_reserva_endpoint(
         reserva_data
     )
 
-    return reserva@router.patch("/{reserva_id}/reactivar", response_model=ReservaOut)
+    return reserva
+
+@router.patch("/{reserva_id}/reactivar", response_model=ReservaOut)
 def reactivar_reserva_endpoint(
     reserva_id: int, 
     current_user: User = Depends(get_current_user), 
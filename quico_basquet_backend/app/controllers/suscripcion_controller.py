@@ -1,13 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks, Header
 from sqlalchemy.orm import Session
-from app.schemas.suscripcion import SuscripcionCreate, SuscripcionOut, SuscripcionUpdate, SuscripcionRenovacion
+from app.schemas.suscripcion import SuscripcionCreate, SuscripcionOut, SuscripcionUpdate, SuscripcionRenovacion, OcurrenciaSuscripcionOut, CambioMasivoSuscripciones, ResultadoCambioSuscripcion
 from app.crud.suscripcion import (
     crear_suscripcion, listar_suscripciones_usuario, obtener_suscripcion,
     actualizar_suscripcion, cancelar_suscripcion, listar_todas_suscripciones,
     actualizar_descuento_suscripcion, actualizar_estado_pago_suscripcion, actualizar_estado_suscripcion,
-    actualizar_precio_suscripcion, reactivar_suscripcion
+    actualizar_precio_suscripcion, reactivar_suscripcion, actualizar_suscripciones_masivo
 )
 from app.services.suscripcion_service import renovar_suscripcion, procesar_suscripciones_vencidas, obtener_suscripciones_activas_por_fecha
+from app.services.ocurrencias_service import omitir_ocurrencia, restaurar_ocurrencia
 from app.data.database import get_db
 from app.services.email_service import (
     send_subscription_confirmation_email, 
@@ -19,8 +20,10 @@ from app.services.email_service import (
 from app.models.user import User
 from app.models.suscripcion import Suscripcion
 from app.services.auth_service import get_current_user
-from typing import List
-from datetime import datetime
+from app.utils.respuestas import respuesta_listado, formato_listado
+from app.services.idempotencia_service import ejecutar_idempotente
+from typing import List, Optional
+from datetime import datetime, date
 
 router = APIRouter(prefix="/suscripciones", tags=["Suscripciones"])
 
@@ -29,9 +32,17 @@ def crear_suscripcion_endpoint(
     suscripcion_in: SuscripcionCreate, 
     background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
-    """Crear una nueva suscripción"""
+    """Crear una nueva suscripción. Con Idempotency-Key, los reintentos devuelven la respuesta original"""
+    return ejecutar_idempotente(
+        idempotency_key, current_user.id, "POST /suscripciones/", suscripcion_in.model_dump(),
+        lambda: _crear_suscripcion(suscripcion_in, background_tasks, current_user, db),
+        SuscripcionOut, db, Suscripcion
+    )
+
+def _crear_suscripcion(suscripcion_in: SuscripcionCreate, background_tasks: BackgroundTasks, current_user: User, db: Session):
     try:
         # Validar que el user_id coincida con el usuario autenticado
         if suscripcion_in.user_id != current_user.id:
@@ -208,12 +219,12 @@ def renovar_suscripcion_endpoint(
 
 # Endpoints para administradores
 @router.get("/admin/todas", response_model=List[SuscripcionOut])
-def listar_todas_suscripciones_endpoint(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def listar_todas_suscripciones_endpoint(current_user: User = Depends(get_current_user), db: Session = Depends(get_db), formato: str = Depends(formato_listado)):
     """Listar todas las suscripciones (solo admin)"""
     if current_user.rol != "admin":
         raise HTTPException(status_code=403, detail="Acceso denegado. Solo administradores pueden ver todas las suscripciones.")
     
-    return listar_todas_suscripciones(db)
+    return respuesta_listado(listar_todas_suscripciones(db), SuscripcionOut, formato)
 
 @router.post("/admin/verificar-vencimientos")
 def verificar_vencimientos_endpoint(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -227,6 +238,29 @@ def verificar_vencimientos_endpoint(current_user: User = Depends(get_current_use
         "suscripciones_vencidas": len(suscripciones_vencidas)
     }
 
+@router.patch("/bulk", response_model=List[ResultadoCambioSuscripcion])
+def actualizar_suscripciones_masivo_endpoint(
+    cambio: CambioMasivoSuscripciones, 
+    current_user: User = Depends(get_current_user), 
+    db: Session = Depends(get_db)
+):
+    """Aplicar el mismo cambio de estado, pago, precio o descuento a muchas suscripciones (solo para administradores)"""
+    if current_user.rol != "admin":
+        raise HTTPException(status_code=403, detail="Acceso denegado. Solo administradores pueden actualizar suscripciones.")
+    
+    ids = list(dict.fromkeys(cambio.ids))
+    try:
+        actualizadas = actualizar_suscripciones_masivo(db, ids, cambio.model_dump(mode="json", exclude={"ids"}))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return [
+        {"id": suscripcion_id, "resultado": "actualizada", "suscripcion": actualizadas[suscripcion_id]}
+        if suscripcion_id in actualizadas else
+        {"id": suscripcion_id, "resultado": "no_encontrada", "suscripcion": None}
+        for suscripcion_id in ids
+    ]
+
 @router.patch("/{suscripcion_id}/descuento", response_model=SuscripcionOut)
 def actualizar_descuento_suscripcion_endpoint(
     suscripcion_id: int, 
@@ -301,4 +335,40 @@ def reactivar_suscripcion_endpoint(
         suscripcion = reactivar_suscripcion(db, suscripcion_id)
         return suscripcion
     except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e)) 
+
+def _verificar_acceso_ocurrencia(db: Session, suscripcion_id: int, current_user: User) -> None:
+    """Solo el titular de la suscripción o un administrador pueden modificar sus fechas"""
+    suscripcion = db.query(Suscripcion).filter(Suscripcion.id == suscripcion_id).first()
+    if not suscripcion:
+        raise HTTPException(status_code=404, detail="Suscripción no encontrada")
+    if current_user.rol != "admin" and suscripcion.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="No tienes permisos para modificar esta suscripción")
+
+@router.patch("/{suscripcion_id}/ocurrencias/{fecha}/omitir", response_model=OcurrenciaSuscripcionOut)
+def omitir_ocurrencia_endpoint(
+    suscripcion_id: int, 
+    fecha: date, 
+    current_user: User = Depends(get_current_user), 
+    db: Session = Depends(get_db)
+):
+    """Omitir una fecha puntual de la suscripción (libera el horario ese día)"""
+    _verificar_acceso_ocurrencia(db, suscripcion_id, current_user)
+    try:
+        return omitir_ocurrencia(db, suscripcion_id, fecha)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.patch("/{suscripcion_id}/ocurrencias/{fecha}/restaurar", response_model=OcurrenciaSuscripcionOut)
+def restaurar_ocurrencia_endpoint(
+    suscripcion_id: int, 
+    fecha: date, 
+    current_user: User = Depends(get_current_user), 
+    db: Session = Depends(get_db)
+):
+    """Restaurar una fecha omitida de la suscripción si el horario sigue libre"""
+    _verificar_acceso_ocurrencia(db, suscripcion_id, current_user)
+    try:
+        return restaurar_ocurrencia(db, suscripcion_id, fecha)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Query
 from sqlalchemy.orm import Session
-from app.schemas.user import UserCreate, UserOut, FirebaseTokenRequest, FirebaseUserData
+from app.schemas.user import UserCreate, UserOut, FirebaseTokenRequest, FirebaseUserData, PreferenciasNotificacion
 from app.models.user import User
 from app.data.database import get_db
-from app.services.auth_service import hash_password, verify_password, create_access_token, get_current_user, require_admin
+from app.services.auth_service import hash_password_async, verify_password_async, create_access_token, get_current_user, require_admin
+from starlette.concurrency import run_in_threadpool
 from app.services.firebase_service import verify_firebase_token
+from app.utils.respuestas import respuesta_listado, formato_listado
+from app.schemas.agenda import AgendaPaginaOut
+from app.services.agenda_service import obtener_agenda, obtener_historial, LIMITE_AGENDA_DEFECTO, LIMITE_AGENDA_MAXIMO
+from app.services.whatsapp_service import normalizar_telefono
+from app.crud.user import update_user
 from fastapi.security import OAuth2PasswordRequestForm
 import datetime
 from typing import List, Optional
@@ -23,14 +29,18 @@ def health_check():
         "server_time_iso": time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime())
     }
 
+# Los endpoints de autenticación son async: el trabajo de bcrypt corre en un executor
+# dedicado y el acceso a la base de datos en el threadpool, sin retener hilos mientras se hashea.
+
 @router.post("/auth/register", response_model=UserOut)
-def register(user_in: UserCreate, db: Session = Depends(get_db)):
+async def register(user_in: UserCreate, db: Session = Depends(get_db)):
     # Verificar si el email ya existe
-    if db.query(User).filter(User.email == user_in.email).first():
+    existente = await run_in_threadpool(lambda: db.query(User.id).filter(User.email == user_in.email).first())
+    if existente:
         raise HTTPException(status_code=400, detail="El email ya está registrado")
     
     # Hash de la contraseña
-    hashed_pw = hash_password(user_in.password)
+    hashed_pw = await hash_password_async(user_in.password)
     
     # Crear el usuario (fecha_registro se establecerá automáticamente)
     user = User(
@@ -42,16 +52,31 @@ def register(user_in: UserCreate, db: Session = Depends(get_db)):
         rol=user_in.rol
     )
     
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+    def guardar():
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return user
+    
+    return await run_in_threadpool(guardar)
 
 @router.post("/auth/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password_hash):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = await run_in_threadpool(lambda: db.query(User).filter(User.email == form_data.username).first())
+    if not user:
+        raise HTTPException(status_code=400, detail="Credenciales incorrectas")
+    
+    valida, nuevo_hash = await verify_password_async(form_data.password, user.password_hash)
+    if not valida:
         raise HTTPException(status_code=400, detail="Credenciales incorrectas")
+    
+    # Re-hash transparente si cambió el costo de bcrypt configurado
+    if nuevo_hash:
+        def actualizar_hash():
+            user.password_hash = nuevo_hash
+            db.commit()
+        await run_in_threadpool(actualizar_hash)
+    
     access_token = create_access_token({"user_id": user.id, "rol": user.rol})
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -230,18 +255,67 @@ def register_with_firebase(user_data: FirebaseUserData, authorization: Optional[
 def get_me(current_user: User = Depends(get_current_user)):
     return current_user 
 
+@router.put("/me/notificaciones", response_model=UserOut)
+def update_my_notification_channels(
+    preferencias: PreferenciasNotificacion,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Elegir los canales (email y/o WhatsApp) por los que llegan las notificaciones"""
+    if "whatsapp" in preferencias.canales and not normalizar_telefono(current_user.telefono):
+        raise HTTPException(status_code=400, detail="Para recibir notificaciones por WhatsApp cargá un teléfono válido")
+    return update_user(db, current_user.id, canales_notificacion=",".join(preferencias.canales))
+
+@router.get("/me/agenda", response_model=AgendaPaginaOut)
+def get_my_agenda(
+    cursor: Optional[str] = Query(None, description="Cursor devuelto por la página anterior"),
+    limit: int = Query(LIMITE_AGENDA_DEFECTO, ge=1, le=LIMITE_AGENDA_MAXIMO),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Próximas reservas y fechas de suscripción del usuario, combinadas en orden cronológico"""
+    try:
+        return obtener_agenda(db, current_user.id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/me/historial", response_model=AgendaPaginaOut)
+def get_my_history(
+    cursor: Optional[str] = Query(None, description="Cursor devuelto por la página anterior"),
+    limit: int = Query(LIMITE_AGENDA_DEFECTO, ge=1, le=LIMITE_AGENDA_MAXIMO),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Reservas y fechas de suscripción pasadas, de la más reciente a la más antigua"""
+    try:
+        return obtener_historial(db, current_user.id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/", response_model=List[UserOut])
 def get_users(db: Session = Depends(get_db), admin=Depends(require_admin)):
     return db.query(User).all()
 
 @router.get("/all", response_model=List[UserOut])
-def get_all_users(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_all_users(current_user: User = Depends(get_current_user), db: Session = Depends(get_db), formato: str = Depends(formato_listado)):
     """Obtener todos los usuarios (solo para administradores)"""
     if current_user.rol != "admin":
         raise HTTPException(status_code=403, detail="Acceso denegado. Solo administradores pueden ver todos los usuarios.")
     
     usuarios = db.query(User).order_by(User.fecha_registro.desc()).all()
-    return usuarios
+    return respuesta_listado(usuarios, UserOut, formato)
+
+@router.get("/buscar", response_model=List[UserOut])
+def buscar_usuarios_endpoint(
+    q: str = Query(..., min_length=2, description="Nombre o email"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
+    db: Session = Depends(get_db),
+    admin=Depends(require_admin)
+):
+    """Buscar usuarios por nombre o email, ordenados por relevancia (solo para administradores)"""
+    from app.services.busqueda_service import buscar_usuarios
+    return buscar_usuarios(db, q, skip=skip, limit=limit)
 
 @router.patch("/{user_id}/bloquear", response_model=UserOut)
 def bloquear_usuario_endpoint(
@@ -1,8 +1,12 @@
 from sqlalchemy.orm import Session
 from app.models.cancha import Cancha
 from app.schemas.cancha import CanchaCreate, CanchaUpdate, CanchaPreciosUpdate
+from app.utils.actualizacion_masiva import actualizar_entidad
+from app.services.precio_service import precios_cancha, invalidar_libro_precios
 from typing import Optional
 
+CAMPOS_PRECIOS = ["precio_basquet", "precio_voley", "descuento_basquet", "descuento_voley", "descuento_suscripcion"]
+
 # Obtener todas las canchas
 def get_canchas(db: Session):
     return db.query(Cancha).all()
@@ -13,17 +17,17 @@ def get_cancha(db: Session, cancha_id: int) -> Optional[Cancha]:
 
 # Actualizar cancha (solo admin)
 def update_cancha(db: Session, cancha_id: int, cancha_in: CanchaCreate) -> Optional[Cancha]:
-    cancha = db.query(Cancha).filter(Cancha.id == cancha_id).first()
-    if not cancha:
-        return None
-    
     update_data = cancha_in.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(cancha, field, value)
+    if not update_data:
+        return get_cancha(db, cancha_id)
+    
+    resultado = actualizar_entidad(db, Cancha, [Cancha.id == cancha_id], update_data)
+    if not resultado:
+        return None
     
     db.commit()
-    db.refresh(cancha)
-    return cancha
+    invalidar_libro_precios()
+    return resultado[0]
 
 # Actualizar precios y descuentos de una cancha (solo admin)
 def update_cancha_precios(db: Session, cancha_id: int, precios_data: CanchaPreciosUpdate) -> Optional[Cancha]:
@@ -31,42 +35,31 @@ def update_cancha_precios(db: Session, cancha_id: int, precios_data: CanchaPreci
     print(f"🏀 Cancha ID: {cancha_id}")
     print(f"📋 Datos recibidos: {precios_data.model_dump()}")
     
-    cancha = db.query(Cancha).filter(Cancha.id == cancha_id).first()
-    if not cancha:
+    # Un solo UPDATE ... RETURNING que además devuelve los valores previos para el log
+    resultado = actualizar_entidad(
+        db, Cancha, [Cancha.id == cancha_id],
+        {campo: getattr(precios_data, campo) for campo in CAMPOS_PRECIOS},
+        {f"{campo}_anterior": campo for campo in CAMPOS_PRECIOS}
+    )
+    if not resultado:
         print(f"❌ Cancha no encontrada con ID: {cancha_id}")
         return None
     
-    print(f"🏀 Cancha encontrada: {cancha.nombre}")
-    print(f"📊 Valores actuales:")
-    print(f"   - precio_basquet: {cancha.precio_basquet}")
-    print(f"   - precio_voley: {cancha.precio_voley}")
-    print(f"   - descuento_basquet: {cancha.descuento_basquet}")
-    print(f"   - descuento_voley: {cancha.descuento_voley}")
-    print(f"   - descuento_suscripcion: {cancha.descuento_suscripcion}")
-    
-    # Actualizar campos directamente
-    cancha.precio_basquet = precios_data.precio_basquet
-    cancha.precio_voley = precios_data.precio_voley
-    cancha.descuento_basquet = precios_data.descuento_basquet
-    cancha.descuento_voley = precios_data.descuento_voley
-    cancha.descuento_suscripcion = precios_data.descuento_suscripcion
-    
-    print(f"📊 Valores después de actualizar:")
-    print(f"   - precio_basquet: {cancha.precio_basquet}")
-    print(f"   - precio_voley: {cancha.precio_voley}")
-    print(f"   - descuento_basquet: {cancha.descuento_basquet}")
-    print(f"   - descuento_voley: {cancha.descuento_voley}")
-    print(f"   - descuento_suscripcion: {cancha.descuento_suscripcion}")
-    
+    cancha, previos = resultado
     db.commit()
-    db.refresh(cancha)
+    invalidar_libro_precios()
+    
+    print(f"🏀 Cancha actualizada: {cancha.nombre}")
+    print(f"📊 Valores anteriores → nuevos:")
+    for campo in CAMPOS_PRECIOS:
+        print(f"   - {campo}: {previos[campo + '_anterior']} → {getattr(cancha, campo)}")
     
     print(f"✅ Precios actualizados exitosamente")
     return cancha
 
 # Obtener precio de un deporte específico
 def get_precio_deporte(db: Session, cancha_id: int, deporte: str) -> float:
-    cancha = get_cancha(db, cancha_id)
+    cancha = precios_cancha(db, cancha_id)
     if not cancha:
         return 0
     
@@ -79,7 +72,7 @@ def get_precio_deporte(db: Session, cancha_id: int, deporte: str) -> float:
 
 # Obtener descuento de un deporte específico
 def get_descuento_deporte(db: Session, cancha_id: int, deporte: str) -> float:
-    cancha = get_cancha(db, cancha_id)
+    cancha = precios_cancha(db, cancha_id)
     if not cancha:
         return 0
     
@@ -92,7 +85,7 @@ def get_descuento_deporte(db: Session, cancha_id: int, deporte: str) -> float:
 
 # Obtener descuento de suscripción
 def get_descuento_suscripcion(db: Session, cancha_id: int, deporte: str) -> float:
-    cancha = get_cancha(db, cancha_id)
+    cancha = precios_cancha(db, cancha_id)
     if not cancha:
         return 0
     
@@ -1,9 +1,24 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
+from cachetools import TTLCache
 from app.models.notification import Notification
 from app.schemas.notification import NotificationCreate
 from typing import List, Optional
+from datetime import datetime
+import threading
 
-def crear_notificacion(db: Session, notification_data: NotificationCreate, admin_id: int) -> Notification:
+# Largo máximo del preview de mensaje que se devuelve en el historial
+LARGO_PREVIEW_MENSAJE = 120
+
+# Cache de estadísticas, invalidada cada vez que se crea o actualiza una notificación
+_cache_estadisticas = TTLCache(maxsize=1, ttl=300)
+_cache_lock = threading.Lock()
+
+def invalidar_cache_estadisticas() -> None:
+    with _cache_lock:
+        _cache_estadisticas.clear()
+
+def crear_notificacion(db: Session, notification_data: NotificationCreate, admin_id: int, estado: str = "enviado") -> Notification:
     """Crear una nueva notificación en el historial"""
     db_notification = Notification(
         tipo=notification_data.tipo,
@@ -11,11 +26,15 @@ def crear_notificacion(db: Session, notification_data: NotificationCreate, admin
         mensaje=notification_data.mensaje,
         destinatarios=notification_data.destinatarios,
         usuario_id_especifico=notification_data.usuario_id_especifico,
-        enviado_por=admin_id
+        segmento_parametros=notification_data.segmento_parametros,
+        enviado_por=admin_id,
+        estado=estado,
+        actualizada=datetime.utcnow()
     )
     db.add(db_notification)
     db.commit()
     db.refresh(db_notification)
+    invalidar_cache_estadisticas()
     return db_notification
 
 def actualizar_resultados_notificacion(
@@ -24,22 +43,83 @@ def actualizar_resultados_notificacion(
     enviados_exitosos: int, 
     enviados_fallidos: int, 
     total_destinatarios: int,
-    estado: str = "enviado"
+    estado: str = "enviado",
+    resultados_canales: Optional[dict] = None
 ) -> Notification:
-    """Actualizar los resultados del envío de una notificación"""
+    """Actualizar los resultados del envío de una notificación (totales y, si se pasan, por canal)"""
     db_notification = db.query(Notification).filter(Notification.id == notification_id).first()
     if db_notification:
         db_notification.enviados_exitosos = enviados_exitosos
         db_notification.enviados_fallidos = enviados_fallidos
         db_notification.total_destinatarios = total_destinatarios
         db_notification.estado = estado
+        if resultados_canales is not None:
+            db_notification.resultados_canales = resultados_canales
         db.commit()
         db.refresh(db_notification)
+        invalidar_cache_estadisticas()
     return db_notification
 
-def obtener_historial_notificaciones(db: Session, limit: int = 50) -> List[Notification]:
-    """Obtener historial de notificaciones ordenado por fecha más reciente"""
-    return db.query(Notification).order_by(Notification.fecha_envio.desc()).limit(limit).all()
+def obtener_historial_notificaciones(db: Session, limit: int = 50, skip: int = 0) -> list:
+    """
+    Obtener historial paginado de notificaciones ordenado por fecha más reciente.
+    Solo trae un preview del mensaje; el cuerpo completo se pide con obtener_notificacion_por_id.
+    """
+    return db.query(
+        Notification.id,
+        Notification.tipo,
+        Notification.asunto,
+        func.substr(Notification.mensaje, 1, LARGO_PREVIEW_MENSAJE).label("mensaje_preview"),
+        Notification.destinatarios,
+        Notification.enviados_exitosos,
+        Notification.total_destinatarios,
+        Notification.fecha_envio,
+        Notification.estado
+    ).order_by(Notification.fecha_envio.desc(), Notification.id.desc()).offset(skip).limit(limit).all()
+
+def obtener_estadisticas_notificaciones(db: Session) -> dict:
+    """
+    Estadísticas de notificaciones con un único GROUP BY por tipo (los totales se
+    derivan de los grupos) más las últimas 7 notificaciones proyectadas.
+    El resultado se cachea hasta que se crea o actualiza una notificación.
+    """
+    with _cache_lock:
+        cacheadas = _cache_estadisticas.get("estadisticas")
+    if cacheadas is not None:
+        return cacheadas
+
+    por_tipo = db.query(
+        Notification.tipo,
+        func.count(Notification.id),
+        func.coalesce(func.sum(Notification.enviados_exitosos), 0),
+        func.coalesce(func.sum(Notification.enviados_fallidos), 0)
+    ).group_by(Notification.tipo).all()
+
+    total_notificaciones = sum(cantidad for _, cantidad, _, _ in por_tipo)
+    total_enviados = sum(exitosos for _, _, exitosos, _ in por_tipo)
+    total_fallidos = sum(fallidos for _, _, _, fallidos in por_tipo)
+
+    ultimas_notificaciones = db.query(
+        Notification.id,
+        Notification.tipo,
+        Notification.asunto,
+        Notification.fecha_envio,
+        Notification.enviados_exitosos,
+        Notification.estado
+    ).order_by(Notification.fecha_envio.desc(), Notification.id.desc()).limit(7).all()
+
+    estadisticas = {
+        "total_notificaciones": total_notificaciones,
+        "total_enviados": total_enviados,
+        "total_fallidos": total_fallidos,
+        "tasa_exito": (total_enviados / (total_enviados + total_fallidos) * 100) if (total_enviados + total_fallidos) > 0 else 0,
+        "por_tipo": {tipo: cantidad for tipo, cantidad, _, _ in por_tipo},
+        "ultimas_notificaciones": [dict(n._mapping) for n in ultimas_notificaciones]
+    }
+
+    with _cache_lock:
+        _cache_estadisticas["estadisticas"] = estadisticas
+    return estadisticas
 
 def obtener_notificacion_por_id(db: Session, notification_id: int) -> Optional[Notification]:
     """Obtener una notificación específica por ID"""
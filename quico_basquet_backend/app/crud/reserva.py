@@ -1,9 +1,20 @@
 from sqlalchemy.orm import Session
 from app.models.reserva import Reserva
+from app.data.consultas import RESERVAS_USUARIO
 from app.services.reserva_service import validar_horario_reserva, calcular_duracion_reserva, hay_solapamiento_reserva_suscripcion
+from app.utils.actualizacion_masiva import actualizar_devolviendo_anteriores, actualizar_entidad
+from app.services.ingresos_service import (
+    cuenta_en_ingresos, registrar_alta_reserva, registrar_baja_reserva, registrar_cambio_estado_reserva,
+    registrar_cambio_reserva, registrar_cambios_lote
+)
+from app.services.resumen_service import invalidar_resumen
+from app.services.disponibilidad_service import publicar_reserva
 from app.config.settings import DURACION_MINIMA_RESERVA, DURACION_MAXIMA_RESERVA
 from datetime import datetime, time
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+
+ESTADOS_RESERVA = ["pendiente", "confirmada", "cancelada", "completada"]
+ESTADOS_PAGO_RESERVA = ["pendiente", "pagado", "cancelado"]
 
 def crear_reserva(db: Session, reserva_in, precio: float, metodo_pago: str) -> Reserva:
     """Crear una nueva reserva"""
@@ -46,8 +57,10 @@ def crear_reserva(db: Session, reserva_in, precio: float, metodo_pago: str) -> R
     )
     
     db.add(db_reserva)
-    db.commit()
-    db.refresh(db_reserva)
+    registrar_alta_reserva(db, db_reserva)
+    db.commit()  # el INSERT devuelve el id con RETURNING
+    invalidar_resumen()
+    publicar_reserva(db_reserva, "ocupado")
     
     print(f"✅ Reserva creada exitosamente con ID: {db_reserva.id}")
     return db_reserva
@@ -60,7 +73,7 @@ def hay_solapamiento_reserva(db: Session, cancha_id: int, fecha, hora_inicio: ti
 
 def listar_reservas_usuario(db: Session, user_id: int) -> List[Reserva]:
     """Listar reservas de un usuario"""
-    return db.query(Reserva).filter(Reserva.user_id == user_id).order_by(Reserva.fecha.desc(), Reserva.hora_inicio.desc()).all()
+    return db.execute(RESERVAS_USUARIO, {"user_id": user_id}).scalars().all()
 
 def listar_reservas_por_cancha_fecha(db: Session, cancha_id: int, fecha: str) -> List[Reserva]:
     """Listar reservas por cancha y fecha"""
@@ -90,81 +103,70 @@ def listar_reservas_desde_fecha(db: Session, fecha_desde: str) -> List[Reserva]:
         Reserva.fecha >= fecha_obj
     ).order_by(Reserva.fecha.asc(), Reserva.hora_inicio.asc()).all()
 
-def buscar_reservas_por_usuario(db: Session, termino_busqueda: str) -> List[Reserva]:
+def buscar_reservas_por_usuario(db: Session, termino_busqueda: str, skip: int = 0, limit: int = 50) -> List[Reserva]:
     """Buscar reservas por nombre del usuario, email o nombre del cliente"""
-    from app.models.user import User
-    
-    # Buscar usuarios que coincidan con el término
-    usuarios_encontrados = db.query(User).filter(
-        (User.nombre.ilike(f"%{termino_busqueda}%")) |
-        (User.email.ilike(f"%{termino_busqueda}%"))
-    ).all()
-    
-    user_ids = [usuario.id for usuario in usuarios_encontrados]
-    
-    # Buscar reservas por user_ids o nombre_cliente
-    query = db.query(Reserva).filter(
-        (Reserva.user_id.in_(user_ids)) |
-        (Reserva.nombre_cliente.ilike(f"%{termino_busqueda}%"))
-    )
-    
-    return query.order_by(Reserva.fecha.desc(), Reserva.hora_inicio.desc()).all()
+    from app.services.busqueda_service import buscar_reservas
+    return buscar_reservas(db, termino_busqueda, skip=skip, limit=limit)
 
 def cancelar_reserva(db: Session, reserva_id: int, user_id: int) -> Optional[Reserva]:
     """Cancelar una reserva"""
-    reserva = db.query(Reserva).filter(Reserva.id == reserva_id, Reserva.user_id == user_id).first()
-    if not reserva:
+    resultado = actualizar_entidad(db, Reserva, [Reserva.id == reserva_id, Reserva.user_id == user_id], {"estado": "cancelada"}, {"estado_anterior": "estado"})
+    if not resultado:
         raise ValueError("Reserva no encontrada")
     
-    reserva.estado = "cancelada"
+    reserva, previos = resultado
+    if cuenta_en_ingresos(previos["estado_anterior"]):
+        registrar_baja_reserva(db, reserva)
     db.commit()
-    db.refresh(reserva)
+    invalidar_resumen()
+    publicar_reserva(reserva, "liberado")
     return reserva
 
 def actualizar_estado_reserva(db: Session, reserva_id: int, nuevo_estado: str) -> Reserva:
     """Actualizar estado de una reserva"""
-    estados_validos = ["pendiente", "confirmada", "cancelada", "completada"]
+    if nuevo_estado not in ESTADOS_RESERVA:
+        raise ValueError(f"Estado inválido. Estados válidos: {ESTADOS_RESERVA}")
     
-    reserva = db.query(Reserva).filter(Reserva.id == reserva_id).first()
-    if not reserva:
+    resultado = actualizar_entidad(db, Reserva, [Reserva.id == reserva_id], {"estado": nuevo_estado}, {"estado_anterior": "estado"})
+    if not resultado:
         raise ValueError("Reserva no encontrada")
     
-    if nuevo_estado not in estados_validos:
-        raise ValueError(f"Estado inválido. Estados válidos: {estados_validos}")
-    
-    reserva.estado = nuevo_estado
+    reserva, previos = resultado
+    registrar_cambio_estado_reserva(db, reserva, previos["estado_anterior"])
     db.commit()
-    db.refresh(reserva)
+    invalidar_resumen()
+    if (previos["estado_anterior"] == "cancelada") != (nuevo_estado == "cancelada"):
+        publicar_reserva(reserva, "liberado" if nuevo_estado == "cancelada" else "ocupado")
     return reserva
 
 def actualizar_estado_pago_reserva(db: Session, reserva_id: int, nuevo_estado_pago: str) -> Reserva:
     """Actualizar estado de pago de una reserva"""
-    estados_pago_validos = ["pendiente", "pagado", "cancelado"]
+    if nuevo_estado_pago not in ESTADOS_PAGO_RESERVA:
+        raise ValueError(f"Estado de pago inválido. Estados válidos: {ESTADOS_PAGO_RESERVA}")
     
-    reserva = db.query(Reserva).filter(Reserva.id == reserva_id).first()
-    if not reserva:
+    resultado = actualizar_entidad(db, Reserva, [Reserva.id == reserva_id], {"estado_pago": nuevo_estado_pago}, {"estado_pago_anterior": "estado_pago"})
+    if not resultado:
         raise ValueError("Reserva no encontrada")
     
-    if nuevo_estado_pago not in estados_pago_validos:
-        raise ValueError(f"Estado de pago inválido. Estados válidos: {estados_pago_validos}")
-    
-    reserva.estado_pago = nuevo_estado_pago
+    reserva, previos = resultado
+    registrar_cambio_reserva(db, reserva, previos["estado_pago_anterior"], reserva.precio)
     db.commit()
-    db.refresh(reserva)
+    invalidar_resumen()
     return reserva
 
 def actualizar_precio_reserva(db: Session, reserva_id: int, nuevo_precio: float) -> Reserva:
     """Actualizar precio de una reserva"""
-    reserva = db.query(Reserva).filter(Reserva.id == reserva_id).first()
-    if not reserva:
-        raise ValueError("Reserva no encontrada")
-    
     if nuevo_precio < 0:
         raise ValueError("El precio no puede ser negativo")
     
-    reserva.precio = nuevo_precio
+    resultado = actualizar_entidad(db, Reserva, [Reserva.id == reserva_id], {"precio": nuevo_precio}, {"precio_anterior": "precio"})
+    if not resultado:
+        raise ValueError("Reserva no encontrada")
+    
+    reserva, previos = resultado
+    registrar_cambio_reserva(db, reserva, reserva.estado_pago, previos["precio_anterior"])
     db.commit()
-    db.refresh(reserva)
+    invalidar_resumen()
     return reserva
 
 def reactivar_reserva(db: Session, reserva_id: int) -> Reserva:
@@ -181,6 +183,48 @@ def reactivar_reserva(db: Session, reserva_id: int) -> Reserva:
         raise ValueError("No se puede reactivar la reserva porque hay un conflicto de horario con otra reserva o suscripción")
     
     reserva.estado = "confirmada"
+    registrar_alta_reserva(db, reserva)
     db.commit()
-    db.refresh(reserva)
-    return reserva 
\ No newline at end of file
+    invalidar_resumen()
+    publicar_reserva(reserva, "ocupado")
+    return reserva 
+
+def actualizar_reservas_masivo(db: Session, ids: List[int], cambios: dict) -> Dict[int, Any]:
+    """
+    Aplica el mismo cambio (estado, estado_pago y/o precio) a muchas reservas con un único
+    UPDATE ... RETURNING. Retorna las filas actualizadas por id; los ids que falten no existen.
+    """
+    valores = {campo: valor for campo, valor in cambios.items() if valor is not None}
+    if not valores:
+        raise ValueError("Debe indicar al menos un cambio: estado, estado_pago o precio")
+    if "estado" in valores and valores["estado"] not in ESTADOS_RESERVA:
+        raise ValueError(f"Estado inválido. Estados válidos: {ESTADOS_RESERVA}")
+    if "estado_pago" in valores and valores["estado_pago"] not in ESTADOS_PAGO_RESERVA:
+        raise ValueError(f"Estado de pago inválido. Estados válidos: {ESTADOS_PAGO_RESERVA}")
+    if "precio" in valores and valores["precio"] < 0:
+        raise ValueError("El precio no puede ser negativo")
+
+    # Una sola sentencia que además devuelve los valores previos (para el rollup y los eventos)
+    filas = actualizar_devolviendo_anteriores(db, Reserva.__table__, ids, valores, {
+        "estado_anterior": "estado",
+        "estado_pago_anterior": "estado_pago",
+        "precio_anterior": "precio",
+    })
+
+    if valores.keys() & {"estado", "estado_pago", "precio"}:
+        registrar_cambios_lote(db, "reserva", [
+            {
+                "fecha": f.fecha, "cancha_id": f.cancha_id, "deporte": f.deporte, "metodo_pago": f.metodo_pago,
+                "estado": f.estado, "estado_pago": f.estado_pago, "precio": f.precio,
+                "estado_anterior": f.estado_anterior, "estado_pago_anterior": f.estado_pago_anterior, "precio_anterior": f.precio_anterior,
+            }
+            for f in filas
+        ])
+    db.commit()
+    invalidar_resumen()
+
+    for fila in filas:
+        if (fila.estado_anterior == "cancelada") != (fila.estado == "cancelada"):
+            publicar_reserva(fila, "liberado" if fila.estado == "cancelada" else "ocupado")
+
+    return {fila.id: fila for fila in filas}
@@ -5,9 +5,20 @@ from app.services.reserva_service import hay_solapamiento_suscripcion, validar_h
 from app.services.optimized_reserva_service import verificar_solapamiento_suscripcion_optimizado
 from app.services.precio_service import calcular_precio_suscripcion_mensual
 from app.services.descuento_service import aplicar_descuento_multiple_dias, contar_dias_unicos_usuario, calcular_descuento_por_dias
+from app.utils.actualizacion_masiva import actualizar_devolviendo_anteriores, actualizar_entidad
+from app.services.ingresos_service import (
+    cuenta_en_ingresos, registrar_alta_suscripcion, registrar_baja_suscripcion, registrar_cambio_estado_suscripcion,
+    registrar_cambio_suscripcion, registrar_cambios_lote
+)
+from app.services.ocurrencias_service import sincronizar_ocurrencias, sincronizar_ocurrencias_lote
+from app.services.resumen_service import invalidar_resumen
+from app.services.disponibilidad_service import publicar_suscripcion
 from app.config.settings import DURACION_MINIMA_RESERVA, DURACION_MAXIMA_RESERVA
 from datetime import datetime, time
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+
+ESTADOS_SUSCRIPCION = ["activa", "vencida", "cancelada", "pendiente"]
+ESTADOS_PAGO_SUSCRIPCION = ["pendiente", "aprobado", "rechazado"]
 
 def crear_suscripcion(db: Session, suscripcion_in: SuscripcionCreate, user_id: int) -> Suscripcion:
     """
@@ -55,15 +66,16 @@ def crear_suscripcion(db: Session, suscripcion_in: SuscripcionCreate, user_id: i
     
     print("💾 Guardando en base de datos...")
     db.add(db_suscripcion)
-    db.commit()
-    db.refresh(db_suscripcion)
+    registrar_alta_suscripcion(db, db_suscripcion)
+    sincronizar_ocurrencias(db, db_suscripcion, historial=True)
     
-    # 🚀 APLICAR DESCUENTOS AUTOMÁTICOS POR DÍAS MÚLTIPLES
+    # 🚀 APLICAR DESCUENTOS AUTOMÁTICOS POR DÍAS MÚLTIPLES (en la misma transacción)
     print("🔢 Aplicando descuentos automáticos por días múltiples...")
-    aplicar_descuento_multiple_dias(db, user_id, suscripcion_in.dia_semana)
+    aplicar_descuento_multiple_dias(db, user_id, suscripcion_in.dia_semana, commit=False)
     
-    # Refresh para obtener el descuento actualizado
-    db.refresh(db_suscripcion)
+    db.commit()
+    invalidar_resumen()
+    publicar_suscripcion(db_suscripcion, "ocupado")
     
     print(f"✅ Suscripción creada exitosamente con ID: {db_suscripcion.id}")
     print(f"💰 Descuento aplicado: {db_suscripcion.descuento}%")
@@ -83,29 +95,41 @@ def actualizar_suscripcion(db: Session, suscripcion_id: int, user_id: int, suscr
     if not suscripcion:
         return None
     
+    estado_anterior = suscripcion.estado
+    estado_pago_anterior = suscripcion.estado_pago
+    precio_anterior = suscripcion.precio_mensual
+    
     # Actualizar campos
     update_data = suscripcion_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(suscripcion, field, value)
     
+    registrar_cambio_suscripcion(db, suscripcion, estado_pago_anterior, precio_anterior, estado_anterior)
+    sincronizar_ocurrencias(db, suscripcion)
     db.commit()
-    db.refresh(suscripcion)
+    invalidar_resumen()
     return suscripcion
 
 def cancelar_suscripcion(db: Session, suscripcion_id: int, user_id: int) -> Suscripcion:
     """Cancelar una suscripción"""
-    suscripcion = db.query(Suscripcion).filter(Suscripcion.id == suscripcion_id, Suscripcion.user_id == user_id).first()
-    if not suscripcion:
+    resultado = actualizar_entidad(
+        db, Suscripcion, [Suscripcion.id == suscripcion_id, Suscripcion.user_id == user_id], {"estado": "cancelada"}, {"estado_anterior": "estado"}
+    )
+    if not resultado:
         raise ValueError("Suscripción no encontrada")
     
-    suscripcion.estado = "cancelada"
-    db.commit()
-    db.refresh(suscripcion)
+    suscripcion, previos = resultado
+    if cuenta_en_ingresos(previos["estado_anterior"]):
+        registrar_baja_suscripcion(db, suscripcion)
+    sincronizar_ocurrencias(db, suscripcion)
     
     # 🚀 RECALCULAR DESCUENTOS AUTOMÁTICOS DESPUÉS DE CANCELAR
     print("🔢 Recalculando descuentos automáticos tras cancelación...")
-    aplicar_descuento_multiple_dias(db, user_id)
+    aplicar_descuento_multiple_dias(db, user_id, commit=False)
     
+    db.commit()
+    invalidar_resumen()
+    publicar_suscripcion(suscripcion, "liberado")
     return suscripcion
 
 def listar_todas_suscripciones(db: Session) -> List[Suscripcion]:
@@ -130,47 +154,46 @@ def actualizar_descuento_suscripcion(db: Session, suscripcion_id: int, nuevo_des
     if not (0 <= nuevo_descuento <= 100):
         raise ValueError("El descuento debe estar entre 0 y 100")
     
-    suscripcion = db.query(Suscripcion).filter(Suscripcion.id == suscripcion_id).first()
-    if not suscripcion:
+    resultado = actualizar_entidad(db, Suscripcion, [Suscripcion.id == suscripcion_id], {"descuento": nuevo_descuento})
+    if not resultado:
         raise ValueError("Suscripción no encontrada")
     
-    suscripcion.descuento = nuevo_descuento
     db.commit()
-    db.refresh(suscripcion)
-    return suscripcion
+    return resultado[0]
 
 # Actualizar estado de pago de una suscripción (para administradores)
 def actualizar_estado_pago_suscripcion(db: Session, suscripcion_id: int, nuevo_estado_pago: str) -> Suscripcion:
     """Actualizar estado de pago de una suscripción"""
-    estados_pago_validos = ["pendiente", "aprobado", "rechazado"]
-    
-    if nuevo_estado_pago not in estados_pago_validos:
-        raise ValueError(f"Estado de pago inválido. Debe ser uno de: {estados_pago_validos}")
+    if nuevo_estado_pago not in ESTADOS_PAGO_SUSCRIPCION:
+        raise ValueError(f"Estado de pago inválido. Debe ser uno de: {ESTADOS_PAGO_SUSCRIPCION}")
     
-    suscripcion = db.query(Suscripcion).filter(Suscripcion.id == suscripcion_id).first()
-    if not suscripcion:
+    resultado = actualizar_entidad(db, Suscripcion, [Suscripcion.id == suscripcion_id], {"estado_pago": nuevo_estado_pago}, {"estado_pago_anterior": "estado_pago"})
+    if not resultado:
         raise ValueError("Suscripción no encontrada")
     
-    suscripcion.estado_pago = nuevo_estado_pago
+    suscripcion, previos = resultado
+    registrar_cambio_suscripcion(db, suscripcion, previos["estado_pago_anterior"], suscripcion.precio_mensual)
     db.commit()
-    db.refresh(suscripcion)
+    invalidar_resumen()
     return suscripcion
 
 # Actualizar estado de una suscripción (para administradores)
 def actualizar_estado_suscripcion(db: Session, suscripcion_id: int, nuevo_estado: str) -> Suscripcion:
     """Actualizar estado de una suscripción"""
-    estados_validos = ["activa", "vencida", "cancelada", "pendiente"]
-    
-    if nuevo_estado not in estados_validos:
-        raise ValueError(f"Estado inválido. Debe ser uno de: {estados_validos}")
+    if nuevo_estado not in ESTADOS_SUSCRIPCION:
+        raise ValueError(f"Estado inválido. Debe ser uno de: {ESTADOS_SUSCRIPCION}")
     
-    suscripcion = db.query(Suscripcion).filter(Suscripcion.id == suscripcion_id).first()
-    if not suscripcion:
+    resultado = actualizar_entidad(db, Suscripcion, [Suscripcion.id == suscripcion_id], {"estado": nuevo_estado}, {"estado_anterior": "estado"})
+    if not resultado:
         raise ValueError("Suscripción no encontrada")
     
-    suscripcion.estado = nuevo_estado
+    suscripcion, previos = resultado
+    registrar_cambio_estado_suscripcion(db, suscripcion, previos["estado_anterior"])
+    sincronizar_ocurrencias(db, suscripcion)
     db.commit()
-    db.refresh(suscripcion)
+    invalidar_resumen()
+    if (previos["estado_anterior"] == "activa") != (nuevo_estado == "activa"):
+        publicar_suscripcion(suscripcion, "ocupado" if nuevo_estado == "activa" else "liberado")
     return suscripcion
 
 # Actualizar precio de una suscripción (para administradores)
@@ -179,13 +202,14 @@ def actualizar_precio_suscripcion(db: Session, suscripcion_id: int, nuevo_precio
     if nuevo_precio <= 0:
         raise ValueError("El precio debe ser un valor positivo")
     
-    suscripcion = db.query(Suscripcion).filter(Suscripcion.id == suscripcion_id).first()
-    if not suscripcion:
+    resultado = actualizar_entidad(db, Suscripcion, [Suscripcion.id == suscripcion_id], {"precio_mensual": nuevo_precio}, {"precio_anterior": "precio_mensual"})
+    if not resultado:
         raise ValueError("Suscripción no encontrada")
     
-    suscripcion.precio_mensual = nuevo_precio
+    suscripcion, previos = resultado
+    registrar_cambio_suscripcion(db, suscripcion, suscripcion.estado_pago, previos["precio_anterior"])
     db.commit()
-    db.refresh(suscripcion)
+    invalidar_resumen()
     return suscripcion
 
 def reactivar_suscripcion(db: Session, suscripcion_id: int) -> Suscripcion:
@@ -198,11 +222,57 @@ def reactivar_suscripcion(db: Session, suscripcion_id: int) -> Suscripcion:
         raise ValueError("Solo se pueden reactivar suscripciones canceladas")
     
     # Verificar que no haya conflictos de horario al reactivar
-    from app.services.reserva_service import verificar_solapamiento_suscripcion_multiple_dias
-    if verificar_solapamiento_suscripcion_multiple_dias(db, suscripcion.cancha_id, suscripcion.dia_semana, suscripcion.hora_inicio, suscripcion.hora_fin, suscripcion.fecha_inicio, suscripcion.fecha_fin, suscripcion_id):
+    if verificar_solapamiento_suscripcion_optimizado(db, suscripcion.cancha_id, suscripcion.dia_semana, suscripcion.hora_inicio, suscripcion.hora_fin, suscripcion.fecha_inicio, suscripcion.fecha_fin, suscripcion_id):
         raise ValueError("No se puede reactivar la suscripción porque hay un conflicto de horario con otra reserva o suscripción")
     
     suscripcion.estado = "activa"
+    registrar_alta_suscripcion(db, suscripcion)
+    sincronizar_ocurrencias(db, suscripcion)
     db.commit()
-    db.refresh(suscripcion)
-    return suscripcion 
\ No newline at end of file
+    invalidar_resumen()
+    publicar_suscripcion(suscripcion, "ocupado")
+    return suscripcion 
+
+def actualizar_suscripciones_masivo(db: Session, ids: List[int], cambios: dict) -> Dict[int, Any]:
+    """
+    Aplica el mismo cambio (estado, estado_pago, precio_mensual y/o descuento) a muchas
+    suscripciones con un único UPDATE ... RETURNING. Retorna las filas actualizadas por id.
+    """
+    valores = {campo: valor for campo, valor in cambios.items() if valor is not None}
+    if not valores:
+        raise ValueError("Debe indicar al menos un cambio: estado, estado_pago, precio_mensual o descuento")
+    if "estado" in valores and valores["estado"] not in ESTADOS_SUSCRIPCION:
+        raise ValueError(f"Estado inválido. Debe ser uno de: {ESTADOS_SUSCRIPCION}")
+    if "estado_pago" in valores and valores["estado_pago"] not in ESTADOS_PAGO_SUSCRIPCION:
+        raise ValueError(f"Estado de pago inválido. Debe ser uno de: {ESTADOS_PAGO_SUSCRIPCION}")
+    if "precio_mensual" in valores and valores["precio_mensual"] <= 0:
+        raise ValueError("El precio debe ser un valor positivo")
+    if "descuento" in valores and not (0 <= valores["descuento"] <= 100):
+        raise ValueError("El descuento debe estar entre 0 y 100")
+
+    # Una sola sentencia que además devuelve los valores previos (para el rollup y los eventos)
+    filas = actualizar_devolviendo_anteriores(db, Suscripcion.__table__, ids, valores, {
+        "estado_anterior": "estado",
+        "estado_pago_anterior": "estado_pago",
+        "precio_anterior": "precio_mensual",
+    })
+
+    if valores.keys() & {"estado", "estado_pago", "precio_mensual"}:
+        registrar_cambios_lote(db, "suscripcion", [
+            {
+                "fecha": f.fecha_inicio, "cancha_id": f.cancha_id, "deporte": f.deporte, "metodo_pago": f.metodo_pago,
+                "estado": f.estado, "estado_pago": f.estado_pago, "precio": f.precio_mensual,
+                "estado_anterior": f.estado_anterior, "estado_pago_anterior": f.estado_pago_anterior, "precio_anterior": f.precio_anterior,
+            }
+            for f in filas
+        ])
+
+    cambian_ocupacion = [f for f in filas if (f.estado_anterior == "activa") != (f.estado == "activa")]
+    sincronizar_ocurrencias_lote(db, [f.id for f in cambian_ocupacion])
+    db.commit()
+    invalidar_resumen()
+
+    for fila in cambian_ocupacion:
+        publicar_suscripcion(fila, "ocupado" if fila.estado == "activa" else "liberado")
+
+    return {fila.id: fila for fila in filas}
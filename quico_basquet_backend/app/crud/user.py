@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session
 from app.models.user import User
 from app.schemas.user import UserCreate
+from app.utils.actualizacion_masiva import actualizar_entidad
+from app.services.auth_service import invalidar_usuario
 from typing import Optional, List
 
 def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
@@ -26,8 +28,7 @@ def create_user(db: Session, user_data: UserCreate, password_hash: str) -> User:
         rol=user_data.rol
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    db.commit()  # el INSERT devuelve id y fecha_registro con RETURNING
     return user
 
 def get_all_users(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
@@ -36,14 +37,14 @@ def get_all_users(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
 
 def update_user(db: Session, user_id: int, **kwargs) -> Optional[User]:
     """Actualizar usuario"""
-    user = get_user_by_id(db, user_id)
-    if not user:
-        return None
+    valores = {key: value for key, value in kwargs.items() if hasattr(User, key)}
+    if not valores:
+        return get_user_by_id(db, user_id)
     
-    for key, value in kwargs.items():
-        if hasattr(user, key):
-            setattr(user, key, value)
+    resultado = actualizar_entidad(db, User, [User.id == user_id], valores)
+    if not resultado:
+        return None
     
     db.commit()
-    db.refresh(user)
-    return user 
\ No newline at end of file
+    invalidar_usuario(user_id)  # el UPDATE masivo no dispara los eventos del mapper
+    return resultado[0]
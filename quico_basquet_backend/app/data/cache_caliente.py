@@ -0,0 +1,178 @@
+"""
+Caches en memoria de los read models calientes (libro de precios, horarios de los próximos
+días y usuarios autenticados) con la versión de sus tablas.
+
+En PostgreSQL un trigger por sentencia incrementa un contador en cada cambio de las tablas
+versionadas. Cada cache recuerda la versión leída antes de cargar su entrada más vieja: si al
+restaurar una instantánea la versión en la base sigue igual, nadie tocó esas tablas desde
+entonces y las entradas se pueden usar sin volver a consultarlas.
+
+El contador de cada tabla está repartido en PARTICIONES_VERSION filas (la del trigger sale del
+pid de la conexión) y la versión es su suma: escrituras concurrentes desde distintas conexiones
+no se serializan sobre una única fila. No se usa una secuencia porque nextval no es
+transaccional: una escritura todavía sin commit ya movería la versión, y un cache cargado en
+ese momento quedaría marcado como vigente sin ver el cambio.
+"""
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+from cachetools import TTLCache
+from sqlalchemy import func, select, text
+from app.models.version_datos import VersionDatos
+
+logger = logging.getLogger(__name__)
+
+TABLAS_VERSIONADAS = ("canchas", "reservas", "ocurrencias_suscripcion", "users")
+
+PARTICIONES_VERSION = 16
+
+FUNCION_VERSION = f"""
+CREATE OR REPLACE FUNCTION incrementar_version_datos() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO versiones_datos_particiones (tabla, particion, version)
+    VALUES (TG_TABLE_NAME, pg_backend_pid() % {PARTICIONES_VERSION}, 1)
+    ON CONFLICT (tabla, particion) DO UPDATE SET version = versiones_datos_particiones.version + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+# El trigger solo se crea si falta: recrearlo en cada arranque tomaba un lock exclusivo sobre
+# cada tabla versionada. Los cambios de lógica van en la función (CREATE OR REPLACE, sin locks)
+TRIGGER_VERSION = """
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'tr_version_{tabla}' AND tgrelid = '{tabla}'::regclass) THEN
+        CREATE TRIGGER tr_version_{tabla} AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {tabla}
+        FOR EACH STATEMENT EXECUTE FUNCTION incrementar_version_datos();
+    END IF;
+END
+$$
+"""
+
+_versionado = False
+
+def inicializar_versiones(engine) -> bool:
+    """
+    Crea en PostgreSQL la función y los triggers que versionan las tablas. En otros motores
+    no hay versiones y las instantáneas en disco quedan desactivadas (los caches siguen andando).
+    """
+    global _versionado
+    if engine.dialect.name != "postgresql":
+        return False
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(FUNCION_VERSION))
+            for tabla in TABLAS_VERSIONADAS:
+                conn.execute(text(TRIGGER_VERSION.format(tabla=tabla)))
+        _versionado = True
+    except Exception as e:
+        logger.warning(f"No se pudieron crear los triggers de versión de datos: {e}")
+        _versionado = False
+    return _versionado
+
+def versionado_habilitado() -> bool:
+    return _versionado
+
+def leer_versiones(db, tablas: Iterable[str]) -> Optional[Dict[str, int]]:
+    """Versión actual de cada tabla: suma de sus particiones (None si el versionado no está habilitado)"""
+    if not _versionado:
+        return None
+    tablas = list(tablas)
+    filas = db.execute(
+        select(VersionDatos.tabla, func.sum(VersionDatos.version)).where(VersionDatos.tabla.in_(tablas)).group_by(VersionDatos.tabla)
+    ).all()
+    versiones = {tabla: 0 for tabla in tablas}
+    versiones.update({tabla: int(version) for tabla, version in filas})
+    return versiones
+
+# Caches registrados por nombre (secciones de la instantánea en disco)
+CACHES: Dict[str, "CacheCaliente"] = {}
+
+class CacheCaliente:
+    """
+    TTLCache con lock y la versión de sus tablas. Las claves son tuplas o valores simples y
+    los valores tipos básicos (dict, list, str, números), para poder guardarlos en msgpack.
+    """
+
+    def __init__(self, nombre: str, tablas: Tuple[str, ...], maxsize: int, ttl: float):
+        self.nombre = nombre
+        self.tablas = tablas
+        self._datos = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.version: Optional[Dict[str, int]] = None
+        self.aciertos = 0
+        self.fallos = 0
+        CACHES[nombre] = self
+
+    def obtener(self, clave: Hashable) -> Any:
+        with self._lock:
+            valor = self._datos.get(clave)
+            if valor is None:
+                self.fallos += 1
+            else:
+                self.aciertos += 1
+            return valor
+
+    def obtener_o_cargar(self, db, clave: Hashable, cargar: Callable[[], Any]) -> Any:
+        """Valor cacheado o el que devuelve cargar(); la versión se lee antes de cargar"""
+        valor = self.obtener(clave)
+        if valor is not None:
+            return valor
+
+        with self._lock:
+            self._datos.expire()
+            if not self._datos:
+                self.version = None
+            necesita_version = self.version is None
+        version = leer_versiones(db, self.tablas) if necesita_version else None
+
+        valor = cargar()
+        if valor is not None:
+            with self._lock:
+                if self.version is None:
+                    self.version = version
+                self._datos[clave] = valor
+        return valor
+
+    def invalidar(self, claves: Optional[Iterable[Hashable]] = None) -> None:
+        """Sin claves vacía todo el cache"""
+        with self._lock:
+            if claves is None:
+                self._datos.clear()
+                self.version = None
+                return
+            for clave in claves:
+                self._datos.pop(clave, None)
+
+    def exportar(self) -> Optional[dict]:
+        """Entradas vigentes y su versión, o None si no hay nada que guardar"""
+        with self._lock:
+            self._datos.expire()
+            if self.version is None or not self._datos:
+                return None
+            return {
+                "tablas": list(self.tablas),
+                "version": dict(self.version),
+                "entradas": [[list(clave) if isinstance(clave, tuple) else clave, valor] for clave, valor in self._datos.items()],
+            }
+
+    def importar(self, version: Dict[str, int], entradas: List[list]) -> int:
+        """Carga entradas de una instantánea ya validada (msgpack devuelve las tuplas como listas)"""
+        with self._lock:
+            for clave, valor in entradas:
+                self._datos[tuple(clave) if isinstance(clave, list) else clave] = valor
+            if self.version is None:
+                self.version = dict(version)
+            return len(self._datos)
+
+    def resumen(self) -> dict:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._datos),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else None,
+            }
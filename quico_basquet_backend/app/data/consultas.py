@@ -0,0 +1,127 @@
+"""
+Registro de consultas precompiladas para el camino caliente (solapamientos, listados y auth).
+
+Cada sentencia se construye una sola vez con select() y parámetros bindparam: en cada
+request solo cambian los valores, así SQLAlchemy reutiliza la clave de caché ya calculada
+y la compilación guardada en el compiled cache del engine en lugar de rearmar el Query.
+"""
+import threading
+from functools import lru_cache
+from datetime import time
+from sqlalchemy import and_, bindparam, event, or_, select
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
+from app.models.ocurrencia import OcurrenciaSuscripcion
+from app.models.reserva import Reserva
+from app.models.suscripcion import Suscripcion
+from app.models.user import User
+
+MEDIANOCHE = time(0, 0)
+
+# ---- Reservas ----
+
+# Solo las columnas que usa la validación de solapamiento (sin hidratar entidades)
+HORARIOS_RESERVAS_CANCHA_FECHA = select(Reserva.id, Reserva.hora_inicio, Reserva.hora_fin).where(
+    Reserva.cancha_id == bindparam("cancha_id"),
+    Reserva.fecha == bindparam("fecha"),
+    Reserva.estado != "cancelada"
+)
+
+RESERVAS_USUARIO = select(Reserva).where(
+    Reserva.user_id == bindparam("user_id")
+).order_by(Reserva.fecha.desc(), Reserva.hora_inicio.desc())
+
+# ---- Usuarios ----
+
+USUARIO_POR_ID = select(User).where(User.id == bindparam("user_id"))
+
+# Campos de autorización: se leen en cada request aunque el resto del usuario esté cacheado
+AUTORIZACION_USUARIO = select(User.rol, User.bloqueado).where(User.id == bindparam("user_id"))
+
+# ---- Ocurrencias de suscripciones ----
+
+@lru_cache(maxsize=None)
+def ocurrencias_en_conflicto(termina_a_medianoche: bool, excluye_suscripcion: bool):
+    """
+    Variante de la consulta de conflicto según la forma del horario pedido. El filtro de
+    solapamiento cambia si el horario termina a medianoche, así que hay una sentencia por caso.
+    Parámetros: cancha_id, fechas (lista), hora_inicio, hora_fin (salvo a medianoche)
+    y excluir_suscripcion_id.
+    """
+    # Mismo criterio que ocurrencias_service.filtro_solapamiento (00:00 = fin del día)
+    termina_despues = or_(
+        OcurrenciaSuscripcion.hora_fin > bindparam("hora_inicio"),
+        OcurrenciaSuscripcion.hora_fin == MEDIANOCHE
+    )
+    solapa = termina_despues if termina_a_medianoche else and_(
+        OcurrenciaSuscripcion.hora_inicio < bindparam("hora_fin"), termina_despues
+    )
+
+    stmt = select(OcurrenciaSuscripcion.id).where(
+        OcurrenciaSuscripcion.cancha_id == bindparam("cancha_id"),
+        OcurrenciaSuscripcion.fecha.in_(bindparam("fechas", expanding=True)),
+        OcurrenciaSuscripcion.estado == "activa",
+        solapa
+    )
+    if excluye_suscripcion:
+        stmt = stmt.where(OcurrenciaSuscripcion.suscripcion_id != bindparam("excluir_suscripcion_id"))
+    return stmt.limit(1)
+
+@lru_cache(maxsize=None)
+def suscripciones_por_fecha(filtra_cancha: bool):
+    """Suscripciones que ocupan la fecha. Parámetros: fecha y, si filtra_cancha, cancha_id"""
+    stmt = select(Suscripcion).join(
+        OcurrenciaSuscripcion, OcurrenciaSuscripcion.suscripcion_id == Suscripcion.id
+    ).where(
+        OcurrenciaSuscripcion.fecha == bindparam("fecha"),
+        OcurrenciaSuscripcion.estado == "activa"
+    )
+    if filtra_cancha:
+        stmt = stmt.where(OcurrenciaSuscripcion.cancha_id == bindparam("cancha_id"))
+    return stmt.order_by(Suscripcion.cancha_id, Suscripcion.hora_inicio)
+
+# ---- Métrica del compiled cache ----
+
+class EstadisticasCache:
+    """Cuenta aciertos y fallos del compiled cache de SQLAlchemy por sentencia ejecutada"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self.aciertos = 0
+            self.fallos = 0
+            self.sin_cache = 0
+
+    def registrar(self, resultado) -> None:
+        with self._lock:
+            if resultado == CACHE_HIT:
+                self.aciertos += 1
+            elif resultado == CACHE_MISS:
+                self.fallos += 1
+            else:
+                self.sin_cache += 1
+
+    def resumen(self, engine=None) -> dict:
+        with self._lock:
+            cacheables = self.aciertos + self.fallos
+            resumen = {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "sin_cache": self.sin_cache,
+                "tasa_aciertos": round(self.aciertos / cacheables, 4) if cacheables else None,
+            }
+        cache = getattr(engine, "_compiled_cache", None)
+        if cache is not None:
+            resumen["sentencias_compiladas"] = len(cache)
+        return resumen
+
+estadisticas_cache = EstadisticasCache()
+
+def instrumentar_cache(engine) -> None:
+    """Registra el resultado de caché de cada sentencia que ejecuta el engine"""
+    @event.listens_for(engine, "after_cursor_execute")
+    def _registrar(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            estadisticas_cache.registrar(context.cache_hit)
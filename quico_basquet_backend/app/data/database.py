@@ -27,7 +27,9 @@ engine = create_engine(
     echo=False  # Cambiar a True para ver todas las queries
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: las entidades conservan sus valores tras el commit (los UPDATE/INSERT
+# del CRUD ya los devuelven con RETURNING), así que leerlas no dispara otro SELECT
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 Base = declarative_base()
 
@@ -1,9 +1,11 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from app.config.settings import settings
 from app.controllers import user_controller, reserva_controller, cancha_controller, suscripcion_controller, notification_controller, admin_controller
-from app.data.database import engine, Base
+from app.data.database import engine, Base, SessionLocal
 # Importar modelos para que se creen las tablas
-from app.models import user, cancha, reserva, suscripcion, notification
+from app.models import user, cancha, reserva, suscripcion, notification, ingreso, ocurrencia, idempotencia, version_datos
 import logging
 
 # Configurar logging
@@ -13,6 +15,34 @@ logger = logging.getLogger(__name__)
 # Crear tablas
 Base.metadata.create_all(bind=engine)
 
+# Métrica de aciertos del compiled cache de SQLAlchemy (ver /admin/metricas/consultas)
+from app.data.consultas import instrumentar_cache
+instrumentar_cache(engine)
+
+# Columnas de preferencia y resultados por canal de notificación
+from app.services.canales_notificacion import inicializar_canales
+inicializar_canales(engine)
+
+# Índices de búsqueda (pg_trgm)
+from app.services.busqueda_service import inicializar_busqueda
+inicializar_busqueda(engine)
+
+# Índice del keyset de la agenda por usuario
+from app.services.agenda_service import inicializar_agenda
+inicializar_agenda(engine)
+
+# Índices de los segmentos de audiencia de notificaciones
+from app.services.segmentos_service import inicializar_segmentos
+inicializar_segmentos(engine)
+
+# Versión por tabla (triggers) para validar la instantánea de caches calientes
+from app.data.cache_caliente import inicializar_versiones
+inicializar_versiones(engine)
+
+# Ocurrencias materializadas de suscripciones (carga inicial si la tabla está vacía)
+from app.services.ocurrencias_service import inicializar_ocurrencias
+inicializar_ocurrencias(SessionLocal)
+
 # Crear aplicación FastAPI
 app = FastAPI(title="Quico Básquet API", version="1.0.0")
 
@@ -25,6 +55,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Configurar compresión de respuestas (brotli si está instalado, gzip como alternativa)
+try:
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(
+        BrotliMiddleware,
+        minimum_size=settings.COMPRESION_TAMANO_MINIMO,
+        gzip_fallback=True,
+        # Los streams SSE no se comprimen: el compresor retendría los eventos en su buffer
+        excluded_handlers=[r"/stream$"],
+    )
+    logger.info("Compresión brotli/gzip habilitada")
+except ImportError:
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=settings.COMPRESION_TAMANO_MINIMO,
+        compresslevel=settings.COMPRESION_NIVEL_GZIP,
+    )
+    logger.info("Compresión gzip habilitada")
+
 # Inicializar Firebase
 try:
     from app.services.firebase_service import firebase_service
@@ -44,6 +93,49 @@ app.include_router(suscripcion_controller.router)
 app.include_router(notification_controller.router)
 app.include_router(admin_controller.router)
 
+@app.on_event("startup")
+async def iniciar_recursos():
+    import asyncio
+    from app.services.disponibilidad_service import iniciar_disponibilidad
+    from app.services.avisos_admin_service import iniciar_avisos_admin
+    from app.services.envios_notificacion_service import iniciar_barrido_envios, reanudar_envios
+    from app.config.negocio import iniciar_configuracion
+    from app.services.snapshot_service import iniciar_snapshot
+    from app.services.ingresos_service import iniciar_reconciliacion_ingresos
+    from app.services.ocurrencias_service import iniciar_extension_ocurrencias
+    iniciar_configuracion()
+    iniciar_snapshot(SessionLocal)
+    iniciar_disponibilidad(asyncio.get_running_loop(), engine)
+    iniciar_avisos_admin()
+    reanudar_envios(SessionLocal)
+    iniciar_barrido_envios(SessionLocal)
+    iniciar_reconciliacion_ingresos(SessionLocal)
+    iniciar_extension_ocurrencias(SessionLocal)
+
+@app.on_event("shutdown")
+def cerrar_recursos():
+    from app.services.hashing_service import cerrar_executor
+    from app.services.disponibilidad_service import detener_disponibilidad
+    from app.services.proveedores_email import cerrar_proveedores
+    from app.services.avisos_admin_service import detener_avisos_admin
+    from app.config.negocio import detener_configuracion
+    from app.services.snapshot_service import detener_snapshot
+    from app.services.ingresos_service import detener_reconciliacion_ingresos
+    from app.services.ocurrencias_service import detener_extension_ocurrencias
+    detener_snapshot()
+    detener_reconciliacion_ingresos()
+    detener_extension_ocurrencias()
+    cerrar_executor()
+    detener_configuracion()
+    detener_disponibilidad()
+    # Primero el resumen pendiente, después se cierran los proveedores
+    from app.services.canales_notificacion import cerrar_canales
+    from app.services.envios_notificacion_service import detener_envios
+    detener_avisos_admin()
+    detener_envios()
+    cerrar_canales()
+    cerrar_proveedores()
+
 @app.get("/")
 def read_root():
     return {"message": "API de Quico Básquet funcionando correctamente"}
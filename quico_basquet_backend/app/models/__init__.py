@@ -2,5 +2,9 @@ from .user import User
 from .cancha import Cancha
 from .reserva import Reserva
 from .notification import Notification
+from .ingreso import IngresoMensual
+from .ocurrencia import OcurrenciaSuscripcion
+from .idempotencia import ClaveIdempotencia
+from .version_datos import VersionDatos
 
-__all__ = ['User', 'Cancha', 'Reserva', 'Notification'] 
\ No newline at end of file
+__all__ = ['User', 'Cancha', 'Reserva', 'Notification', 'IngresoMensual', 'OcurrenciaSuscripcion', 'ClaveIdempotencia', 'VersionDatos'] 
\ No newline at end of file
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, UniqueConstraint
+from app.data.database import Base
+
+class ClaveIdempotencia(Base):
+    """Respuesta guardada para un Idempotency-Key (por usuario y endpoint) hasta su vencimiento"""
+    __tablename__ = "claves_idempotencia"
+    __table_args__ = (
+        UniqueConstraint("user_id", "endpoint", "clave", name="uq_claves_idempotencia_clave"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    clave = Column(String(255), nullable=False)
+    user_id = Column(Integer, nullable=False)
+    endpoint = Column(String(100), nullable=False)
+    hash_peticion = Column(String(64), nullable=False)  # sha256 del cuerpo normalizado
+    estado = Column(String(20), nullable=False, default="en_proceso")  # en_proceso, completada
+    status_code = Column(Integer, nullable=True)
+    respuesta = Column(Text, nullable=True)  # JSON de la respuesta
+    creada = Column(DateTime, nullable=False)
+    expira = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, Date, Float, UniqueConstraint
+from app.data.database import Base
+
+class IngresoMensual(Base):
+    """Rollup de ingresos por mes, cancha, deporte, método y estado de pago"""
+    __tablename__ = "ingresos_mensuales"
+    __table_args__ = (
+        UniqueConstraint("mes", "origen", "cancha_id", "deporte", "metodo_pago", "estado_pago", name="uq_ingresos_mensuales_clave"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    mes = Column(Date, nullable=False, index=True)  # Primer día del mes
+    origen = Column(String, nullable=False)  # "reserva" o "suscripcion"
+    cancha_id = Column(Integer, nullable=False)
+    deporte = Column(String, nullable=False)
+    metodo_pago = Column(String, nullable=False)
+    estado_pago = Column(String, nullable=False)
+    cantidad = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.data.database import Base
@@ -10,14 +10,19 @@ class Notification(Base):
     tipo = Column(String(50), nullable=False)  # "general", "mantenimiento", "promocion", "reserva", "suscripcion"
     asunto = Column(String(200), nullable=False)
     mensaje = Column(Text, nullable=False)
-    destinatarios = Column(String(50), nullable=False)  # "todos", "activos", "especifico"
+    destinatarios = Column(String(50), nullable=False)  # segmento: "todos", "activos", "suscriptores", "cancha", "deporte", "especifico"
+    segmento_parametros = Column(JSON, nullable=True)  # {"dias": 30}, {"cancha_id": 2}, {"deporte": "padel"}...
     usuario_id_especifico = Column(Integer, ForeignKey("users.id"), nullable=True)
     enviado_por = Column(Integer, ForeignKey("users.id"), nullable=False)
     enviados_exitosos = Column(Integer, default=0)
     enviados_fallidos = Column(Integer, default=0)
     total_destinatarios = Column(Integer, default=0)
     fecha_envio = Column(DateTime(timezone=True), server_default=func.now())
-    estado = Column(String(20), default="enviado")  # "enviado", "error", "pendiente"
+    estado = Column(String(20), default="enviado")  # "pendiente", "enviando", "enviado", "error"
+    resultados_canales = Column(JSON, nullable=True)  # {"email": {"exitosos", "fallidos", "omitidos", "total"}, "whatsapp": {...}}
+    # Progreso del envío en tandas: último usuario procesado (por id) y último avance del worker
+    ultimo_usuario_id = Column(Integer, nullable=True)
+    actualizada = Column(DateTime, nullable=True)
     
     # Relaciones
     usuario_especifico = relationship("User", foreign_keys=[usuario_id_especifico])
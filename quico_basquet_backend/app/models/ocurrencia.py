@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, Time, Index, UniqueConstraint
+from app.data.database import Base
+
+class OcurrenciaSuscripcion(Base):
+    """Una fecha concreta de una suscripción (materializada desde dia_semana y el período)"""
+    __tablename__ = "ocurrencias_suscripcion"
+    __table_args__ = (
+        UniqueConstraint("suscripcion_id", "fecha", name="uq_ocurrencias_suscripcion_fecha"),
+        Index("ix_ocurrencias_suscripcion_cancha_fecha", "cancha_id", "fecha"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    suscripcion_id = Column(Integer, ForeignKey("suscripciones.id", ondelete="CASCADE"), nullable=False, index=True)
+    cancha_id = Column(Integer, nullable=False)
+    fecha = Column(Date, nullable=False)
+    hora_inicio = Column(Time, nullable=False)
+    hora_fin = Column(Time, nullable=False)
+    estado = Column(String, nullable=False, default="activa")  # activa, omitida
@@ -1,9 +1,12 @@
 from app.data.database import Base
-from sqlalchemy import Column, Float, Integer, String, ForeignKey, Date, Time
+from sqlalchemy import Column, Float, Integer, String, ForeignKey, Date, Time, Index
 from sqlalchemy.orm import relationship
 
 class Reserva(Base):
     __tablename__ = "reservas"
+    __table_args__ = (
+        Index("ix_reservas_user_fecha", "user_id", "fecha"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
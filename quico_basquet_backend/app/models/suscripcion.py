@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, Time, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, Time, Float, Index
 from sqlalchemy.orm import relationship
 from app.data.database import Base
 
 class Suscripcion(Base):
     __tablename__ = "suscripciones"
+    __table_args__ = (
+        Index("ix_suscripciones_user_estado", "user_id", "estado"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
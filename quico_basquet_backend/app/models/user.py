@@ -16,6 +16,7 @@ class User(Base):
     rol = Column(String, default="usuario")  # "usuario" o "admin"
     bloqueado = Column(String, default="activo")  # "activo" o "bloqueado"
     fecha_registro = Column(DateTime, default=func.now(), nullable=False)
+    canales_notificacion = Column(String(30), default="email", server_default="email", nullable=False)  # "email", "whatsapp" o "email,whatsapp"
 
     reservas = relationship("Reserva", back_populates="user")
     suscripciones = relationship("Suscripcion", back_populates="user")
\ No newline at end of file
@@ -0,0 +1,13 @@
+from sqlalchemy import BigInteger, Column, SmallInteger, String
+from app.data.database import Base
+
+class VersionDatos(Base):
+    """
+    Contador de cambios por tabla repartido en particiones (lo incrementa un trigger en PostgreSQL)
+    para validar caches guardados. La versión de una tabla es la suma de sus particiones.
+    """
+    __tablename__ = "versiones_datos_particiones"
+
+    tabla = Column(String(63), primary_key=True)
+    particion = Column(SmallInteger, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
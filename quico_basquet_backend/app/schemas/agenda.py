@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from datetime import date, time
+from typing import List, Optional
+
+class AgendaItemOut(BaseModel):
+    tipo: str  # "reserva" o "suscripcion"
+    id: int  # id de la reserva o de la suscripción
+    cancha_id: int
+    deporte: str
+    fecha: date
+    hora_inicio: time
+    hora_fin: time
+    estado: str
+    estado_pago: Optional[str] = None
+    precio: Optional[float] = None  # precio de la reserva; las suscripciones se cobran por mes
+    metodo_pago: Optional[str] = None
+
+class AgendaPaginaOut(BaseModel):
+    items: List[AgendaItemOut]
+    siguiente_cursor: Optional[str] = None  # None cuando no hay más resultados
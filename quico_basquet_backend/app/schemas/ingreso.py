@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import date
+
+class IngresoAgrupadoOut(BaseModel):
+    mes: Optional[date] = None
+    origen: Optional[str] = None
+    cancha_id: Optional[int] = None
+    deporte: Optional[str] = None
+    metodo_pago: Optional[str] = None
+    estado_pago: Optional[str] = None
+    cantidad: int
+    total: float
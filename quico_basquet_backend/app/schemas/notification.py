@@ -1,5 +1,5 @@
 from pydantic import BaseModel, field_validator
-from typing import Optional
+from typing import Any, Dict, Optional
 from datetime import datetime
 
 class NotificationCreate(BaseModel):
@@ -8,6 +8,7 @@ class NotificationCreate(BaseModel):
     mensaje: str
     destinatarios: str
     usuario_id_especifico: Optional[int] = None
+    segmento_parametros: Optional[Dict[str, Any]] = None  # parámetros del segmento (dias, cancha_id, deporte)
 
     @field_validator('tipo')
     @classmethod
@@ -20,7 +21,7 @@ class NotificationCreate(BaseModel):
     @field_validator('destinatarios')
     @classmethod
     def validate_destinatarios(cls, v):
-        destinatarios_validos = ['todos', 'activos', 'especifico']
+        destinatarios_validos = ['todos', 'activos', 'suscriptores', 'cancha', 'deporte', 'especifico']
         if v not in destinatarios_validos:
             raise ValueError(f'Destinatarios debe ser uno de: {destinatarios_validos}')
         return v
@@ -55,12 +56,14 @@ class NotificationOut(BaseModel):
     mensaje: str
     destinatarios: str
     usuario_id_especifico: Optional[int]
+    segmento_parametros: Optional[Dict[str, Any]] = None
     enviado_por: int
     enviados_exitosos: int
     enviados_fallidos: int
     total_destinatarios: int
     fecha_envio: datetime
     estado: str
+    resultados_canales: Optional[Dict[str, Dict[str, int]]] = None
     
     class Config:
         from_attributes = True
@@ -69,6 +72,7 @@ class NotificationHistory(BaseModel):
     id: int
     tipo: str
     asunto: str
+    mensaje_preview: Optional[str] = None
     destinatarios: str
     enviados_exitosos: int
     total_destinatarios: int
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, field_validator
-from typing import Optional, Union
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional, Union
 from datetime import date, time
 from enum import Enum
 
@@ -75,6 +75,20 @@ class ReservaOut(ReservaInternal):
     class Config:
         from_attributes = True
 
+# Máximo de ids por petición en los cambios masivos
+LIMITE_CAMBIO_MASIVO = 500
+
+class CambioMasivoReservas(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=LIMITE_CAMBIO_MASIVO)
+    estado: Optional[str] = None
+    estado_pago: Optional[str] = None
+    precio: Optional[float] = None
+
+class ResultadoCambioReserva(BaseModel):
+    id: int
+    resultado: str  # "actualizada" o "no_encontrada"
+    reserva: Optional[ReservaOut] = None
+
 # Nuevo schema para respuestas combinadas (reservas + suscripciones)
 class ReservaCombinadaOut(BaseModel):
     id: Union[int, str]  # Puede ser int (reserva) o str (suscripcion_X)
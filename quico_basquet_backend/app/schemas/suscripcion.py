@@ -1,7 +1,8 @@
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, Field, validator
 from datetime import date, time
 from typing import Optional, List
 from enum import Enum
+from app.schemas.reserva import LIMITE_CAMBIO_MASIVO
 
 class EstadoSuscripcion(str, Enum):
     activa = "activa"
@@ -71,10 +72,34 @@ class SuscripcionOut(BaseModel):
     class Config:
         from_attributes = True
 
+class CambioMasivoSuscripciones(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=LIMITE_CAMBIO_MASIVO)
+    estado: Optional[EstadoSuscripcion] = None
+    estado_pago: Optional[EstadoPagoSuscripcion] = None
+    precio_mensual: Optional[float] = None
+    descuento: Optional[float] = None
+
+class ResultadoCambioSuscripcion(BaseModel):
+    id: int
+    resultado: str  # "actualizada" o "no_encontrada"
+    suscripcion: Optional[SuscripcionOut] = None
+
 class SuscripcionMultipleCreate(BaseModel):
     suscripciones: List[SuscripcionCreate]
 
 class SuscripcionRenovacion(BaseModel):
     suscripcion_id: int
     nueva_fecha_fin: date
-    precio_mensual: float 
\ No newline at end of file
+    precio_mensual: float
+
+
+class OcurrenciaSuscripcionOut(BaseModel):
+    suscripcion_id: int
+    cancha_id: int
+    fecha: date
+    hora_inicio: time
+    hora_fin: time
+    estado: str  # activa, omitida
+
+    class Config:
+        from_attributes = True
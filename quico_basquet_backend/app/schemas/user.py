@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, validator
-from typing import Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 
 class UserBase(BaseModel):
@@ -34,6 +34,7 @@ class UserOut(UserBase):
     id: int
     fecha_registro: datetime
     google_id: Optional[str] = None
+    canales_notificacion: Optional[str] = "email"
     
     class Config:
         from_attributes = True
@@ -44,4 +45,14 @@ class UserUpdate(BaseModel):
     telefono: Optional[str] = None
     
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class PreferenciasNotificacion(BaseModel):
+    """Canales por los que el usuario quiere recibir las notificaciones"""
+    canales: List[Literal["email", "whatsapp"]]
+
+    @validator('canales')
+    def validate_canales(cls, v):
+        if not v:
+            raise ValueError('Elegí al menos un canal')
+        return list(dict.fromkeys(v))
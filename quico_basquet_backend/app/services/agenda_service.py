@@ -0,0 +1,133 @@
+import base64
+import heapq
+import json
+import logging
+from datetime import date, datetime, time
+from itertools import islice
+from typing import Iterator, Optional, Tuple
+from sqlalchemy import and_, false, or_, select, text, true, tuple_
+from sqlalchemy.orm import Session
+from app.models.ocurrencia import OcurrenciaSuscripcion
+from app.models.reserva import Reserva
+from app.models.suscripcion import Suscripcion
+
+logger = logging.getLogger(__name__)
+
+LIMITE_AGENDA_DEFECTO = 20
+LIMITE_AGENDA_MAXIMO = 100
+
+# Ante la misma fecha y hora, las reservas van antes que las suscripciones
+ORDEN_RESERVA = 0
+ORDEN_SUSCRIPCION = 1
+
+# (fecha, hora_inicio, orden del tipo, id): clave total de la agenda y contenido del cursor
+Clave = Tuple[date, time, int, int]
+
+# Índice del keyset de reservas por usuario (create_all no lo agrega a tablas que ya existían)
+INDICES_AGENDA = {
+    "ix_reservas_user_fecha": "reservas (user_id, fecha)",
+}
+
+def inicializar_agenda(engine) -> None:
+    """Crea los índices que usan las consultas keyset de la agenda si no existen"""
+    try:
+        with engine.begin() as conn:
+            for nombre, definicion in INDICES_AGENDA.items():
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {nombre} ON {definicion}"))
+    except Exception as e:
+        logger.warning(f"No se pudieron crear los índices de la agenda: {e}")
+
+def codificar_cursor(clave: Clave) -> str:
+    fecha, hora, orden, id_ = clave
+    crudo = json.dumps([fecha.isoformat(), hora.isoformat(), orden, id_], separators=(",", ":"))
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip("=")
+
+def decodificar_cursor(cursor: str) -> Clave:
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        fecha, hora, orden, id_ = json.loads(crudo)
+        return date.fromisoformat(fecha), time.fromisoformat(hora), int(orden), int(id_)
+    except (ValueError, TypeError):
+        raise ValueError("Cursor inválido")
+
+def _posterior_a(col_fecha, col_hora, col_id, orden: int, clave: Clave, descendente: bool):
+    """
+    Condición keyset "la fila va después de `clave`" para una fuente cuyo orden de tipo es fijo.
+    La comparación de (fecha, hora) usa el índice; el desempate por tipo e id se resuelve acá.
+    """
+    fecha, hora, orden_cursor, id_cursor = clave
+    if descendente:
+        avanza = tuple_(col_fecha, col_hora) < tuple_(fecha, hora)
+        desempate = true() if orden < orden_cursor else (col_id < id_cursor if orden == orden_cursor else false())
+    else:
+        avanza = tuple_(col_fecha, col_hora) > tuple_(fecha, hora)
+        desempate = true() if orden > orden_cursor else (col_id > id_cursor if orden == orden_cursor else false())
+    return or_(avanza, and_(col_fecha == fecha, col_hora == hora, desempate))
+
+def _reservas(db: Session, user_id: int, desde: Clave, descendente: bool, limite: int) -> Iterator[dict]:
+    condicion = _posterior_a(Reserva.fecha, Reserva.hora_inicio, Reserva.id, ORDEN_RESERVA, desde, descendente)
+    stmt = select(Reserva).where(Reserva.user_id == user_id, condicion)
+    if not descendente:
+        stmt = stmt.where(Reserva.estado != "cancelada")
+    orden = (Reserva.fecha.desc(), Reserva.hora_inicio.desc(), Reserva.id.desc()) if descendente else \
+            (Reserva.fecha, Reserva.hora_inicio, Reserva.id)
+
+    for r in db.execute(stmt.order_by(*orden).limit(limite)).scalars():
+        yield {
+            "clave": (r.fecha, r.hora_inicio, ORDEN_RESERVA, r.id),
+            "tipo": "reserva", "id": r.id, "cancha_id": r.cancha_id, "deporte": r.deporte,
+            "fecha": r.fecha, "hora_inicio": r.hora_inicio, "hora_fin": r.hora_fin,
+            "estado": r.estado, "estado_pago": r.estado_pago, "precio": r.precio, "metodo_pago": r.metodo_pago,
+        }
+
+def _ocurrencias(db: Session, user_id: int, desde: Clave, descendente: bool, limite: int) -> Iterator[dict]:
+    o = OcurrenciaSuscripcion
+    condicion = _posterior_a(o.fecha, o.hora_inicio, o.id, ORDEN_SUSCRIPCION, desde, descendente)
+    stmt = select(
+        o.id, o.suscripcion_id, o.cancha_id, o.fecha, o.hora_inicio, o.hora_fin,
+        Suscripcion.deporte, Suscripcion.estado_pago, Suscripcion.metodo_pago
+    ).join(Suscripcion, Suscripcion.id == o.suscripcion_id).where(
+        Suscripcion.user_id == user_id, o.estado == "activa", condicion
+    )
+    # El historial no mira el estado de la suscripción: al cancelarla, vencerla o editarla solo se
+    # reemplazan las fechas desde hoy, así que las pasadas son las sesiones que efectivamente se jugaron
+    if not descendente:
+        stmt = stmt.where(Suscripcion.estado == "activa")
+    orden = (o.fecha.desc(), o.hora_inicio.desc(), o.id.desc()) if descendente else (o.fecha, o.hora_inicio, o.id)
+
+    for f in db.execute(stmt.order_by(*orden).limit(limite)):
+        yield {
+            "clave": (f.fecha, f.hora_inicio, ORDEN_SUSCRIPCION, f.id),
+            "tipo": "suscripcion", "id": f.suscripcion_id, "cancha_id": f.cancha_id, "deporte": f.deporte,
+            "fecha": f.fecha, "hora_inicio": f.hora_inicio, "hora_fin": f.hora_fin,
+            "estado": "activa", "estado_pago": f.estado_pago, "precio": None, "metodo_pago": f.metodo_pago,
+        }
+
+def _pagina(db: Session, user_id: int, cursor: Optional[str], limite: int, descendente: bool) -> dict:
+    """
+    Una página de la agenda: cada fuente trae a lo sumo limite + 1 filas por keyset y
+    heapq.merge las combina en orden sin materializar todo el historial del usuario.
+    """
+    limite = max(1, min(limite, LIMITE_AGENDA_MAXIMO))
+    ahora = datetime.now()
+    # Sin cursor se parte de "ahora" con un orden de tipo menor a todos: las próximas incluyen
+    # lo que empieza en este minuto y el historial (descendente) todo lo que empezó antes
+    inicio: Clave = (ahora.date(), ahora.time().replace(second=0, microsecond=0), ORDEN_RESERVA - 1, 0)
+    desde = decodificar_cursor(cursor) if cursor else inicio
+
+    fuentes = [
+        _reservas(db, user_id, desde, descendente, limite + 1),
+        _ocurrencias(db, user_id, desde, descendente, limite + 1),
+    ]
+    items = list(islice(heapq.merge(*fuentes, key=lambda item: item["clave"], reverse=descendente), limite + 1))
+
+    siguiente = codificar_cursor(items[limite - 1]["clave"]) if len(items) > limite else None
+    return {"items": items[:limite], "siguiente_cursor": siguiente}
+
+def obtener_agenda(db: Session, user_id: int, cursor: Optional[str] = None, limite: int = LIMITE_AGENDA_DEFECTO) -> dict:
+    """Próximas reservas y fechas de suscripción del usuario, en orden cronológico"""
+    return _pagina(db, user_id, cursor, limite, descendente=False)
+
+def obtener_historial(db: Session, user_id: int, cursor: Optional[str] = None, limite: int = LIMITE_AGENDA_DEFECTO) -> dict:
+    """Reservas y fechas de suscripción ya pasadas, de la más reciente a la más antigua"""
+    return _pagina(db, user_id, cursor, limite, descendente=True)
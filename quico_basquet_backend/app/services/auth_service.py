@@ -1,17 +1,18 @@
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
 import jwt
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.config.settings import settings
 from app.data.database import get_db
+from app.data.cache_caliente import CacheCaliente
+from app.data.consultas import AUTORIZACION_USUARIO, USUARIO_POR_ID
 from app.models.user import User
+from app.services.hashing_service import hash_password_sync, verify_and_update_sync, hash_password_async, verify_password_async
 import os
 
-# Configuración de hash de contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # Clave secreta y algoritmo para JWT
 SECRET_KEY = os.getenv("SECRET_KEY", "tu_clave_secreta_muy_segura_aqui_cambiar_por_una_real")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
@@ -19,13 +20,14 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/auth/login")
 
-# Hashear contraseña
+# Hashear contraseña (versión sincrónica; en endpoints usar hash_password_async)
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return hash_password_sync(password)
 
-# Verificar contraseña
+# Verificar contraseña (versión sincrónica; en endpoints usar verify_password_async)
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    valida, _ = verify_and_update_sync(plain_password, hashed_password)
+    return valida
 
 # Crear JWT
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -48,15 +50,61 @@ def decode_access_token(token: str):
     except jwt.InvalidTokenError:
         return None
 
+# Usuarios autenticados por id: las columnas del principal, sin password_hash ni google_id
+# (si algún endpoint los lee se cargan en ese momento). rol y bloqueado no se cachean: un
+# cambio hecho por fuera de la aplicación (SQL directo, otro worker) rige desde el próximo request
+COLUMNAS_PRINCIPAL = ("id", "nombre", "email", "telefono", "fecha_registro", "canales_notificacion")
+
+principales = CacheCaliente("usuarios", ("users",), maxsize=settings.CACHE_USUARIOS_MAXIMO, ttl=settings.CACHE_USUARIOS_TTL_SEGUNDOS)
+
+def _principal(user: User) -> dict:
+    principal = {columna: getattr(user, columna) for columna in COLUMNAS_PRINCIPAL}
+    if principal["fecha_registro"] is not None:
+        principal["fecha_registro"] = principal["fecha_registro"].isoformat()
+    return principal
+
+def _usuario_desde_principal(db: Session, principal: dict, autorizacion: dict) -> User:
+    """User persistente armado desde el cache y la autorización recién leída, sin SELECT del resto (merge con load=False)"""
+    datos = {**principal, **autorizacion}
+    if datos["fecha_registro"] is not None:
+        datos["fecha_registro"] = datetime.fromisoformat(datos["fecha_registro"])
+    user = User(**datos)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+def invalidar_usuario(user_id: int) -> None:
+    principales.invalidar([user_id])
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidar_usuario_modificado(mapper, connection, target):
+    invalidar_usuario(target.id)
+
 # Dependencia para obtener el usuario actual a partir del JWT
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
     payload = decode_access_token(token)
     if not payload or "user_id" not in payload:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido o expirado")
-    user = db.query(User).filter(User.id == payload["user_id"]).first()
-    if not user:
+
+    user_id = payload["user_id"]
+    cargado = {}
+
+    def cargar():
+        cargado["user"] = db.execute(USUARIO_POR_ID, {"user_id": user_id}).scalar_one_or_none()
+        return _principal(cargado["user"]) if cargado["user"] else None
+
+    principal = principales.obtener_o_cargar(db, user_id, cargar)
+    if not principal:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario no encontrado")
+    if cargado.get("user") is not None:
+        return cargado["user"]
+
+    # Acierto de cache: rol y bloqueado se leen siempre de la base (búsqueda por clave primaria)
+    autorizacion = db.execute(AUTORIZACION_USUARIO, {"user_id": user_id}).one_or_none()
+    if autorizacion is None:
+        invalidar_usuario(user_id)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario no encontrado")
-    return user
+    return _usuario_desde_principal(db, principal, dict(autorizacion._mapping))
 
 # Dependencia para requerir rol admin
 def require_admin(current_user: User = Depends(get_current_user)):
@@ -0,0 +1,176 @@
+"""
+Modo resumen para los avisos al administrador.
+
+Cada reserva o suscripción creada o cancelada genera un aviso para el negocio. En lugar de
+mandar un email por evento, los avisos se acumulan en memoria y un hilo los envía cada
+EMAIL_ADMIN_RESUMEN_MINUTOS como un único mensaje. Los avisos urgentes (tipos configurados
+o eventos para el mismo día) se envían en el momento. Si el resumen no se puede enviar, los
+avisos vuelven al buffer y se reintentan en el próximo ciclo.
+"""
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Tope del buffer: si se llena antes del intervalo se envía el resumen igual
+MAXIMO_AVISOS_PENDIENTES = 100
+# Con el envío caído los avisos se retienen hasta este tope (se descartan los más viejos)
+MAXIMO_AVISOS_RETENIDOS = 1000
+
+TITULOS_AVISO = {
+    "confirmacion_reserva": "🏀 Reservas creadas",
+    "cancelacion_reserva": "❌ Reservas canceladas",
+    "confirmacion_suscripcion": "🔄 Suscripciones creadas",
+    "cancelacion_suscripcion": "❌ Suscripciones canceladas",
+}
+
+@dataclass
+class AvisoAdmin:
+    tipo: str
+    asunto: str
+    texto: str
+    html: str
+    creado: datetime = field(default_factory=datetime.now)
+
+def _tipos_urgentes() -> set:
+    return {t.strip() for t in settings.EMAIL_ADMIN_TIPOS_URGENTES.split(",") if t.strip()}
+
+class ResumenAvisosAdmin(threading.Thread):
+    """Hilo que junta los avisos al administrador y los envía como un resumen periódico"""
+
+    def __init__(self, intervalo_segundos: float):
+        super().__init__(name="avisos-admin", daemon=True)
+        self.intervalo_segundos = intervalo_segundos
+        self._lock = threading.Lock()
+        self._pendientes: List[AvisoAdmin] = []
+        self._detener = threading.Event()
+        self._vaciar = threading.Event()
+
+    def encolar(self, aviso: AvisoAdmin) -> None:
+        with self._lock:
+            self._pendientes.append(aviso)
+            # Solo al cruzar el tope: con avisos reencolados tras un fallo se espera al próximo ciclo
+            lleno = len(self._pendientes) == MAXIMO_AVISOS_PENDIENTES
+        if lleno:
+            self._vaciar.set()
+
+    @property
+    def pendientes(self) -> int:
+        with self._lock:
+            return len(self._pendientes)
+
+    def vaciar(self) -> int:
+        """
+        Envía lo acumulado (un solo email) y retorna la cantidad de avisos enviados.
+        Si el envío falla los avisos vuelven al principio del buffer y se retorna 0.
+        """
+        with self._lock:
+            avisos, self._pendientes = self._pendientes, []
+        if not avisos:
+            return 0
+        try:
+            enviado = enviar_resumen(avisos)
+        except Exception:
+            self._reencolar(avisos)
+            raise
+        if not enviado:
+            self._reencolar(avisos)
+            return 0
+        return len(avisos)
+
+    def _reencolar(self, avisos: List[AvisoAdmin]) -> None:
+        with self._lock:
+            self._pendientes[:0] = avisos
+            descartados = len(self._pendientes) - MAXIMO_AVISOS_RETENIDOS
+            if descartados > 0:
+                del self._pendientes[:descartados]
+        logger.warning(f"⚠️ No se pudo enviar el resumen al administrador: {len(avisos)} avisos vuelven a la cola")
+        if descartados > 0:
+            logger.error(f"❌ Se descartaron {descartados} avisos al administrador (cola llena)")
+
+    def detener(self) -> None:
+        self._detener.set()
+        self._vaciar.set()
+
+    def run(self) -> None:
+        while not self._detener.is_set():
+            self._vaciar.wait(self.intervalo_segundos)
+            self._vaciar.clear()
+            try:
+                self.vaciar()
+            except Exception as e:
+                logger.error(f"Error enviando el resumen de avisos al administrador: {e}")
+        # Lo que quedó al apagar se intenta enviar una última vez
+        try:
+            self.vaciar()
+        except Exception as e:
+            logger.error(f"Error enviando el resumen de avisos al administrador: {e}")
+        if self.pendientes:
+            logger.error(f"❌ Quedaron {self.pendientes} avisos al administrador sin enviar al apagar")
+
+def enviar_resumen(avisos: List[AvisoAdmin]) -> bool:
+    """Un solo email con todos los avisos; si hay uno solo se envía tal cual"""
+    from app.services.email_service import send_email
+    from app.services.email_templates import EMAIL_ADMIN, render
+
+    if len(avisos) == 1:
+        aviso = avisos[0]
+        return send_email(EMAIL_ADMIN, aviso.asunto, aviso.texto, aviso.html)
+
+    conteo = Counter(a.tipo for a in avisos)
+    lineas_conteo = "\n".join(f"{TITULOS_AVISO.get(tipo, tipo)}: {cantidad}" for tipo, cantidad in conteo.most_common())
+    separador = "\n" + "─" * 30 + "\n"
+    detalle = separador.join(f"[{a.creado:%H:%M}]\n{a.texto.strip()}" for a in avisos)
+
+    texto, html = render(
+        "resumen_admin",
+        cantidad=len(avisos),
+        desde=f"{avisos[0].creado:%d/%m %H:%M}",
+        hasta=f"{avisos[-1].creado:%d/%m %H:%M}",
+        conteo=lineas_conteo,
+        detalle=detalle
+    )
+    enviado = send_email(EMAIL_ADMIN, f"📬 Resumen de actividad ({len(avisos)}) - Quico Básquet", texto, html)
+    logger.info(f"📬 Resumen al administrador con {len(avisos)} avisos ({'enviado' if enviado else 'falló'})")
+    return enviado
+
+_resumen: Optional[ResumenAvisosAdmin] = None
+
+def enviar_aviso_admin(tipo: str, asunto: str, texto: str, html: str, urgente: bool = False) -> Optional[bool]:
+    """
+    Envía el aviso al administrador o lo acumula para el próximo resumen.
+    Sin el hilo de resumen en marcha (modo desactivado, scripts) se envía directo.
+    Retorna True/False según el resultado del envío, o None si el aviso quedó encolado
+    (todavía no se envió; el resultado se conoce al mandar el resumen).
+    """
+    if _resumen is None or urgente or tipo in _tipos_urgentes():
+        from app.services.email_service import send_email
+        from app.services.email_templates import EMAIL_ADMIN
+        return send_email(EMAIL_ADMIN, asunto, texto, html)
+
+    _resumen.encolar(AvisoAdmin(tipo, asunto, texto, html))
+    logger.info(f"📥 Aviso al administrador acumulado para el resumen: {asunto}")
+    return None
+
+def iniciar_avisos_admin() -> None:
+    global _resumen
+    if settings.EMAIL_ADMIN_RESUMEN and _resumen is None:
+        _resumen = ResumenAvisosAdmin(settings.EMAIL_ADMIN_RESUMEN_MINUTOS * 60)
+        _resumen.start()
+        logger.info(f"📬 Avisos al administrador en modo resumen (cada {settings.EMAIL_ADMIN_RESUMEN_MINUTOS} min)")
+
+def detener_avisos_admin() -> None:
+    """Detiene el hilo y envía los avisos pendientes"""
+    global _resumen
+    if _resumen is not None:
+        resumen, _resumen = _resumen, None
+        resumen.detener()
+        resumen.join(timeout=settings.EMAIL_TIMEOUT_SEGUNDOS * 2)
+
+def avisos_pendientes() -> int:
+    return _resumen.pendientes if _resumen is not None else 0
@@ -0,0 +1,114 @@
+import logging
+from typing import List
+from sqlalchemy import func, or_, select, text, union
+from sqlalchemy.orm import Session
+from app.models.reserva import Reserva
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Índices GIN con trigramas: aceleran ILIKE '%termino%' y 'termino%' y permiten ordenar por similitud
+INDICES_TRIGRAMA = {
+    "ix_users_nombre_trgm": "users USING gin (nombre gin_trgm_ops)",
+    "ix_users_email_trgm": "users USING gin (email gin_trgm_ops)",
+    "ix_reservas_nombre_cliente_trgm": "reservas USING gin (nombre_cliente gin_trgm_ops)",
+}
+
+LIMITE_AUTOCOMPLETADO = 10
+
+# pg_trgm quedó disponible (sin la extensión no existe similarity() y se ordena sin relevancia)
+_trigramas = False
+
+def inicializar_busqueda(engine) -> bool:
+    """
+    Habilita pg_trgm y crea los índices de búsqueda si no existen.
+    En motores que no son PostgreSQL no hace nada y la búsqueda usa ILIKE simple.
+    """
+    global _trigramas
+    if engine.dialect.name != "postgresql":
+        _trigramas = False
+        return False
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            for nombre, definicion in INDICES_TRIGRAMA.items():
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {nombre} ON {definicion}"))
+        logger.info("🔎 Índices de búsqueda por trigramas disponibles")
+        _trigramas = True
+    except Exception as e:
+        logger.warning(f"No se pudieron crear los índices de búsqueda por trigramas: {e}")
+        _trigramas = False
+    return _trigramas
+
+def _escapar_like(termino: str) -> str:
+    """Escapa los comodines de LIKE para buscar el texto literal"""
+    return termino.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _usa_trigramas(db: Session) -> bool:
+    return _trigramas and db.bind.dialect.name == "postgresql"
+
+def buscar_reservas(db: Session, termino: str, skip: int = 0, limit: int = 50) -> List[Reserva]:
+    """
+    Busca reservas por nombre/email del usuario o nombre del cliente, ordenadas por
+    relevancia (similitud de trigramas) y paginadas.
+
+    Los candidatos salen de un UNION de dos subconsultas que usan cada una su índice: los
+    usuarios que coinciden (índices de trigramas de users) con sus reservas por user_id, y
+    las reservas por nombre_cliente. Un OR entre columnas de las dos tablas del JOIN no
+    puede usar esos índices y termina en un recorrido secuencial.
+    """
+    termino = termino.strip()
+    if not termino:
+        return []
+
+    patron = f"%{_escapar_like(termino)}%"
+    usuarios = select(User.id).where(or_(User.nombre.ilike(patron, escape="\\"), User.email.ilike(patron, escape="\\")))
+    candidatos = union(
+        select(Reserva.id).where(Reserva.user_id.in_(usuarios)),
+        select(Reserva.id).where(Reserva.nombre_cliente.ilike(patron, escape="\\")),
+    ).subquery()
+    query = db.query(Reserva).join(candidatos, candidatos.c.id == Reserva.id).outerjoin(User, User.id == Reserva.user_id)
+
+    orden = [Reserva.fecha.desc(), Reserva.hora_inicio.desc(), Reserva.id.desc()]
+    if _usa_trigramas(db):
+        relevancia = func.greatest(
+            func.coalesce(func.similarity(User.nombre, termino), 0),
+            func.coalesce(func.similarity(User.email, termino), 0),
+            func.coalesce(func.similarity(Reserva.nombre_cliente, termino), 0),
+        )
+        orden.insert(0, relevancia.desc())
+
+    return query.order_by(*orden).offset(skip).limit(limit).all()
+
+def buscar_usuarios(db: Session, termino: str, skip: int = 0, limit: int = 50) -> List[User]:
+    """Busca usuarios por nombre o email, ordenados por relevancia y paginados"""
+    termino = termino.strip()
+    if not termino:
+        return []
+
+    patron = f"%{_escapar_like(termino)}%"
+    query = db.query(User).filter(
+        or_(User.nombre.ilike(patron, escape="\\"), User.email.ilike(patron, escape="\\"))
+    )
+
+    orden = [User.nombre.asc(), User.id.asc()]
+    if _usa_trigramas(db):
+        relevancia = func.greatest(func.similarity(User.nombre, termino), func.similarity(User.email, termino))
+        orden.insert(0, relevancia.desc())
+
+    return query.order_by(*orden).offset(skip).limit(limit).all()
+
+def autocompletar_nombre_cliente(db: Session, prefijo: str, limit: int = LIMITE_AUTOCOMPLETADO) -> List[str]:
+    """Sugerencias de nombre_cliente por prefijo, las más usadas primero"""
+    prefijo = prefijo.strip()
+    if not prefijo:
+        return []
+
+    filas = db.query(Reserva.nombre_cliente, func.count(Reserva.id).label("usos")).filter(
+        Reserva.nombre_cliente.ilike(f"{_escapar_like(prefijo)}%", escape="\\")
+    ).group_by(Reserva.nombre_cliente).order_by(
+        func.count(Reserva.id).desc(), Reserva.nombre_cliente.asc()
+    ).limit(limit).all()
+
+    return [fila.nombre_cliente for fila in filas]
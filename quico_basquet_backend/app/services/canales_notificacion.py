@@ -0,0 +1,209 @@
+"""
+Despacho de notificaciones por canal (email y WhatsApp) según la preferencia de cada usuario.
+
+Cada canal tiene su propio pool de hilos (límite de concurrencia), su limitador de
+mensajes por segundo y su tamaño de lote, así un proveedor lento o con cuota baja no
+frena al otro. Los resultados se devuelven por canal para guardarlos en la notificación;
+un canal sin proveedor configurado no simula envíos: sus destinos se informan como omitidos.
+"""
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import text
+from app.config.settings import settings
+from app.models.user import User
+from app.services.email_service import send_email_lote
+from app.services.email_templates import plantilla_notificacion
+from app.services.whatsapp_service import cerrar_cliente_whatsapp, normalizar_telefono, send_whatsapp_message, twilio_configurado
+
+logger = logging.getLogger(__name__)
+
+CANALES_VALIDOS = ("email", "whatsapp")
+CANAL_POR_DEFECTO = "email"
+
+# Columnas agregadas después de que las tablas ya existían (create_all no altera tablas)
+COLUMNAS_AGREGADAS = [
+    ("users", "canales_notificacion VARCHAR(30) NOT NULL DEFAULT 'email'"),
+    ("notifications", "resultados_canales JSON"),
+    ("notifications", "ultimo_usuario_id INTEGER"),
+    ("notifications", "actualizada TIMESTAMP"),
+    ("notifications", "segmento_parametros JSON"),
+]
+
+def inicializar_canales(engine) -> None:
+    """Agrega en PostgreSQL las columnas de preferencia, resultados por canal y progreso de envío si faltan"""
+    if engine.dialect.name != "postgresql":
+        return
+    try:
+        with engine.begin() as conn:
+            for tabla, columna in COLUMNAS_AGREGADAS:
+                conn.execute(text(f"ALTER TABLE {tabla} ADD COLUMN IF NOT EXISTS {columna}"))
+    except Exception as e:
+        logger.warning(f"No se pudieron agregar las columnas de canales de notificación: {e}")
+
+def canales_de(usuario: User) -> List[str]:
+    """Canales elegidos por el usuario (email si no eligió ninguno válido)"""
+    elegidos = [c.strip() for c in (usuario.canales_notificacion or "").split(",") if c.strip() in CANALES_VALIDOS]
+    return elegidos or [CANAL_POR_DEFECTO]
+
+class LimitadorTasa:
+    """
+    Token bucket compartido por los hilos de un canal: como mucho por_segundo envíos por segundo.
+    Un lote adquiere un token por mensaje; si pide más que la capacidad, espera a tener el
+    bucket lleno y queda en deuda, así los envíos siguientes esperan lo que corresponde.
+    """
+
+    def __init__(self, por_segundo: float):
+        self.por_segundo = por_segundo
+        self.capacidad = max(1.0, por_segundo)
+        self._tokens = self.capacidad
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def adquirir(self, cantidad: int = 1) -> None:
+        necesarios = min(cantidad, self.capacidad)
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.por_segundo)
+                self._ultimo = ahora
+                if self._tokens >= necesarios:
+                    self._tokens -= cantidad
+                    return
+                espera = (necesarios - self._tokens) / self.por_segundo
+            time.sleep(espera)
+
+class CanalNotificacion(ABC):
+    """Canal con concurrencia, tasa y lote propios. Las subclases definen destino() y enviar_lote()"""
+
+    nombre = ""
+
+    def __init__(self, max_concurrencia: int, por_segundo: float, tamano_lote: int):
+        self.tamano_lote = max(1, tamano_lote)
+        self.limitador = LimitadorTasa(por_segundo)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_concurrencia), thread_name_prefix=f"canal-{self.nombre}")
+
+    @abstractmethod
+    def destino(self, usuario: User) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def enviar_lote(self, destinos: List[str], asunto: str, texto: str, html: str) -> int:
+        """Envía a un lote de destinos y retorna la cantidad de envíos exitosos"""
+
+    def disponible(self) -> bool:
+        """Si el proveedor del canal está configurado (si no, los destinos se omiten)"""
+        return True
+
+    def _procesar_lote(self, destinos: List[str], asunto: str, texto: str, html: str) -> Tuple[int, int, int]:
+        """Retorna (exitosos, fallidos, omitidos) del lote"""
+        if not self.disponible():
+            logger.warning(f"⏭️ Canal {self.nombre} sin configurar: se omiten {len(destinos)} destinos")
+            return 0, 0, len(destinos)
+        try:
+            exitosos = self.enviar_lote(destinos, asunto, texto, html)
+        except Exception as e:
+            logger.error(f"Error enviando lote por {self.nombre}: {e}")
+            exitosos = 0
+        return exitosos, len(destinos) - exitosos, 0
+
+    def programar(self, destinos: List[str], asunto: str, texto: str, html: str) -> List[Future]:
+        """Reparte los destinos en lotes y los encola en el pool del canal"""
+        return [
+            self._executor.submit(self._procesar_lote, destinos[i:i + self.tamano_lote], asunto, texto, html)
+            for i in range(0, len(destinos), self.tamano_lote)
+        ]
+
+    def cerrar(self) -> None:
+        self._executor.shutdown(wait=False)
+
+class CanalEmail(CanalNotificacion):
+    nombre = "email"
+
+    def destino(self, usuario: User) -> Optional[str]:
+        return usuario.email or None
+
+    def enviar_lote(self, destinos: List[str], asunto: str, texto: str, html: str) -> int:
+        # Un request de SendGrid por lote (o un envío por destino si hay que caer a SMTP);
+        # la cuota es por mensaje, así que el lote consume un token por destino
+        self.limitador.adquirir(len(destinos))
+        return send_email_lote(destinos, asunto, texto, html)
+
+class CanalWhatsApp(CanalNotificacion):
+    nombre = "whatsapp"
+
+    def destino(self, usuario: User) -> Optional[str]:
+        return normalizar_telefono(usuario.telefono)
+
+    def disponible(self) -> bool:
+        # Sin Twilio send_whatsapp_message solo simula el envío: no cuenta como exitoso
+        return twilio_configurado()
+
+    def enviar_lote(self, destinos: List[str], asunto: str, texto: str, html: str) -> int:
+        exitosos = 0
+        mensaje = f"*{asunto}*\n{texto.strip()}"
+        for telefono in destinos:
+            self.limitador.adquirir()
+            if send_whatsapp_message(telefono, mensaje):
+                exitosos += 1
+        return exitosos
+
+CANALES: Dict[str, CanalNotificacion] = {
+    "email": CanalEmail(settings.EMAIL_MAX_CONCURRENCIA, settings.EMAIL_ENVIOS_POR_SEGUNDO, settings.EMAIL_TAMANO_LOTE),
+    "whatsapp": CanalWhatsApp(settings.WHATSAPP_MAX_CONCURRENCIA, settings.WHATSAPP_ENVIOS_POR_SEGUNDO, settings.WHATSAPP_TAMANO_LOTE),
+}
+
+def destinos_por_canal(usuarios: Iterable[User]) -> Dict[str, List[str]]:
+    """
+    Agrupa los destinos según la preferencia de cada usuario. Si el canal elegido no tiene
+    destino (WhatsApp sin teléfono válido) se usa el email para que el aviso no se pierda.
+    """
+    destinos = {nombre: [] for nombre in CANALES}
+    vistos = {nombre: set() for nombre in CANALES}
+    for usuario in usuarios:
+        asignado = False
+        for nombre in canales_de(usuario):
+            destino = CANALES[nombre].destino(usuario)
+            if destino:
+                asignado = True
+                if destino not in vistos[nombre]:
+                    vistos[nombre].add(destino)
+                    destinos[nombre].append(destino)
+        email = CANALES["email"].destino(usuario)
+        if not asignado and email and email not in vistos["email"]:
+            vistos["email"].add(email)
+            destinos["email"].append(email)
+    return destinos
+
+def despachar_notificacion(usuarios: Iterable[User], asunto: str, mensaje: str, tipo: str = "general") -> Dict[str, dict]:
+    """
+    Envía la notificación por los canales de cada usuario. El cuerpo se renderiza una sola vez
+    y los canales trabajan en paralelo. Retorna {canal: {"exitosos", "fallidos", "omitidos", "total"}}.
+    """
+    texto, html = plantilla_notificacion(tipo).precompilar(mensaje=mensaje).render()
+    destinos = destinos_por_canal(usuarios)
+
+    programados = {
+        nombre: CANALES[nombre].programar(lista, asunto, texto, html)
+        for nombre, lista in destinos.items() if lista
+    }
+
+    resultados = {}
+    for nombre, futuros in programados.items():
+        exitosos = fallidos = omitidos = 0
+        for futuro in futuros:
+            ok, error, omitido = futuro.result()
+            exitosos += ok
+            fallidos += error
+            omitidos += omitido
+        resultados[nombre] = {"exitosos": exitosos, "fallidos": fallidos, "omitidos": omitidos, "total": len(destinos[nombre])}
+        logger.info(f"📨 Notificación por {nombre}: {exitosos} exitosos, {fallidos} fallidos, {omitidos} omitidos")
+    return resultados
+
+def cerrar_canales() -> None:
+    for canal in CANALES.values():
+        canal.cerrar()
+    cerrar_cliente_whatsapp()
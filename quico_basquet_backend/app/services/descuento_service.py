@@ -49,7 +49,7 @@ def calcular_descuento_por_dias(cantidad_dias: int) -> float:
     else:
         return 0.0   # Sin descuento para 1 día
 
-def aplicar_descuento_multiple_dias(db: Session, user_id: int, nueva_suscripcion_dia: int = None) -> None:
+def aplicar_descuento_multiple_dias(db: Session, user_id: int, nueva_suscripcion_dia: int = None, commit: bool = True) -> None:
     """
     Aplica descuentos automáticos a TODAS las suscripciones activas de un usuario
     basado en la cantidad de días únicos
@@ -58,6 +58,7 @@ def aplicar_descuento_multiple_dias(db: Session, user_id: int, nueva_suscripcion
         db: Sesión de base de datos
         user_id: ID del usuario
         nueva_suscripcion_dia: Día de nueva suscripción a incluir en el conteo
+        commit: Si es False, los cambios quedan en la transacción del llamador
     """
     print(f"🔢 Calculando descuentos automáticos para usuario {user_id}")
     
@@ -87,7 +88,8 @@ def aplicar_descuento_multiple_dias(db: Session, user_id: int, nueva_suscripcion
         print(f"   💰 Suscripción {suscripcion.id}: descuento actualizado a {descuento_automatico}%")
     
     # Commit changes
-    db.commit()
+    if commit:
+        db.commit()
     
     print(f"✅ Descuentos aplicados a {len(suscripciones_activas)} suscripciones")
 
@@ -0,0 +1,248 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+from collections import defaultdict
+from datetime import date, time, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import text
+from app.config.settings import settings
+from app.data.cache_caliente import CacheCaliente
+from app.services.ocupacion_service import invalidar_cache_ocupacion
+
+logger = logging.getLogger(__name__)
+
+# Canal de Postgres para repartir los eventos entre workers
+CANAL_NOTIFY = "disponibilidad"
+# NOTIFY admite payloads de hasta 8000 bytes; los eventos con muchas fechas se parten
+TAMANO_MAXIMO_PAYLOAD = 7500
+# Eventos pendientes por cliente antes de descartar los más viejos
+TAMANO_COLA_SUSCRIPTOR = 100
+SEGUNDOS_ESPERA_LISTEN = 5.0
+
+class BroadcasterDisponibilidad:
+    """
+    Reparte eventos de ocupación a los clientes conectados por (cancha, fecha).
+    publicar() es thread-safe: los endpoints síncronos corren en el threadpool
+    y las colas viven en el event loop.
+    """
+
+    def __init__(self):
+        self._suscriptores: Dict[Tuple[int, str], Set[asyncio.Queue]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def iniciar(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    def suscribir(self, cancha_id: int, fecha: date) -> asyncio.Queue:
+        cola: asyncio.Queue = asyncio.Queue(maxsize=TAMANO_COLA_SUSCRIPTOR)
+        with self._lock:
+            self._suscriptores[(cancha_id, fecha.isoformat())].add(cola)
+        return cola
+
+    def desuscribir(self, cancha_id: int, fecha: date, cola: asyncio.Queue) -> None:
+        clave = (cancha_id, fecha.isoformat())
+        with self._lock:
+            colas = self._suscriptores.get(clave)
+            if colas is not None:
+                colas.discard(cola)
+                if not colas:
+                    del self._suscriptores[clave]
+
+    def conectados(self) -> int:
+        with self._lock:
+            return sum(len(colas) for colas in self._suscriptores.values())
+
+    def publicar(self, evento: dict) -> None:
+        """Entrega el evento a los clientes de cada fecha que afecta"""
+        # Llega acá también lo publicado por otros workers (LISTEN), así el cache queda al día en todos
+        horarios_cacheados.invalidar((evento["cancha_id"], fecha) for fecha in evento["fechas"])
+        if self._loop is None:
+            return
+
+        entregas = []
+        with self._lock:
+            for fecha in evento["fechas"]:
+                for cola in self._suscriptores.get((evento["cancha_id"], fecha), ()):
+                    entregas.append((cola, fecha))
+
+        for cola, fecha in entregas:
+            evento_fecha = {k: v for k, v in evento.items() if k != "fechas"}
+            evento_fecha["fecha"] = fecha
+            self._loop.call_soon_threadsafe(self._encolar, cola, evento_fecha)
+
+    @staticmethod
+    def _encolar(cola: asyncio.Queue, evento: dict) -> None:
+        if cola.full():
+            # Cliente lento: se descarta el evento más viejo en lugar de bloquear al resto
+            cola.get_nowait()
+        cola.put_nowait(evento)
+
+broadcaster = BroadcasterDisponibilidad()
+
+class OyenteNotify(threading.Thread):
+    """Hilo que escucha el canal de Postgres y reenvía los eventos al broadcaster local"""
+
+    def __init__(self, engine):
+        super().__init__(name="disponibilidad-listen", daemon=True)
+        self._engine = engine
+        self._detener = threading.Event()
+
+    def detener(self) -> None:
+        self._detener.set()
+
+    def _conectar(self):
+        """
+        Conexión propia para el LISTEN, creada por el engine con su URL y connect_args (sslmode,
+        timeouts) y separada del pool para no ocupar una de sus conexiones.
+        """
+        import psycopg2
+
+        proxy = self._engine.raw_connection()
+        proxy.detach()
+        conn = proxy.dbapi_connection
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        conn.cursor().execute("SET application_name = 'quico_basquet_listen'")
+        return conn
+
+    def run(self) -> None:
+        while not self._detener.is_set():
+            conn = None
+            try:
+                conn = self._conectar()
+                conn.cursor().execute(f"LISTEN {CANAL_NOTIFY}")
+                logger.info("📡 Escuchando eventos de disponibilidad (LISTEN/NOTIFY)")
+
+                while not self._detener.is_set():
+                    if select.select([conn], [], [], SEGUNDOS_ESPERA_LISTEN) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notificacion = conn.notifies.pop(0)
+                        try:
+                            broadcaster.publicar(json.loads(notificacion.payload))
+                        except (ValueError, KeyError) as e:
+                            logger.warning(f"Evento de disponibilidad inválido: {e}")
+            except Exception as e:
+                logger.warning(f"Conexión LISTEN de disponibilidad perdida, reintentando: {e}")
+                self._detener.wait(SEGUNDOS_ESPERA_LISTEN)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+_oyente: Optional[OyenteNotify] = None
+
+def _usa_notify() -> bool:
+    return _oyente is not None
+
+def iniciar_disponibilidad(loop: asyncio.AbstractEventLoop, engine) -> None:
+    """
+    Enlaza el broadcaster con el event loop y, en PostgreSQL, arranca el hilo LISTEN
+    para recibir también los eventos publicados por otros workers.
+    """
+    global _oyente
+    broadcaster.iniciar(loop)
+    if settings.DISPONIBILIDAD_LISTEN_NOTIFY and engine.dialect.name == "postgresql":
+        _oyente = OyenteNotify(engine)
+        _oyente.start()
+
+def detener_disponibilidad() -> None:
+    global _oyente
+    if _oyente is not None:
+        _oyente.detener()
+        _oyente = None
+
+def _partir_fechas(fechas: List[str]) -> Iterable[List[str]]:
+    """Parte la lista de fechas para que cada payload entre en un NOTIFY"""
+    por_lote = max(1, TAMANO_MAXIMO_PAYLOAD // 16)  # ~13 bytes por fecha serializada
+    for i in range(0, len(fechas), por_lote):
+        yield fechas[i:i + por_lote]
+
+def publicar_evento(tipo: str, origen: str, origen_id: int, cancha_id: int, fechas: Iterable[date], hora_inicio: time, hora_fin: time) -> None:
+    """
+    Publica un cambio de ocupación (tipo "ocupado" o "liberado") tras el commit.
+    Nunca propaga errores: la reserva ya quedó guardada y el push es best effort.
+    """
+    hoy = date.today()
+    fechas_futuras = sorted(f.isoformat() for f in fechas if f >= hoy)
+    if not fechas_futuras:
+        return
+
+    base = {
+        "tipo": tipo,
+        "origen": origen,
+        "id": origen_id,
+        "cancha_id": cancha_id,
+        "hora_inicio": hora_inicio.strftime("%H:%M"),
+        "hora_fin": hora_fin.strftime("%H:%M"),
+    }
+    try:
+        if not _usa_notify():
+            broadcaster.publicar({**base, "fechas": fechas_futuras})
+            return
+
+        from app.data.database import engine
+        with engine.begin() as conn:
+            for lote in _partir_fechas(fechas_futuras):
+                conn.execute(
+                    text("SELECT pg_notify(:canal, :payload)"),
+                    {"canal": CANAL_NOTIFY, "payload": json.dumps({**base, "fechas": lote})}
+                )
+    except Exception as e:
+        logger.warning(f"No se pudo publicar el evento de disponibilidad: {e}")
+
+def publicar_reserva(reserva, tipo: str) -> None:
+    invalidar_cache_ocupacion(reserva.cancha_id, [reserva.fecha])
+    publicar_evento(tipo, "reserva", reserva.id, reserva.cancha_id, [reserva.fecha], reserva.hora_inicio, reserva.hora_fin)
+
+def publicar_suscripcion(suscripcion, tipo: str, fechas: Optional[Iterable[date]] = None) -> None:
+    """Publica todas las fechas futuras de la suscripción (o solo las indicadas)"""
+    from app.services.ocurrencias_service import fechas_suscripcion
+    # La ocupación histórica se calcula con la regla de la suscripción: cambian todas sus semanas
+    invalidar_cache_ocupacion(suscripcion.cancha_id)
+    publicar_evento(
+        tipo, "suscripcion", suscripcion.id, suscripcion.cancha_id,
+        fechas if fechas is not None else fechas_suscripcion(suscripcion),
+        suscripcion.hora_inicio, suscripcion.hora_fin
+    )
+
+# Horarios ocupados de los próximos días por (cancha_id, fecha ISO); cada evento invalida sus fechas
+horarios_cacheados = CacheCaliente(
+    "horarios_ocupados", ("reservas", "ocurrencias_suscripcion"),
+    maxsize=1000, ttl=settings.CACHE_HORARIOS_TTL_SEGUNDOS
+)
+
+def horarios_ocupados(db, cancha_id: int, fecha: date) -> List[dict]:
+    """Estado inicial del stream: horarios ocupados por reservas y suscripciones en la fecha"""
+    hoy = date.today()
+    if not hoy <= fecha <= hoy + timedelta(days=settings.CACHE_HORARIOS_DIAS):
+        return _consultar_horarios_ocupados(db, cancha_id, fecha)
+    return horarios_cacheados.obtener_o_cargar(
+        db, (cancha_id, fecha.isoformat()), lambda: _consultar_horarios_ocupados(db, cancha_id, fecha)
+    )
+
+def _consultar_horarios_ocupados(db, cancha_id: int, fecha: date) -> List[dict]:
+    from app.models.reserva import Reserva
+    from app.models.ocurrencia import OcurrenciaSuscripcion
+
+    reservas = db.query(Reserva.id, Reserva.hora_inicio, Reserva.hora_fin).filter(
+        Reserva.cancha_id == cancha_id,
+        Reserva.fecha == fecha,
+        Reserva.estado != "cancelada"
+    ).all()
+    ocurrencias = db.query(OcurrenciaSuscripcion.suscripcion_id, OcurrenciaSuscripcion.hora_inicio, OcurrenciaSuscripcion.hora_fin).filter(
+        OcurrenciaSuscripcion.cancha_id == cancha_id,
+        OcurrenciaSuscripcion.fecha == fecha,
+        OcurrenciaSuscripcion.estado == "activa"
+    ).all()
+
+    ocupados = [
+        {"origen": "reserva", "id": r.id, "hora_inicio": r.hora_inicio.strftime("%H:%M"), "hora_fin": r.hora_fin.strftime("%H:%M")}
+        for r in reservas
+    ] + [
+        {"origen": "suscripcion", "id": o.suscripcion_id, "hora_inicio": o.hora_inicio.strftime("%H:%M"), "hora_fin": o.hora_fin.strftime("%H:%M")}
+        for o in ocurrencias
+    ]
+    return sorted(ocupados, key=lambda o: o["hora_inicio"])
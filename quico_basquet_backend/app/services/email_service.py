@@ -1,115 +1,55 @@
-import smtplib
 import logging
-import sendgrid
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.header import Header
+from datetime import date
+from typing import List, Optional
 from app.config.settings import settings
-from sendgrid.helpers.mail import Mail, From, To, Subject, PlainTextContent, HtmlContent
+from app.services.avisos_admin_service import enviar_aviso_admin
+from app.services.email_templates import envolver_html, nombre_dia, plantilla_notificacion, render
+from app.services.proveedores_email import enviar_con_proveedor, proveedor_sendgrid, proveedor_smtp
 
 logger = logging.getLogger(__name__)
 
-def send_with_sendgrid_api(to_email: str, subject: str, message: str) -> bool:
+def send_with_sendgrid_api(to_email: str, subject: str, message: str, html: Optional[str] = None) -> bool:
     """
-    Envía un email usando SendGrid API 
+    Envía un email usando SendGrid API (cliente HTTP compartido, con circuit breaker).
+    Si no llega el HTML ya renderizado por la plantilla, se envuelve el texto plano.
     """
-    try:
-        if not settings.SENDGRID_API_KEY:
-            logger.error("SendGrid API Key no configurada")
-            return False
-        
-        # Configurar SendGrid
-        sg = sendgrid.SendGridAPIClient(api_key=settings.SENDGRID_API_KEY)
-        
-        # Crear el mensaje
-        from_email = From(settings.FROM_EMAIL, settings.FROM_NAME)
-        to_email_obj = To(to_email)
-        subject_obj = Subject(subject)
-        
-        # Convertir texto plano a HTML básico
-        html_message = message.replace('\n', '<br>')
-        
-        content = HtmlContent(f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <div style="text-align: center; border-bottom: 2px solid #4a90e2; padding-bottom: 20px; margin-bottom: 20px;">
-                    <h1 style="color: #4a90e2; margin: 0;">{settings.FROM_NAME}</h1>
-                </div>
-                <div style="white-space: pre-wrap;">
-                    {html_message}
-                </div>
-                <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #eee; text-align: center; color: #666; font-size: 0.9em;">
-                    <p>Este es un mensaje automático, por favor no responder a este email.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """)
-        
-        mail = Mail(from_email, to_email_obj, subject_obj, content)
-        
-        # Enviar el email
-        response = sg.send(mail)
-        
-        if response.status_code in [200, 202]:
-            logger.info(f"📧 Email enviado via SendGrid a {to_email}: {subject}")
-            return True
-        else:
-            logger.error(f"SendGrid falló con código: {response.status_code}")
-            return False
-            
-    except Exception as e:
-        logger.error(f"Error al enviar email via SendGrid: {e}")
+    if not settings.SENDGRID_API_KEY:
+        logger.error("SendGrid API Key no configurada")
         return False
+    
+    if enviar_con_proveedor(proveedor_sendgrid, to_email, subject, message, html if html is not None else envolver_html(message)):
+        logger.info(f"📧 Email enviado via SendGrid a {to_email}: {subject}")
+        return True
+    return False
 
-def send_with_smtp(to_email: str, subject: str, message: str) -> bool:
+def send_with_smtp(to_email: str, subject: str, message: str, html: Optional[str] = None) -> bool:
     """
-    Envía un email usando Gmail SMTP (puede fallar en Render)
+    Envía un email usando Gmail SMTP (puede fallar en Render).
+    Reutiliza la sesión SMTP abierta en lugar de loguearse en cada mensaje.
     """
-    try:
-        # Verificar si Gmail está configurado
-        if not settings.GMAIL_APP_PASSWORD:
-            logger.warning("Gmail SMTP no configurado")
-            return False
-        
-        # Configurar el mensaje
-        msg = MIMEMultipart()
-        msg['From'] = settings.GMAIL_USER
-        msg['To'] = to_email
-        msg['Subject'] = Header(subject, 'utf-8')
-        
-        # Agregar el cuerpo del mensaje con codificación UTF-8
-        msg.attach(MIMEText(message, 'plain', 'utf-8'))
-        
-        # Conectar al servidor SMTP de Gmail
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(settings.GMAIL_USER, settings.GMAIL_APP_PASSWORD)
-        
-        # Enviar el email
-        text = msg.as_string()
-        server.sendmail(settings.GMAIL_USER, to_email, text)
-        server.quit()
-        
+    # Verificar si Gmail está configurado
+    if not settings.GMAIL_APP_PASSWORD:
+        logger.warning("Gmail SMTP no configurado")
+        return False
+    
+    if enviar_con_proveedor(proveedor_smtp, to_email, subject, message, html if html is not None else envolver_html(message)):
         logger.info(f"📧 Email enviado via SMTP a {to_email}: {subject}")
         return True
-        
-    except Exception as e:
-        logger.error(f"Error al enviar email via SMTP: {e}")
-        return False
+    return False
 
-def send_email(to_email: str, subject: str, message: str) -> bool:
+def send_email(to_email: str, subject: str, message: str, html: Optional[str] = None) -> bool:
     """
     Envía un email usando SendGrid API como método principal, con SMTP como fallback
     Ideal para despliegues en Render donde SMTP puede estar bloqueado
+    html: variante HTML ya renderizada (las plantillas la generan junto con el texto)
+    Un proveedor con el circuito abierto se saltea sin esperar su timeout.
     """
     logger.info(f"🚀 Iniciando envío de email a {to_email}: {subject}")
     
     # 1. Intentar SendGrid API primero (recomendado para Render)
     if settings.SENDGRID_API_KEY:
         logger.info("📡 Intentando envío via SendGrid API...")
-        if send_with_sendgrid_api(to_email, subject, message):
+        if send_with_sendgrid_api(to_email, subject, message, html):
             return True
         else:
             logger.warning("⚠️ SendGrid API falló, intentando SMTP...")
@@ -117,7 +57,7 @@ def send_email(to_email: str, subject: str, message: str) -> bool:
         logger.info("📡 SendGrid no configurado, intentando SMTP...")
     
     # 2. Fallback a SMTP si SendGrid falla
-    if send_with_smtp(to_email, subject, message):
+    if send_with_smtp(to_email, subject, message, html):
         return True
     
     # 3. Si ambos fallan, simular envío en desarrollo
@@ -130,20 +70,43 @@ def send_email(to_email: str, subject: str, message: str) -> bool:
     logger.error(f"❌ Falló el envío de email a {to_email}")
     return False
 
+def send_email_lote(destinatarios: List[str], subject: str, message: str, html: Optional[str] = None) -> int:
+    """
+    Envía el mismo mensaje a varios destinatarios. Con SendGrid va en un solo request
+    (cada destinatario ve solo su dirección); si falla, se envía uno por uno.
+    Retorna la cantidad de envíos exitosos.
+    """
+    if not destinatarios:
+        return 0
+    html = html if html is not None else envolver_html(message)
+    if len(destinatarios) > 1 and settings.SENDGRID_API_KEY:
+        if enviar_con_proveedor(proveedor_sendgrid, destinatarios, subject, message, html):
+            logger.info(f"📧 Lote de {len(destinatarios)} emails enviado via SendGrid: {subject}")
+            return len(destinatarios)
+        logger.warning("⚠️ Lote via SendGrid falló, enviando uno por uno...")
+    return sum(1 for destinatario in destinatarios if send_email(destinatario, subject, message, html))
+
+def _es_de_hoy(fecha) -> bool:
+    return str(fecha) == date.today().isoformat()
+
 def enviar_notificacion_masiva(destinatarios: list, asunto: str, mensaje: str, tipo: str = "general") -> dict:
     """
     Envía notificación masiva por email
+    El cuerpo compartido se renderiza una sola vez; por destinatario solo se sustituyen
+    los campos que queden en la plantilla (email).
     Retorna: {"exitosos": int, "fallidos": int}
     """
     exitosos = 0
     fallidos = 0
     
+    plantilla = plantilla_notificacion(tipo).precompilar(mensaje=mensaje)
+    compartido = None if plantilla.campos else plantilla.render()
+    
     for destinatario in destinatarios:
         try:
-            # Crear mensaje personalizado según el tipo
-            mensaje_personalizado = crear_template_notificacion(tipo, mensaje)
+            texto, html = compartido or plantilla.render(email=destinatario)
             
-            if send_email(destinatario, asunto, mensaje_personalizado):
+            if send_email(destinatario, asunto, texto, html):
                 exitosos += 1
             else:
                 fallidos += 1
@@ -157,32 +120,9 @@ def enviar_notificacion_masiva(destinatarios: list, asunto: str, mensaje: str, t
 
 def crear_template_notificacion(tipo: str, mensaje: str) -> str:
     """
-    Crea un template para el email basado en el tipo
-    """
-    # Configuración de emojis por tipo
-    tipo_config = {
-        "general": {"emoji": "📢", "titulo": "Notificación General"},
-        "mantenimiento": {"emoji": "🔧", "titulo": "Mantenimiento"},
-        "promocion": {"emoji": "🎉", "titulo": "Promoción Especial"},
-        "reserva": {"emoji": "🏀", "titulo": "Información de Reserva"},
-        "suscripcion": {"emoji": "📅", "titulo": "Información de Suscripción"}
-    }
-    
-    config = tipo_config.get(tipo, tipo_config["general"])
-    
-    template = f"""
-{config['emoji']} {config['titulo']} - Quico Básquet
-
-{mensaje}
-
----
-¿Necesitas ayuda? Contacta con nosotros:
-Email: basquetquico@gmail.com
-
-© 2025 Quico Básquet. Todos los derechos reservados.
+    Crea el texto del email basado en el tipo (plantilla precompilada por tipo)
     """
-    
-    return template
+    return plantilla_notificacion(tipo).render(mensaje=mensaje)[0]
 
 def send_reservation_confirmation_email(user_email: str, user_name: str, reserva_data: dict, info_pago: dict) -> bool:
     """
@@ -190,52 +130,19 @@ def send_reservation_confirmation_email(user_email: str, user_name: str, reserva
     """
     subject = "✅ Confirmación de Reserva - Quico Básquet"
     
-    if info_pago['metodo'] == 'transferencia':
-        message = f"""
-¡Hola {user_name}!
-
-Tu reserva ha sido confirmada exitosamente.
-
-📅 Fecha: {reserva_data['fecha']}
-⏰ Horario: {reserva_data['hora_inicio']} - {reserva_data['hora_fin']}
-🏀 Deporte: {reserva_data['deporte']}
-💰 Precio: ${reserva_data['precio']}
-
-💳 INFORMACIÓN DE PAGO:
-• Método: Transferencia bancaria
-• Alias: {info_pago['alias']}
-• CBU: {info_pago['cbu']}
-• Banco: {info_pago['banco']}
-• Titular: {info_pago['titular']}
-
-Por favor, realiza la transferencia antes de la fecha de la reserva.
-
-¡Gracias por elegir Quico Básquet!
-
-Saludos,
-El equipo de Quico Básquet
-        """
-    else:
-        message = f"""
-¡Hola {user_name}!
-
-Tu reserva ha sido confirmada exitosamente.
-
-📅 Fecha: {reserva_data['fecha']}
-⏰ Horario: {reserva_data['hora_inicio']} - {reserva_data['hora_fin']}
-🏀 Deporte: {reserva_data['deporte']}
-💰 Precio: ${reserva_data['precio']}
-
-💵 PAGO EN EFECTIVO:
-El pago se realiza en efectivo al momento de la reserva.
-
-¡Gracias por elegir Quico Básquet!
-
-Saludos,
-El equipo de Quico Básquet
-        """
+    # Los datos bancarios ya vienen pre-renderizados en la plantilla de transferencia
+    plantilla = "confirmacion_reserva_transferencia" if info_pago['metodo'] == 'transferencia' else "confirmacion_reserva_efectivo"
+    message, html = render(
+        plantilla,
+        user_name=user_name,
+        fecha=reserva_data['fecha'],
+        hora_inicio=reserva_data['hora_inicio'],
+        hora_fin=reserva_data['hora_fin'],
+        deporte=reserva_data['deporte'],
+        precio=reserva_data['precio']
+    )
     
-    return send_email(user_email, subject, message)
+    return send_email(user_email, subject, message, html)
 
 def send_subscription_confirmation_email(user_email: str, user_name: str, suscripcion_data: dict) -> bool:
     """
@@ -243,57 +150,38 @@ def send_subscription_confirmation_email(user_email: str, user_name: str, suscri
     """
     subject = "✅ Confirmación de Suscripción - Quico Básquet"
     
-    # Convertir número de día a nombre
-    dias_semana = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
-    dia_nombre = dias_semana[suscripcion_data['dia_semana']] if 0 <= suscripcion_data['dia_semana'] < 7 else f"Día {suscripcion_data['dia_semana']}"
-    
-    message = f"""
-¡Hola {user_name}!
-
-Tu suscripción ha sido creada exitosamente.
-
-📅 Día de la semana: {dia_nombre}
-⏰ Horario: {suscripcion_data['hora_inicio']} - {suscripcion_data['hora_fin']}
-🏀 Deporte: {suscripcion_data['deporte']}
-💰 Precio mensual: ${suscripcion_data['precio_mensual']}
-
-Tu suscripción está activa y puedes disfrutar de tu cancha reservada.
-
-¡Gracias por elegir Quico Básquet!
-
-Saludos,
-El equipo de Quico Básquet
-    """
+    message, html = render(
+        "confirmacion_suscripcion",
+        user_name=user_name,
+        dia_nombre=nombre_dia(suscripcion_data['dia_semana']),
+        hora_inicio=suscripcion_data['hora_inicio'],
+        hora_fin=suscripcion_data['hora_fin'],
+        deporte=suscripcion_data['deporte'],
+        precio_mensual=suscripcion_data['precio_mensual']
+    )
     
-    return send_email(user_email, subject, message)
+    return send_email(user_email, subject, message, html)
 
-def send_subscription_confirmation_email_admin(user_name: str, suscripcion_data: dict) -> bool:
+def send_subscription_confirmation_email_admin(user_name: str, suscripcion_data: dict) -> Optional[bool]:
     """
     Envía email de confirmación de suscripción al administrador
     """
     subject = "✅ Nueva Suscripción Creada - Quico Básquet"
     
-    # Convertir número de día a nombre
-    dias_semana = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
-    dia_nombre = dias_semana[suscripcion_data['dia_semana']] if 0 <= suscripcion_data['dia_semana'] < 7 else f"Día {suscripcion_data['dia_semana']}"
+    message, html = render(
+        "confirmacion_suscripcion_admin",
+        user_name=user_name,
+        dia_nombre=nombre_dia(suscripcion_data['dia_semana']),
+        hora_inicio=suscripcion_data['hora_inicio'],
+        hora_fin=suscripcion_data['hora_fin'],
+        deporte=suscripcion_data['deporte'],
+        cliente_nombre=suscripcion_data['cliente_nombre'],
+        precio_mensual=suscripcion_data['precio_mensual'],
+        fecha_inicio=suscripcion_data.get('fecha_inicio', 'No especificada'),
+        fecha_fin=suscripcion_data.get('fecha_fin', 'No especificada')
+    )
     
-    message = f"""
-🔄 NUEVA SUSCRIPCIÓN CREADA
-
-📅 Día de la semana: {dia_nombre}
-⏰ Horario: {suscripcion_data['hora_inicio']} - {suscripcion_data['hora_fin']}
-🏀 Deporte: {suscripcion_data['deporte']}
-👤 Cliente: {suscripcion_data['cliente_nombre']}
-💰 Precio mensual: ${suscripcion_data['precio_mensual']}
-📅 Fecha inicio: {suscripcion_data.get('fecha_inicio', 'No especificada')}
-📅 Fecha fin: {suscripcion_data.get('fecha_fin', 'No especificada')}
-
-📍 Creada por: {user_name}
-
-¡Nueva suscripción confirmada en el sistema!
-    """
-    
-    return send_email("basquetquico@gmail.com", subject, message)
+    return enviar_aviso_admin('confirmacion_suscripcion', subject, message, html)
 
 def send_subscription_cancellation_email(user_email: str, user_name: str, suscripcion_data: dict) -> bool:
     """
@@ -301,54 +189,35 @@ def send_subscription_cancellation_email(user_email: str, user_name: str, suscri
     """
     subject = "❌ Suscripción Cancelada - Quico Básquet"
     
-    # Convertir número de día a nombre
-    dias_semana = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
-    dia_nombre = dias_semana[suscripcion_data['dia_semana']] if 0 <= suscripcion_data['dia_semana'] < 7 else f"Día {suscripcion_data['dia_semana']}"
-    
-    message = f"""
-¡Hola {user_name}!
-
-Tu suscripción ha sido cancelada.
-
-📅 Día de la semana: {dia_nombre}
-⏰ Horario: {suscripcion_data['hora_inicio']} - {suscripcion_data['hora_fin']}
-🏀 Deporte: {suscripcion_data['deporte']}
-
-Si tienes alguna pregunta o deseas reactivar tu suscripción, no dudes en contactarnos.
-
-¡Gracias por haber elegido Quico Básquet!
-
-Saludos,
-El equipo de Quico Básquet
-    """
+    message, html = render(
+        "cancelacion_suscripcion",
+        user_name=user_name,
+        dia_nombre=nombre_dia(suscripcion_data['dia_semana']),
+        hora_inicio=suscripcion_data['hora_inicio'],
+        hora_fin=suscripcion_data['hora_fin'],
+        deporte=suscripcion_data['deporte']
+    )
     
-    return send_email(user_email, subject, message)
+    return send_email(user_email, subject, message, html)
 
-def send_subscription_cancellation_email_admin(user_name: str, suscripcion_data: dict) -> bool:
+def send_subscription_cancellation_email_admin(user_name: str, suscripcion_data: dict) -> Optional[bool]:
     """
     Envía email de cancelación de suscripción al administrador
     """
     subject = "❌ Suscripción Cancelada - Quico Básquet"
     
-    # Convertir número de día a nombre
-    dias_semana = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
-    dia_nombre = dias_semana[suscripcion_data['dia_semana']] if 0 <= suscripcion_data['dia_semana'] < 7 else f"Día {suscripcion_data['dia_semana']}"
+    message, html = render(
+        "cancelacion_suscripcion_admin",
+        user_name=user_name,
+        dia_nombre=nombre_dia(suscripcion_data['dia_semana']),
+        hora_inicio=suscripcion_data['hora_inicio'],
+        hora_fin=suscripcion_data['hora_fin'],
+        deporte=suscripcion_data['deporte'],
+        cliente_nombre=suscripcion_data['cliente_nombre'],
+        precio_mensual=suscripcion_data['precio_mensual']
+    )
     
-    message = f"""
-❌ SUSCRIPCIÓN CANCELADA
-
-📅 Día de la semana: {dia_nombre}
-⏰ Horario: {suscripcion_data['hora_inicio']} - {suscripcion_data['hora_fin']}
-🏀 Deporte: {suscripcion_data['deporte']}
-👤 Cliente: {suscripcion_data['cliente_nombre']}
-💰 Precio mensual: ${suscripcion_data['precio_mensual']}
-
-📍 Cancelada por: {user_name}
-
-⚠️ Suscripción cancelada en el sistema.
-    """
-    
-    return send_email("basquetquico@gmail.com", subject, message)
+    return enviar_aviso_admin('cancelacion_suscripcion', subject, message, html)
 
 def send_subscription_renewal_email(user_email: str, user_name: str, suscripcion_data: dict, nueva_fecha_fin: str) -> bool:
     """
@@ -356,30 +225,18 @@ def send_subscription_renewal_email(user_email: str, user_name: str, suscripcion
     """
     subject = "🔄 Suscripción Renovada - Quico Básquet"
     
-    # Convertir número de día a nombre
-    dias_semana = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
-    dia_nombre = dias_semana[suscripcion_data['dia_semana']] if 0 <= suscripcion_data['dia_semana'] < 7 else f"Día {suscripcion_data['dia_semana']}"
+    message, html = render(
+        "renovacion_suscripcion",
+        user_name=user_name,
+        dia_nombre=nombre_dia(suscripcion_data['dia_semana']),
+        hora_inicio=suscripcion_data['hora_inicio'],
+        hora_fin=suscripcion_data['hora_fin'],
+        deporte=suscripcion_data['deporte'],
+        precio_mensual=suscripcion_data['precio_mensual'],
+        nueva_fecha_fin=nueva_fecha_fin
+    )
     
-    message = f"""
-¡Hola {user_name}!
-
-Tu suscripción ha sido renovada exitosamente.
-
-📅 Día de la semana: {dia_nombre}
-⏰ Horario: {suscripcion_data['hora_inicio']} - {suscripcion_data['hora_fin']}
-🏀 Deporte: {suscripcion_data['deporte']}
-💰 Precio mensual: ${suscripcion_data['precio_mensual']}
-📅 Nueva fecha de fin: {nueva_fecha_fin}
-
-Tu suscripción está activa y puedes seguir disfrutando de tu cancha reservada.
-
-¡Gracias por elegir Quico Básquet!
-
-Saludos,
-El equipo de Quico Básquet
-    """
-    
-    return send_email(user_email, subject, message)
+    return send_email(user_email, subject, message, html)
 
 def send_reservation_cancellation_email(user_email: str, user_name: str, reserva_data: dict) -> bool:
     """
@@ -387,78 +244,54 @@ def send_reservation_cancellation_email(user_email: str, user_name: str, reserva
     """
     subject = "❌ Reserva Cancelada - Quico Básquet"
     
-    message = f"""
-¡Hola {user_name}!
-
-Tu reserva ha sido cancelada.
-
-📅 Fecha: {reserva_data['fecha']}
-⏰ Horario: {reserva_data['hora_inicio']} - {reserva_data['hora_fin']}
-🏀 Deporte: {reserva_data['deporte']}
-
-Si tienes alguna pregunta o deseas hacer una nueva reserva, no dudes en contactarnos.
-
-¡Gracias por haber elegido Quico Básquet!
-
-Saludos,
-El equipo de Quico Básquet
-    """
+    message, html = render(
+        "cancelacion_reserva",
+        user_name=user_name,
+        fecha=reserva_data['fecha'],
+        hora_inicio=reserva_data['hora_inicio'],
+        hora_fin=reserva_data['hora_fin'],
+        deporte=reserva_data['deporte']
+    )
     
-    return send_email(user_email, subject, message)
+    return send_email(user_email, subject, message, html)
 
-def send_reservation_confirmation_email_admin(user_name: str, reserva_data: dict, info_pago: dict) -> bool:
+def send_reservation_confirmation_email_admin(user_name: str, reserva_data: dict, info_pago: dict) -> Optional[bool]:
     """
     Envía email de confirmación de reserva al administrador
     """
     subject = "✅ Confirmación de Reserva - Quico Básquet"
     
-    if info_pago['metodo'] == 'transferencia':
-        message = f"""
-🏀 NUEVA RESERVA CREADA
-
-📅 Fecha: {reserva_data['fecha']}
-⏰ Horario: {reserva_data['hora_inicio']} - {reserva_data['hora_fin']}
-🏀 Deporte: {reserva_data['deporte']}
-👤 Cliente: {reserva_data['cliente_nombre']}
-💰 Precio: ${reserva_data['precio']}
-💳 Método pago: Transferencia
-
-📍 Creada por: {user_name}
-
-¡Nueva reserva confirmada en el sistema!
-        """
-    else:
-        message = f"""
-🏀 NUEVA RESERVA CREADA
-
-📅 Fecha: {reserva_data['fecha']}
-⏰ Horario: {reserva_data['hora_inicio']} - {reserva_data['hora_fin']}
-🏀 Deporte: {reserva_data['deporte']}
-👤 Cliente: {reserva_data['cliente_nombre']}
-💰 Precio: ${reserva_data['precio']}
-💳 Método pago: Efectivo
-
-📍 Creada por: {user_name}
-
-¡Nueva reserva confirmada en el sistema!
-        """
-
-    return send_email("basquetquico@gmail.com", subject, message)
-
-def send_reservation_cancellation_email_admin(user_name: str, reserva_data: dict) -> bool:
+    plantilla = "confirmacion_reserva_admin_transferencia" if info_pago['metodo'] == 'transferencia' else "confirmacion_reserva_admin_efectivo"
+    message, html = render(
+        plantilla,
+        user_name=user_name,
+        fecha=reserva_data['fecha'],
+        hora_inicio=reserva_data['hora_inicio'],
+        hora_fin=reserva_data['hora_fin'],
+        deporte=reserva_data['deporte'],
+        # El controlador de reservas arma el dict con 'nombre_cliente'
+        cliente_nombre=reserva_data.get('cliente_nombre', reserva_data.get('nombre_cliente')),
+        precio=reserva_data['precio']
+    )
+
+    # Los cambios para el mismo día no esperan al resumen
+    return enviar_aviso_admin('confirmacion_reserva', subject, message, html, urgente=_es_de_hoy(reserva_data['fecha']))
+
+def send_reservation_cancellation_email_admin(user_name: str, reserva_data: dict) -> Optional[bool]:
     """
     Envía email de cancelación de reserva al administrador
     """
     subject = "❌ Reserva Cancelada - Quico Básquet"
     
-    message = f"""
-🏀 RESERVA CANCELADA
-
-📅 Fecha: {reserva_data['fecha']}
-⏰ Horario: {reserva_data['hora_inicio']} - {reserva_data['hora_fin']}
-🏀 Deporte: {reserva_data['deporte']}
-👤 Cliente: {reserva_data['cliente_nombre']}
-💰 Precio: ${reserva_data['precio']}
-    """
-
-    return send_email("basquetquico@gmail.com", subject, message)
\ No newline at end of file
+    message, html = render(
+        "cancelacion_reserva_admin",
+        fecha=reserva_data['fecha'],
+        hora_inicio=reserva_data['hora_inicio'],
+        hora_fin=reserva_data['hora_fin'],
+        deporte=reserva_data['deporte'],
+        cliente_nombre=reserva_data['cliente_nombre'],
+        precio=reserva_data['precio']
+    )
+
+    # Los cambios para el mismo día no esperan al resumen
+    return enviar_aviso_admin('cancelacion_reserva', subject, message, html, urgente=_es_de_hoy(reserva_data['fecha']))
\ No newline at end of file
@@ -0,0 +1,273 @@
+"""
+Plantillas de email compiladas una sola vez al importar el módulo.
+
+Cada plantilla se define como texto plano con marcadores ${campo} y al compilarse genera
+también su variante HTML (escapada y envuelta en el layout de Quico Básquet), así que un
+envío solo sustituye los valores en las dos versiones. Los bloques constantes (datos
+bancarios, pie de notificaciones, cabecera HTML) quedan pre-renderizados en la plantilla.
+"""
+import html
+import re
+from string import Template
+from typing import Dict, Tuple
+from app.config.settings import settings
+
+DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+EMAIL_ADMIN = "basquetquico@gmail.com"
+
+def nombre_dia(dia_semana: int) -> str:
+    """Convierte el número de día (0 = lunes) a su nombre"""
+    return DIAS_SEMANA[dia_semana] if 0 <= dia_semana < 7 else f"Día {dia_semana}"
+
+def _escapar_dolar(valor) -> str:
+    return str(valor).replace("$", "$$")
+
+# Layout HTML común (mismo que armaba send_with_sendgrid_api en cada envío)
+HTML_CABECERA = _escapar_dolar(f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+                <div style="text-align: center; border-bottom: 2px solid #4a90e2; padding-bottom: 20px; margin-bottom: 20px;">
+                    <h1 style="color: #4a90e2; margin: 0;">{html.escape(settings.FROM_NAME)}</h1>
+                </div>
+                <div style="white-space: pre-wrap;">
+                    """)
+HTML_PIE = """
+                </div>
+                <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #eee; text-align: center; color: #666; font-size: 0.9em;">
+                    <p>Este es un mensaje automático, por favor no responder a este email.</p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+
+def _a_html(texto: str) -> str:
+    """Texto plano a fragmento HTML: escapa caracteres especiales y conserva los saltos de línea"""
+    return html.escape(texto, quote=False).replace("\n", "<br>")
+
+def _sustituir_parcial(fuente: str, valores: Dict[str, str]) -> str:
+    """
+    Como Template.safe_substitute pero deja intactos los "$$" y escapa los valores,
+    para que el resultado siga siendo una plantilla válida con los campos restantes.
+    """
+    def reemplazar(m: re.Match) -> str:
+        nombre = m.group("named") or m.group("braced")
+        if nombre is not None and nombre in valores:
+            return _escapar_dolar(valores[nombre])
+        return m.group(0)
+    return Template.pattern.sub(reemplazar, fuente)
+
+class PlantillaEmail:
+    """Plantilla compilada: el texto plano y el HTML se renderizan juntos"""
+
+    def __init__(self, fuente: str):
+        self.fuente = fuente
+        self._texto = Template(fuente)
+        self._html = Template(HTML_CABECERA + _a_html(fuente) + HTML_PIE)
+        self.campos = frozenset(self._texto.get_identifiers())
+
+    def render(self, **campos) -> Tuple[str, str]:
+        """Retorna (texto, html). Falla con KeyError si falta algún campo de la plantilla"""
+        texto = self._texto.substitute({k: str(v) for k, v in campos.items()})
+        cuerpo_html = self._html.substitute({k: _a_html(str(v)) for k, v in campos.items()})
+        return texto, cuerpo_html
+
+    def precompilar(self, **compartidos) -> "PlantillaEmail":
+        """Nueva plantilla con los campos compartidos ya aplicados (solo quedan los restantes)"""
+        return PlantillaEmail(_sustituir_parcial(self.fuente, {k: str(v) for k, v in compartidos.items()}))
+
+# Plantilla mínima para mensajes sueltos (send_email sin HTML propio)
+MENSAJE_LIBRE = PlantillaEmail("${mensaje}")
+
+def envolver_html(mensaje: str) -> str:
+    """HTML de un mensaje de texto plano con el layout común"""
+    return MENSAJE_LIBRE.render(mensaje=mensaje)[1]
+
+# ---- Notificaciones masivas ----
+
+TIPOS_NOTIFICACION = {
+    "general": {"emoji": "📢", "titulo": "Notificación General"},
+    "mantenimiento": {"emoji": "🔧", "titulo": "Mantenimiento"},
+    "promocion": {"emoji": "🎉", "titulo": "Promoción Especial"},
+    "reserva": {"emoji": "🏀", "titulo": "Información de Reserva"},
+    "suscripcion": {"emoji": "📅", "titulo": "Información de Suscripción"}
+}
+
+_NOTIFICACION = PlantillaEmail(f"""
+${{emoji}} ${{titulo}} - Quico Básquet
+
+${{mensaje}}
+
+---
+¿Necesitas ayuda? Contacta con nosotros:
+Email: {EMAIL_ADMIN}
+
+© 2025 Quico Básquet. Todos los derechos reservados.
+    """)
+
+# Una plantilla por tipo con el encabezado ya aplicado
+NOTIFICACIONES = {tipo: _NOTIFICACION.precompilar(**config) for tipo, config in TIPOS_NOTIFICACION.items()}
+
+def plantilla_notificacion(tipo: str) -> PlantillaEmail:
+    return NOTIFICACIONES.get(tipo, NOTIFICACIONES["general"])
+
+# ---- Reservas ----
+
+_DATOS_RESERVA = """📅 Fecha: ${fecha}
+⏰ Horario: ${hora_inicio} - ${hora_fin}
+🏀 Deporte: ${deporte}"""
+
+_SALUDO_FINAL = """¡Gracias por elegir Quico Básquet!
+
+Saludos,
+El equipo de Quico Básquet"""
+
+_CONFIRMACION_RESERVA = f"""
+¡Hola ${{user_name}}!
+
+Tu reserva ha sido confirmada exitosamente.
+
+{_DATOS_RESERVA}
+💰 Precio: $$${{precio}}
+
+${{bloque_pago}}
+
+{_SALUDO_FINAL}
+        """
+
+# Bloques de pago pre-renderizados (los datos bancarios no cambian entre envíos)
+BLOQUE_PAGO_TRANSFERENCIA = f"""💳 INFORMACIÓN DE PAGO:
+• Método: Transferencia bancaria
+• Alias: {settings.DATOS_BANCARIOS.get("alias", "ALIAS_NO_CONFIGURADO")}
+• CBU: {settings.DATOS_BANCARIOS.get("cbu", "CBU_NO_CONFIGURADO")}
+• Banco: {settings.DATOS_BANCARIOS.get("bank", "BANCO_NO_CONFIGURADO")}
+• Titular: {settings.DATOS_BANCARIOS.get("holder", "TITULAR_NO_CONFIGURADO")}
+
+Por favor, realiza la transferencia antes de la fecha de la reserva."""
+
+BLOQUE_PAGO_EFECTIVO = """💵 PAGO EN EFECTIVO:
+El pago se realiza en efectivo al momento de la reserva."""
+
+_RESERVA_ADMIN = f"""
+🏀 NUEVA RESERVA CREADA
+
+{_DATOS_RESERVA}
+👤 Cliente: ${{cliente_nombre}}
+💰 Precio: $$${{precio}}
+💳 Método pago: ${{metodo_pago}}
+
+📍 Creada por: ${{user_name}}
+
+¡Nueva reserva confirmada en el sistema!
+        """
+
+# ---- Suscripciones ----
+
+_DATOS_SUSCRIPCION = """📅 Día de la semana: ${dia_nombre}
+⏰ Horario: ${hora_inicio} - ${hora_fin}
+🏀 Deporte: ${deporte}"""
+
+PLANTILLAS: Dict[str, PlantillaEmail] = {
+    "confirmacion_reserva_transferencia": PlantillaEmail(_CONFIRMACION_RESERVA).precompilar(bloque_pago=BLOQUE_PAGO_TRANSFERENCIA),
+    "confirmacion_reserva_efectivo": PlantillaEmail(_CONFIRMACION_RESERVA).precompilar(bloque_pago=BLOQUE_PAGO_EFECTIVO),
+    "confirmacion_reserva_admin_transferencia": PlantillaEmail(_RESERVA_ADMIN).precompilar(metodo_pago="Transferencia"),
+    "confirmacion_reserva_admin_efectivo": PlantillaEmail(_RESERVA_ADMIN).precompilar(metodo_pago="Efectivo"),
+    "cancelacion_reserva": PlantillaEmail(f"""
+¡Hola ${{user_name}}!
+
+Tu reserva ha sido cancelada.
+
+{_DATOS_RESERVA}
+
+Si tienes alguna pregunta o deseas hacer una nueva reserva, no dudes en contactarnos.
+
+¡Gracias por haber elegido Quico Básquet!
+
+Saludos,
+El equipo de Quico Básquet
+    """),
+    "cancelacion_reserva_admin": PlantillaEmail(f"""
+🏀 RESERVA CANCELADA
+
+{_DATOS_RESERVA}
+👤 Cliente: ${{cliente_nombre}}
+💰 Precio: $$${{precio}}
+    """),
+    "confirmacion_suscripcion": PlantillaEmail(f"""
+¡Hola ${{user_name}}!
+
+Tu suscripción ha sido creada exitosamente.
+
+{_DATOS_SUSCRIPCION}
+💰 Precio mensual: $$${{precio_mensual}}
+
+Tu suscripción está activa y puedes disfrutar de tu cancha reservada.
+
+{_SALUDO_FINAL}
+    """),
+    "confirmacion_suscripcion_admin": PlantillaEmail(f"""
+🔄 NUEVA SUSCRIPCIÓN CREADA
+
+{_DATOS_SUSCRIPCION}
+👤 Cliente: ${{cliente_nombre}}
+💰 Precio mensual: $$${{precio_mensual}}
+📅 Fecha inicio: ${{fecha_inicio}}
+📅 Fecha fin: ${{fecha_fin}}
+
+📍 Creada por: ${{user_name}}
+
+¡Nueva suscripción confirmada en el sistema!
+    """),
+    "cancelacion_suscripcion": PlantillaEmail(f"""
+¡Hola ${{user_name}}!
+
+Tu suscripción ha sido cancelada.
+
+{_DATOS_SUSCRIPCION}
+
+Si tienes alguna pregunta o deseas reactivar tu suscripción, no dudes en contactarnos.
+
+¡Gracias por haber elegido Quico Básquet!
+
+Saludos,
+El equipo de Quico Básquet
+    """),
+    "cancelacion_suscripcion_admin": PlantillaEmail(f"""
+❌ SUSCRIPCIÓN CANCELADA
+
+{_DATOS_SUSCRIPCION}
+👤 Cliente: ${{cliente_nombre}}
+💰 Precio mensual: $$${{precio_mensual}}
+
+📍 Cancelada por: ${{user_name}}
+
+⚠️ Suscripción cancelada en el sistema.
+    """),
+    "renovacion_suscripcion": PlantillaEmail(f"""
+¡Hola ${{user_name}}!
+
+Tu suscripción ha sido renovada exitosamente.
+
+{_DATOS_SUSCRIPCION}
+💰 Precio mensual: $$${{precio_mensual}}
+📅 Nueva fecha de fin: ${{nueva_fecha_fin}}
+
+Tu suscripción está activa y puedes seguir disfrutando de tu cancha reservada.
+
+{_SALUDO_FINAL}
+    """),
+    "resumen_admin": PlantillaEmail("""
+📬 RESUMEN DE ACTIVIDAD
+
+${cantidad} avisos entre ${desde} y ${hasta}
+
+${conteo}
+
+${detalle}
+    """),
+}
+
+def render(nombre: str, **campos) -> Tuple[str, str]:
+    """Renderiza la plantilla registrada como (texto, html)"""
+    return PLANTILLAS[nombre].render(**campos)
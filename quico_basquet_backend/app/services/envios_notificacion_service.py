@@ -0,0 +1,230 @@
+"""
+Envío de notificaciones masivas en segundo plano.
+
+POST /notifications/send solo crea la notificación en estado "pendiente" y la encola.
+Un hilo recorre la audiencia (un segmento de segmentos_service) en tandas ordenadas
+por id de usuario y, al terminar cada tanda, guarda los contadores y el último usuario procesado. Así el progreso se puede
+consultar mientras tanto y un envío interrumpido (reinicio, worker caído) retoma desde
+la última tanda completa en lugar de volver a empezar.
+
+Cada envío se toma con un lease: un UPDATE condicional lo pasa a "enviando" solo si está
+pendiente o si su último avance es más viejo que NOTIFICACIONES_LEASE_SEGUNDOS, y el worker
+lo renueva antes de cada tanda. Un barrido periódico vuelve a encolar los envíos libres.
+"""
+import logging
+import queue
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from app.config.settings import settings
+from app.models.notification import Notification
+from app.services.canales_notificacion import despachar_notificacion
+from app.services.segmentos_service import contar_segmento, resolver_segmento
+from app.utils.tareas import TareaPeriodica
+
+logger = logging.getLogger(__name__)
+
+def parametros_segmento(notificacion: Notification) -> dict:
+    """Parámetros del segmento de la notificación (usuario_id sale de usuario_id_especifico)"""
+    parametros = dict(notificacion.segmento_parametros or {})
+    if notificacion.destinatarios == "especifico":
+        parametros["usuario_id"] = notificacion.usuario_id_especifico
+    return parametros
+
+def contar_audiencia(db: Session, notificacion: Notification, despues_de_id: Optional[int] = None) -> int:
+    """Cantidad de destinatarios del segmento (con email o teléfono)"""
+    return contar_segmento(db, notificacion.destinatarios, parametros_segmento(notificacion), despues_de_id)
+
+def _siguiente_tanda(db: Session, notificacion: Notification) -> List:
+    """Próxima tanda de destinatarios después del último usuario procesado (keyset por id)"""
+    return resolver_segmento(
+        db, notificacion.destinatarios, parametros_segmento(notificacion),
+        despues_de_id=notificacion.ultimo_usuario_id, limite=settings.NOTIFICACIONES_TAMANO_TANDA
+    )
+
+def _libre():
+    """Envíos que se pueden tomar: pendientes o "enviando" sin avances dentro del lease"""
+    limite = datetime.utcnow() - timedelta(seconds=settings.NOTIFICACIONES_LEASE_SEGUNDOS)
+    return or_(
+        Notification.estado == "pendiente",
+        and_(Notification.estado == "enviando", or_(Notification.actualizada.is_(None), Notification.actualizada < limite)),
+    )
+
+def _propio(lease: datetime):
+    """El envío sigue tomado por este worker (nadie renovó ni liberó el lease)"""
+    return and_(Notification.estado == "enviando", Notification.actualizada == lease)
+
+def _actualizar_lease(db: Session, notification_id: int, condicion, valores: dict) -> bool:
+    """UPDATE condicional sobre el envío: retorna si la fila cumplía la condición"""
+    cambiadas = db.query(Notification).filter(Notification.id == notification_id, condicion).update(valores, synchronize_session=False)
+    db.commit()
+    return bool(cambiadas)
+
+def procesar_envio(session_factory, notification_id: int, detener: Optional[threading.Event] = None) -> None:
+    """Envía la notificación tanda por tanda, guardando el avance después de cada una"""
+    db = session_factory()
+    try:
+        # Toma del envío: si otro worker lo tiene (lease vigente) o ya terminó, no se hace nada
+        lease = datetime.utcnow()
+        if not _actualizar_lease(db, notification_id, _libre(), {"estado": "enviando", "actualizada": lease}):
+            return
+        notificacion = db.get(Notification, notification_id)
+
+        while True:
+            if detener is not None and detener.is_set():
+                # Se apaga el proceso: queda liberada para que la retome otro worker o el próximo arranque
+                _actualizar_lease(db, notification_id, _propio(lease), {"estado": "pendiente", "actualizada": None})
+                return
+
+            tanda = _siguiente_tanda(db, notificacion)
+            if not tanda:
+                break
+
+            resultados = despachar_notificacion(tanda, notificacion.asunto, notificacion.mensaje, notificacion.tipo)
+
+            acumulados = {canal: dict(valores) for canal, valores in (notificacion.resultados_canales or {}).items()}
+            for canal, valores in resultados.items():
+                previos = acumulados.setdefault(canal, {})
+                for clave in ("exitosos", "fallidos", "omitidos", "total"):
+                    previos[clave] = previos.get(clave, 0) + valores.get(clave, 0)
+
+            # Guardar el avance renueva el lease; si venció y otro worker lo tomó, se abandona
+            renovado = datetime.utcnow()
+            if not _actualizar_lease(db, notification_id, _propio(lease), {
+                "resultados_canales": acumulados,
+                "enviados_exitosos": (notificacion.enviados_exitosos or 0) + sum(r["exitosos"] for r in resultados.values()),
+                "enviados_fallidos": (notificacion.enviados_fallidos or 0) + sum(r["fallidos"] for r in resultados.values()),
+                "ultimo_usuario_id": tanda[-1].id,
+                "actualizada": renovado,
+            }):
+                logger.warning(f"⚠️ Se perdió el lease de la notificación {notification_id}, la continúa otro worker")
+                return
+            lease = renovado
+            db.refresh(notificacion)
+
+        if not _actualizar_lease(db, notification_id, _propio(lease), {"estado": "enviado"}):
+            return
+        db.refresh(notificacion)
+        logger.info(f"📨 Notificación {notification_id} enviada: {notificacion.enviados_exitosos} exitosos, {notificacion.enviados_fallidos} fallidos")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error en el envío de la notificación {notification_id}: {e}")
+        db.query(Notification).filter(Notification.id == notification_id).update(
+            {"estado": "error", "actualizada": datetime.utcnow()}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+        from app.crud.notification import invalidar_cache_estadisticas
+        invalidar_cache_estadisticas()
+
+def obtener_progreso(db: Session, notificacion: Notification) -> dict:
+    """Enviados, fallidos y destinatarios restantes de una notificación"""
+    restantes = 0 if notificacion.estado in ("enviado", "error") else contar_audiencia(db, notificacion, notificacion.ultimo_usuario_id)
+    return {
+        "notification_id": notificacion.id,
+        "estado": notificacion.estado,
+        "enviados": notificacion.enviados_exitosos or 0,
+        "fallidos": notificacion.enviados_fallidos or 0,
+        "restantes": restantes,
+        "total_destinatarios": notificacion.total_destinatarios or 0,
+        "por_canal": notificacion.resultados_canales or {},
+        "actualizada": notificacion.actualizada,
+    }
+
+class TrabajadorEnvios(threading.Thread):
+    """Hilo que procesa de a una las notificaciones encoladas"""
+
+    def __init__(self, session_factory):
+        super().__init__(name="envios-notificaciones", daemon=True)
+        self._session_factory = session_factory
+        self._cola: "queue.Queue[Optional[int]]" = queue.Queue()
+        self._detener = threading.Event()
+        self._lock = threading.Lock()
+        self._encoladas = set()
+
+    def encolar(self, notification_id: int) -> bool:
+        """Encola el envío si no está ya en la cola de este worker"""
+        with self._lock:
+            if notification_id in self._encoladas:
+                return False
+            self._encoladas.add(notification_id)
+        self._cola.put(notification_id)
+        return True
+
+    def detener(self) -> None:
+        self._detener.set()
+        self._cola.put(None)
+
+    def run(self) -> None:
+        while not self._detener.is_set():
+            notification_id = self._cola.get()
+            if notification_id is None:
+                break
+            try:
+                procesar_envio(self._session_factory, notification_id, self._detener)
+            finally:
+                with self._lock:
+                    self._encoladas.discard(notification_id)
+
+_trabajador: Optional[TrabajadorEnvios] = None
+_trabajador_lock = threading.Lock()
+_barrido: Optional[TareaPeriodica] = None
+
+def _obtener_trabajador() -> TrabajadorEnvios:
+    global _trabajador
+    with _trabajador_lock:
+        if _trabajador is None:
+            from app.data.database import SessionLocal
+            _trabajador = TrabajadorEnvios(SessionLocal)
+            _trabajador.start()
+        return _trabajador
+
+def encolar_envio(notification_id: int) -> None:
+    _obtener_trabajador().encolar(notification_id)
+
+def reanudar_envios(session_factory) -> int:
+    """
+    Encola los envíos pendientes o abandonados (lease vencido). Corre al arrancar y en el
+    barrido periódico; la toma la hace procesar_envio, así que si dos workers encolan el
+    mismo envío solo uno lo procesa.
+    """
+    db = session_factory()
+    try:
+        libres = [notification_id for (notification_id,) in db.query(Notification.id).filter(_libre()).order_by(Notification.id)]
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"No se pudieron retomar los envíos de notificaciones: {e}")
+        return 0
+    finally:
+        db.close()
+
+    if not libres:
+        return 0
+    trabajador = _obtener_trabajador()
+    retomados = sum(1 for notification_id in libres if trabajador.encolar(notification_id))
+    if retomados:
+        logger.info(f"📨 {retomados} envíos de notificaciones retomados")
+    return retomados
+
+def iniciar_barrido_envios(session_factory) -> None:
+    """Barrido periódico de envíos libres (NOTIFICACIONES_BARRIDO_SEGUNDOS, 0 lo desactiva)"""
+    global _barrido
+    if settings.NOTIFICACIONES_BARRIDO_SEGUNDOS <= 0 or _barrido is not None:
+        return
+    _barrido = TareaPeriodica("barrido-envios", settings.NOTIFICACIONES_BARRIDO_SEGUNDOS, lambda: reanudar_envios(session_factory))
+    _barrido.start()
+
+def detener_envios() -> None:
+    """Corta el envío en curso al terminar su tanda; queda pendiente para el próximo arranque"""
+    global _trabajador, _barrido
+    if _barrido is not None:
+        barrido, _barrido = _barrido, None
+        barrido.detener()
+    with _trabajador_lock:
+        trabajador, _trabajador = _trabajador, None
+    if trabajador is not None:
+        trabajador.detener()
+        trabajador.join(timeout=settings.EMAIL_TIMEOUT_SEGUNDOS * 2)
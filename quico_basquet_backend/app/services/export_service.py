@@ -0,0 +1,170 @@
+import csv
+import io
+import json
+import logging
+from datetime import date
+from typing import Iterator, List, Optional
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from app.data.database import SessionLocal
+from app.models.reserva import Reserva
+from app.models.suscripcion import Suscripcion
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Cantidad de filas que se traen por vuelta del cursor del servidor
+FILAS_POR_LOTE = 500
+
+FORMATOS_EXPORTACION = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+COLUMNAS_RESERVAS = [
+    "id", "fecha", "hora_inicio", "hora_fin", "cancha_id", "deporte", "cliente", "email",
+    "estado", "estado_pago", "metodo_pago", "precio",
+]
+
+COLUMNAS_SUSCRIPCIONES = [
+    "id", "dia_semana", "hora_inicio", "hora_fin", "fecha_inicio", "fecha_fin", "cancha_id",
+    "deporte", "cliente", "email", "estado", "estado_pago", "metodo_pago", "precio_mensual", "descuento",
+]
+
+def query_exportacion_reservas(
+    db: Session,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    cancha_id: Optional[int] = None,
+    estado_pago: Optional[str] = None
+):
+    """Query de columnas planas para exportar reservas, ordenada por fecha"""
+    query = db.query(
+        Reserva.id,
+        Reserva.fecha,
+        Reserva.hora_inicio,
+        Reserva.hora_fin,
+        Reserva.cancha_id,
+        Reserva.deporte,
+        func.coalesce(Reserva.nombre_cliente, User.nombre).label("cliente"),
+        User.email,
+        Reserva.estado,
+        Reserva.estado_pago,
+        Reserva.metodo_pago,
+        Reserva.precio,
+    ).outerjoin(User, User.id == Reserva.user_id)
+
+    if fecha_desde:
+        query = query.filter(Reserva.fecha >= fecha_desde)
+    if fecha_hasta:
+        query = query.filter(Reserva.fecha <= fecha_hasta)
+    if cancha_id:
+        query = query.filter(Reserva.cancha_id == cancha_id)
+    if estado_pago:
+        query = query.filter(Reserva.estado_pago == estado_pago)
+
+    return query.order_by(Reserva.fecha.asc(), Reserva.hora_inicio.asc(), Reserva.id.asc())
+
+def query_exportacion_suscripciones(
+    db: Session,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    cancha_id: Optional[int] = None,
+    estado_pago: Optional[str] = None
+):
+    """Query de columnas planas para exportar suscripciones vigentes en el rango"""
+    query = db.query(
+        Suscripcion.id,
+        Suscripcion.dia_semana,
+        Suscripcion.hora_inicio,
+        Suscripcion.hora_fin,
+        Suscripcion.fecha_inicio,
+        Suscripcion.fecha_fin,
+        Suscripcion.cancha_id,
+        Suscripcion.deporte,
+        User.nombre.label("cliente"),
+        User.email,
+        Suscripcion.estado,
+        Suscripcion.estado_pago,
+        Suscripcion.metodo_pago,
+        Suscripcion.precio_mensual,
+        Suscripcion.descuento,
+    ).outerjoin(User, User.id == Suscripcion.user_id)
+
+    # Una suscripción entra en el rango si su período se solapa con él
+    if fecha_desde:
+        query = query.filter(or_(Suscripcion.fecha_fin.is_(None), Suscripcion.fecha_fin >= fecha_desde))
+    if fecha_hasta:
+        query = query.filter(Suscripcion.fecha_inicio <= fecha_hasta)
+    if cancha_id:
+        query = query.filter(Suscripcion.cancha_id == cancha_id)
+    if estado_pago:
+        query = query.filter(Suscripcion.estado_pago == estado_pago)
+
+    return query.order_by(Suscripcion.fecha_inicio.asc(), Suscripcion.id.asc())
+
+def _valor_plano(valor):
+    """Convierte fechas y horas a texto ISO para CSV/NDJSON"""
+    if valor is None:
+        return ""
+    if hasattr(valor, "isoformat"):
+        return valor.isoformat()
+    return valor
+
+def _serializar_csv(filas, columnas: List[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columnas)
+
+    pendientes = 0
+    for fila in filas:
+        writer.writerow([_valor_plano(valor) for valor in fila])
+        pendientes += 1
+        if pendientes >= FILAS_POR_LOTE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pendientes = 0
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _serializar_ndjson(filas, columnas: List[str]) -> Iterator[str]:
+    lote = []
+    for fila in filas:
+        registro = {columna: (None if valor is None else _valor_plano(valor)) for columna, valor in zip(columnas, fila)}
+        lote.append(json.dumps(registro, ensure_ascii=False))
+        if len(lote) >= FILAS_POR_LOTE:
+            yield "\n".join(lote) + "\n"
+            lote = []
+
+    if lote:
+        yield "\n".join(lote) + "\n"
+
+def _exportar(construir_query, columnas: List[str], formato: str, **filtros) -> Iterator[str]:
+    """
+    Recorre la query con un cursor del lado del servidor (stream_results + yield_per)
+    para mantener la memoria constante sin importar cuántas filas haya.
+    La sesión es propia del generador porque la de la request se cierra antes de
+    terminar de enviar la respuesta.
+    """
+    db = SessionLocal()
+    try:
+        filas = construir_query(db, **filtros).execution_options(stream_results=True).yield_per(FILAS_POR_LOTE)
+        serializar = _serializar_csv if formato == "csv" else _serializar_ndjson
+        for bloque in serializar(filas, columnas):
+            yield bloque
+        logger.info(f"📤 Exportación {formato} finalizada")
+    except Exception as e:
+        logger.error(f"Error durante la exportación: {e}")
+        raise
+    finally:
+        db.close()
+
+def exportar_reservas(formato: str, **filtros) -> Iterator[str]:
+    """Genera la exportación de reservas en CSV o NDJSON"""
+    return _exportar(query_exportacion_reservas, COLUMNAS_RESERVAS, formato, **filtros)
+
+def exportar_suscripciones(formato: str, **filtros) -> Iterator[str]:
+    """Genera la exportación de suscripciones en CSV o NDJSON"""
+    return _exportar(query_exportacion_suscripciones, COLUMNAS_SUSCRIPCIONES, formato, **filtros)
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Contexto de hash con costo configurable. Fijar min/max al mismo valor hace que
+# cualquier hash con otro costo quede marcado para re-hash en el próximo login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+# Executor dedicado y acotado: bcrypt libera el GIL, así que los hilos escalan
+# con los núcleos sin ocupar el threadpool que atiende el resto de las requests.
+_executor = ThreadPoolExecutor(
+    max_workers=settings.BCRYPT_MAX_CONCURRENCIA,
+    thread_name_prefix="bcrypt"
+)
+
+def hash_password_sync(password: str) -> str:
+    return pwd_context.hash(password)
+
+def verify_and_update_sync(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifica la contraseña y, si el hash usa un costo distinto al configurado,
+    devuelve también el nuevo hash para guardarlo.
+    """
+    if not hashed_password:
+        # Usuarios de Firebase no tienen contraseña local
+        return False, None
+    try:
+        return pwd_context.verify_and_update(password, hashed_password)
+    except ValueError:
+        logger.warning("Hash de contraseña con formato desconocido")
+        return False, None
+
+async def hash_password_async(password: str) -> str:
+    """Hashea la contraseña en el executor dedicado"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, hash_password_sync, password)
+
+async def verify_password_async(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verifica la contraseña en el executor dedicado. Retorna (válida, nuevo_hash_o_None)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, verify_and_update_sync, password, hashed_password)
+
+def cerrar_executor() -> None:
+    """Libera los hilos del executor al apagar la aplicación"""
+    _executor.shutdown(wait=False)
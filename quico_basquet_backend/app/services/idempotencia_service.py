@@ -0,0 +1,260 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional, Tuple
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import event, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.config.settings import settings
+from app.data.database import SessionLocal
+from app.models.idempotencia import ClaveIdempotencia
+
+logger = logging.getLogger(__name__)
+
+LARGO_MAXIMO_CLAVE = 255
+# Una clave "en_proceso" más vieja que esto se considera abandonada (worker caído a mitad de la operación)
+SEGUNDOS_CLAVE_ABANDONADA = 120
+INTERVALO_PURGA = timedelta(minutes=10)
+
+_ultima_purga = datetime.min
+_purga_lock = threading.Lock()
+
+def hash_peticion(cuerpo: Any) -> str:
+    """Hash estable del cuerpo de la petición (claves ordenadas)"""
+    normalizado = json.dumps(jsonable_encoder(cuerpo), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(normalizado.encode("utf-8")).hexdigest()
+
+def _purgar_vencidas(ahora: datetime) -> None:
+    """Borra las claves vencidas como mucho una vez cada INTERVALO_PURGA por proceso"""
+    global _ultima_purga
+    with _purga_lock:
+        if ahora - _ultima_purga < INTERVALO_PURGA:
+            return
+        _ultima_purga = ahora
+
+    db = SessionLocal()
+    try:
+        borradas = db.query(ClaveIdempotencia).filter(ClaveIdempotencia.expira < ahora).delete(synchronize_session=False)
+        db.commit()
+        if borradas:
+            logger.info(f"🧹 {borradas} claves de idempotencia vencidas eliminadas")
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"No se pudieron purgar las claves de idempotencia: {e}")
+    finally:
+        db.close()
+
+def _intentar_reservar(clave: str, user_id: int, endpoint: str, hash_cuerpo: str) -> Tuple[bool, Optional[ClaveIdempotencia]]:
+    """
+    Un intento de tomar la clave. Retorna (tomada, fila_existente):
+    (True, None) si esta petición debe ejecutar la operación; (False, fila) si ya existe otra.
+    """
+    db = SessionLocal()
+    try:
+        ahora = datetime.utcnow()
+        fila = db.query(ClaveIdempotencia).filter(
+            ClaveIdempotencia.user_id == user_id,
+            ClaveIdempotencia.endpoint == endpoint,
+            ClaveIdempotencia.clave == clave
+        ).first()
+
+        if fila is not None and fila.expira < ahora:
+            db.delete(fila)
+            db.commit()
+            fila = None
+
+        if fila is None:
+            db.add(ClaveIdempotencia(
+                clave=clave,
+                user_id=user_id,
+                endpoint=endpoint,
+                hash_peticion=hash_cuerpo,
+                estado="en_proceso",
+                creada=ahora,
+                expira=ahora + timedelta(hours=settings.IDEMPOTENCIA_TTL_HORAS)
+            ))
+            try:
+                db.commit()
+                return True, None
+            except IntegrityError:
+                # Otra petición con la misma clave la insertó primero
+                db.rollback()
+                return False, None
+
+        if fila.hash_peticion != hash_cuerpo:
+            raise HTTPException(status_code=422, detail="La Idempotency-Key ya se usó con una petición distinta")
+
+        if fila.estado == "en_proceso" and (ahora - fila.creada).total_seconds() > SEGUNDOS_CLAVE_ABANDONADA:
+            # Toma condicional: si dos peticiones la reclaman a la vez, solo una actualiza la fila
+            tomadas = db.query(ClaveIdempotencia).filter(
+                ClaveIdempotencia.id == fila.id,
+                ClaveIdempotencia.estado == "en_proceso",
+                ClaveIdempotencia.creada == fila.creada
+            ).update({"creada": ahora}, synchronize_session=False)
+            db.commit()
+            if tomadas:
+                return True, None
+            return False, None
+
+        db.expunge(fila)
+        return False, fila
+    finally:
+        db.close()
+
+def reservar_clave(clave: str, user_id: int, endpoint: str, hash_cuerpo: str) -> Optional[ClaveIdempotencia]:
+    """
+    Toma la clave para ejecutar la operación (retorna None) o devuelve la respuesta guardada.
+    Si otra petición con la misma clave está en curso, espera a que termine en lugar de competir con ella.
+    """
+    _purgar_vencidas(datetime.utcnow())
+
+    limite = time.monotonic() + settings.IDEMPOTENCIA_ESPERA_SEGUNDOS
+    espera = 0.05
+    while True:
+        tomada, fila = _intentar_reservar(clave, user_id, endpoint, hash_cuerpo)
+        if tomada:
+            return None
+        if fila is not None and fila.estado == "completada":
+            return fila
+
+        if time.monotonic() >= limite:
+            raise HTTPException(status_code=409, detail="Una petición con la misma Idempotency-Key todavía se está procesando")
+        time.sleep(espera)
+        espera = min(espera * 2, 0.5)
+
+def completar_clave(clave: str, user_id: int, endpoint: str, status_code: int, contenido: Any, solo_en_proceso: bool = False) -> None:
+    """
+    Guarda la respuesta final para que los reintentos la reciban sin re-ejecutar la operación.
+    Con solo_en_proceso no pisa una respuesta ya guardada junto al recurso.
+    """
+    db = SessionLocal()
+    try:
+        filtros = [
+            ClaveIdempotencia.user_id == user_id,
+            ClaveIdempotencia.endpoint == endpoint,
+            ClaveIdempotencia.clave == clave
+        ]
+        if solo_en_proceso:
+            filtros.append(ClaveIdempotencia.estado == "en_proceso")
+        db.query(ClaveIdempotencia).filter(*filtros).update({
+            "estado": "completada",
+            "status_code": status_code,
+            "respuesta": json.dumps(contenido),
+        }, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+def liberar_clave(clave: str, user_id: int, endpoint: str) -> None:
+    """Descarta la clave tras un error del servidor para que el reintento vuelva a ejecutar la operación"""
+    db = SessionLocal()
+    try:
+        db.query(ClaveIdempotencia).filter(
+            ClaveIdempotencia.user_id == user_id,
+            ClaveIdempotencia.endpoint == endpoint,
+            ClaveIdempotencia.clave == clave,
+            ClaveIdempotencia.estado == "en_proceso"
+        ).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+def _completar_al_confirmar(db: Session, clave: str, user_id: int, endpoint: str, modelo, response_model) -> Callable[[], None]:
+    """
+    Guarda la respuesta en la misma transacción que crea el recurso: al confirmar la sesión de la
+    operación, la clave pasa a "completada" con el recurso creado (la primera instancia nueva de
+    `modelo`). Si algo falla después del commit, o el worker se cae, el reintento recibe esa
+    respuesta en lugar de volver a ejecutar la operación y duplicar la reserva.
+    Retorna la función que quita los listeners.
+    """
+    creados = []
+
+    def al_hacer_flush(session, contexto) -> None:
+        creados.extend(objeto for objeto in session.new if isinstance(objeto, modelo))
+
+    def antes_de_confirmar(session) -> None:
+        # before_commit corre antes del último flush: lo pendiente todavía está en session.new
+        al_hacer_flush(session, None)
+        if not creados:
+            return
+        # Los cambios pendientes (descuentos, precios) se aplican antes de armar la respuesta
+        session.flush()
+        try:
+            contenido = jsonable_encoder(response_model.model_validate(creados[0]))
+        except Exception as e:
+            logger.warning(f"No se pudo guardar la respuesta idempotente junto al recurso: {e}")
+            return
+        session.execute(
+            update(ClaveIdempotencia.__table__).where(
+                ClaveIdempotencia.user_id == user_id,
+                ClaveIdempotencia.endpoint == endpoint,
+                ClaveIdempotencia.clave == clave
+            ).values(estado="completada", status_code=200, respuesta=json.dumps(contenido))
+        )
+
+    event.listen(db, "after_flush", al_hacer_flush)
+    event.listen(db, "before_commit", antes_de_confirmar)
+
+    def quitar() -> None:
+        event.remove(db, "after_flush", al_hacer_flush)
+        event.remove(db, "before_commit", antes_de_confirmar)
+    return quitar
+
+def ejecutar_idempotente(
+    clave: Optional[str],
+    user_id: int,
+    endpoint: str,
+    cuerpo: Any,
+    operacion: Callable[[], Any],
+    response_model,
+    db: Optional[Session] = None,
+    modelo=None
+):
+    """
+    Ejecuta la operación una sola vez por Idempotency-Key.
+    Sin clave se comporta como siempre. Los errores 4xx también se guardan (la misma
+    petición daría el mismo error); los 5xx liberan la clave para permitir el reintento.
+    Con `db` y `modelo` (la sesión de la operación y la clase ORM que crea) la respuesta se
+    guarda en la misma transacción que el recurso, así una vez confirmado nunca se re-ejecuta.
+    """
+    if not clave:
+        return operacion()
+
+    clave = clave.strip()
+    if not clave or len(clave) > LARGO_MAXIMO_CLAVE:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key inválida (máximo {LARGO_MAXIMO_CLAVE} caracteres)")
+
+    guardada = reservar_clave(clave, user_id, endpoint, hash_peticion(cuerpo))
+    if guardada is not None:
+        return JSONResponse(
+            content=json.loads(guardada.respuesta),
+            status_code=guardada.status_code,
+            headers={"Idempotent-Replayed": "true"}
+        )
+
+    quitar_listeners = _completar_al_confirmar(db, clave, user_id, endpoint, modelo, response_model) if db is not None and modelo is not None else None
+    try:
+        resultado = operacion()
+    except HTTPException as e:
+        if e.status_code < 500:
+            # Un error después de confirmar el recurso no reemplaza la respuesta guardada
+            completar_clave(clave, user_id, endpoint, e.status_code, {"detail": jsonable_encoder(e.detail)}, solo_en_proceso=True)
+        else:
+            liberar_clave(clave, user_id, endpoint)
+        raise
+    except Exception:
+        liberar_clave(clave, user_id, endpoint)
+        raise
+    finally:
+        if quitar_listeners is not None:
+            quitar_listeners()
+
+    contenido = jsonable_encoder(response_model.model_validate(resultado))
+    completar_clave(clave, user_id, endpoint, 200, contenido)
+    return resultado
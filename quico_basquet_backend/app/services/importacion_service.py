@@ -0,0 +1,240 @@
+import csv
+import io
+import logging
+from datetime import date, time
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+from sqlalchemy.orm import Session
+from app.config.settings import DURACION_MINIMA_RESERVA, DURACION_MAXIMA_RESERVA
+from app.models.cancha import Cancha
+from app.models.ocurrencia import OcurrenciaSuscripcion
+from app.models.reserva import Reserva
+from app.schemas.reserva import MetodoPagoEnum
+from app.services.optimized_reserva_service import crear_reservas_bulk
+from app.services.precio_service import calcular_precio_reserva
+from app.services.reserva_service import validar_horario_reserva
+
+logger = logging.getLogger(__name__)
+
+COLUMNAS_REQUERIDAS = ["cancha_id", "fecha", "hora_inicio", "hora_fin", "deporte", "nombre_cliente"]
+COLUMNAS_OPCIONALES = ["metodo_pago", "precio", "estado_pago"]
+ESTADOS_PAGO_IMPORTACION = ["pendiente", "pagado"]
+LIMITE_FILAS_IMPORTACION = 5000
+
+# Cada (cancha, fecha) ocupa su propio tramo de la recta numérica: así todos los
+# intervalos se ordenan y barren juntos sin que se mezclen grupos distintos
+ANCHO_GRUPO = 2 * 24 * 60
+
+def _minutos(hora: time) -> int:
+    return hora.hour * 60 + hora.minute
+
+def _fin_minutos(hora_fin: time) -> int:
+    """Fin en minutos; 00:00 (medianoche) cuenta como 24:00"""
+    return _minutos(hora_fin) or 24 * 60
+
+def _parsear_fila(fila: Dict[str, str], canchas: Dict[int, Cancha]) -> Tuple[Optional[dict], Optional[str]]:
+    """Valida una fila del CSV. Retorna (datos de la reserva, None) o (None, motivo del rechazo)"""
+    faltantes = [c for c in COLUMNAS_REQUERIDAS if not (fila.get(c) or "").strip()]
+    if faltantes:
+        return None, f"Faltan columnas: {', '.join(faltantes)}"
+
+    try:
+        cancha_id = int(fila["cancha_id"])
+        fecha = date.fromisoformat(fila["fecha"].strip())
+        hora_inicio = time.fromisoformat(fila["hora_inicio"].strip())
+        hora_fin = time.fromisoformat(fila["hora_fin"].strip())
+    except ValueError as e:
+        return None, f"Formato inválido: {e}"
+
+    cancha = canchas.get(cancha_id)
+    if cancha is None:
+        return None, f"Cancha {cancha_id} no encontrada"
+
+    if not validar_horario_reserva(hora_inicio, hora_fin):
+        return None, "Horario fuera del horario de atención (8:00 a 24:00, última reserva a las 23:00)"
+
+    duracion = _fin_minutos(hora_fin) - _minutos(hora_inicio)
+    if not (DURACION_MINIMA_RESERVA <= duracion <= DURACION_MAXIMA_RESERVA):
+        return None, f"La duración debe estar entre {DURACION_MINIMA_RESERVA} y {DURACION_MAXIMA_RESERVA} minutos ({duracion})"
+
+    nombre_cliente = fila["nombre_cliente"].strip()
+    if not (2 <= len(nombre_cliente) <= 100):
+        return None, "El nombre del cliente debe tener entre 2 y 100 caracteres"
+
+    metodo_pago = (fila.get("metodo_pago") or MetodoPagoEnum.efectivo.value).strip().lower()
+    if metodo_pago not in {m.value for m in MetodoPagoEnum}:
+        return None, f"Método de pago inválido: {metodo_pago}"
+
+    estado_pago = (fila.get("estado_pago") or "pendiente").strip().lower()
+    if estado_pago not in ESTADOS_PAGO_IMPORTACION:
+        return None, f"Estado de pago inválido: {estado_pago}"
+
+    deporte = fila["deporte"].strip().lower()
+    precio_texto = (fila.get("precio") or "").strip()
+    try:
+        precio = float(precio_texto) if precio_texto else calcular_precio_reserva(cancha, deporte, duracion)
+    except ValueError:
+        return None, f"Precio inválido: {precio_texto}"
+    if precio <= 0:
+        return None, f"Precio inválido para {deporte}: {precio}"
+
+    return {
+        "cancha_id": cancha_id,
+        "deporte": deporte,
+        "fecha": fecha,
+        "hora_inicio": hora_inicio,
+        "hora_fin": hora_fin,
+        "precio": precio,
+        "metodo_pago": metodo_pago,
+        "estado": "confirmada",
+        "estado_pago": estado_pago,
+        "nombre_cliente": nombre_cliente,
+    }, None
+
+def _intervalos_existentes(db: Session, canchas: List[int], fechas: List[date], grupos: Dict[Tuple[int, date], int]) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """
+    Carga en una query por tabla los intervalos ocupados (reservas y ocurrencias de
+    suscripciones) de las canchas y fechas afectadas, ordenados sobre la recta de grupos.
+    """
+    reservas = db.query(Reserva.id, Reserva.cancha_id, Reserva.fecha, Reserva.hora_inicio, Reserva.hora_fin).filter(
+        Reserva.cancha_id.in_(canchas),
+        Reserva.fecha.in_(fechas),
+        Reserva.estado != "cancelada"
+    ).all()
+    ocurrencias = db.query(
+        OcurrenciaSuscripcion.suscripcion_id, OcurrenciaSuscripcion.cancha_id, OcurrenciaSuscripcion.fecha,
+        OcurrenciaSuscripcion.hora_inicio, OcurrenciaSuscripcion.hora_fin
+    ).filter(
+        OcurrenciaSuscripcion.cancha_id.in_(canchas),
+        OcurrenciaSuscripcion.fecha.in_(fechas),
+        OcurrenciaSuscripcion.estado == "activa"
+    ).all()
+
+    inicios, fines, origenes = [], [], []
+    for origen, filas in (("reserva", reservas), ("suscripción", ocurrencias)):
+        for fila in filas:
+            grupo = grupos.get((fila.cancha_id, fila.fecha))
+            if grupo is None:
+                continue  # la query filtra canchas y fechas por separado
+            base = grupo * ANCHO_GRUPO
+            inicios.append(base + _minutos(fila.hora_inicio))
+            fines.append(base + _fin_minutos(fila.hora_fin))
+            origenes.append(f"{origen} #{fila[0]}")
+
+    orden = np.argsort(np.array(inicios, dtype=np.int64), kind="stable")
+    return np.array(inicios, dtype=np.int64)[orden], np.array(fines, dtype=np.int64)[orden], [origenes[i] for i in orden]
+
+def detectar_conflictos(db: Session, filas: List[dict], lineas: List[int]) -> Dict[int, str]:
+    """
+    Sort-and-sweep de los intervalos del archivo contra la base y entre sí.
+    Retorna {índice de fila: motivo} para las filas en conflicto.
+    """
+    if not filas:
+        return {}
+
+    grupos: Dict[Tuple[int, date], int] = {}
+    for fila in filas:
+        grupos.setdefault((fila["cancha_id"], fila["fecha"]), len(grupos))
+
+    base = np.array([grupos[(f["cancha_id"], f["fecha"])] * ANCHO_GRUPO for f in filas], dtype=np.int64)
+    inicios = base + np.array([_minutos(f["hora_inicio"]) for f in filas], dtype=np.int64)
+    fines = base + np.array([_fin_minutos(f["hora_fin"]) for f in filas], dtype=np.int64)
+
+    conflictos: Dict[int, str] = {}
+
+    # 1. Contra la base: el último intervalo existente que empieza antes del fin de la
+    #    fila, con el máximo acumulado de fines, alcanza para saber si hay solapamiento
+    existentes_inicio, existentes_fin, origenes = _intervalos_existentes(
+        db, sorted({f["cancha_id"] for f in filas}), sorted({f["fecha"] for f in filas}), grupos
+    )
+    if len(existentes_inicio):
+        fin_acumulado = np.maximum.accumulate(existentes_fin)
+        indice_fin_maximo = np.maximum.accumulate(
+            np.where(existentes_fin == fin_acumulado, np.arange(len(existentes_fin)), 0)
+        )
+        previo = np.searchsorted(existentes_inicio, fines, side="left") - 1
+        en_conflicto = (previo >= 0) & (fin_acumulado[np.clip(previo, 0, None)] > inicios)
+        for i in np.nonzero(en_conflicto)[0]:
+            conflictos[int(i)] = f"Se solapa con {origenes[indice_fin_maximo[previo[i]]]} existente"
+
+    # 2. Dentro del archivo: ordenadas por inicio (y por línea ante empates), gana la primera
+    orden = np.lexsort((np.array(lineas), inicios))
+    ocupado_hasta = -1
+    ocupante = None
+    for i in orden:
+        i = int(i)
+        if i in conflictos:
+            continue
+        if inicios[i] < ocupado_hasta:
+            conflictos[i] = f"Se solapa con la línea {lineas[ocupante]} del archivo"
+            continue
+        ocupado_hasta = int(fines[i])
+        ocupante = i
+
+    return conflictos
+
+def importar_reservas_csv(db: Session, contenido: Union[str, bytes], user_id: int, simular: bool = False) -> dict:
+    """
+    Importa reservas de administrador desde un CSV con columnas
+    cancha_id, fecha, hora_inicio, hora_fin, deporte, nombre_cliente
+    (y opcionalmente metodo_pago, precio, estado_pago).
+    Las filas válidas se insertan en una sola transacción; retorna un reporte por línea.
+    """
+    if isinstance(contenido, bytes):
+        contenido = contenido.decode("utf-8-sig")
+
+    lector = csv.DictReader(io.StringIO(contenido))
+    faltantes = [c for c in COLUMNAS_REQUERIDAS if c not in (lector.fieldnames or [])]
+    if faltantes:
+        raise ValueError(f"El CSV no tiene las columnas requeridas: {', '.join(faltantes)}")
+
+    filas_csv = list(lector)
+    if len(filas_csv) > LIMITE_FILAS_IMPORTACION:
+        raise ValueError(f"El archivo supera el máximo de {LIMITE_FILAS_IMPORTACION} filas")
+
+    # Una sola query para todas las canchas referenciadas
+    ids_canchas = set()
+    for fila in filas_csv:
+        try:
+            ids_canchas.add(int(fila.get("cancha_id") or 0))
+        except ValueError:
+            pass
+    canchas = {c.id: c for c in db.query(Cancha).filter(Cancha.id.in_(ids_canchas)).all()}
+
+    reporte = []
+    validas, lineas = [], []
+    for numero, fila in enumerate(filas_csv, start=2):  # la línea 1 es el encabezado
+        datos, motivo = _parsear_fila(fila, canchas)
+        if motivo:
+            reporte.append({"linea": numero, "estado": "rechazada", "motivo": motivo})
+        else:
+            validas.append(datos)
+            lineas.append(numero)
+
+    conflictos = detectar_conflictos(db, validas, lineas)
+    a_crear = []
+    for i, datos in enumerate(validas):
+        if i in conflictos:
+            reporte.append({"linea": lineas[i], "estado": "rechazada", "motivo": conflictos[i]})
+        else:
+            a_crear.append((lineas[i], {**datos, "user_id": user_id}))
+
+    if a_crear and not simular:
+        creadas = crear_reservas_bulk(db, [datos for _, datos in a_crear])
+        for (linea, _), reserva in zip(a_crear, creadas):
+            reporte.append({"linea": linea, "estado": "importada", "reserva_id": reserva.id})
+    else:
+        for linea, _ in a_crear:
+            reporte.append({"linea": linea, "estado": "valida" if simular else "importada"})
+
+    reporte.sort(key=lambda r: r["linea"])
+    aceptadas = len(a_crear)
+    logger.info(f"📥 Importación de reservas: {aceptadas} aceptadas, {len(reporte) - aceptadas} rechazadas (simulación={simular})")
+    return {
+        "total_filas": len(filas_csv),
+        "importadas": 0 if simular else aceptadas,
+        "validas": aceptadas,
+        "rechazadas": len(reporte) - aceptadas,
+        "simulacion": simular,
+        "filas": reporte,
+    }
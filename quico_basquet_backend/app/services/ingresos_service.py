@@ -0,0 +1,342 @@
+import logging
+from datetime import date
+from typing import Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.config.settings import settings
+from app.models.ingreso import IngresoMensual
+from app.models.reserva import Reserva
+from app.models.suscripcion import Suscripcion
+from app.utils.tareas import TareaPeriodica
+
+logger = logging.getLogger(__name__)
+
+# Dimensiones por las que se puede agrupar el reporte de ingresos
+DIMENSIONES_INGRESOS = ["mes", "origen", "cancha_id", "deporte", "metodo_pago", "estado_pago"]
+
+# Las reservas y suscripciones canceladas no aportan ingresos (igual que en el resumen del panel)
+ESTADO_SIN_INGRESO = "cancelada"
+
+def cuenta_en_ingresos(estado: Optional[str]) -> bool:
+    return estado != ESTADO_SIN_INGRESO
+
+def primer_dia_mes(fecha: date) -> date:
+    """Normaliza una fecha al primer día de su mes"""
+    return fecha.replace(day=1)
+
+# Valor de la clave del rollup cuando falta el dato (deporte o método de pago sin cargar)
+SIN_DATO = "sin_dato"
+
+def _texto(valor, nulo: str = SIN_DATO) -> str:
+    """Normaliza enums y valores nulos a texto para la clave del rollup"""
+    if valor is None:
+        return nulo
+    return str(getattr(valor, "value", valor))
+
+def _estado_pago(valor) -> str:
+    """Un estado de pago sin cargar es "pendiente", el valor por defecto de las tablas de origen"""
+    return _texto(valor, "pendiente")
+
+def _insert_dialecto(db: Session):
+    """Devuelve la función insert con soporte ON CONFLICT según el motor"""
+    if db.bind.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert
+
+def acumular_ingreso(
+    db: Session,
+    origen: str,
+    fecha: date,
+    cancha_id: int,
+    deporte: str,
+    metodo_pago: str,
+    estado_pago: str,
+    delta_cantidad: int,
+    delta_total: float
+) -> None:
+    """
+    Suma (o resta) una fila al rollup con un único UPSERT.
+    No hace commit: se ejecuta dentro de la transacción de la operación que lo origina.
+    """
+    insert = _insert_dialecto(db)
+    stmt = insert(IngresoMensual).values(
+        mes=primer_dia_mes(fecha),
+        origen=origen,
+        cancha_id=cancha_id,
+        deporte=_texto(deporte),
+        metodo_pago=_texto(metodo_pago),
+        estado_pago=_estado_pago(estado_pago),
+        cantidad=delta_cantidad,
+        total=delta_total or 0.0,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["mes", "origen", "cancha_id", "deporte", "metodo_pago", "estado_pago"],
+        set_={
+            "cantidad": IngresoMensual.cantidad + stmt.excluded.cantidad,
+            "total": IngresoMensual.total + stmt.excluded.total,
+        },
+    )
+    db.execute(stmt)
+
+def registrar_cambios_lote(db: Session, origen: str, cambios: List[dict]) -> None:
+    """
+    Aplica al rollup los cambios de estado de pago o precio de muchas filas a la vez.
+    Cada cambio trae fecha, cancha_id, deporte, metodo_pago, estado, estado_pago, precio,
+    estado_anterior, estado_pago_anterior y precio_anterior. Una fila que pasa a cancelada
+    resta su aporte y una que deja de estarlo lo vuelve a sumar. Los deltas se agregan por
+    clave y se escriben con un único UPSERT multi-fila.
+    """
+    deltas: Dict[tuple, List[float]] = {}
+
+    def sumar(clave: tuple, cantidad: int, total: float) -> None:
+        acumulado = deltas.setdefault(clave, [0, 0.0])
+        acumulado[0] += cantidad
+        acumulado[1] += total or 0.0
+
+    for cambio in cambios:
+        antes, ahora = cuenta_en_ingresos(cambio["estado_anterior"]), cuenta_en_ingresos(cambio["estado"])
+        if antes == ahora and (not ahora or (
+            _estado_pago(cambio["estado_pago_anterior"]) == _estado_pago(cambio["estado_pago"]) and cambio["precio_anterior"] == cambio["precio"]
+        )):
+            continue
+        base = (primer_dia_mes(cambio["fecha"]), origen, cambio["cancha_id"], _texto(cambio["deporte"]), _texto(cambio["metodo_pago"]))
+        if antes:
+            sumar(base + (_estado_pago(cambio["estado_pago_anterior"]),), -1, -(cambio["precio_anterior"] or 0.0))
+        if ahora:
+            sumar(base + (_estado_pago(cambio["estado_pago"]),), 1, cambio["precio"])
+
+    filas = [
+        dict(zip(DIMENSIONES_INGRESOS, clave), cantidad=cantidad, total=total)
+        for clave, (cantidad, total) in deltas.items()
+        if cantidad or total
+    ]
+    if not filas:
+        return
+
+    insert = _insert_dialecto(db)
+    stmt = insert(IngresoMensual).values(filas)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=DIMENSIONES_INGRESOS,
+        set_={
+            "cantidad": IngresoMensual.cantidad + stmt.excluded.cantidad,
+            "total": IngresoMensual.total + stmt.excluded.total,
+        },
+    )
+    db.execute(stmt)
+
+# ---- Reservas ----
+
+def registrar_alta_reserva(db: Session, reserva: Reserva) -> None:
+    """Agrega una reserva nueva al rollup"""
+    acumular_ingreso(
+        db, "reserva", reserva.fecha, reserva.cancha_id, reserva.deporte,
+        reserva.metodo_pago, reserva.estado_pago, 1, reserva.precio
+    )
+
+def registrar_baja_reserva(db: Session, reserva: Reserva) -> None:
+    """Resta el aporte de una reserva que se cancela"""
+    acumular_ingreso(
+        db, "reserva", reserva.fecha, reserva.cancha_id, reserva.deporte,
+        reserva.metodo_pago, reserva.estado_pago, -1, -(reserva.precio or 0.0)
+    )
+
+def registrar_cambio_reserva(
+    db: Session, reserva: Reserva, estado_pago_anterior: str, precio_anterior: float, estado_anterior: Optional[str] = None
+) -> None:
+    """
+    Mueve la contribución de una reserva cuando cambia su estado de pago o su precio.
+    Con estado_anterior también contempla que entre o salga de cancelada.
+    """
+    antes = cuenta_en_ingresos(reserva.estado if estado_anterior is None else estado_anterior)
+    ahora = cuenta_en_ingresos(reserva.estado)
+    if antes == ahora and (not ahora or (
+        _estado_pago(estado_pago_anterior) == _estado_pago(reserva.estado_pago) and precio_anterior == reserva.precio
+    )):
+        return
+
+    if antes:
+        acumular_ingreso(
+            db, "reserva", reserva.fecha, reserva.cancha_id, reserva.deporte,
+            reserva.metodo_pago, estado_pago_anterior, -1, -(precio_anterior or 0.0)
+        )
+    if ahora:
+        registrar_alta_reserva(db, reserva)
+
+def registrar_cambio_estado_reserva(db: Session, reserva: Reserva, estado_anterior: str) -> None:
+    """Resta o vuelve a sumar el aporte cuando la reserva entra o sale de cancelada"""
+    registrar_cambio_reserva(db, reserva, reserva.estado_pago, reserva.precio, estado_anterior)
+
+# ---- Suscripciones ----
+# El precio mensual de una suscripción se imputa al mes de su fecha de inicio.
+
+def registrar_alta_suscripcion(db: Session, suscripcion: Suscripcion) -> None:
+    """Agrega una suscripción nueva al rollup"""
+    acumular_ingreso(
+        db, "suscripcion", suscripcion.fecha_inicio, suscripcion.cancha_id, suscripcion.deporte,
+        suscripcion.metodo_pago, suscripcion.estado_pago, 1, suscripcion.precio_mensual
+    )
+
+def registrar_baja_suscripcion(db: Session, suscripcion: Suscripcion) -> None:
+    """Resta el aporte de una suscripción que se cancela"""
+    acumular_ingreso(
+        db, "suscripcion", suscripcion.fecha_inicio, suscripcion.cancha_id, suscripcion.deporte,
+        suscripcion.metodo_pago, suscripcion.estado_pago, -1, -(suscripcion.precio_mensual or 0.0)
+    )
+
+def registrar_cambio_suscripcion(
+    db: Session, suscripcion: Suscripcion, estado_pago_anterior: str, precio_anterior: float, estado_anterior: Optional[str] = None
+) -> None:
+    """
+    Mueve la contribución de una suscripción cuando cambia su estado de pago o su precio.
+    Con estado_anterior también contempla que entre o salga de cancelada.
+    """
+    antes = cuenta_en_ingresos(suscripcion.estado if estado_anterior is None else estado_anterior)
+    ahora = cuenta_en_ingresos(suscripcion.estado)
+    if antes == ahora and (not ahora or (
+        _estado_pago(estado_pago_anterior) == _estado_pago(suscripcion.estado_pago) and precio_anterior == suscripcion.precio_mensual
+    )):
+        return
+
+    if antes:
+        acumular_ingreso(
+            db, "suscripcion", suscripcion.fecha_inicio, suscripcion.cancha_id, suscripcion.deporte,
+            suscripcion.metodo_pago, estado_pago_anterior, -1, -(precio_anterior or 0.0)
+        )
+    if ahora:
+        registrar_alta_suscripcion(db, suscripcion)
+
+def registrar_cambio_estado_suscripcion(db: Session, suscripcion: Suscripcion, estado_anterior: str) -> None:
+    """Resta o vuelve a sumar el aporte cuando la suscripción entra o sale de cancelada"""
+    registrar_cambio_suscripcion(db, suscripcion, suscripcion.estado_pago, suscripcion.precio_mensual, estado_anterior)
+
+# ---- Reconstrucción y consultas ----
+
+def _ingresos_desde_origen(db: Session) -> Dict[tuple, List[float]]:
+    """
+    Rollup esperado según reservas y suscripciones no canceladas: la base agrupa por día y el
+    mes se arma en Python con primer_dia_mes, igual que en los registros incrementales (sirve
+    en cualquier motor).
+    """
+    esperados: Dict[tuple, List[float]] = {}
+    fuentes = [
+        ("reserva", Reserva, Reserva.fecha, Reserva.precio),
+        ("suscripcion", Suscripcion, Suscripcion.fecha_inicio, Suscripcion.precio_mensual),
+    ]
+    for origen, modelo, fecha, precio in fuentes:
+        claves = (fecha, modelo.cancha_id, modelo.deporte, modelo.metodo_pago, modelo.estado_pago)
+        filas = db.query(*claves, func.count(modelo.id), func.coalesce(func.sum(precio), 0.0)).filter(
+            func.coalesce(modelo.estado, "") != ESTADO_SIN_INGRESO
+        ).group_by(*claves).all()
+        for dia, cancha_id, deporte, metodo_pago, estado_pago, cantidad, total in filas:
+            clave = (primer_dia_mes(dia), origen, cancha_id, _texto(deporte), _texto(metodo_pago), _estado_pago(estado_pago))
+            acumulado = esperados.setdefault(clave, [0, 0.0])
+            acumulado[0] += cantidad
+            acumulado[1] += total or 0.0
+    return esperados
+
+def _escribir_rollup(db: Session, esperados: Dict[tuple, List[float]]) -> None:
+    db.query(IngresoMensual).delete(synchronize_session=False)
+    filas = [dict(zip(DIMENSIONES_INGRESOS, clave), cantidad=cantidad, total=total) for clave, (cantidad, total) in esperados.items()]
+    if filas:
+        db.execute(IngresoMensual.__table__.insert(), filas)
+
+def reconstruir_ingresos(db: Session) -> int:
+    """
+    Recalcula el rollup completo desde reservas y suscripciones.
+    Útil para la carga inicial o para corregir desvíos. Retorna la cantidad de filas generadas.
+    """
+    esperados = _ingresos_desde_origen(db)
+    _escribir_rollup(db, esperados)
+    db.commit()
+
+    logger.info(f"📊 Rollup de ingresos reconstruido: {len(esperados)} filas")
+    return len(esperados)
+
+def reconciliar_ingresos(db: Session) -> int:
+    """
+    Compara el rollup con reservas y suscripciones y lo reescribe si se desvió (un camino que
+    no pasó por registrar_*). Retorna la cantidad de claves con diferencias.
+    """
+    esperados = _ingresos_desde_origen(db)
+    actuales = {
+        tuple(getattr(fila, d) for d in DIMENSIONES_INGRESOS): (fila.cantidad, fila.total)
+        for fila in db.query(IngresoMensual).all()
+    }
+
+    def normalizar(valores) -> dict:
+        return {clave: (int(cantidad), round(total or 0.0, 2)) for clave, (cantidad, total) in valores.items() if cantidad or total}
+
+    esperado, actual = normalizar(esperados), normalizar(actuales)
+    desvios = len({clave for clave in esperado.keys() | actual.keys() if esperado.get(clave) != actual.get(clave)})
+    if not desvios:
+        db.rollback()
+        return 0
+
+    _escribir_rollup(db, esperados)
+    db.commit()
+    logger.warning(f"📊 Rollup de ingresos desviado en {desvios} claves, se reescribió desde las tablas de origen")
+    return desvios
+
+_reconciliacion: Optional[TareaPeriodica] = None
+
+def iniciar_reconciliacion_ingresos(session_factory) -> None:
+    """Reconciliación periódica del rollup (INGRESOS_RECONCILIAR_HORAS, 0 la desactiva)"""
+    global _reconciliacion
+    if settings.INGRESOS_RECONCILIAR_HORAS <= 0 or _reconciliacion is not None:
+        return
+
+    def reconciliar() -> None:
+        db = session_factory()
+        try:
+            reconciliar_ingresos(db)
+        finally:
+            db.close()
+
+    _reconciliacion = TareaPeriodica("reconciliar-ingresos", settings.INGRESOS_RECONCILIAR_HORAS * 3600, reconciliar)
+    _reconciliacion.start()
+
+def detener_reconciliacion_ingresos() -> None:
+    global _reconciliacion
+    if _reconciliacion is not None:
+        tarea, _reconciliacion = _reconciliacion, None
+        tarea.detener()
+
+def obtener_ingresos(
+    db: Session,
+    agrupar_por: List[str],
+    mes_desde: Optional[date] = None,
+    mes_hasta: Optional[date] = None,
+    cancha_id: Optional[int] = None,
+    estado_pago: Optional[str] = None
+) -> List[Dict]:
+    """Lee el rollup pre-agregado con un GROUP BY sobre las dimensiones pedidas"""
+    dimensiones_invalidas = [d for d in agrupar_por if d not in DIMENSIONES_INGRESOS]
+    if dimensiones_invalidas:
+        raise ValueError(f"Dimensiones inválidas: {dimensiones_invalidas}. Dimensiones válidas: {DIMENSIONES_INGRESOS}")
+
+    columnas = [getattr(IngresoMensual, d) for d in agrupar_por]
+    query = db.query(
+        *columnas,
+        func.sum(IngresoMensual.cantidad).label("cantidad"),
+        func.sum(IngresoMensual.total).label("total"),
+    )
+
+    if mes_desde:
+        query = query.filter(IngresoMensual.mes >= primer_dia_mes(mes_desde))
+    if mes_hasta:
+        query = query.filter(IngresoMensual.mes <= primer_dia_mes(mes_hasta))
+    if cancha_id:
+        query = query.filter(IngresoMensual.cancha_id == cancha_id)
+    if estado_pago:
+        query = query.filter(IngresoMensual.estado_pago == estado_pago)
+
+    if columnas:
+        # Las claves que quedaron en cero (todo cancelado o movido a otro estado de pago) no se listan
+        query = query.group_by(*columnas).having(func.sum(IngresoMensual.cantidad) != 0).order_by(*columnas)
+
+    return [
+        {**{d: getattr(fila, d) for d in agrupar_por}, "cantidad": int(fila.cantidad or 0), "total": round(fila.total or 0.0, 2)}
+        for fila in query.all()
+    ]
@@ -1,22 +1,11 @@
 import logging
 from typing import Dict, Any, List
-from app.services.email_service import enviar_notificacion_masiva, email_service
+from app.services.email_service import enviar_notificacion_masiva
+from app.services.whatsapp_service import send_whatsapp_message
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def send_whatsapp_message(telefono: str, mensaje: str) -> bool:
-    """
-    Envía mensaje por WhatsApp (placeholder - por ahora solo log)
-    En el futuro se puede integrar con WhatsApp Business API
-    """
-    try:
-        logger.info(f"WhatsApp enviado a {telefono}: {mensaje}")
-        return True
-    except Exception as e:
-        logger.error(f"Error enviando WhatsApp a {telefono}: {e}")
-        return False
-
 class NotificationService:
     """Servicio para manejo de notificaciones"""
     
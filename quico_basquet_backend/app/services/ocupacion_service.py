@@ -0,0 +1,223 @@
+import logging
+import threading
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from cachetools import TTLCache
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from app.config.settings import settings
+from app.models.cancha import Cancha
+from app.models.reserva import Reserva
+from app.models.suscripcion import Suscripcion
+
+logger = logging.getLogger(__name__)
+
+# Grilla horaria: franjas de una hora desde la apertura (08:00) hasta el cierre (24:00)
+HORA_APERTURA = 8
+HORA_CIERRE = 24
+FRANJAS_POR_DIA = HORA_CIERRE - HORA_APERTURA
+DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+
+# Cache de semanas cerradas: (lunes, cancha_ids) -> bitmap (canchas, 7, franjas). Los cambios de
+# este worker la invalidan al momento; el TTL acota lo que tarda en ver los de otros workers
+_cache_semanas: Dict[Tuple[date, Tuple[int, ...]], np.ndarray] = TTLCache(maxsize=512, ttl=settings.OCUPACION_CACHE_TTL_SEGUNDOS)
+_cache_lock = threading.Lock()
+
+def lunes_de(fecha: date) -> date:
+    """Lunes de la semana a la que pertenece la fecha"""
+    return fecha - timedelta(days=fecha.weekday())
+
+def invalidar_cache_ocupacion(cancha_id: Optional[int] = None, fechas: Optional[Iterable[date]] = None) -> None:
+    """
+    Descarta semanas cacheadas: todas, las de una cancha o solo las semanas de las fechas
+    indicadas (una reserva cambia su semana; una suscripción, todas las de su cancha)
+    """
+    semanas = {lunes_de(fecha) for fecha in fechas} if fechas is not None else None
+    with _cache_lock:
+        for clave in list(_cache_semanas.keys()):
+            lunes, canchas = clave
+            if cancha_id is not None and cancha_id not in canchas:
+                continue
+            if semanas is not None and lunes not in semanas:
+                continue
+            _cache_semanas.pop(clave, None)
+
+def _minutos(horas: np.ndarray, minutos: np.ndarray) -> np.ndarray:
+    return horas.astype(np.int32) * 60 + minutos.astype(np.int32)
+
+def _franjas(inicio_min: np.ndarray, fin_min: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convierte rangos en minutos a índices de franja [inicio, fin).
+    Un fin a las 00:00 se interpreta como medianoche (24:00).
+    """
+    fin_min = np.where(fin_min == 0, 24 * 60, fin_min)
+    apertura = HORA_APERTURA * 60
+    inicio = np.clip((inicio_min - apertura) // 60, 0, FRANJAS_POR_DIA)
+    fin = np.clip(-((apertura - fin_min) // 60), 0, FRANJAS_POR_DIA)  # techo de la división
+    return inicio, fin
+
+def _marcar(diff: np.ndarray, cancha_idx: np.ndarray, dia_idx: np.ndarray, inicio: np.ndarray, fin: np.ndarray) -> None:
+    """Marca intervalos en el arreglo de diferencias (se resuelve con cumsum)"""
+    validos = fin > inicio
+    np.add.at(diff, (cancha_idx[validos], dia_idx[validos], inicio[validos]), 1)
+    np.add.at(diff, (cancha_idx[validos], dia_idx[validos], fin[validos]), -1)
+
+def calcular_bitmaps(db: Session, desde: date, hasta: date, cancha_ids: List[int]) -> np.ndarray:
+    """
+    Expande reservas y suscripciones activas a un bitmap de ocupación por cancha, día y franja horaria.
+    Retorna un arreglo booleano de forma (canchas, días, franjas).
+    """
+    n_dias = (hasta - desde).days + 1
+    n_canchas = len(cancha_ids)
+    diff = np.zeros((n_canchas, n_dias, FRANJAS_POR_DIA + 1), dtype=np.int32)
+    indice_cancha = {cancha_id: i for i, cancha_id in enumerate(cancha_ids)}
+
+    # Reservas: una fila por reserva, sin materializar objetos ORM
+    reservas = db.query(Reserva.cancha_id, Reserva.fecha, Reserva.hora_inicio, Reserva.hora_fin).filter(
+        Reserva.cancha_id.in_(cancha_ids),
+        Reserva.fecha >= desde,
+        Reserva.fecha <= hasta,
+        Reserva.estado != "cancelada"
+    ).all()
+
+    if reservas:
+        filas = np.array(
+            [(indice_cancha[r.cancha_id], (r.fecha - desde).days, r.hora_inicio.hour, r.hora_inicio.minute, r.hora_fin.hour, r.hora_fin.minute) for r in reservas],
+            dtype=np.int32
+        )
+        inicio, fin = _franjas(_minutos(filas[:, 2], filas[:, 3]), _minutos(filas[:, 4], filas[:, 5]))
+        _marcar(diff, filas[:, 0], filas[:, 1], inicio, fin)
+
+    # Suscripciones activas cuyo período se solapa con el rango
+    suscripciones = db.query(
+        Suscripcion.cancha_id, Suscripcion.dia_semana, Suscripcion.hora_inicio, Suscripcion.hora_fin,
+        Suscripcion.fecha_inicio, Suscripcion.fecha_fin
+    ).filter(
+        Suscripcion.cancha_id.in_(cancha_ids),
+        Suscripcion.estado == "activa",
+        Suscripcion.fecha_inicio <= hasta,
+        or_(Suscripcion.fecha_fin.is_(None), Suscripcion.fecha_fin >= desde)
+    ).all()
+
+    if suscripciones:
+        filas = np.array(
+            [
+                (
+                    indice_cancha[s.cancha_id], s.dia_semana,
+                    s.hora_inicio.hour, s.hora_inicio.minute, s.hora_fin.hour, s.hora_fin.minute,
+                    (s.fecha_inicio - desde).days,
+                    (s.fecha_fin - desde).days if s.fecha_fin else n_dias,
+                )
+                for s in suscripciones
+            ],
+            dtype=np.int32
+        )
+        dias = np.arange(n_dias)
+        dia_semana = (dias + desde.weekday()) % 7
+        # Matriz (suscripciones, días): qué días del rango ocupa cada suscripción
+        ocupa = (
+            (dia_semana[None, :] == filas[:, 1:2])
+            & (dias[None, :] >= filas[:, 6:7])
+            & (dias[None, :] <= filas[:, 7:8])
+        )
+        sus_idx, dia_idx = np.nonzero(ocupa)
+        inicio, fin = _franjas(_minutos(filas[:, 2], filas[:, 3]), _minutos(filas[:, 4], filas[:, 5]))
+        _marcar(diff, filas[sus_idx, 0], dia_idx, inicio[sus_idx], fin[sus_idx])
+
+    return np.cumsum(diff, axis=2)[:, :, :FRANJAS_POR_DIA] > 0
+
+def _bitmaps_por_semana(db: Session, primer_lunes: date, ultimo_lunes: date, cancha_ids: List[int]) -> np.ndarray:
+    """
+    Bitmap (canchas, días, franjas) para semanas completas, usando la cache
+    para las semanas ya cerradas y recalculando solo las abiertas.
+    """
+    clave_canchas = tuple(cancha_ids)
+    lunes_actual = lunes_de(date.today())
+    semanas = []
+    lunes = primer_lunes
+    while lunes <= ultimo_lunes:
+        semanas.append(lunes)
+        lunes += timedelta(weeks=1)
+
+    with _cache_lock:
+        cacheadas = {s: _cache_semanas.get((s, clave_canchas)) for s in semanas}
+    faltantes = [s for s in semanas if cacheadas[s] is None]
+
+    if faltantes:
+        # Una sola expansión vectorizada para todo el tramo de semanas faltantes
+        desde, hasta = faltantes[0], faltantes[-1] + timedelta(days=6)
+        bitmap = calcular_bitmaps(db, desde, hasta, cancha_ids)
+        for s in faltantes:
+            offset = (s - desde).days
+            cacheadas[s] = bitmap[:, offset:offset + 7, :].copy()
+            if s < lunes_actual:
+                with _cache_lock:
+                    _cache_semanas[(s, clave_canchas)] = cacheadas[s]
+
+    return np.concatenate([cacheadas[s] for s in semanas], axis=1)
+
+def calcular_ocupacion(db: Session, fecha_desde: date, fecha_hasta: date, cancha_id: Optional[int] = None, top_horas_pico: int = 5) -> dict:
+    """
+    Utilización por día de semana × hora, horas pico y capacidad ociosa.
+    El rango se extiende a semanas completas (lunes a domingo).
+    """
+    if fecha_hasta < fecha_desde:
+        raise ValueError("La fecha final debe ser posterior a la fecha inicial")
+
+    query_canchas = db.query(Cancha.id)
+    if cancha_id:
+        query_canchas = query_canchas.filter(Cancha.id == cancha_id)
+    cancha_ids = sorted(c.id for c in query_canchas.all())
+    if not cancha_ids:
+        raise ValueError("Cancha no encontrada")
+
+    primer_lunes = lunes_de(fecha_desde)
+    ultimo_lunes = lunes_de(fecha_hasta)
+    bitmap = _bitmaps_por_semana(db, primer_lunes, ultimo_lunes, cancha_ids)
+    n_semanas = bitmap.shape[1] // 7
+
+    # (canchas, semanas, 7, franjas) -> ocupadas por día de semana y franja
+    por_semana = bitmap.reshape(len(cancha_ids), n_semanas, 7, FRANJAS_POR_DIA)
+    ocupadas_dia_hora = por_semana.sum(axis=(0, 1))
+    capacidad_dia_hora = len(cancha_ids) * n_semanas
+    utilizacion = np.round(ocupadas_dia_hora / capacidad_dia_hora * 100, 1)
+
+    # Horas pico: las franjas (día, hora) con mayor utilización
+    orden = np.argsort(utilizacion, axis=None)[::-1][:top_horas_pico]
+    horas_pico = [
+        {
+            "dia": DIAS_SEMANA[int(d)],
+            "hora": f"{HORA_APERTURA + int(h):02d}:00",
+            "utilizacion": float(utilizacion[d, h])
+        }
+        for d, h in zip(*np.unravel_index(orden, utilizacion.shape))
+    ]
+
+    ocupadas_por_cancha = bitmap.sum(axis=(1, 2))
+    capacidad_por_cancha = bitmap.shape[1] * FRANJAS_POR_DIA
+    total_ocupadas = int(ocupadas_por_cancha.sum())
+    capacidad_total = capacidad_por_cancha * len(cancha_ids)
+
+    return {
+        "desde": primer_lunes,
+        "hasta": ultimo_lunes + timedelta(days=6),
+        "semanas": n_semanas,
+        "dias": DIAS_SEMANA,
+        "horas": [f"{HORA_APERTURA + h:02d}:00" for h in range(FRANJAS_POR_DIA)],
+        "utilizacion": utilizacion.tolist(),
+        "horas_pico": horas_pico,
+        "por_cancha": [
+            {
+                "cancha_id": cid,
+                "horas_ocupadas": int(ocupadas),
+                "horas_libres": int(capacidad_por_cancha - ocupadas),
+                "utilizacion": round(float(ocupadas) / capacidad_por_cancha * 100, 1)
+            }
+            for cid, ocupadas in zip(cancha_ids, ocupadas_por_cancha)
+        ],
+        "capacidad_ociosa": {
+            "horas_libres": capacidad_total - total_ocupadas,
+            "porcentaje": round((capacidad_total - total_ocupadas) / capacidad_total * 100, 1)
+        }
+    }
@@ -0,0 +1,295 @@
+import logging
+from datetime import date, time, timedelta
+from typing import Iterable, List, Optional
+from sqlalchemy import and_, or_, text
+from sqlalchemy.orm import Session
+from app.config.settings import settings
+from app.data import consultas
+from app.models.ocurrencia import OcurrenciaSuscripcion
+from app.models.suscripcion import Suscripcion
+from app.utils.tareas import TareaPeriodica
+
+logger = logging.getLogger(__name__)
+
+# Suscripciones sin fecha_fin se materializan hasta este horizonte; extender_horizonte_ocurrencias
+# lo corre hacia adelante al arrancar y cada OCURRENCIAS_EXTENSION_HORAS
+HORIZONTE_SIN_FECHA_FIN_DIAS = 365
+MEDIANOCHE = consultas.MEDIANOCHE
+# Las regeneraciones solo tocan desde hoy: las fechas pasadas son historial y no se reescriben
+DESDE_HOY = "GREATEST(s.fecha_inicio, CAST(:hoy AS date))"
+
+# Genera una fila por semana entre la primera fecha desde {desde} que cae en dia_semana y el fin
+# del período. Las fechas omitidas ya existentes se conservan gracias al ON CONFLICT.
+SQL_GENERAR_OCURRENCIAS = """
+INSERT INTO ocurrencias_suscripcion (suscripcion_id, cancha_id, fecha, hora_inicio, hora_fin, estado)
+SELECT s.id, s.cancha_id, CAST(dia AS date), s.hora_inicio, s.hora_fin, 'activa'
+FROM suscripciones s
+CROSS JOIN LATERAL (SELECT {desde} AS desde) d
+CROSS JOIN LATERAL generate_series(
+    d.desde + ((s.dia_semana - (EXTRACT(ISODOW FROM d.desde)::int - 1) + 7) % 7),
+    COALESCE(s.fecha_fin, GREATEST(s.fecha_inicio, CURRENT_DATE) + :horizonte),
+    interval '7 days'
+) AS dia
+WHERE s.estado = 'activa' {filtro}
+ON CONFLICT (suscripcion_id, fecha) DO NOTHING
+"""
+
+def primera_fecha(fecha_inicio: date, dia_semana: int) -> date:
+    """Primera fecha >= fecha_inicio que cae en el día de semana indicado"""
+    return fecha_inicio + timedelta(days=(dia_semana - fecha_inicio.weekday()) % 7)
+
+def fechas_suscripcion(suscripcion: Suscripcion, desde: Optional[date] = None) -> List[date]:
+    """Fechas del período de la suscripción (a partir de desde, si se indica) que caen en su día de semana"""
+    fin = suscripcion.fecha_fin or max(suscripcion.fecha_inicio, date.today()) + timedelta(days=HORIZONTE_SIN_FECHA_FIN_DIAS)
+    inicio = max(suscripcion.fecha_inicio, desde) if desde else suscripcion.fecha_inicio
+    fecha = primera_fecha(inicio, suscripcion.dia_semana)
+    fechas = []
+    while fecha <= fin:
+        fechas.append(fecha)
+        fecha += timedelta(weeks=1)
+    return fechas
+
+def _sql_generar(filtro: str = "", desde: str = "s.fecha_inicio"):
+    return text(SQL_GENERAR_OCURRENCIAS.format(filtro=filtro, desde=desde))
+
+def _generar_python(db: Session, suscripciones: Iterable[Suscripcion], desde: Optional[date] = None) -> int:
+    """Alternativa para motores sin generate_series (sqlite en desarrollo). Retorna las filas insertadas"""
+    insertadas = 0
+    for suscripcion in suscripciones:
+        existentes = {
+            f for (f,) in db.query(OcurrenciaSuscripcion.fecha).filter(
+                OcurrenciaSuscripcion.suscripcion_id == suscripcion.id
+            ).all()
+        }
+        filas = [
+            {
+                "suscripcion_id": suscripcion.id,
+                "cancha_id": suscripcion.cancha_id,
+                "fecha": fecha,
+                "hora_inicio": suscripcion.hora_inicio,
+                "hora_fin": suscripcion.hora_fin,
+                "estado": "activa",
+            }
+            for fecha in fechas_suscripcion(suscripcion, desde) if fecha not in existentes
+        ]
+        if filas:
+            db.execute(OcurrenciaSuscripcion.__table__.insert(), filas)
+            insertadas += len(filas)
+    return insertadas
+
+def _eliminar_futuras(db: Session, hoy: date, *filtros) -> None:
+    """Borra las ocurrencias activas desde hoy; las pasadas quedan como historial de sesiones jugadas"""
+    db.query(OcurrenciaSuscripcion).filter(
+        *filtros,
+        OcurrenciaSuscripcion.estado == "activa",
+        OcurrenciaSuscripcion.fecha >= hoy
+    ).delete(synchronize_session=False)
+
+def sincronizar_ocurrencias(db: Session, suscripcion: Suscripcion, historial: bool = False) -> None:
+    """
+    Regenera las ocurrencias de una suscripción tras crearla, renovarla, cancelarla o editarla.
+    Solo se reemplazan las fechas desde hoy; si no está activa solo se eliminan. Con historial=True
+    (al crearla) se generan también las fechas ya pasadas del período.
+    No hace commit: corre dentro de la transacción de la operación.
+    """
+    if suscripcion.id is None:
+        db.flush()
+
+    hoy = date.today()
+    _eliminar_futuras(db, hoy, OcurrenciaSuscripcion.suscripcion_id == suscripcion.id)
+
+    if suscripcion.estado != "activa":
+        return
+
+    db.flush()
+    if db.bind.dialect.name == "postgresql":
+        db.execute(
+            _sql_generar("AND s.id = :suscripcion_id", desde="s.fecha_inicio" if historial else DESDE_HOY),
+            {"horizonte": HORIZONTE_SIN_FECHA_FIN_DIAS, "suscripcion_id": suscripcion.id, "hoy": hoy}
+        )
+    else:
+        _generar_python(db, [suscripcion], None if historial else hoy)
+
+def sincronizar_ocurrencias_lote(db: Session, suscripcion_ids: List[int]) -> None:
+    """Como sincronizar_ocurrencias pero para muchas suscripciones con una sola sentencia por paso"""
+    if not suscripcion_ids:
+        return
+
+    hoy = date.today()
+    _eliminar_futuras(db, hoy, OcurrenciaSuscripcion.suscripcion_id.in_(suscripcion_ids))
+
+    if db.bind.dialect.name == "postgresql":
+        db.execute(
+            _sql_generar("AND s.id = ANY(:suscripcion_ids)", desde=DESDE_HOY),
+            {"horizonte": HORIZONTE_SIN_FECHA_FIN_DIAS, "suscripcion_ids": list(suscripcion_ids), "hoy": hoy}
+        )
+    else:
+        _generar_python(db, db.query(Suscripcion).filter(
+            Suscripcion.id.in_(suscripcion_ids),
+            Suscripcion.estado == "activa"
+        ).all(), hoy)
+
+def regenerar_ocurrencias(db: Session, historial: bool = False) -> int:
+    """
+    Recalcula las ocurrencias de todas las suscripciones activas en una sola sentencia.
+    Solo reemplaza las fechas desde hoy; historial=True genera también las pasadas (carga inicial).
+    """
+    hoy = date.today()
+    _eliminar_futuras(db, hoy)
+
+    if db.bind.dialect.name == "postgresql":
+        db.execute(
+            _sql_generar(desde="s.fecha_inicio" if historial else DESDE_HOY),
+            {"horizonte": HORIZONTE_SIN_FECHA_FIN_DIAS, "hoy": hoy}
+        )
+    else:
+        _generar_python(db, db.query(Suscripcion).filter(Suscripcion.estado == "activa").all(), None if historial else hoy)
+    db.commit()
+    from app.services.disponibilidad_service import horarios_cacheados
+    horarios_cacheados.invalidar()
+
+    total = db.query(OcurrenciaSuscripcion).filter(OcurrenciaSuscripcion.estado == "activa").count()
+    logger.info(f"📅 Ocurrencias de suscripciones regeneradas: {total}")
+    return total
+
+def extender_horizonte_ocurrencias(db: Session) -> int:
+    """
+    Completa las ocurrencias de las suscripciones activas sin fecha_fin hasta hoy + el horizonte.
+    Sin esto, un año después de creada la suscripción dejaría de bloquear sus horarios.
+    Solo agrega las fechas que faltan desde hoy. Retorna la cantidad de ocurrencias nuevas.
+    """
+    hoy = date.today()
+    if db.bind.dialect.name == "postgresql":
+        resultado = db.execute(
+            _sql_generar("AND s.fecha_fin IS NULL", desde=DESDE_HOY),
+            {"horizonte": HORIZONTE_SIN_FECHA_FIN_DIAS, "hoy": hoy}
+        )
+        nuevas = max(resultado.rowcount or 0, 0)
+    else:
+        nuevas = _generar_python(db, db.query(Suscripcion).filter(
+            Suscripcion.estado == "activa",
+            Suscripcion.fecha_fin.is_(None)
+        ).all(), hoy)
+    db.commit()
+
+    if nuevas:
+        from app.services.disponibilidad_service import horarios_cacheados
+        horarios_cacheados.invalidar()
+        logger.info(f"📅 Horizonte de suscripciones sin fecha de fin extendido: {nuevas} ocurrencias nuevas")
+    return nuevas
+
+def inicializar_ocurrencias(session_factory) -> None:
+    """Materializa las ocurrencias al arrancar si la tabla todavía está vacía; si no, extiende el horizonte"""
+    db = session_factory()
+    try:
+        if db.query(OcurrenciaSuscripcion.id).first() is None:
+            if db.query(Suscripcion.id).filter(Suscripcion.estado == "activa").first() is not None:
+                regenerar_ocurrencias(db, historial=True)
+        else:
+            extender_horizonte_ocurrencias(db)
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"No se pudieron materializar las ocurrencias de suscripciones: {e}")
+    finally:
+        db.close()
+
+_extension: Optional[TareaPeriodica] = None
+
+def iniciar_extension_ocurrencias(session_factory) -> None:
+    """Extiende el horizonte cada OCURRENCIAS_EXTENSION_HORAS (0 lo deja solo para el arranque)"""
+    global _extension
+    if settings.OCURRENCIAS_EXTENSION_HORAS <= 0 or _extension is not None:
+        return
+
+    def extender() -> None:
+        db = session_factory()
+        try:
+            extender_horizonte_ocurrencias(db)
+        finally:
+            db.close()
+
+    _extension = TareaPeriodica("extender-ocurrencias", settings.OCURRENCIAS_EXTENSION_HORAS * 3600, extender)
+    _extension.start()
+
+def detener_extension_ocurrencias() -> None:
+    global _extension
+    if _extension is not None:
+        tarea, _extension = _extension, None
+        tarea.detener()
+
+def filtro_solapamiento(col_inicio, col_fin, hora_inicio: time, hora_fin: time):
+    """
+    Condición SQL de solapamiento entre [col_inicio, col_fin) y [hora_inicio, hora_fin).
+    Un fin a las 00:00 se interpreta como medianoche (fin del día).
+    """
+    termina_despues = or_(col_fin > hora_inicio, col_fin == MEDIANOCHE)
+    if hora_fin == MEDIANOCHE:
+        return termina_despues
+    return and_(col_inicio < hora_fin, termina_despues)
+
+def obtener_suscripciones_por_fecha(db: Session, fecha: date, cancha_id: Optional[int] = None) -> List[Suscripcion]:
+    """Suscripciones que ocupan la fecha (búsqueda por igualdad sobre el índice cancha/fecha)"""
+    parametros = {"fecha": fecha}
+    if cancha_id is not None:
+        parametros["cancha_id"] = cancha_id
+    return db.execute(consultas.suscripciones_por_fecha(cancha_id is not None), parametros).scalars().all()
+
+def hay_ocurrencia_en_conflicto(
+    db: Session,
+    cancha_id: int,
+    fechas: List[date],
+    hora_inicio: time,
+    hora_fin: time,
+    excluir_suscripcion_id: Optional[int] = None
+) -> bool:
+    """Indica si alguna ocurrencia activa de la cancha en esas fechas se solapa con el horario"""
+    if not fechas:
+        return False
+
+    termina_a_medianoche = hora_fin == MEDIANOCHE
+    parametros = {"cancha_id": cancha_id, "fechas": list(fechas), "hora_inicio": hora_inicio}
+    if not termina_a_medianoche:
+        parametros["hora_fin"] = hora_fin
+    if excluir_suscripcion_id:
+        parametros["excluir_suscripcion_id"] = excluir_suscripcion_id
+
+    stmt = consultas.ocurrencias_en_conflicto(termina_a_medianoche, bool(excluir_suscripcion_id))
+    return db.execute(stmt, parametros).first() is not None
+
+def _cambiar_estado_ocurrencia(db: Session, suscripcion_id: int, fecha: date, estado_actual: str, nuevo_estado: str) -> OcurrenciaSuscripcion:
+    ocurrencia = db.query(OcurrenciaSuscripcion).filter(
+        OcurrenciaSuscripcion.suscripcion_id == suscripcion_id,
+        OcurrenciaSuscripcion.fecha == fecha
+    ).first()
+    if not ocurrencia:
+        raise ValueError("La suscripción no tiene una ocurrencia en esa fecha")
+    if ocurrencia.estado != estado_actual:
+        raise ValueError(f"La ocurrencia del {fecha} no está {estado_actual}")
+
+    ocurrencia.estado = nuevo_estado
+    db.commit()
+
+    from app.services.disponibilidad_service import publicar_evento
+    publicar_evento(
+        "liberado" if nuevo_estado == "omitida" else "ocupado", "suscripcion", suscripcion_id,
+        ocurrencia.cancha_id, [fecha], ocurrencia.hora_inicio, ocurrencia.hora_fin
+    )
+    return ocurrencia
+
+def omitir_ocurrencia(db: Session, suscripcion_id: int, fecha: date) -> OcurrenciaSuscripcion:
+    """Marca una fecha puntual de la suscripción como omitida y libera el horario"""
+    return _cambiar_estado_ocurrencia(db, suscripcion_id, fecha, "activa", "omitida")
+
+def restaurar_ocurrencia(db: Session, suscripcion_id: int, fecha: date) -> OcurrenciaSuscripcion:
+    """Vuelve a activar una fecha omitida si el horario sigue libre"""
+    from app.services.reserva_service import hay_solapamiento_solo_reservas
+
+    ocurrencia = db.query(OcurrenciaSuscripcion).filter(
+        OcurrenciaSuscripcion.suscripcion_id == suscripcion_id,
+        OcurrenciaSuscripcion.fecha == fecha
+    ).first()
+    if ocurrencia and ocurrencia.estado == "omitida":
+        if hay_solapamiento_solo_reservas(db, ocurrencia.cancha_id, fecha, ocurrencia.hora_inicio, ocurrencia.hora_fin) or \
+           hay_ocurrencia_en_conflicto(db, ocurrencia.cancha_id, [fecha], ocurrencia.hora_inicio, ocurrencia.hora_fin, suscripcion_id):
+            raise ValueError("El horario ya fue ocupado por otra reserva o suscripción")
+    return _cambiar_estado_ocurrencia(db, suscripcion_id, fecha, "omitida", "activa")
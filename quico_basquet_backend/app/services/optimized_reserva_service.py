@@ -3,7 +3,11 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 from typing import List
 from app.models.reserva import Reserva
-from app.models.suscripcion import Suscripcion
+from app.models.ocurrencia import OcurrenciaSuscripcion
+from app.services.ingresos_service import registrar_alta_reserva
+from app.services.disponibilidad_service import publicar_reserva
+from app.services.resumen_service import invalidar_resumen
+from app.services.ocurrencias_service import hay_ocurrencia_en_conflicto, primera_fecha, HORIZONTE_SIN_FECHA_FIN_DIAS
 
 def verificar_solapamiento_suscripcion_optimizado(
     db: Session, 
@@ -20,14 +24,15 @@ def verificar_solapamiento_suscripcion_optimizado(
     en lugar de hacer múltiples queries secuenciales
     """
     
-    # 1. Generar todas las fechas que coincidan con el día de la semana
+    # 1. Generar todas las fechas que coincidan con el día de la semana (saltando de a una semana)
+    if fecha_fin is None:
+        fecha_fin = max(fecha_inicio, date.today()) + timedelta(days=HORIZONTE_SIN_FECHA_FIN_DIAS)
     fechas_objetivo = []
-    fecha_actual = fecha_inicio
+    fecha_actual = primera_fecha(fecha_inicio, dia_semana)
     
     while fecha_actual <= fecha_fin:
-        if fecha_actual.weekday() == dia_semana:
-            fechas_objetivo.append(fecha_actual)
-        fecha_actual += timedelta(days=1)
+        fechas_objetivo.append(fecha_actual)
+        fecha_actual += timedelta(weeks=1)
     
     if not fechas_objetivo:
         print("   ✅ No hay fechas que verificar")
@@ -57,36 +62,12 @@ def verificar_solapamiento_suscripcion_optimizado(
         )
     ).first()
     
-    # 3. UNA SOLA QUERY para suscripciones en conflicto
-    suscripciones_conflicto = db.query(Suscripcion).filter(
-        and_(
-            Suscripcion.cancha_id == cancha_id,
-            Suscripcion.dia_semana == dia_semana,
-            Suscripcion.estado == "activa",
-            # Verificar solapamiento de horarios
-            or_(
-                # Caso 1: Horarios idénticos
-                and_(
-                    Suscripcion.hora_inicio == hora_inicio,
-                    Suscripcion.hora_fin == hora_fin
-                ),
-                # Caso 2: Solapamiento parcial
-                and_(
-                    Suscripcion.hora_inicio < hora_fin,
-                    Suscripcion.hora_fin > hora_inicio
-                )
-            )
-        )
+    # 3. UNA SOLA QUERY sobre las ocurrencias materializadas de suscripciones en esas fechas
+    suscripcion_conflicto = hay_ocurrencia_en_conflicto(
+        db, cancha_id, fechas_objetivo, hora_inicio, hora_fin, excluir_suscripcion_id
     )
     
-    if excluir_suscripcion_id:
-        suscripciones_conflicto = suscripciones_conflicto.filter(
-            Suscripcion.id != excluir_suscripcion_id
-        )
-    
-    suscripcion_conflicto = suscripciones_conflicto.first()
-    
-    hay_conflicto = reservas_conflicto is not None or suscripcion_conflicto is not None
+    hay_conflicto = reservas_conflicto is not None or suscripcion_conflicto
     
     print(f"   - Reservas en conflicto: {'Sí' if reservas_conflicto else 'No'}")
     print(f"   - Suscripciones en conflicto: {'Sí' if suscripcion_conflicto else 'No'}")
@@ -124,14 +105,12 @@ def verificar_solapamiento_bulk_insert(
         )
     ).all()
     
-    # UNA SOLA QUERY para todas las suscripciones
-    dias_semana = list(set([r['fecha'].weekday() for r in reservas_a_crear]))
-    
-    suscripciones_existentes = db.query(Suscripcion).filter(
+    # UNA SOLA QUERY para las ocurrencias de suscripciones en esas fechas
+    ocurrencias_existentes = db.query(OcurrenciaSuscripcion).filter(
         and_(
-            Suscripcion.cancha_id.in_(canchas),
-            Suscripcion.dia_semana.in_(dias_semana),
-            Suscripcion.estado == "activa"
+            OcurrenciaSuscripcion.fecha.in_(fechas),
+            OcurrenciaSuscripcion.cancha_id.in_(canchas),
+            OcurrenciaSuscripcion.estado == "activa"
         )
     ).all()
     
@@ -141,7 +120,6 @@ def verificar_solapamiento_bulk_insert(
         cancha_id = nueva_reserva['cancha_id']
         hora_inicio = nueva_reserva['hora_inicio']
         hora_fin = nueva_reserva['hora_fin']
-        dia_semana = fecha.weekday()
         
         # Verificar contra reservas existentes
         for reserva_existente in reservas_existentes:
@@ -153,13 +131,13 @@ def verificar_solapamiento_bulk_insert(
                 print(f"   ❌ Conflicto con reserva existente en {fecha}")
                 return True
         
-        # Verificar contra suscripciones existentes
-        for suscripcion in suscripciones_existentes:
-            if (suscripcion.cancha_id == cancha_id and 
-                suscripcion.dia_semana == dia_semana and
+        # Verificar contra ocurrencias de suscripciones
+        for ocurrencia in ocurrencias_existentes:
+            if (ocurrencia.fecha == fecha and 
+                ocurrencia.cancha_id == cancha_id and
                 hay_solapamiento_horario(hora_inicio, hora_fin, 
-                                       suscripcion.hora_inicio, 
-                                       suscripcion.hora_fin)):
+                                       ocurrencia.hora_inicio, 
+                                       ocurrencia.hora_fin)):
                 print(f"   ❌ Conflicto con suscripción en {fecha}")
                 return True
     
@@ -188,11 +166,13 @@ def crear_reservas_bulk(db: Session, reservas_data: List[dict]) -> List:
     try:
         # UNA SOLA TRANSACCIÓN para todas las reservas
         db.add_all(reservas_objetos)
-        db.commit()
+        for reserva in reservas_objetos:
+            registrar_alta_reserva(db, reserva)
+        db.commit()  # los ids vuelven con RETURNING en el mismo INSERT; no hace falta refresh
+        invalidar_resumen()
         
-        # Refresh all objects
         for reserva in reservas_objetos:
-            db.refresh(reserva)
+            publicar_reserva(reserva, "ocupado")
         
         print(f"✅ {len(reservas_objetos)} reservas creadas exitosamente")
         return reservas_objetos
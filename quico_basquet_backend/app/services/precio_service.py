@@ -1,8 +1,29 @@
-import json
+from types import SimpleNamespace
 from typing import Dict, Optional
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from app.config.settings import settings
+from app.data.cache_caliente import CacheCaliente
 from app.models.cancha import Cancha
 
+CAMPOS_LIBRO_PRECIOS = ("precio_basquet", "precio_voley", "descuento_basquet", "descuento_voley", "descuento_suscripcion")
+
+# Libro de precios de todas las canchas (una sola entrada, se invalida al editar una cancha)
+libro_precios = CacheCaliente("precios_canchas", ("canchas",), maxsize=1, ttl=settings.CACHE_PRECIOS_TTL_SEGUNDOS)
+
+def _cargar_libro_precios(db: Session) -> Dict[int, dict]:
+    filas = db.execute(select(Cancha.id, *(getattr(Cancha, campo) for campo in CAMPOS_LIBRO_PRECIOS))).mappings()
+    return {fila["id"]: {campo: fila[campo] for campo in CAMPOS_LIBRO_PRECIOS} for fila in filas}
+
+def precios_cancha(db: Session, cancha_id: int) -> Optional[SimpleNamespace]:
+    """Precios y descuentos de la cancha desde el libro en memoria (None si no existe)"""
+    libro = libro_precios.obtener_o_cargar(db, "todas", lambda: _cargar_libro_precios(db))
+    precios = libro.get(cancha_id)
+    return SimpleNamespace(**precios) if precios is not None else None
+
+def invalidar_libro_precios() -> None:
+    libro_precios.invalidar()
+
 def obtener_precio_por_deporte(cancha, deporte: str) -> float:
     """
     Obtiene el precio por hora para un deporte específico en una cancha.
@@ -83,7 +104,7 @@ def calcular_precio_suscripcion_mensual(db: Session, cancha_id: int, deporte: st
     Returns:
         Precio mensual calculado con descuentos aplicados
     """
-    cancha = db.query(Cancha).filter(Cancha.id == cancha_id).first()
+    cancha = precios_cancha(db, cancha_id)
     if not cancha:
         return 0
     
@@ -108,7 +129,7 @@ def calcular_precio_suscripcion_por_sesion(db: Session, cancha_id: int, deporte:
     Returns:
         Precio por sesión con descuento de suscripción aplicado
     """
-    cancha = db.query(Cancha).filter(Cancha.id == cancha_id).first()
+    cancha = precios_cancha(db, cancha_id)
     if not cancha:
         return 0
     
@@ -125,14 +146,8 @@ def obtener_precios_y_descuentos_cancha(db: Session, cancha_id: int) -> Dict:
     Returns:
         Diccionario con precios y descuentos
     """
-    cancha = db.query(Cancha).filter(Cancha.id == cancha_id).first()
+    cancha = precios_cancha(db, cancha_id)
     if not cancha:
         return {}
     
-    return {
-        "precio_basquet": cancha.precio_basquet,
-        "precio_voley": cancha.precio_voley,
-        "descuento_basquet": cancha.descuento_basquet,
-        "descuento_voley": cancha.descuento_voley,
-        "descuento_suscripcion": cancha.descuento_suscripcion
-    } 
\ No newline at end of file
+    return vars(cancha).copy() 
\ No newline at end of file
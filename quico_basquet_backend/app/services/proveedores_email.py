@@ -0,0 +1,224 @@
+"""
+Capa de proveedores de email compartida por todo el proceso.
+
+SendGrid se usa con un httpx.Client persistente (pool keep-alive) en lugar de crear un
+SendGridAPIClient por mensaje, y SMTP reutiliza una sola sesión autenticada. Cada proveedor
+tiene su circuito: tras varios fallos seguidos deja de intentarse durante un rato y los
+envíos van directo al proveedor sano en lugar de pagar un timeout por mensaje.
+
+Las URLs y el host SMTP salen de settings, así que se pueden apuntar a un stub local.
+"""
+import logging
+import smtplib
+import threading
+import time
+from email.header import Header
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import List, Optional, Union
+import httpx
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class DestinatarioRechazado(Exception):
+    """El proveedor respondió pero rechazó el mensaje (no cuenta como falla del proveedor)"""
+
+class CircuitoProveedor:
+    """
+    Circuit breaker por proveedor: cerrado (envía), abierto (falla rápido) y
+    semiabierto (deja pasar un solo intento de prueba al vencer la espera).
+    """
+
+    def __init__(self, nombre: str, umbral_fallos: int, segundos_abierto: float):
+        self.nombre = nombre
+        self.umbral_fallos = umbral_fallos
+        self.segundos_abierto = segundos_abierto
+        self._lock = threading.Lock()
+        self._fallos = 0
+        self._abierto_hasta = 0.0
+        self._prueba_en_curso = False
+
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            if self._fallos < self.umbral_fallos:
+                return "cerrado"
+            return "abierto" if time.monotonic() < self._abierto_hasta else "semiabierto"
+
+    def permitir(self) -> bool:
+        """Indica si se puede intentar un envío con este proveedor"""
+        with self._lock:
+            if self._fallos < self.umbral_fallos:
+                return True
+            if time.monotonic() < self._abierto_hasta or self._prueba_en_curso:
+                return False
+            self._prueba_en_curso = True
+            return True
+
+    def registrar_exito(self) -> None:
+        with self._lock:
+            if self._fallos >= self.umbral_fallos:
+                logger.info(f"🟢 Circuito de {self.nombre} cerrado nuevamente")
+            self._fallos = 0
+            self._prueba_en_curso = False
+
+    def registrar_fallo(self) -> None:
+        with self._lock:
+            self._fallos += 1
+            self._prueba_en_curso = False
+            if self._fallos >= self.umbral_fallos:
+                self._abierto_hasta = time.monotonic() + self.segundos_abierto
+                logger.warning(f"🔴 Circuito de {self.nombre} abierto por {self.segundos_abierto:.0f}s ({self._fallos} fallos seguidos)")
+
+    def resumen(self) -> dict:
+        return {"estado": self.estado, "fallos_seguidos": self._fallos}
+
+class ProveedorSendGrid:
+    """SendGrid v3 vía HTTP con un cliente httpx compartido (conexiones keep-alive)"""
+
+    nombre = "sendgrid"
+
+    def __init__(self):
+        self.circuito = CircuitoProveedor(self.nombre, settings.EMAIL_CIRCUITO_UMBRAL_FALLOS, settings.EMAIL_CIRCUITO_SEGUNDOS_ABIERTO)
+        self._cliente: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+
+    @property
+    def configurado(self) -> bool:
+        return bool(settings.SENDGRID_API_KEY)
+
+    def _obtener_cliente(self) -> httpx.Client:
+        with self._lock:
+            if self._cliente is None:
+                self._cliente = httpx.Client(
+                    base_url=settings.SENDGRID_API_URL,
+                    headers={"Authorization": f"Bearer {settings.SENDGRID_API_KEY}"},
+                    timeout=settings.EMAIL_TIMEOUT_SEGUNDOS,
+                    limits=httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=60),
+                )
+            return self._cliente
+
+    def enviar(self, to_email: Union[str, List[str]], subject: str, texto: str, html: str) -> bool:
+        """Con una lista de destinatarios envía un solo request con una personalization por cada uno"""
+        destinatarios = [to_email] if isinstance(to_email, str) else to_email
+        contenido = [{"type": "text/plain", "value": texto}, {"type": "text/html", "value": html}]
+        respuesta = self._obtener_cliente().post("/v3/mail/send", json={
+            "personalizations": [{"to": [{"email": d}]} for d in destinatarios],
+            "from": {"email": settings.FROM_EMAIL, "name": settings.FROM_NAME},
+            "subject": subject,
+            "content": contenido,
+        })
+        if respuesta.status_code in (200, 202):
+            return True
+        if 400 <= respuesta.status_code < 500 and respuesta.status_code not in (401, 403, 429):
+            raise DestinatarioRechazado(f"SendGrid rechazó el mensaje ({respuesta.status_code}): {respuesta.text[:200]}")
+        logger.error(f"SendGrid falló con código: {respuesta.status_code}")
+        return False
+
+    def cerrar(self) -> None:
+        with self._lock:
+            if self._cliente is not None:
+                self._cliente.close()
+                self._cliente = None
+
+class ProveedorSMTP:
+    """SMTP con una sesión autenticada reutilizada entre envíos (se reconecta si el servidor la cortó)"""
+
+    nombre = "smtp"
+
+    def __init__(self):
+        self.circuito = CircuitoProveedor(self.nombre, settings.EMAIL_CIRCUITO_UMBRAL_FALLOS, settings.EMAIL_CIRCUITO_SEGUNDOS_ABIERTO)
+        self._sesion: Optional[smtplib.SMTP] = None
+        self._lock = threading.Lock()
+
+    @property
+    def configurado(self) -> bool:
+        return bool(settings.GMAIL_APP_PASSWORD)
+
+    def _conectar(self) -> smtplib.SMTP:
+        sesion = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=settings.EMAIL_TIMEOUT_SEGUNDOS)
+        if settings.SMTP_STARTTLS:
+            sesion.starttls()
+        sesion.login(settings.GMAIL_USER, settings.GMAIL_APP_PASSWORD)
+        return sesion
+
+    def _descartar_sesion(self) -> None:
+        if self._sesion is not None:
+            try:
+                self._sesion.close()
+            except Exception:
+                pass
+            self._sesion = None
+
+    def enviar(self, to_email: str, subject: str, texto: str, html: str) -> bool:
+        msg = MIMEMultipart('alternative')
+        msg['From'] = settings.GMAIL_USER
+        msg['To'] = to_email
+        msg['Subject'] = Header(subject, 'utf-8')
+        msg.attach(MIMEText(texto, 'plain', 'utf-8'))
+        msg.attach(MIMEText(html, 'html', 'utf-8'))
+        contenido = msg.as_string()
+
+        # Una sesión por proceso: los envíos se serializan sobre ella
+        with self._lock:
+            for intento in range(2):
+                if self._sesion is None:
+                    self._sesion = self._conectar()
+                try:
+                    self._sesion.sendmail(settings.GMAIL_USER, to_email, contenido)
+                    return True
+                except smtplib.SMTPRecipientsRefused as e:
+                    raise DestinatarioRechazado(f"SMTP rechazó el destinatario: {e}")
+                except smtplib.SMTPServerDisconnected:
+                    # Gmail corta las sesiones inactivas: se reconecta una vez
+                    self._descartar_sesion()
+                    if intento:
+                        raise
+                except Exception:
+                    self._descartar_sesion()
+                    raise
+        return False
+
+    def cerrar(self) -> None:
+        with self._lock:
+            if self._sesion is not None:
+                try:
+                    self._sesion.quit()
+                except Exception:
+                    pass
+                self._sesion = None
+
+proveedor_sendgrid = ProveedorSendGrid()
+proveedor_smtp = ProveedorSMTP()
+PROVEEDORES: List = [proveedor_sendgrid, proveedor_smtp]
+
+def enviar_con_proveedor(proveedor, to_email: Union[str, List[str]], subject: str, texto: str, html: str) -> bool:
+    """Intenta el envío con un proveedor respetando su circuito. Retorna False sin intentar si está abierto"""
+    if not proveedor.configurado:
+        return False
+    if not proveedor.circuito.permitir():
+        logger.info(f"⏭️ Circuito de {proveedor.nombre} abierto, se omite")
+        return False
+    try:
+        enviado = proveedor.enviar(to_email, subject, texto, html)
+    except DestinatarioRechazado as e:
+        logger.error(f"❌ {e}")
+        proveedor.circuito.registrar_exito()
+        return False
+    except Exception as e:
+        logger.error(f"Error al enviar email via {proveedor.nombre}: {e}")
+        enviado = False
+    if enviado:
+        proveedor.circuito.registrar_exito()
+    else:
+        proveedor.circuito.registrar_fallo()
+    return enviado
+
+def estado_proveedores() -> dict:
+    return {p.nombre: {"configurado": p.configurado, **p.circuito.resumen()} for p in PROVEEDORES}
+
+def cerrar_proveedores() -> None:
+    """Cierra el pool HTTP y la sesión SMTP al apagar la aplicación"""
+    for proveedor in PROVEEDORES:
+        proveedor.cerrar()
@@ -108,14 +108,10 @@ def hay_solapamiento_solo_reservas(db, cancha_id: int, fecha, hora_inicio: time,
     """
     Verifica SOLO si hay solapamiento con reservas existentes (sin suscripciones)
     """
-    from app.models.reserva import Reserva
+    from app.data.consultas import HORARIOS_RESERVAS_CANCHA_FECHA
     
-    # Obtener todas las reservas existentes para la fecha y cancha
-    reservas_existentes = db.query(Reserva).filter(
-        Reserva.cancha_id == cancha_id,
-        Reserva.fecha == fecha,
-        Reserva.estado != "cancelada"
-    ).all()
+    # Obtener todas las reservas existentes para la fecha y cancha (sentencia precompilada)
+    reservas_existentes = db.execute(HORARIOS_RESERVAS_CANCHA_FECHA, {"cancha_id": cancha_id, "fecha": fecha}).all()
     
     if excluir_reserva_id:
         reservas_existentes = [r for r in reservas_existentes if r.id != excluir_reserva_id]
@@ -173,16 +169,13 @@ def hay_solapamiento_reserva_suscripcion(db, cancha_id: int, fecha, hora_inicio:
     """
     Verifica si hay solapamiento con reservas Y suscripciones existentes
     """
-    from app.models.reserva import Reserva
-    from app.models.suscripcion import Suscripcion
-    from datetime import datetime
+    from app.data.consultas import HORARIOS_RESERVAS_CANCHA_FECHA
+    from app.services.ocurrencias_service import hay_ocurrencia_en_conflicto
     
-    # Obtener todas las reservas existentes para la fecha y cancha
-    reservas_existentes = db.query(Reserva).filter(
-        Reserva.cancha_id == cancha_id,
-        Reserva.fecha == fecha,
-        Reserva.estado != "cancelada"
-    ).all()
+    fecha_obj = fecha if isinstance(fecha, date) else datetime.strptime(fecha, "%Y-%m-%d").date()
+    
+    # Obtener todas las reservas existentes para la fecha y cancha (sentencia precompilada)
+    reservas_existentes = db.execute(HORARIOS_RESERVAS_CANCHA_FECHA, {"cancha_id": cancha_id, "fecha": fecha_obj}).all()
     
     if excluir_reserva_id:
         reservas_existentes = [r for r in reservas_existentes if r.id != excluir_reserva_id]
@@ -191,31 +184,8 @@ def hay_solapamiento_reserva_suscripcion(db, cancha_id: int, fecha, hora_inicio:
     print(f"🔍 Verificando solapamiento con reservas:")
     hay_solapamiento_reservas = not validar_solapamiento_reservas(hora_inicio, hora_fin, reservas_existentes)
     
-    # Verificar solapamiento con suscripciones
-    fecha_obj = fecha if isinstance(fecha, date) else datetime.strptime(fecha, "%Y-%m-%d").date()
-    dia_semana = fecha_obj.weekday()  # 0=lunes, 6=domingo
-    
-    # Obtener todas las suscripciones activas para el día de la semana y cancha
-    suscripciones_existentes = db.query(Suscripcion).filter(
-        Suscripcion.cancha_id == cancha_id,
-        Suscripcion.dia_semana == dia_semana,
-        Suscripcion.estado == "activa"
-    ).all()
-    
-    # Usar la misma lógica de validación para suscripciones
-    hay_solapamiento_suscripciones = False
-    for suscripcion in suscripciones_existentes:
-        # Verificar si hay solapamiento usando la misma lógica
-        if (hora_inicio == suscripcion.hora_inicio and hora_fin == suscripcion.hora_fin) or \
-           (hora_fin > suscripcion.hora_inicio and hora_inicio < suscripcion.hora_fin):
-            hay_solapamiento_suscripciones = True
-            break
-        
-        # Caso especial: si la suscripción termina a medianoche (00:00)
-        if suscripcion.hora_fin == time(0, 0):
-            if hora_inicio < time(0, 0):  # Si la nueva reserva empieza antes de medianoche
-                hay_solapamiento_suscripciones = True
-                break
+    # Verificar solapamiento con suscripciones: búsqueda por igualdad en las ocurrencias materializadas
+    hay_solapamiento_suscripciones = hay_ocurrencia_en_conflicto(db, cancha_id, [fecha_obj], hora_inicio, hora_fin)
     
     hay_solapamiento_total = hay_solapamiento_reservas or hay_solapamiento_suscripciones
     
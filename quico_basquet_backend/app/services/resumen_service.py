@@ -0,0 +1,81 @@
+import threading
+from datetime import date, datetime
+from cachetools import TTLCache
+from sqlalchemy import func, select, true
+from sqlalchemy.orm import Session
+from app.config.settings import settings
+from app.models.reserva import Reserva
+from app.models.suscripcion import Suscripcion
+from app.models.user import User
+
+# Un solo resumen por día; el TTL acota lo que puede tardar en verse un cambio no invalidado
+_cache_resumen = TTLCache(maxsize=2, ttl=settings.RESUMEN_ADMIN_TTL_SEGUNDOS)
+_cache_lock = threading.Lock()
+
+def invalidar_resumen() -> None:
+    """Descarta el resumen cacheado. Llamar después del commit de cambios en reservas, pagos o usuarios"""
+    with _cache_lock:
+        _cache_resumen.clear()
+
+def _consulta_resumen(hoy: date):
+    """Todos los indicadores en una sola sentencia: un CTE de una fila por tabla, unidos con CROSS JOIN"""
+    inicio_mes = hoy.replace(day=1)
+    inicio_mes_siguiente = (inicio_mes.replace(year=inicio_mes.year + 1, month=1) if inicio_mes.month == 12
+                            else inicio_mes.replace(month=inicio_mes.month + 1))
+    es_hoy = Reserva.fecha == hoy
+    es_del_mes = (Reserva.fecha >= inicio_mes) & (Reserva.fecha < inicio_mes_siguiente)
+    reserva_pendiente = Reserva.estado_pago == "pendiente"
+
+    reservas = select(
+        func.count().filter(es_hoy).label("reservas_hoy"),
+        func.coalesce(func.sum(Reserva.precio).filter(es_hoy), 0).label("ingresos_hoy"),
+        func.coalesce(func.sum(Reserva.precio).filter(es_del_mes), 0).label("ingresos_mes"),
+        func.count().filter(reserva_pendiente).label("reservas_pago_pendiente"),
+        func.coalesce(func.sum(Reserva.precio).filter(reserva_pendiente), 0).label("monto_reservas_pendiente"),
+    ).where(Reserva.estado != "cancelada").cte("resumen_reservas")
+
+    suscripcion_activa = Suscripcion.estado == "activa"
+    suscripciones = select(
+        func.count().filter(suscripcion_activa).label("suscripciones_activas"),
+        func.count().filter(suscripcion_activa & (Suscripcion.estado_pago == "pendiente")).label("suscripciones_pago_pendiente"),
+    ).cte("resumen_suscripciones")
+
+    es_cliente = User.rol != "admin"
+    usuarios = select(
+        func.count().filter(es_cliente).label("total_usuarios"),
+        func.count().filter(es_cliente & (func.coalesce(User.bloqueado, "activo") != "bloqueado")).label("usuarios_activos"),
+    ).cte("resumen_usuarios")
+
+    return select(reservas, suscripciones, usuarios).select_from(reservas).join(suscripciones, true()).join(usuarios, true())
+
+def obtener_resumen(db: Session) -> dict:
+    """
+    KPIs del panel de administración (reservas e ingresos de hoy y del mes, pagos pendientes,
+    suscripciones activas y usuarios) en un único round trip, cacheados por un TTL corto.
+    """
+    hoy = date.today()
+    with _cache_lock:
+        cacheado = _cache_resumen.get(hoy)
+    if cacheado is not None:
+        return cacheado
+
+    fila = db.execute(_consulta_resumen(hoy)).mappings().one()
+    resumen = {
+        "fecha": hoy,
+        "reservas_hoy": fila["reservas_hoy"],
+        "ingresos_hoy": float(fila["ingresos_hoy"]),
+        "ingresos_mes": float(fila["ingresos_mes"]),
+        "pagos_pendientes": {
+            "reservas": fila["reservas_pago_pendiente"],
+            "monto_reservas": float(fila["monto_reservas_pendiente"]),
+            "suscripciones": fila["suscripciones_pago_pendiente"],
+        },
+        "suscripciones_activas": fila["suscripciones_activas"],
+        "total_usuarios": fila["total_usuarios"],
+        "usuarios_activos": fila["usuarios_activos"],
+        "generado": datetime.now(),
+    }
+
+    with _cache_lock:
+        _cache_resumen[hoy] = resumen
+    return resumen
@@ -0,0 +1,126 @@
+"""
+Segmentos de audiencia para las notificaciones masivas.
+
+Cada segmento es una condición EXISTS correlacionada sobre users, así la audiencia se
+resuelve en una sola query (sin traer los user_id a Python ni armar listas IN) y solo se
+proyectan las columnas que usan los canales de envío: id, nombre, email, teléfono y canales.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import and_, exists, func, or_, select, text, true
+from sqlalchemy.orm import Session
+from app.models.reserva import Reserva
+from app.models.suscripcion import Suscripcion
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+DIAS_ACTIVO_DEFECTO = 30
+
+# Índices de los EXISTS por usuario (create_all no los agrega a tablas que ya existían).
+# El de reservas (user_id, fecha) es de la agenda y lo crea inicializar_agenda
+INDICES_SEGMENTOS = {
+    "ix_suscripciones_user_estado": "suscripciones (user_id, estado)",
+}
+
+COLUMNAS_AUDIENCIA = (User.id, User.nombre, User.email, User.telefono, User.canales_notificacion)
+
+def inicializar_segmentos(engine) -> None:
+    """Crea en PostgreSQL los índices que usan los segmentos si no existen"""
+    if engine.dialect.name != "postgresql":
+        return
+    try:
+        with engine.begin() as conn:
+            for nombre, definicion in INDICES_SEGMENTOS.items():
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {nombre} ON {definicion}"))
+    except Exception as e:
+        logger.warning(f"No se pudieron crear los índices de segmentos: {e}")
+
+def _desde(parametros: dict) -> date:
+    try:
+        dias = int(parametros.get("dias", DIAS_ACTIVO_DEFECTO))
+    except (TypeError, ValueError):
+        raise ValueError("El parámetro 'dias' debe ser un número entero")
+    if dias < 1:
+        raise ValueError("El parámetro 'dias' debe ser mayor a 0")
+    return date.today() - timedelta(days=dias)
+
+def _requerido(parametros: dict, nombre: str) -> Any:
+    valor = parametros.get(nombre)
+    if valor in (None, ""):
+        raise ValueError(f"El segmento requiere el parámetro '{nombre}'")
+    return valor
+
+def _reservo_desde(parametros: dict, *filtros):
+    return exists().where(Reserva.user_id == User.id, Reserva.fecha >= _desde(parametros), *filtros)
+
+def _suscripcion_activa(*filtros):
+    return exists().where(Suscripcion.user_id == User.id, Suscripcion.estado == "activa", *filtros)
+
+def _por_cancha(parametros: dict):
+    cancha_id = _requerido(parametros, "cancha_id")
+    try:
+        cancha_id = int(cancha_id)
+    except (TypeError, ValueError):
+        raise ValueError("El parámetro 'cancha_id' debe ser un número entero")
+    return or_(
+        _reservo_desde(parametros, Reserva.cancha_id == cancha_id),
+        _suscripcion_activa(Suscripcion.cancha_id == cancha_id)
+    )
+
+def _por_deporte(parametros: dict):
+    deporte = str(_requerido(parametros, "deporte")).strip().lower()
+    return or_(
+        _reservo_desde(parametros, func.lower(Reserva.deporte) == deporte),
+        _suscripcion_activa(func.lower(Suscripcion.deporte) == deporte)
+    )
+
+@dataclass(frozen=True)
+class Segmento:
+    nombre: str
+    descripcion: str
+    parametros: Tuple[str, ...]
+    condicion: Callable[[dict], Any]
+
+SEGMENTOS: Dict[str, Segmento] = {s.nombre: s for s in [
+    Segmento("todos", "Todos los usuarios", (), lambda p: true()),
+    Segmento("activos", "Usuarios con reservas en los últimos N días (dias, 30 por defecto)", ("dias",), lambda p: _reservo_desde(p)),
+    Segmento("suscriptores", "Usuarios con una suscripción activa", (), lambda p: _suscripcion_activa()),
+    Segmento("cancha", "Usuarios que reservaron la cancha en los últimos N días o tienen una suscripción activa en ella", ("cancha_id", "dias"), _por_cancha),
+    Segmento("deporte", "Usuarios que reservaron el deporte en los últimos N días o tienen una suscripción activa de ese deporte", ("deporte", "dias"), _por_deporte),
+    Segmento("especifico", "Un usuario puntual (usuario_id)", ("usuario_id",), lambda p: User.id == int(_requerido(p, "usuario_id"))),
+]}
+
+def condicion_segmento(nombre: str, parametros: Optional[dict] = None):
+    """Condición WHERE sobre users para el segmento. ValueError si no existe o faltan parámetros"""
+    segmento = SEGMENTOS.get(nombre)
+    if segmento is None:
+        raise ValueError(f"Segmento desconocido: {nombre}")
+    # Solo se alcanza a quien tiene algún canal (email o teléfono para WhatsApp)
+    contacto = or_(User.email.isnot(None), User.telefono.isnot(None))
+    return and_(contacto, segmento.condicion(parametros or {}))
+
+def consulta_segmento(nombre: str, parametros: Optional[dict] = None, despues_de_id: Optional[int] = None, limite: Optional[int] = None):
+    """SELECT de la audiencia ordenada por id, con paginación por keyset opcional"""
+    stmt = select(*COLUMNAS_AUDIENCIA).where(condicion_segmento(nombre, parametros))
+    if despues_de_id is not None:
+        stmt = stmt.where(User.id > despues_de_id)
+    stmt = stmt.order_by(User.id)
+    if limite is not None:
+        stmt = stmt.limit(limite)
+    return stmt
+
+def resolver_segmento(db: Session, nombre: str, parametros: Optional[dict] = None, despues_de_id: Optional[int] = None, limite: Optional[int] = None) -> List:
+    """Filas (id, nombre, email, telefono, canales_notificacion) de la audiencia"""
+    return db.execute(consulta_segmento(nombre, parametros, despues_de_id, limite)).all()
+
+def contar_segmento(db: Session, nombre: str, parametros: Optional[dict] = None, despues_de_id: Optional[int] = None) -> int:
+    stmt = select(func.count()).select_from(User).where(condicion_segmento(nombre, parametros))
+    if despues_de_id is not None:
+        stmt = stmt.where(User.id > despues_de_id)
+    return db.execute(stmt).scalar_one()
+
+def listar_segmentos() -> List[dict]:
+    return [{"nombre": s.nombre, "descripcion": s.descripcion, "parametros": list(s.parametros)} for s in SEGMENTOS.values()]
@@ -0,0 +1,169 @@
+"""
+Instantánea en disco de los caches calientes para arrancar en caliente.
+
+La plataforma duerme la instancia cuando no hay tráfico y los primeros requests al
+despertar pagaban caches vacíos. Los caches de app.data.cache_caliente se guardan en un
+archivo msgpack al apagar y cada SNAPSHOT_CACHES_MINUTOS; al arrancar se restauran las
+secciones cuya versión de tablas coincide con la de la base. Una sección que cambió en la
+base se descarta y se vuelve a llenar con los requests, como antes.
+"""
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Optional
+import msgpack
+from app.config.settings import settings
+from app.data.cache_caliente import CACHES, TABLAS_VERSIONADAS, leer_versiones, versionado_habilitado
+
+logger = logging.getLogger(__name__)
+
+# Se incrementa si cambia la forma de las secciones o de sus entradas
+FORMATO_SNAPSHOT = 3
+
+def _leer_archivo(ruta: str) -> Optional[dict]:
+    try:
+        with open(ruta, "rb") as f:
+            datos = msgpack.unpackb(f.read(), raw=False, strict_map_key=False)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"🧊 Instantánea de caches ilegible en {ruta}: {e}")
+        return None
+    if not isinstance(datos, dict) or datos.get("formato") != FORMATO_SNAPSHOT:
+        return None
+    return datos
+
+def _vigente(seccion: dict, versiones: dict) -> bool:
+    """La sección coincide con la versión actual de sus tablas en la base"""
+    return seccion.get("version") == {tabla: versiones.get(tabla) for tabla in seccion.get("tablas", [])}
+
+def _secciones_vigentes(datos: Optional[dict], versiones: dict) -> dict:
+    if not datos:
+        return {}
+    return {nombre: seccion for nombre, seccion in datos.get("secciones", {}).items() if _vigente(seccion, versiones)}
+
+def guardar_snapshot(session_factory, ruta: Optional[str] = None) -> int:
+    """
+    Escribe los caches en disco (reemplazo atómico del archivo). Un cache vacío conserva la
+    sección anterior si sigue vigente, así un período sin tráfico no borra la instantánea.
+    Retorna la cantidad de entradas guardadas.
+    """
+    if not versionado_habilitado():
+        return 0
+    ruta = ruta or settings.SNAPSHOT_CACHES_PATH
+
+    db = session_factory()
+    try:
+        versiones = leer_versiones(db, TABLAS_VERSIONADAS)
+    finally:
+        db.close()
+
+    secciones = _secciones_vigentes(_leer_archivo(ruta), versiones)
+    for nombre, cache in CACHES.items():
+        exportado = cache.exportar()
+        # Un cache cargado antes del último cambio en la base se descartaría al restaurar
+        if exportado is not None and _vigente(exportado, versiones):
+            secciones[nombre] = exportado
+
+    contenido = msgpack.packb({
+        "formato": FORMATO_SNAPSHOT,
+        "creado": datetime.now().isoformat(),
+        "secciones": secciones,
+    }, use_bin_type=True)
+
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    temporal = f"{ruta}.tmp"
+    # Tiene datos de contacto de usuarios: solo lo lee el proceso
+    with open(os.open(temporal, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as f:
+        f.write(contenido)
+    os.replace(temporal, ruta)
+
+    entradas = sum(len(s["entradas"]) for s in secciones.values())
+    logger.info(f"🧊 Instantánea de caches guardada: {entradas} entradas en {len(secciones)} secciones ({len(contenido)} bytes)")
+    return entradas
+
+def cargar_snapshot(session_factory, ruta: Optional[str] = None) -> int:
+    """Restaura las secciones vigentes de la instantánea. Retorna la cantidad de entradas cargadas"""
+    if not versionado_habilitado():
+        return 0
+    ruta = ruta or settings.SNAPSHOT_CACHES_PATH
+    datos = _leer_archivo(ruta)
+    if not datos:
+        return 0
+
+    db = session_factory()
+    try:
+        versiones = leer_versiones(db, TABLAS_VERSIONADAS)
+    finally:
+        db.close()
+
+    vigentes = _secciones_vigentes(datos, versiones)
+    cargadas = 0
+    for nombre, seccion in vigentes.items():
+        cache = CACHES.get(nombre)
+        if cache is not None:
+            cargadas += cache.importar(seccion["version"], seccion["entradas"])
+
+    descartadas = sorted(set(datos.get("secciones", {})) - set(vigentes))
+    logger.info(
+        f"🧊 Caches restaurados desde {ruta} ({datos.get('creado')}): {cargadas} entradas"
+        + (f", descartadas por cambios en la base: {', '.join(descartadas)}" if descartadas else "")
+    )
+    return cargadas
+
+class GuardadoPeriodico(threading.Thread):
+    """Hilo que guarda la instantánea cada cierto intervalo"""
+
+    def __init__(self, session_factory, intervalo_segundos: float):
+        super().__init__(name="snapshot-caches", daemon=True)
+        self._session_factory = session_factory
+        self.intervalo_segundos = intervalo_segundos
+        self._detener = threading.Event()
+
+    def detener(self) -> None:
+        self._detener.set()
+
+    def run(self) -> None:
+        while not self._detener.wait(self.intervalo_segundos):
+            try:
+                guardar_snapshot(self._session_factory)
+            except Exception as e:
+                logger.error(f"Error guardando la instantánea de caches: {e}")
+
+_guardado: Optional[GuardadoPeriodico] = None
+_session_factory = None
+
+def iniciar_snapshot(session_factory) -> None:
+    """Restaura los caches y arranca el guardado periódico"""
+    global _guardado, _session_factory
+    if not settings.SNAPSHOT_CACHES or not versionado_habilitado():
+        return
+    _session_factory = session_factory
+    try:
+        cargar_snapshot(session_factory)
+    except Exception as e:
+        logger.warning(f"No se pudo restaurar la instantánea de caches: {e}")
+    if settings.SNAPSHOT_CACHES_MINUTOS > 0 and _guardado is None:
+        _guardado = GuardadoPeriodico(session_factory, settings.SNAPSHOT_CACHES_MINUTOS * 60)
+        _guardado.start()
+
+def detener_snapshot() -> None:
+    """Detiene el guardado periódico y guarda la instantánea final"""
+    global _guardado
+    if _guardado is not None:
+        guardado, _guardado = _guardado, None
+        guardado.detener()
+    if _session_factory is not None:
+        try:
+            guardar_snapshot(_session_factory)
+        except Exception as e:
+            logger.error(f"Error guardando la instantánea de caches al apagar: {e}")
+
+def estado_caches() -> dict:
+    return {
+        "snapshot": settings.SNAPSHOT_CACHES and versionado_habilitado(),
+        "caches": {nombre: cache.resumen() for nombre, cache in CACHES.items()},
+    }
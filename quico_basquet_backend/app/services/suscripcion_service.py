@@ -1,48 +1,37 @@
-import json
 import logging
 from datetime import datetime, timedelta, time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
 from app.models.suscripcion import Suscripcion
 from app.models.reserva import Reserva
+from app.models.ocurrencia import OcurrenciaSuscripcion
 from app.schemas.suscripcion import SuscripcionCreate, SuscripcionUpdate
-from app.services.reserva_service import hay_solapamiento_suscripcion, validar_horario_reserva
+from app.services.reserva_service import validar_horario_reserva
+from app.services.ocurrencias_service import sincronizar_ocurrencias, obtener_suscripciones_por_fecha, filtro_solapamiento
+from app.services.disponibilidad_service import publicar_suscripcion, horarios_cacheados
+from app.services.resumen_service import invalidar_resumen
+from app.services.ocupacion_service import invalidar_cache_ocupacion
 from app.config.settings import settings
+from app.config.negocio import configuracion_actual
 
 logger = logging.getLogger(__name__)
 
 def cargar_configuracion_precios() -> Dict[str, float]:
-    """Cargar configuración de precios desde archivo JSON"""
-    try:
-        with open('config/precios.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, AttributeError):
-        # Usar precios por defecto si no se puede cargar el archivo
-        return {
-            "basquet": settings.PRECIO_BASQUET_POR_HORA,
-            "volley": settings.PRECIO_VOLLEY_POR_HORA
-        }
+    """Precios por hora vigentes (instantánea en memoria de config/precios.json)"""
+    return dict(configuracion_actual().precios_por_hora)
 
 def calcular_precio_mensual(cancha, deporte: str, horas_por_semana: int = 1) -> float:
     """Calcular precio mensual de una suscripción"""
-    try:
-        with open('config/precios.json', 'r', encoding='utf-8') as f:
-            precios = json.load(f)
-    except (json.JSONDecodeError, AttributeError):
-        # Usar precios por defecto si no se puede cargar el archivo
-        precios = {
-            "basquet": settings.PRECIO_BASQUET_POR_HORA,
-            "volley": settings.PRECIO_VOLLEY_POR_HORA
-        }
+    configuracion = configuracion_actual()
     
     # Obtener precio base según el deporte
-    precio_base = precios.get(deporte.lower(), settings.PRECIO_BASQUET_POR_HORA)
+    precio_base = configuracion.precio_por_hora(deporte)
     
     # Calcular precio mensual (4 semanas por mes)
-    precio_mensual = precio_base * horas_por_semana * 4
+    precio_mensual = precio_base * horas_por_semana * configuracion.semanas_por_mes
     
     # Aplicar descuento de suscripción
-    descuento = settings.DESCUENTO_SUSCRIPCION / 100
+    descuento = configuracion.descuento_suscripcion / 100
     precio_con_descuento = precio_mensual * (1 - descuento)
     
     return round(precio_con_descuento, 2)
@@ -61,39 +50,44 @@ def generar_fechas_mensuales(fecha_inicio: datetime, meses: int = 1) -> List[dat
     return fechas
 
 def crear_reservas_desde_suscripcion(db, suscripcion: Suscripcion, fecha_fin: datetime) -> List[Reserva]:
-    """Crear reservas automáticas desde una suscripción"""
-    reservas = []
-    fecha_actual = suscripcion.fecha_inicio
-    
-    while fecha_actual <= fecha_fin:
-        # Verificar si el día de la semana coincide
-        if fecha_actual.weekday() == suscripcion.dia_semana:
-            # Verificar si no hay solapamiento
-            if not hay_solapamiento_suscripcion(
-                db, 
-                suscripcion.cancha_id, 
-                suscripcion.dia_semana, 
-                suscripcion.hora_inicio, 
-                suscripcion.hora_fin
-            ):
-                # Crear reserva
-                reserva = Reserva(
-                    user_id=suscripcion.user_id,
-                    cancha_id=suscripcion.cancha_id,
-                    deporte="basquet",  # Por defecto
-                    fecha=fecha_actual.date(),
-                    hora_inicio=suscripcion.hora_inicio,
-                    hora_fin=suscripcion.hora_fin,
-                    precio=suscripcion.precio_mensual / 4,  # Precio por semana
-                    metodo_pago="efectivo",
-                    estado="confirmada",
-                    estado_pago=suscripcion.estado_pago  # Usar el estado_pago de la suscripción
-                )
-                reservas.append(reserva)
-        
-        fecha_actual += timedelta(days=1)
-    
-    return reservas
+    """Crear reservas automáticas desde las ocurrencias materializadas de una suscripción"""
+    fecha_limite = fecha_fin.date() if isinstance(fecha_fin, datetime) else fecha_fin
+    
+    fechas = [
+        o.fecha for o in db.query(OcurrenciaSuscripcion.fecha).filter(
+            OcurrenciaSuscripcion.suscripcion_id == suscripcion.id,
+            OcurrenciaSuscripcion.estado == "activa",
+            OcurrenciaSuscripcion.fecha <= fecha_limite
+        ).order_by(OcurrenciaSuscripcion.fecha).all()
+    ]
+    if not fechas:
+        return []
+    
+    # Una sola query para las fechas que ya tienen una reserva en ese horario
+    fechas_ocupadas = {
+        r.fecha for r in db.query(Reserva.fecha).filter(
+            Reserva.cancha_id == suscripcion.cancha_id,
+            Reserva.fecha.in_(fechas),
+            Reserva.estado != "cancelada",
+            filtro_solapamiento(Reserva.hora_inicio, Reserva.hora_fin, suscripcion.hora_inicio, suscripcion.hora_fin)
+        ).all()
+    }
+    
+    return [
+        Reserva(
+            user_id=suscripcion.user_id,
+            cancha_id=suscripcion.cancha_id,
+            deporte="basquet",  # Por defecto
+            fecha=fecha,
+            hora_inicio=suscripcion.hora_inicio,
+            hora_fin=suscripcion.hora_fin,
+            precio=suscripcion.precio_mensual / 4,  # Precio por semana
+            metodo_pago="efectivo",
+            estado="confirmada",
+            estado_pago=suscripcion.estado_pago  # Usar el estado_pago de la suscripción
+        )
+        for fecha in fechas if fecha not in fechas_ocupadas
+    ]
 
 def procesar_suscripciones_vencidas(db) -> List[Suscripcion]:
     """Procesar suscripciones que han vencido"""
@@ -106,7 +100,18 @@ def procesar_suscripciones_vencidas(db) -> List[Suscripcion]:
     for suscripcion in suscripciones_vencidas:
         suscripcion.estado = "vencida"
     
+    if suscripciones_vencidas:
+        db.query(OcurrenciaSuscripcion).filter(
+            OcurrenciaSuscripcion.suscripcion_id.in_([s.id for s in suscripciones_vencidas]),
+            OcurrenciaSuscripcion.estado == "activa",
+            OcurrenciaSuscripcion.fecha >= hoy
+        ).delete(synchronize_session=False)
+    
     db.commit()
+    if suscripciones_vencidas:
+        invalidar_resumen()
+        horarios_cacheados.invalidar()
+        invalidar_cache_ocupacion()
     return suscripciones_vencidas
 
 def renovar_suscripcion(db, suscripcion_id: int, nueva_fecha_fin: datetime) -> Suscripcion:
@@ -117,24 +122,20 @@ def renovar_suscripcion(db, suscripcion_id: int, nueva_fecha_fin: datetime) -> S
     
     suscripcion.fecha_fin = nueva_fecha_fin
     suscripcion.estado = "activa"
+    sincronizar_ocurrencias(db, suscripcion)
     
     db.commit()
-    db.refresh(suscripcion)
+    invalidar_resumen()
+    publicar_suscripcion(suscripcion, "ocupado")
     return suscripcion
 
-def obtener_suscripciones_activas_por_fecha(db: Session, fecha: datetime, cancha_id: int) -> List[Suscripcion]:
+def obtener_suscripciones_activas_por_fecha(db: Session, fecha: datetime, cancha_id: Optional[int] = None) -> List[Suscripcion]:
     """
     Obtiene las suscripciones activas para una fecha específica.
+    Sin cancha_id devuelve las de todas las canchas en una sola query.
     """
-    dia_semana = fecha.weekday()
-    query = db.query(Suscripcion).filter(
-        Suscripcion.cancha_id == cancha_id,
-        Suscripcion.dia_semana == dia_semana,
-        Suscripcion.estado == "activa",
-        Suscripcion.fecha_inicio <= fecha,
-        Suscripcion.fecha_fin >= fecha
-    )
-    return query.all()
+    fecha = fecha.date() if isinstance(fecha, datetime) else fecha
+    return obtener_suscripciones_por_fecha(db, fecha, cancha_id)
 
 def calcular_disponibilidad_con_suscripciones(db: Session, cancha_id: int, fecha: datetime, hora_inicio: time, hora_fin: time) -> bool:
     """
@@ -1,32 +1,100 @@
 import logging
+import re
+import threading
+from typing import Optional
+import httpx
 from app.config.settings import settings
+from app.services.proveedores_email import CircuitoProveedor
 
 logger = logging.getLogger(__name__)
 
+# Twilio corta el cuerpo de WhatsApp en 1600 caracteres
+LARGO_MAXIMO_WHATSAPP = 1600
+
+_cliente: Optional[httpx.Client] = None
+_cliente_lock = threading.Lock()
+circuito_whatsapp = CircuitoProveedor("whatsapp", settings.EMAIL_CIRCUITO_UMBRAL_FALLOS, settings.EMAIL_CIRCUITO_SEGUNDOS_ABIERTO)
+
+def twilio_configurado() -> bool:
+    return all([settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, settings.TWILIO_PHONE_NUMBER])
+
+def normalizar_telefono(telefono: Optional[str]) -> Optional[str]:
+    """
+    Número en formato E.164 (+549...) o None si no parece válido.
+    Los números sin código de país se completan con WHATSAPP_CODIGO_PAIS.
+    """
+    if not telefono:
+        return None
+    digitos = re.sub(r"\D", "", telefono)
+    if len(digitos) < 8:
+        return None
+    if telefono.strip().startswith("+") or (digitos.startswith(settings.WHATSAPP_CODIGO_PAIS[:2]) and len(digitos) > 11):
+        return f"+{digitos}"
+    return f"+{settings.WHATSAPP_CODIGO_PAIS}{digitos.lstrip('0')}"
+
+def _obtener_cliente() -> httpx.Client:
+    """Cliente HTTP compartido contra la API REST de Twilio (TWILIO_API_URL se puede apuntar a un stub)"""
+    global _cliente
+    with _cliente_lock:
+        if _cliente is None:
+            _cliente = httpx.Client(
+                base_url=settings.TWILIO_API_URL,
+                auth=(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN),
+                timeout=settings.EMAIL_TIMEOUT_SEGUNDOS,
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=60),
+            )
+        return _cliente
+
 def send_whatsapp_message(telefono: str, mensaje: str) -> bool:
     """
-    Envía un mensaje de WhatsApp (simulado por ahora)
-    En producción, aquí se integraría con Twilio o similar
+    Envía un mensaje de WhatsApp con Twilio.
+    Sin Twilio configurado el envío se simula (solo log).
     """
     try:
         # Verificar si Twilio está configurado
-        if not all([settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, settings.TWILIO_PHONE_NUMBER]):
+        if not twilio_configurado():
             logger.warning("Twilio no configurado - mensaje simulado")
             logger.info(f"📱 Mensaje simulado a {telefono}: {mensaje}")
             return True
-        
-        # Aquí iría la integración real con Twilio
-        # from twilio.rest import Client
-        # client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-        # message = client.messages.create(
-        #     body=mensaje,
-        #     from_=settings.TWILIO_PHONE_NUMBER,
-        #     to=f"whatsapp:{telefono}"
-        # )
-        
-        logger.info(f"📱 Mensaje enviado a {telefono}: {mensaje}")
-        return True
-        
+
+        destino = normalizar_telefono(telefono)
+        if destino is None:
+            logger.error(f"Teléfono inválido para WhatsApp: {telefono}")
+            return False
+
+        if not circuito_whatsapp.permitir():
+            logger.info("⏭️ Circuito de WhatsApp abierto, se omite")
+            return False
+
+        respuesta = _obtener_cliente().post(
+            f"/2010-04-01/Accounts/{settings.TWILIO_ACCOUNT_SID}/Messages.json",
+            data={
+                "From": f"whatsapp:{settings.TWILIO_PHONE_NUMBER}",
+                "To": f"whatsapp:{destino}",
+                "Body": mensaje[:LARGO_MAXIMO_WHATSAPP],
+            }
+        )
+        if respuesta.status_code in (200, 201):
+            circuito_whatsapp.registrar_exito()
+            logger.info(f"📱 Mensaje enviado a {destino}")
+            return True
+
+        # 4xx (número no habilitado, fuera de la ventana de 24 h, etc.) no es una falla del proveedor
+        if 400 <= respuesta.status_code < 500 and respuesta.status_code not in (401, 403, 429):
+            circuito_whatsapp.registrar_exito()
+        else:
+            circuito_whatsapp.registrar_fallo()
+        logger.error(f"Twilio rechazó el mensaje a {destino} ({respuesta.status_code}): {respuesta.text[:200]}")
+        return False
+
     except Exception as e:
+        circuito_whatsapp.registrar_fallo()
         logger.error(f"Error al enviar mensaje de WhatsApp: {e}")
-        return False 
\ No newline at end of file
+        return False
+
+def cerrar_cliente_whatsapp() -> None:
+    global _cliente
+    with _cliente_lock:
+        if _cliente is not None:
+            _cliente.close()
+            _cliente = None
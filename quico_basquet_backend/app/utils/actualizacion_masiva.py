@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import Table, select, update
+from sqlalchemy.orm import Session
+
+def actualizar_devolviendo_anteriores(db: Session, tabla: Table, ids: List[int], valores: dict, anteriores: Dict[str, str]) -> List[SimpleNamespace]:
+    """
+    UPDATE ... WHERE id IN (...) RETURNING de todas las columnas más los valores previos
+    de las columnas indicadas en `anteriores` (etiqueta -> columna).
+
+    En PostgreSQL es una sola sentencia: los valores previos salen de una subconsulta
+    bloqueada con FOR UPDATE en el FROM del UPDATE. Otros motores (sqlite) no permiten
+    referenciar el FROM en RETURNING, así que leen los valores previos antes del UPDATE.
+    """
+    columnas_previas = [tabla.c[columna].label(etiqueta) for etiqueta, columna in anteriores.items()]
+
+    if db.bind.dialect.name == "postgresql":
+        anterior = select(tabla.c.id, *columnas_previas).where(tabla.c.id.in_(ids)).with_for_update().subquery("anterior")
+        stmt = update(tabla).where(tabla.c.id == anterior.c.id).values(**valores).returning(
+            *tabla.c, *(anterior.c[etiqueta] for etiqueta in anteriores)
+        )
+        return [SimpleNamespace(**fila) for fila in db.execute(stmt).mappings()]
+
+    previos = {
+        fila["id"]: fila
+        for fila in db.execute(select(tabla.c.id, *columnas_previas).where(tabla.c.id.in_(ids))).mappings()
+    }
+    stmt = update(tabla).where(tabla.c.id.in_(list(previos))).values(**valores).returning(*tabla.c)
+    return [
+        SimpleNamespace(**fila, **{etiqueta: previos[fila["id"]][etiqueta] for etiqueta in anteriores})
+        for fila in db.execute(stmt).mappings()
+    ] if previos else []
+
+def actualizar_entidad(db: Session, modelo, condiciones: list, valores: dict, anteriores: Optional[Dict[str, str]] = None) -> Optional[Tuple[Any, Dict[str, Any]]]:
+    """
+    UPDATE ... WHERE <condiciones> RETURNING de una fila como entidad ORM (la instancia de la
+    sesión queda actualizada, sin refresh posterior). Retorna (entidad, valores_previos) o None
+    si ninguna fila cumple las condiciones.
+
+    Los valores previos de `anteriores` (etiqueta -> columna) salen, en PostgreSQL, de la
+    misma sentencia; en otros motores se leen antes del UPDATE.
+    """
+    anteriores = anteriores or {}
+    columnas_previas = [getattr(modelo, columna).label(etiqueta) for etiqueta, columna in anteriores.items()]
+    opciones = {"synchronize_session": False, "populate_existing": True}
+
+    if anteriores and db.bind.dialect.name == "postgresql":
+        anterior = select(modelo.id, *columnas_previas).where(*condiciones).with_for_update().subquery("anterior")
+        stmt = update(modelo).where(modelo.id == anterior.c.id).values(**valores).returning(
+            modelo, *(anterior.c[etiqueta] for etiqueta in anteriores)
+        ).execution_options(**opciones)
+        fila = db.execute(stmt).first()
+        if fila is None:
+            return None
+        return fila[0], {etiqueta: fila[i + 1] for i, etiqueta in enumerate(anteriores)}
+
+    previos: Dict[str, Any] = {}
+    if anteriores:
+        fila = db.execute(select(modelo.id, *columnas_previas).where(*condiciones)).mappings().first()
+        if fila is None:
+            return None
+        previos = {etiqueta: fila[etiqueta] for etiqueta in anteriores}
+        condiciones = [modelo.id == fila["id"]]
+
+    entidad = db.execute(
+        update(modelo).where(*condiciones).values(**valores).returning(modelo).execution_options(**opciones)
+    ).scalars().first()
+    if entidad is None:
+        return None
+    return entidad, previos
@@ -0,0 +1,123 @@
+import logging
+from datetime import date, datetime, time
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Optional, Tuple, Type
+from fastapi import HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+from app.config.settings import settings
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional, sin él se usa el camino normal de FastAPI
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # sin msgpack solo se ofrecen los formatos JSON
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=None)
+def campos_schema(schema: Type[BaseModel]) -> Tuple[str, ...]:
+    """Nombres de campos del schema, calculados una sola vez por clase"""
+    return tuple(schema.model_fields.keys())
+
+def fila_a_dict(fila: Any, campos: Tuple[str, ...]) -> dict:
+    """Proyecta una fila (modelo ORM, Row o dict) sobre los campos indicados"""
+    if isinstance(fila, dict):
+        return {campo: fila.get(campo) for campo in campos}
+    return {campo: getattr(fila, campo, None) for campo in campos}
+
+def serializar_filas(filas: Iterable[Any], schema: Type[BaseModel]) -> bytes:
+    """
+    Serializa filas con orjson sin pasar por la validación de Pydantic.
+    Solo debe usarse con datos confiables (salida del ORM).
+    """
+    campos = campos_schema(schema)
+    return orjson.dumps([fila_a_dict(fila, campos) for fila in filas])
+
+def respuestas_rapidas_habilitadas() -> bool:
+    """Indica si el camino rápido está activo y orjson está disponible"""
+    return settings.RESPUESTAS_RAPIDAS and orjson is not None
+
+# Formatos de listado: json (por defecto, una lista de objetos), columnar (JSON con un arreglo
+# por columna) y msgpack (lo mismo que columnar pero en binario)
+FORMATOS_LISTADO = ("json", "columnar", "msgpack")
+TIPOS_MSGPACK = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+# El formato puede salir del header Accept: todas las respuestas de listado lo declaran para
+# que un cache intermedio no le sirva msgpack a quien pidió JSON (ni al revés)
+VARY_FORMATO = {"Vary": "Accept"}
+
+def formato_listado(
+    request: Request,
+    response: Response,
+    format: Optional[str] = Query(None, description="json (por defecto), columnar o msgpack. También acepta Accept: application/msgpack")
+) -> str:
+    """
+    Dependencia que resuelve el formato pedido: ?format= tiene prioridad sobre el header Accept.
+    Agrega Vary: Accept a la respuesta del endpoint cuando este devuelve datos (no un Response).
+    """
+    response.headers.update(VARY_FORMATO)
+    if format is not None:
+        formato = format.lower()
+        if formato not in FORMATOS_LISTADO:
+            raise HTTPException(status_code=400, detail=f"Formato inválido. Opciones: {', '.join(FORMATOS_LISTADO)}")
+    else:
+        aceptados = request.headers.get("accept", "").lower()
+        formato = "msgpack" if any(tipo in aceptados for tipo in TIPOS_MSGPACK) else "json"
+    if formato == "msgpack" and msgpack is None:
+        raise HTTPException(status_code=406, detail="msgpack no está disponible en el servidor")
+    return formato
+
+def filas_a_columnas(filas: Iterable[Any], schema: Type[BaseModel], normalizar: Optional[Callable[[dict], dict]] = None) -> dict:
+    """
+    Listado en columnas con el esquema compartido: {"campos": [...], "columnas": [[...], ...],
+    "total": n}. columnas[i] tiene los valores de campos[i] en el orden de las filas.
+    """
+    campos = campos_schema(schema)
+    columnas = [[] for _ in campos]
+    total = 0
+    for fila in filas:
+        registro = fila_a_dict(fila, campos)
+        if normalizar is not None:
+            registro = normalizar(registro)
+        for i, campo in enumerate(campos):
+            columnas[i].append(registro[campo])
+        total += 1
+    return {"campos": list(campos), "columnas": columnas, "total": total}
+
+def _valor_msgpack(valor: Any) -> Any:
+    """Tipos que msgpack no conoce: fechas y horas en ISO, Decimal como float"""
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"Tipo no serializable en msgpack: {type(valor).__name__}")
+
+def respuesta_listado(filas: Iterable[Any], schema: Type[BaseModel], formato: str = "json", normalizar: Optional[Callable[[dict], dict]] = None):
+    """
+    Devuelve un listado en el formato pedido (ver formato_listado).
+
+    En json, con RESPUESTAS_RAPIDAS se serializa con orjson; si no, devuelve las filas tal
+    cual para que FastAPI las valide con el response_model del endpoint (Vary lo agrega
+    formato_listado en ese caso). Los formatos en
+    columnas no repiten las claves por fila y aplican `normalizar` a cada registro.
+    """
+    if formato == "msgpack":
+        contenido = msgpack.packb(filas_a_columnas(filas, schema, normalizar), default=_valor_msgpack, use_bin_type=True)
+        return Response(content=contenido, media_type="application/msgpack", headers=VARY_FORMATO)
+
+    if formato == "columnar":
+        columnas = filas_a_columnas(filas, schema, normalizar)
+        if orjson is not None:
+            return Response(content=orjson.dumps(columnas), media_type="application/json", headers=VARY_FORMATO)
+        return JSONResponse(content=jsonable_encoder(columnas), headers=VARY_FORMATO)
+
+    if not respuestas_rapidas_habilitadas():
+        return filas
+
+    return Response(content=serializar_filas(filas, schema), media_type="application/json", headers=VARY_FORMATO)
@@ -0,0 +1,26 @@
+import logging
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+class TareaPeriodica(threading.Thread):
+    """Hilo que ejecuta una función cada cierto intervalo hasta que se lo detiene"""
+
+    def __init__(self, nombre: str, intervalo_segundos: float, funcion: Callable[[], object]):
+        super().__init__(name=nombre, daemon=True)
+        self.intervalo_segundos = intervalo_segundos
+        self._funcion = funcion
+        self._detener = threading.Event()
+
+    def detener(self, esperar_segundos: float = 5) -> None:
+        self._detener.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout=esperar_segundos)
+
+    def run(self) -> None:
+        while not self._detener.wait(self.intervalo_segundos):
+            try:
+                self._funcion()
+            except Exception as e:
+                logger.error(f"Error en la tarea periódica {self.name}: {e}")
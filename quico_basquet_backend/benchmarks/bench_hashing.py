@@ -0,0 +1,39 @@
+"""
+Benchmark de hash de contraseñas con bcrypt.
+
+Mide hashes por segundo con un solo hilo y con el executor dedicado,
+y reporta el rendimiento por núcleo para el costo configurado.
+
+Uso (desde quico_basquet_backend/):
+    python -m benchmarks.bench_hashing --rounds 12 --hashes 32
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+
+def medir(rounds: int, hashes: int, hilos: int) -> float:
+    contexto = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=rounds)
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        list(executor.map(lambda i: contexto.hash(f"password-{i}"), range(hashes)))
+    return hashes / (time.perf_counter() - inicio)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de bcrypt")
+    parser.add_argument("--rounds", type=int, default=int(os.getenv("BCRYPT_ROUNDS", "12")))
+    parser.add_argument("--hashes", type=int, default=32)
+    parser.add_argument("--hilos", type=int, default=int(os.getenv("BCRYPT_MAX_CONCURRENCIA", str(os.cpu_count() or 2))))
+    args = parser.parse_args()
+
+    nucleos = os.cpu_count() or 1
+    un_hilo = medir(args.rounds, args.hashes, 1)
+    executor = medir(args.rounds, args.hashes, args.hilos)
+
+    print(f"bcrypt rounds={args.rounds} núcleos={nucleos} hilos={args.hilos}")
+    print(f"  1 hilo:    {un_hilo:8.2f} hashes/s")
+    print(f"  executor:  {executor:8.2f} hashes/s ({executor / min(args.hilos, nucleos):.2f} hashes/s por núcleo)")
+
+if __name__ == "__main__":
+    main()
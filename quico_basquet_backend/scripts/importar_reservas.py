@@ -0,0 +1,46 @@
+"""
+Importa reservas telefónicas desde un CSV.
+
+Columnas: cancha_id, fecha, hora_inicio, hora_fin, deporte, nombre_cliente
+(opcionales: metodo_pago, precio, estado_pago). Las reservas quedan a nombre
+del administrador indicado; las filas rechazadas se listan con su motivo.
+
+Uso (desde quico_basquet_backend/):
+    python -m scripts.importar_reservas reservas.csv --admin admin@quicobasquet.com --simular
+"""
+import argparse
+import sys
+from app.data.database import SessionLocal
+from app.models.user import User
+from app.services.importacion_service import importar_reservas_csv
+
+def main():
+    parser = argparse.ArgumentParser(description="Importar reservas desde un CSV")
+    parser.add_argument("archivo", help="Ruta del CSV")
+    parser.add_argument("--admin", required=True, help="Email del administrador que registra las reservas")
+    parser.add_argument("--simular", action="store_true", help="Validar sin crear las reservas")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        admin = db.query(User).filter(User.email == args.admin, User.rol == "admin").first()
+        if admin is None:
+            sys.exit(f"❌ No existe un administrador con email {args.admin}")
+
+        with open(args.archivo, "rb") as f:
+            try:
+                reporte = importar_reservas_csv(db, f.read(), admin.id, args.simular)
+            except ValueError as e:
+                sys.exit(f"❌ {e}")
+    finally:
+        db.close()
+
+    for fila in reporte["filas"]:
+        if fila["estado"] == "rechazada":
+            print(f"  línea {fila['linea']:>5}: ❌ {fila['motivo']}")
+    accion = "válidas" if args.simular else "importadas"
+    print(f"📥 {reporte['validas']} {accion}, {reporte['rechazadas']} rechazadas de {reporte['total_filas']} filas")
+    sys.exit(1 if reporte["rechazadas"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# test_agenda.py
+# Agenda e historial paginados por keyset: cursores entre páginas, desempates y suscripciones canceladas
+
+from datetime import date, time, timedelta
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.controllers import user_controller
+from app.crud.suscripcion import cancelar_suscripcion
+from app.data.database import get_db
+from app.models.reserva import Reserva
+from app.models.suscripcion import Suscripcion
+from app.models.user import User
+from app.services.agenda_service import ORDEN_RESERVA, codificar_cursor, obtener_agenda, obtener_historial
+from app.services.auth_service import get_current_user
+from app.services.ocurrencias_service import sincronizar_ocurrencias
+
+
+def _reserva(db, fecha, hora, estado="confirmada"):
+    reserva = Reserva(
+        user_id=1, cancha_id=1, deporte="basquet", fecha=fecha, hora_inicio=time(hora), hora_fin=time(hora + 1),
+        precio=26000, estado=estado, estado_pago="pendiente", metodo_pago="efectivo"
+    )
+    db.add(reserva)
+    db.commit()
+    return reserva
+
+
+def _suscripcion(db, fecha_inicio, fecha_fin, hora=21):
+    # Como crear_suscripcion: las fechas del período se materializan desde fecha_inicio
+    suscripcion = Suscripcion(
+        user_id=1, cancha_id=1, deporte="basquet", dia_semana=fecha_inicio.weekday(), hora_inicio=time(hora),
+        hora_fin=time(hora + 1), fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, metodo_pago="efectivo"
+    )
+    db.add(suscripcion)
+    sincronizar_ocurrencias(db, suscripcion, historial=True)
+    db.commit()
+    return suscripcion
+
+
+def _recorrer(pagina_de, limite):
+    items, cursor, paginas = [], None, 0
+    while True:
+        pagina = pagina_de(cursor, limite)
+        items.extend(pagina["items"])
+        paginas += 1
+        cursor = pagina["siguiente_cursor"]
+        if cursor is None:
+            return items, paginas
+
+
+def _cursor_en(fecha):
+    """Cursor al comienzo de la fecha, como el que arma _pagina a partir de ahora"""
+    return codificar_cursor((fecha, time(0), ORDEN_RESERVA - 1, 0))
+
+
+def _claves(items):
+    return [(i["tipo"], i["id"], i["fecha"]) for i in items]
+
+
+def test_cursor_recorre_todas_las_paginas_sin_repetir(db):
+    inicio = date(2030, 3, 2)
+    suscripcion = _suscripcion(db, inicio, inicio + timedelta(weeks=3))
+    reservas = [_reserva(db, inicio + timedelta(days=d), 18) for d in (1, 8, 9)]
+
+    completa = obtener_agenda(db, 1, limite=100)["items"]
+    assert len(completa) == 7 and all(item["tipo"] in ("reserva", "suscripcion") for item in completa)
+    assert [(i["fecha"], i["hora_inicio"]) for i in completa] == sorted((i["fecha"], i["hora_inicio"]) for i in completa)
+
+    items, paginas = _recorrer(lambda cursor, limite: obtener_agenda(db, 1, cursor, limite), 2)
+    assert paginas == 4
+    assert _claves(items) == _claves(completa)
+    assert {i["id"] for i in items if i["tipo"] == "reserva"} == {r.id for r in reservas}
+    assert {i["id"] for i in items if i["tipo"] == "suscripcion"} == {suscripcion.id}
+
+
+def test_empate_de_fecha_y_hora_reserva_antes_que_suscripcion(db):
+    inicio = date(2030, 3, 2)
+    suscripcion = _suscripcion(db, inicio, inicio, hora=20)
+    reserva = _reserva(db, inicio, 20)
+
+    # Con limite=1 el empate cae justo en el borde de la página
+    primera = obtener_agenda(db, 1, limite=1)
+    segunda = obtener_agenda(db, 1, primera["siguiente_cursor"], 1)
+    assert [(i["tipo"], i["id"]) for i in primera["items"]] == [("reserva", reserva.id)]
+    assert [(i["tipo"], i["id"]) for i in segunda["items"]] == [("suscripcion", suscripcion.id)]
+    assert segunda["siguiente_cursor"] is None
+
+    # El historial recorre el mismo orden al revés
+    despues = date(2030, 3, 3)
+    items, _ = _recorrer(lambda cursor, limite: obtener_historial(db, 1, cursor or _cursor_en(despues), limite), 1)
+    assert [(i["tipo"], i["id"]) for i in items] == [("suscripcion", suscripcion.id), ("reserva", reserva.id)]
+
+
+def test_cursor_invalido_responde_400(db):
+    app = FastAPI()
+    app.include_router(user_controller.router)
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: db.get(User, 1)
+    cliente = TestClient(app)
+
+    for ruta in ("/users/me/agenda", "/users/me/historial"):
+        respuesta = cliente.get(ruta, params={"cursor": "no-es-un-cursor"})
+        assert respuesta.status_code == 400
+        assert respuesta.json()["detail"] == "Cursor inválido"
+    assert cliente.get("/users/me/agenda").status_code == 200
+
+
+def test_historial_conserva_sesiones_de_una_suscripcion_cancelada(db):
+    hoy = date.today()
+    suscripcion = _suscripcion(db, hoy - timedelta(weeks=3), hoy + timedelta(weeks=3))
+    jugadas = [hoy - timedelta(weeks=s) for s in (1, 2, 3)]
+
+    cancelar_suscripcion(db, suscripcion.id, 1)
+
+    historial = [(i["tipo"], i["id"], i["fecha"]) for i in obtener_historial(db, 1)["items"]]
+    assert historial == [("suscripcion", suscripcion.id, fecha) for fecha in jugadas]
+    assert obtener_agenda(db, 1)["items"] == []
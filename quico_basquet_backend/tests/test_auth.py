@@ -0,0 +1,54 @@
+# test_auth.py
+# Usuario autenticado cacheado: rol y bloqueado se leen de la base en cada request
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from app.services.auth_service import create_access_token, get_current_user, principales, require_admin
+
+
+@pytest.fixture(autouse=True)
+def cache_vacio():
+    principales.invalidar()
+    yield
+    principales.invalidar()
+
+
+def _usuario_actual(sesiones, user_id):
+    token = create_access_token({"user_id": user_id})
+    with sesiones() as db:
+        usuario = get_current_user(token, db)
+        return usuario.nombre, usuario.rol, usuario.bloqueado
+
+
+def _sql(engine, sentencia):
+    # Cambio por fuera del ORM: no dispara los eventos que invalidan el cache
+    with engine.begin() as conn:
+        conn.execute(text(sentencia))
+
+
+def test_usuario_cacheado_ve_bloqueo_y_rol_cambiados_por_fuera(db, engine, sesiones):
+    assert _usuario_actual(sesiones, 2) == ("Admin", "admin", "activo")
+    assert principales.obtener(2) is not None
+
+    _sql(engine, "UPDATE users SET rol = 'user', bloqueado = 'bloqueado', nombre = 'Otro' WHERE id = 2")
+    nombre, rol, bloqueado = _usuario_actual(sesiones, 2)
+    assert (rol, bloqueado) == ("user", "bloqueado")
+    assert nombre == "Admin"  # el perfil sí sale del cache hasta su TTL
+
+    token = create_access_token({"user_id": 2})
+    with sesiones() as otra:
+        with pytest.raises(HTTPException) as error:
+            require_admin(get_current_user(token, otra))
+    assert error.value.status_code == 403
+
+
+def test_usuario_borrado_por_fuera_no_se_autentica(db, engine, sesiones):
+    _usuario_actual(sesiones, 1)
+    _sql(engine, "DELETE FROM users WHERE id = 1")
+
+    with pytest.raises(HTTPException) as error:
+        _usuario_actual(sesiones, 1)
+    assert error.value.status_code == 401
+    assert principales.obtener(1) is None
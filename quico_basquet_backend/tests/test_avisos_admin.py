@@ -0,0 +1,75 @@
+# test_avisos_admin.py
+# Resumen de avisos al administrador: reintento ante fallos y valor de retorno al encolar
+
+import pytest
+
+from app.services import avisos_admin_service
+from app.services.avisos_admin_service import AvisoAdmin, ResumenAvisosAdmin, enviar_aviso_admin
+
+
+def _aviso(n):
+    return AvisoAdmin("cancelacion_reserva", f"Aviso {n}", f"texto {n}", f"<p>{n}</p>")
+
+
+@pytest.fixture
+def envios(monkeypatch):
+    """Reemplaza el envío del resumen: registra los lotes y responde según `resultado`"""
+    registro = {"lotes": [], "resultado": True}
+
+    def enviar_resumen(avisos):
+        registro["lotes"].append([a.asunto for a in avisos])
+        if isinstance(registro["resultado"], Exception):
+            raise registro["resultado"]
+        return registro["resultado"]
+
+    monkeypatch.setattr(avisos_admin_service, "enviar_resumen", enviar_resumen)
+    return registro
+
+
+def test_vaciar_envia_y_limpia(envios):
+    resumen = ResumenAvisosAdmin(60)
+    resumen.encolar(_aviso(1))
+    resumen.encolar(_aviso(2))
+
+    assert resumen.vaciar() == 2
+    assert envios["lotes"] == [["Aviso 1", "Aviso 2"]]
+    assert resumen.pendientes == 0
+
+
+def test_fallo_del_resumen_reencola_en_orden(envios):
+    resumen = ResumenAvisosAdmin(60)
+    resumen.encolar(_aviso(1))
+    envios["resultado"] = False
+    assert resumen.vaciar() == 0
+
+    envios["resultado"] = ConnectionError("sin red")
+    resumen.encolar(_aviso(2))
+    with pytest.raises(ConnectionError):
+        resumen.vaciar()
+    assert resumen.pendientes == 2
+
+    envios["resultado"] = True
+    resumen.encolar(_aviso(3))
+    assert resumen.vaciar() == 3
+    assert envios["lotes"][-1] == ["Aviso 1", "Aviso 2", "Aviso 3"]
+
+
+def test_cola_retenida_tiene_tope(envios, monkeypatch):
+    monkeypatch.setattr(avisos_admin_service, "MAXIMO_AVISOS_RETENIDOS", 3)
+    resumen = ResumenAvisosAdmin(60)
+    envios["resultado"] = False
+    for n in range(5):
+        resumen.encolar(_aviso(n))
+    resumen.vaciar()
+
+    envios["resultado"] = True
+    resumen.vaciar()
+    assert envios["lotes"][-1] == ["Aviso 2", "Aviso 3", "Aviso 4"]
+
+
+def test_aviso_encolado_no_se_informa_como_enviado(envios, monkeypatch):
+    resumen = ResumenAvisosAdmin(60)
+    monkeypatch.setattr(avisos_admin_service, "_resumen", resumen)
+
+    assert enviar_aviso_admin("cancelacion_reserva", "Aviso", "texto", "<p>texto</p>") is None
+    assert resumen.pendientes == 1
@@ -0,0 +1,46 @@
+# test_busqueda.py
+# Búsqueda de reservas por usuario o por nombre de cliente
+
+from datetime import date, time
+
+import pytest
+
+from app.models.reserva import Reserva
+from app.services.busqueda_service import buscar_reservas, inicializar_busqueda
+
+
+@pytest.fixture(autouse=True)
+def indices_busqueda(engine):
+    # En PostgreSQL habilita pg_trgm (similarity); en SQLite no hace nada
+    inicializar_busqueda(engine)
+
+
+def _reserva(db, user_id, nombre_cliente=None, fecha=date(2026, 3, 2)):
+    reserva = Reserva(
+        user_id=user_id, cancha_id=1, deporte="basquet", fecha=fecha, hora_inicio=time(18), hora_fin=time(19),
+        precio=1000, estado="confirmada", nombre_cliente=nombre_cliente
+    )
+    db.add(reserva)
+    db.commit()
+    return reserva.id
+
+
+def test_busca_por_usuario_y_por_nombre_de_cliente(db):
+    del_cliente = _reserva(db, 1)
+    del_admin = _reserva(db, 2, nombre_cliente="Juan Clientez", fecha=date(2026, 3, 3))
+    _reserva(db, 2, nombre_cliente="Otro")
+
+    assert [r.id for r in buscar_reservas(db, "cliente")] == [del_admin, del_cliente]
+    assert [r.id for r in buscar_reservas(db, "cliente@example")] == [del_cliente]
+
+
+def test_sin_coincidencias_ni_termino(db):
+    _reserva(db, 1)
+    assert buscar_reservas(db, "nadie") == []
+    assert buscar_reservas(db, "   ") == []
+
+
+def test_comodines_literales(db):
+    _reserva(db, 2, nombre_cliente="100% basquet")
+    _reserva(db, 2, nombre_cliente="1000 basquet")
+    assert [r.nombre_cliente for r in buscar_reservas(db, "100%")] == ["100% basquet"]
@@ -0,0 +1,75 @@
+# test_cache_caliente.py
+# Versión por tabla de los caches calientes (triggers en PostgreSQL)
+
+import pytest
+from sqlalchemy import text
+
+from app.data import cache_caliente
+from app.data.cache_caliente import PARTICIONES_VERSION, TABLAS_VERSIONADAS, inicializar_versiones, leer_versiones
+
+
+@pytest.fixture
+def versionado(engine, monkeypatch):
+    monkeypatch.setattr(cache_caliente, "_versionado", False)
+    if engine.dialect.name != "postgresql":
+        pytest.skip("El versionado por triggers solo existe en PostgreSQL (TEST_DATABASE_URL)")
+    assert inicializar_versiones(engine)
+    return engine
+
+
+def _conexiones_en_particiones_distintas(engine):
+    """Dos conexiones cuyo pid cae en particiones distintas del contador"""
+    abiertas = []
+    while True:
+        conn = engine.connect()
+        abiertas.append(conn)
+        particion = conn.execute(text("SELECT pg_backend_pid()")).scalar() % PARTICIONES_VERSION
+        otra = next((c for c in abiertas[:-1] if c.info["particion"] != particion), None)
+        conn.info["particion"] = particion
+        if otra is not None:
+            for sobrante in abiertas:
+                if sobrante is not conn and sobrante is not otra:
+                    sobrante.close()
+            return otra, conn
+
+
+def test_sin_postgresql_no_hay_versiones(engine, db, monkeypatch):
+    monkeypatch.setattr(cache_caliente, "_versionado", False)
+    if engine.dialect.name == "postgresql":
+        pytest.skip("Caso de motores sin triggers")
+    assert not inicializar_versiones(engine)
+    assert leer_versiones(db, TABLAS_VERSIONADAS) is None
+
+
+def test_inicializar_es_idempotente_y_cuenta_cambios(versionado, db):
+    assert inicializar_versiones(versionado)
+    with versionado.connect() as conn:
+        triggers = conn.execute(text("SELECT count(*) FROM pg_trigger WHERE tgname = 'tr_version_users'")).scalar()
+    assert triggers == 1
+
+    antes = leer_versiones(db, TABLAS_VERSIONADAS)
+    db.execute(text("UPDATE users SET nombre = 'Cliente Uno' WHERE id = 1"))
+    db.execute(text("UPDATE users SET nombre = 'Cliente' WHERE id = 1"))
+    db.commit()
+    despues = leer_versiones(db, TABLAS_VERSIONADAS)
+    assert despues["users"] == antes["users"] + 2
+    assert despues["canchas"] == antes["canchas"]
+
+
+def test_escrituras_concurrentes_no_se_bloquean(versionado, db):
+    antes = leer_versiones(db, ["users"])["users"]
+    primera, segunda = _conexiones_en_particiones_distintas(versionado)
+    try:
+        primera.execute(text("UPDATE users SET telefono = '1' WHERE id = 1"))
+        # Un cambio sin commit todavía no mueve la versión
+        assert leer_versiones(db, ["users"])["users"] == antes
+        # Con una única fila de versión esta escritura esperaría el commit de la primera
+        segunda.execute(text("SET lock_timeout = '2s'"))
+        segunda.execute(text("UPDATE users SET telefono = '2' WHERE id = 2"))
+        segunda.commit()
+        primera.commit()
+    finally:
+        primera.close()
+        segunda.close()
+
+    assert leer_versiones(db, ["users"])["users"] == antes + 2
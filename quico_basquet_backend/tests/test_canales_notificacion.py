@@ -0,0 +1,128 @@
+# test_canales_notificacion.py
+# Canales de notificación: lotes, limitador de tasa y canales sin configurar contra endpoints falsos
+
+import json
+
+import httpx
+import pytest
+
+from app.config.settings import settings
+from app.services import canales_notificacion, email_service, whatsapp_service
+from app.services.canales_notificacion import CanalEmail, CanalNotificacion, CanalWhatsApp, LimitadorTasa
+from app.services.proveedores_email import ProveedorSendGrid
+
+
+class RelojFalso:
+    """Reemplaza time en el módulo de canales: sleep avanza el reloj en lugar de dormir"""
+
+    def __init__(self):
+        self.ahora = 0.0
+        self.esperas = []
+
+    def monotonic(self):
+        return self.ahora
+
+    def sleep(self, segundos):
+        self.esperas.append(segundos)
+        self.ahora += segundos
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    falso = RelojFalso()
+    monkeypatch.setattr(canales_notificacion, "time", falso)
+    return falso
+
+
+@pytest.fixture
+def sendgrid(monkeypatch):
+    """SendGrid apuntado a un MockTransport que registra los destinatarios de cada request"""
+    monkeypatch.setattr(settings, "SENDGRID_API_KEY", "clave")
+    requests = []
+
+    def responder(request):
+        cuerpo = json.loads(request.content)
+        requests.append([p["to"][0]["email"] for p in cuerpo["personalizations"]])
+        return httpx.Response(202)
+
+    proveedor = ProveedorSendGrid()
+    proveedor._cliente = httpx.Client(base_url="http://sendgrid.local", transport=httpx.MockTransport(responder))
+    monkeypatch.setattr(email_service, "proveedor_sendgrid", proveedor)
+    yield requests
+    proveedor.cerrar()
+
+
+@pytest.fixture
+def twilio(monkeypatch):
+    """Twilio configurado contra un MockTransport que registra los destinos"""
+    monkeypatch.setattr(settings, "TWILIO_ACCOUNT_SID", "AC123")
+    monkeypatch.setattr(settings, "TWILIO_AUTH_TOKEN", "token")
+    monkeypatch.setattr(settings, "TWILIO_PHONE_NUMBER", "+5493410000000")
+    destinos = []
+
+    def responder(request):
+        destinos.append(dict(httpx.QueryParams(request.content.decode()))["To"])
+        return httpx.Response(201)
+
+    monkeypatch.setattr(whatsapp_service, "_cliente", httpx.Client(base_url="http://twilio.local", transport=httpx.MockTransport(responder)))
+    yield destinos
+    whatsapp_service.cerrar_cliente_whatsapp()
+
+
+def test_limitador_cobra_un_token_por_mensaje(reloj):
+    limitador = LimitadorTasa(por_segundo=10)
+    limitador.adquirir(10)
+    assert reloj.esperas == []
+
+    # Un lote más grande que la capacidad espera el bucket lleno y deja deuda
+    limitador.adquirir(25)
+    assert sum(reloj.esperas) == pytest.approx(1.0)
+    limitador.adquirir(1)
+    assert sum(reloj.esperas) == pytest.approx(2.6)
+
+
+def test_canal_email_arma_lotes_y_respeta_la_tasa(sendgrid, reloj):
+    canal = CanalEmail(max_concurrencia=1, por_segundo=2, tamano_lote=2)
+    destinos = [f"u{n}@example.com" for n in range(5)]
+    try:
+        resultados = [f.result() for f in canal.programar(destinos, "Asunto", "texto", "<p>texto</p>")]
+    finally:
+        canal.cerrar()
+
+    assert sendgrid == [destinos[0:2], destinos[2:4], destinos[4:5]]
+    assert resultados == [(2, 0, 0), (2, 0, 0), (1, 0, 0)]
+    # 5 mensajes a 2 por segundo con un bucket de 2: 1.5 s de espera en total
+    assert sum(reloj.esperas) == pytest.approx(1.5)
+
+
+def test_canal_whatsapp_envia_uno_por_destino(twilio, reloj):
+    canal = CanalWhatsApp(max_concurrencia=1, por_segundo=1, tamano_lote=10)
+    try:
+        resultado = canal.programar(["+5493415551111", "+5493415552222"], "Asunto", "texto", "")[0].result()
+    finally:
+        canal.cerrar()
+
+    assert resultado == (2, 0, 0)
+    assert twilio == ["whatsapp:+5493415551111", "whatsapp:+5493415552222"]
+    assert sum(reloj.esperas) == pytest.approx(1.0)
+
+
+def test_whatsapp_sin_twilio_se_informa_omitido(monkeypatch):
+    monkeypatch.setattr(settings, "TWILIO_ACCOUNT_SID", "")
+    canal = CanalWhatsApp(max_concurrencia=1, por_segundo=100, tamano_lote=10)
+    try:
+        resultado = canal.programar(["+5493415551111"], "Asunto", "texto", "")[0].result()
+    finally:
+        canal.cerrar()
+    assert resultado == (0, 0, 1)
+
+
+def test_canal_requiere_implementar_los_metodos_abstractos():
+    class SinEnvio(CanalNotificacion):
+        nombre = "incompleto"
+
+        def destino(self, usuario):
+            return None
+
+    with pytest.raises(TypeError):
+        SinEnvio(1, 1, 1)
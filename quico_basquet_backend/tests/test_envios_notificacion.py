@@ -0,0 +1,116 @@
+# test_envios_notificacion.py
+# Envío de notificaciones en segundo plano: toma con lease, avance por tanda y barrido de envíos libres
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config.settings import settings
+from app.models.notification import Notification
+from app.services import envios_notificacion_service
+from app.services.envios_notificacion_service import procesar_envio, reanudar_envios
+
+
+@pytest.fixture
+def despachos(monkeypatch):
+    """Reemplaza el despacho por canal: registra los ids de cada tanda y los da por enviados"""
+    monkeypatch.setattr(settings, "NOTIFICACIONES_TAMANO_TANDA", 1)
+    registro = {"tandas": [], "durante": None}
+
+    def despachar(usuarios, asunto, mensaje, tipo):
+        ids = [u.id for u in usuarios]
+        registro["tandas"].append(ids)
+        if registro["durante"] is not None:
+            registro["durante"]()
+        return {"email": {"exitosos": len(ids), "fallidos": 0, "omitidos": 0, "total": len(ids)}}
+
+    monkeypatch.setattr(envios_notificacion_service, "despachar_notificacion", despachar)
+    return registro
+
+
+@pytest.fixture
+def encolados(monkeypatch):
+    """Trabajador falso: registra lo encolado sin levantar el hilo"""
+    ids = []
+
+    class Trabajador:
+        def encolar(self, notification_id):
+            if notification_id in ids:
+                return False
+            ids.append(notification_id)
+            return True
+
+    monkeypatch.setattr(envios_notificacion_service, "_obtener_trabajador", lambda: Trabajador())
+    return ids
+
+
+def _notificacion(db, estado="pendiente", actualizada=None, **campos):
+    notificacion = Notification(
+        tipo="general", asunto="Aviso", mensaje="Cancha cerrada", destinatarios="todos",
+        enviado_por=2, estado=estado, actualizada=actualizada, **campos
+    )
+    db.add(notificacion)
+    db.commit()
+    return notificacion.id
+
+
+def _leer(sesiones, notification_id):
+    with sesiones() as db:
+        return db.get(Notification, notification_id)
+
+
+def test_envia_por_tandas_y_guarda_el_avance(db, sesiones, despachos):
+    notification_id = _notificacion(db)
+    procesar_envio(sesiones, notification_id)
+
+    assert despachos["tandas"] == [[1], [2]]
+    notificacion = _leer(sesiones, notification_id)
+    assert notificacion.estado == "enviado"
+    assert notificacion.enviados_exitosos == 2
+    assert notificacion.ultimo_usuario_id == 2
+    assert notificacion.resultados_canales["email"] == {"exitosos": 2, "fallidos": 0, "omitidos": 0, "total": 2}
+
+
+def test_lease_vigente_no_se_toma_y_vencido_se_retoma(db, sesiones, despachos):
+    vigente = _notificacion(db, "enviando", datetime.utcnow())
+    vencido = _notificacion(
+        db, "enviando", datetime.utcnow() - timedelta(seconds=settings.NOTIFICACIONES_LEASE_SEGUNDOS + 1),
+        ultimo_usuario_id=1, enviados_exitosos=1
+    )
+
+    procesar_envio(sesiones, vigente)
+    assert despachos["tandas"] == []
+    assert _leer(sesiones, vigente).estado == "enviando"
+
+    procesar_envio(sesiones, vencido)
+    assert despachos["tandas"] == [[2]]  # retoma después del último usuario procesado
+    assert _leer(sesiones, vencido).enviados_exitosos == 2
+
+
+def test_lease_perdido_corta_el_envio(db, sesiones, despachos):
+    notification_id = _notificacion(db)
+
+    def otro_worker_toma_el_envio():
+        with sesiones() as otra:
+            otra.query(Notification).filter(Notification.id == notification_id).update({"actualizada": datetime.utcnow() + timedelta(seconds=1)})
+            otra.commit()
+
+    despachos["durante"] = otro_worker_toma_el_envio
+    procesar_envio(sesiones, notification_id)
+
+    assert despachos["tandas"] == [[1]]
+    notificacion = _leer(sesiones, notification_id)
+    assert notificacion.estado == "enviando"
+    assert notificacion.ultimo_usuario_id is None  # el avance lo guarda quien tiene el lease
+
+
+def test_barrido_encola_solo_envios_libres(db, sesiones, encolados):
+    pendiente = _notificacion(db)
+    _notificacion(db, "enviando", datetime.utcnow())
+    abandonado = _notificacion(db, "enviando", datetime.utcnow() - timedelta(hours=1))
+    _notificacion(db, "enviado")
+
+    assert reanudar_envios(sesiones) == 2
+    assert encolados == [pendiente, abandonado]
+    # Un segundo barrido no duplica lo que ya está en la cola
+    assert reanudar_envios(sesiones) == 0
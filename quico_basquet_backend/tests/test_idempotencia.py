@@ -0,0 +1,91 @@
+# test_idempotencia.py
+# Idempotency-Key: los reintentos reciben la respuesta guardada y nunca duplican la reserva
+
+from datetime import date, time
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.idempotencia import ClaveIdempotencia
+from app.models.reserva import Reserva
+from app.schemas.reserva import ReservaOut
+from app.services import idempotencia_service
+from app.services.idempotencia_service import ejecutar_idempotente
+
+CUERPO = {"cancha_id": 1, "fecha": "2030-03-02", "hora_inicio": "18:00", "hora_fin": "19:00"}
+
+
+@pytest.fixture(autouse=True)
+def sesiones_idempotencia(sesiones, monkeypatch):
+    monkeypatch.setattr(idempotencia_service, "SessionLocal", sesiones)
+
+
+def _crear(db, fallar_despues=None):
+    """Operación como la del endpoint: crea la reserva y confirma; opcionalmente falla después del commit"""
+    def operacion():
+        reserva = Reserva(
+            user_id=1, cancha_id=1, deporte="basquet", fecha=date(2030, 3, 2),
+            hora_inicio=time(18), hora_fin=time(19), precio=1000, estado="confirmada", metodo_pago="efectivo"
+        )
+        db.add(reserva)
+        db.commit()
+        if fallar_despues is not None:
+            raise fallar_despues
+        return reserva
+    return operacion
+
+
+def _ejecutar(db, operacion, cuerpo=CUERPO):
+    return ejecutar_idempotente("clave-1", 1, "POST /reservas/", cuerpo, operacion, ReservaOut, db, Reserva)
+
+
+def test_reintento_devuelve_la_respuesta_guardada(db):
+    reserva = _ejecutar(db, _crear(db))
+    repetida = _ejecutar(db, _crear(db))
+
+    assert repetida.headers["Idempotent-Replayed"] == "true"
+    assert repetida.status_code == 200
+    assert b'"id":%d' % reserva.id in repetida.body
+    assert db.query(Reserva).count() == 1
+
+
+def test_error_despues_del_commit_no_duplica_la_reserva(db):
+    with pytest.raises(RuntimeError):
+        _ejecutar(db, _crear(db, fallar_despues=RuntimeError("se cayó el envío del email")))
+
+    fila = db.query(ClaveIdempotencia).one()
+    assert fila.estado == "completada"
+
+    repetida = _ejecutar(db, _crear(db))
+    assert repetida.headers["Idempotent-Replayed"] == "true"
+    assert db.query(Reserva).count() == 1
+
+
+def test_error_http_despues_del_commit_no_pisa_la_respuesta(db):
+    with pytest.raises(HTTPException):
+        _ejecutar(db, _crear(db, fallar_despues=HTTPException(status_code=400, detail="tarde")))
+
+    repetida = _ejecutar(db, _crear(db))
+    assert repetida.status_code == 200
+    assert db.query(Reserva).count() == 1
+
+
+def test_error_antes_del_commit_libera_la_clave(db):
+    def operacion_fallida():
+        raise RuntimeError("base caída")
+
+    with pytest.raises(RuntimeError):
+        _ejecutar(db, operacion_fallida)
+    assert db.query(ClaveIdempotencia).count() == 0
+
+    # El reintento vuelve a ejecutar la operación
+    reserva = _ejecutar(db, _crear(db))
+    assert isinstance(reserva, Reserva)
+    assert db.query(Reserva).count() == 1
+
+
+def test_misma_clave_con_otro_cuerpo(db):
+    _ejecutar(db, _crear(db))
+    with pytest.raises(HTTPException) as error:
+        _ejecutar(db, _crear(db), cuerpo={**CUERPO, "hora_inicio": "20:00"})
+    assert error.value.status_code == 422
@@ -0,0 +1,92 @@
+# test_importacion.py
+# Importación CSV de reservas del administrador con detección de solapamientos
+
+from datetime import date, time
+
+import pytest
+
+from app.models.ocurrencia import OcurrenciaSuscripcion
+from app.models.reserva import Reserva
+from app.models.suscripcion import Suscripcion
+from app.services.importacion_service import importar_reservas_csv
+
+ENCABEZADO = "cancha_id,fecha,hora_inicio,hora_fin,deporte,nombre_cliente,precio\n"
+
+
+def _csv(*filas):
+    return ENCABEZADO + "".join(f"{fila}\n" for fila in filas)
+
+
+def _estados(reporte):
+    return {fila["linea"]: fila["estado"] for fila in reporte["filas"]}
+
+
+def test_importa_filas_validas(db):
+    reporte = importar_reservas_csv(db, _csv(
+        "1,2030-03-02,18:00,19:00,basquet,Juan Pérez,",
+        "1,2030-03-02,23:00,00:00,voley,Ana Gómez,9000",
+    ), user_id=2)
+
+    assert reporte["importadas"] == 2
+    assert reporte["rechazadas"] == 0
+    reservas = db.query(Reserva).order_by(Reserva.hora_inicio).all()
+    assert [r.nombre_cliente for r in reservas] == ["Juan Pérez", "Ana Gómez"]
+    assert reservas[0].precio == 26000  # precio por hora de la cancha
+    assert reservas[1].precio == 9000
+
+
+def test_simulacion_no_inserta(db):
+    reporte = importar_reservas_csv(db, _csv("1,2030-03-02,18:00,19:00,basquet,Juan Pérez,"), user_id=2, simular=True)
+    assert _estados(reporte) == {2: "valida"}
+    assert reporte["importadas"] == 0
+    assert db.query(Reserva).count() == 0
+
+
+def test_rechaza_solapamientos_con_la_base_y_dentro_del_archivo(db):
+    db.add(Reserva(
+        user_id=1, cancha_id=1, deporte="basquet", fecha=date(2030, 3, 2),
+        hora_inicio=time(18), hora_fin=time(19), precio=1000, estado="confirmada"
+    ))
+    db.add(Suscripcion(
+        id=7, user_id=1, cancha_id=1, deporte="basquet", dia_semana=5, hora_inicio=time(21), hora_fin=time(22),
+        fecha_inicio=date(2030, 3, 2), metodo_pago="efectivo"
+    ))
+    db.flush()
+    db.add(OcurrenciaSuscripcion(
+        suscripcion_id=7, cancha_id=1, fecha=date(2030, 3, 2), hora_inicio=time(21), hora_fin=time(22), estado="activa"
+    ))
+    db.commit()
+
+    reporte = importar_reservas_csv(db, _csv(
+        "1,2030-03-02,18:30,19:30,basquet,Choca Reserva,",
+        "1,2030-03-02,21:00,22:00,basquet,Choca Suscripcion,",
+        "1,2030-03-02,10:00,11:00,basquet,Primera Linea,",
+        "1,2030-03-02,10:30,11:30,basquet,Segunda Linea,",
+        "1,2030-03-03,18:00,19:00,basquet,Otro Dia,",
+    ), user_id=2)
+
+    assert _estados(reporte) == {2: "rechazada", 3: "rechazada", 4: "importada", 5: "rechazada", 6: "importada"}
+    motivos = {fila["linea"]: fila.get("motivo") for fila in reporte["filas"]}
+    assert motivos[2].startswith("Se solapa con reserva #")
+    assert motivos[3] == "Se solapa con suscripción #7 existente"
+    assert motivos[5] == "Se solapa con la línea 4 del archivo"
+    assert db.query(Reserva).count() == 3
+
+
+def test_rechaza_filas_invalidas(db):
+    reporte = importar_reservas_csv(db, _csv(
+        "1,2030-13-02,18:00,19:00,basquet,Fecha Mala,",
+        "9,2030-03-02,18:00,19:00,basquet,Sin Cancha,",
+        "1,2030-03-02,06:00,07:00,basquet,Muy Temprano,",
+        "1,2030-03-02,18:00,19:00,basquet,,",
+        "1,2030-03-02,18:00,19:00,basquet,Precio Malo,abc",
+    ), user_id=2)
+
+    assert reporte["importadas"] == 0
+    assert set(_estados(reporte).values()) == {"rechazada"}
+    assert db.query(Reserva).count() == 0
+
+
+def test_columnas_requeridas(db):
+    with pytest.raises(ValueError, match="columnas requeridas"):
+        importar_reservas_csv(db, "cancha_id,fecha\n1,2030-03-02\n", user_id=2)
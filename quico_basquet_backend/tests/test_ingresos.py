@@ -0,0 +1,133 @@
+# test_ingresos.py
+# Rollup mensual de ingresos: registros incrementales, reconstrucción y reconciliación periódica
+
+import time as reloj
+from datetime import date, time
+
+from app.models.ingreso import IngresoMensual
+from app.models.reserva import Reserva
+from app.services import ingresos_service
+from app.services.ingresos_service import obtener_ingresos, reconciliar_ingresos, reconstruir_ingresos, registrar_alta_reserva
+
+
+def _reserva(db, fecha, precio, estado_pago="pendiente", registrar=True):
+    reserva = Reserva(
+        user_id=1, cancha_id=1, deporte="basquet", fecha=fecha, hora_inicio=time(18), hora_fin=time(19),
+        precio=precio, estado="confirmada", estado_pago=estado_pago, metodo_pago="efectivo"
+    )
+    db.add(reserva)
+    db.flush()
+    if registrar:
+        registrar_alta_reserva(db, reserva)
+    db.commit()
+    return reserva
+
+
+def test_reconstruir_agrupa_por_mes(db):
+    _reserva(db, date(2026, 3, 2), 1000)
+    _reserva(db, date(2026, 3, 28), 500)
+    _reserva(db, date(2026, 4, 1), 200, estado_pago="pagado")
+
+    assert reconstruir_ingresos(db) == 2
+    ingresos = obtener_ingresos(db, ["mes"])
+    assert ingresos == [
+        {"mes": date(2026, 3, 1), "cantidad": 2, "total": 1500.0},
+        {"mes": date(2026, 4, 1), "cantidad": 1, "total": 200.0},
+    ]
+
+
+def test_reconciliar_sin_desvios_no_reescribe(db):
+    _reserva(db, date(2026, 3, 2), 1000)
+    assert reconciliar_ingresos(db) == 0
+    assert db.query(IngresoMensual).count() == 1
+
+
+def test_reconciliar_corrige_un_camino_sin_registro(db):
+    _reserva(db, date(2026, 3, 2), 1000)
+    # Una reserva cargada sin pasar por registrar_alta_reserva desvía el rollup
+    _reserva(db, date(2026, 3, 10), 700, registrar=False)
+
+    assert reconciliar_ingresos(db) == 1
+    assert obtener_ingresos(db, ["mes"]) == [{"mes": date(2026, 3, 1), "cantidad": 2, "total": 1700.0}]
+    assert reconciliar_ingresos(db) == 0
+
+
+def test_reconciliacion_periodica(db, sesiones, monkeypatch):
+    _reserva(db, date(2026, 5, 5), 300, registrar=False)
+    monkeypatch.setattr(ingresos_service.settings, "INGRESOS_RECONCILIAR_HORAS", 0.05 / 3600)
+
+    ingresos_service.iniciar_reconciliacion_ingresos(sesiones)
+    try:
+        for _ in range(100):
+            if obtener_ingresos(db, ["mes"]):
+                break
+            reloj.sleep(0.02)
+            db.rollback()
+    finally:
+        ingresos_service.detener_reconciliacion_ingresos()
+
+    assert obtener_ingresos(db, ["mes"]) == [{"mes": date(2026, 5, 1), "cantidad": 1, "total": 300.0}]
+
+
+def test_reconciliacion_desactivada(sesiones, monkeypatch):
+    monkeypatch.setattr(ingresos_service.settings, "INGRESOS_RECONCILIAR_HORAS", 0)
+    ingresos_service.iniciar_reconciliacion_ingresos(sesiones)
+    assert ingresos_service._reconciliacion is None
+
+
+def test_cancelar_y_reactivar_mueven_el_aporte(db):
+    from app.crud.reserva import actualizar_estado_reserva, cancelar_reserva, reactivar_reserva
+
+    _reserva(db, date(2026, 6, 1), 1000)
+    cancelada = _reserva(db, date(2026, 6, 8), 400)
+
+    cancelar_reserva(db, cancelada.id, user_id=1)
+    assert obtener_ingresos(db, ["mes"]) == [{"mes": date(2026, 6, 1), "cantidad": 1, "total": 1000.0}]
+    # Cancelar dos veces no resta de nuevo
+    actualizar_estado_reserva(db, cancelada.id, "cancelada")
+    assert obtener_ingresos(db, ["mes"]) == [{"mes": date(2026, 6, 1), "cantidad": 1, "total": 1000.0}]
+    assert reconciliar_ingresos(db) == 0
+
+    reactivar_reserva(db, cancelada.id)
+    assert obtener_ingresos(db, ["mes"]) == [{"mes": date(2026, 6, 1), "cantidad": 2, "total": 1400.0}]
+    assert reconciliar_ingresos(db) == 0
+
+
+def test_cambios_masivos_y_suscripciones_canceladas(db):
+    from app.crud.reserva import actualizar_reservas_masivo
+    from app.crud.suscripcion import actualizar_estado_suscripcion
+    from app.models.suscripcion import Suscripcion
+    from app.services.ingresos_service import registrar_alta_suscripcion
+
+    reservas = [_reserva(db, date(2026, 7, d), 500) for d in (1, 2, 3)]
+    suscripcion = Suscripcion(
+        user_id=1, cancha_id=1, deporte="basquet", dia_semana=0, hora_inicio=time(20), hora_fin=time(21),
+        fecha_inicio=date(2026, 7, 6), fecha_fin=date(2026, 8, 6), estado="activa", precio_mensual=8000, metodo_pago="efectivo"
+    )
+    db.add(suscripcion)
+    db.flush()
+    registrar_alta_suscripcion(db, suscripcion)
+    db.commit()
+
+    actualizar_reservas_masivo(db, [reservas[0].id, reservas[1].id], {"estado": "cancelada"})
+    actualizar_estado_suscripcion(db, suscripcion.id, "cancelada")
+    assert obtener_ingresos(db, ["origen"]) == [{"origen": "reserva", "cantidad": 1, "total": 500.0}]
+    assert reconciliar_ingresos(db) == 0
+
+    # Reactivar en lote con un cambio de pago suma el aporte con el estado de pago nuevo
+    actualizar_reservas_masivo(db, [reservas[0].id], {"estado": "confirmada", "estado_pago": "pagado"})
+    assert obtener_ingresos(db, ["estado_pago"]) == [
+        {"estado_pago": "pagado", "cantidad": 1, "total": 500.0},
+        {"estado_pago": "pendiente", "cantidad": 1, "total": 500.0},
+    ]
+    assert reconciliar_ingresos(db) == 0
+
+
+def test_datos_faltantes_no_se_confunden_con_pendiente(db):
+    # Solo el estado de pago sin cargar equivale a "pendiente"; el resto de las dimensiones queda como sin_dato
+    ingresos_service.acumular_ingreso(db, "reserva", date(2026, 8, 3), 1, None, None, None, 1, 900)
+    db.commit()
+
+    assert obtener_ingresos(db, ["deporte", "metodo_pago", "estado_pago"]) == [
+        {"deporte": "sin_dato", "metodo_pago": "sin_dato", "estado_pago": "pendiente", "cantidad": 1, "total": 900.0}
+    ]
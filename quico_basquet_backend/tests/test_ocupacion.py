@@ -0,0 +1,50 @@
+# test_ocupacion.py
+# Mapa de ocupación: las semanas cerradas se cachean y los cambios de reservas las invalidan
+
+from datetime import date, time, timedelta
+
+from app.crud.reserva import cancelar_reserva
+from app.models.reserva import Reserva
+from app.services import ocupacion_service
+from app.services.ocupacion_service import calcular_ocupacion, lunes_de
+
+
+def _semana_pasada():
+    lunes = lunes_de(date.today()) - timedelta(weeks=2)
+    return lunes, lunes + timedelta(days=6)
+
+
+def _horas_ocupadas(db, desde, hasta):
+    return calcular_ocupacion(db, desde, hasta)["por_cancha"][0]["horas_ocupadas"]
+
+
+def test_cancelar_reserva_invalida_la_semana_cacheada(db):
+    ocupacion_service.invalidar_cache_ocupacion()
+    desde, hasta = _semana_pasada()
+    reserva = Reserva(
+        user_id=1, cancha_id=1, deporte="basquet", fecha=desde + timedelta(days=2),
+        hora_inicio=time(18), hora_fin=time(20), precio=1000, estado="confirmada"
+    )
+    db.add(reserva)
+    db.commit()
+
+    assert _horas_ocupadas(db, desde, hasta) == 2
+    assert len(ocupacion_service._cache_semanas) == 1
+
+    cancelar_reserva(db, reserva.id, 1)
+    assert len(ocupacion_service._cache_semanas) == 0
+    assert _horas_ocupadas(db, desde, hasta) == 0
+
+
+def test_invalidar_solo_las_semanas_de_las_fechas(db):
+    ocupacion_service.invalidar_cache_ocupacion()
+    desde, hasta = _semana_pasada()
+    calcular_ocupacion(db, desde - timedelta(weeks=1), hasta)
+    assert len(ocupacion_service._cache_semanas) == 2
+
+    ocupacion_service.invalidar_cache_ocupacion(1, [desde + timedelta(days=3)])
+    assert [lunes for lunes, _ in ocupacion_service._cache_semanas.keys()] == [desde - timedelta(weeks=1)]
+
+    # Otra cancha no toca las semanas cacheadas de la cancha 1
+    ocupacion_service.invalidar_cache_ocupacion(99)
+    assert len(ocupacion_service._cache_semanas) == 1
@@ -0,0 +1,159 @@
+# test_ocurrencias.py
+# Ocurrencias materializadas: las suscripciones sin fecha de fin extienden su horizonte
+
+import time as reloj
+from datetime import date, time, timedelta
+
+from sqlalchemy import func
+
+from app.models.ocurrencia import OcurrenciaSuscripcion
+from app.models.suscripcion import Suscripcion
+from app.services import ocurrencias_service
+from app.services.ocurrencias_service import (
+    HORIZONTE_SIN_FECHA_FIN_DIAS, extender_horizonte_ocurrencias, hay_ocurrencia_en_conflicto,
+    inicializar_ocurrencias, primera_fecha, sincronizar_ocurrencias
+)
+from app.services.suscripcion_service import procesar_suscripciones_vencidas
+
+
+def _suscripcion(db, fecha_inicio, fecha_fin=None, estado="activa"):
+    suscripcion = Suscripcion(
+        user_id=1, cancha_id=1, deporte="basquet", dia_semana=2, hora_inicio=time(18), hora_fin=time(19),
+        fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, estado=estado, metodo_pago="efectivo"
+    )
+    db.add(suscripcion)
+    db.commit()
+    return suscripcion
+
+
+def _materializar_hasta(db, suscripcion, hasta):
+    """Ocurrencias como las habría dejado la carga hecha cuando se creó la suscripción"""
+    fecha = primera_fecha(suscripcion.fecha_inicio, suscripcion.dia_semana)
+    while fecha <= hasta:
+        db.add(OcurrenciaSuscripcion(
+            suscripcion_id=suscripcion.id, cancha_id=1, fecha=fecha,
+            hora_inicio=suscripcion.hora_inicio, hora_fin=suscripcion.hora_fin, estado="activa"
+        ))
+        fecha += timedelta(weeks=1)
+    db.commit()
+
+
+def _ultima_fecha(db, suscripcion_id):
+    return db.query(func.max(OcurrenciaSuscripcion.fecha)).filter(OcurrenciaSuscripcion.suscripcion_id == suscripcion_id).scalar()
+
+
+def test_extiende_suscripciones_sin_fecha_fin(db):
+    hoy = date.today()
+    inicio = hoy - timedelta(days=400)
+    suscripcion = _suscripcion(db, inicio)
+    _materializar_hasta(db, suscripcion, inicio + timedelta(days=HORIZONTE_SIN_FECHA_FIN_DIAS))
+
+    dentro_de_300_dias = primera_fecha(hoy + timedelta(days=300), suscripcion.dia_semana)
+    assert not hay_ocurrencia_en_conflicto(db, 1, [dentro_de_300_dias], time(18), time(19))
+
+    assert extender_horizonte_ocurrencias(db) > 0
+    assert _ultima_fecha(db, suscripcion.id) > hoy + timedelta(days=HORIZONTE_SIN_FECHA_FIN_DIAS - 7)
+    assert hay_ocurrencia_en_conflicto(db, 1, [dentro_de_300_dias], time(18), time(19))
+
+    # Ya completas: una segunda pasada no agrega nada
+    assert extender_horizonte_ocurrencias(db) == 0
+
+
+def test_conserva_fechas_omitidas(db):
+    suscripcion = _suscripcion(db, date.today() - timedelta(days=400))
+    _materializar_hasta(db, suscripcion, date.today() + timedelta(days=30))
+    omitida = db.query(OcurrenciaSuscripcion).filter(OcurrenciaSuscripcion.fecha > date.today()).first()
+    omitida.estado = "omitida"
+    db.commit()
+
+    extender_horizonte_ocurrencias(db)
+    db.refresh(omitida)
+    assert omitida.estado == "omitida"
+
+
+def test_no_extiende_suscripciones_con_fin_o_inactivas(db):
+    hoy = date.today()
+    con_fin = _suscripcion(db, hoy - timedelta(days=30), fecha_fin=hoy + timedelta(days=30))
+    cancelada = _suscripcion(db, hoy - timedelta(days=30), estado="cancelada")
+    _materializar_hasta(db, con_fin, hoy)
+
+    assert extender_horizonte_ocurrencias(db) == 0
+    assert _ultima_fecha(db, con_fin.id) <= hoy
+    assert _ultima_fecha(db, cancelada.id) is None
+
+
+def test_inicializar_extiende_si_la_tabla_ya_tiene_datos(db, sesiones):
+    suscripcion = _suscripcion(db, date.today() - timedelta(days=10))
+    _materializar_hasta(db, suscripcion, date.today())
+
+    inicializar_ocurrencias(sesiones)
+    assert _ultima_fecha(db, suscripcion.id) > date.today() + timedelta(days=HORIZONTE_SIN_FECHA_FIN_DIAS - 7)
+
+
+def test_extension_periodica(db, sesiones, monkeypatch):
+    suscripcion = _suscripcion(db, date.today() - timedelta(days=10))
+    monkeypatch.setattr(ocurrencias_service.settings, "OCURRENCIAS_EXTENSION_HORAS", 0.05 / 3600)
+
+    ocurrencias_service.iniciar_extension_ocurrencias(sesiones)
+    try:
+        for _ in range(100):
+            if _ultima_fecha(db, suscripcion.id):
+                break
+            reloj.sleep(0.02)
+            db.rollback()
+    finally:
+        ocurrencias_service.detener_extension_ocurrencias()
+
+    assert _ultima_fecha(db, suscripcion.id) is not None
+
+
+def _fechas(db, suscripcion_id):
+    return [f for (f,) in db.query(OcurrenciaSuscripcion.fecha).filter(
+        OcurrenciaSuscripcion.suscripcion_id == suscripcion_id
+    ).order_by(OcurrenciaSuscripcion.fecha).all()]
+
+
+def test_cancelar_conserva_las_sesiones_pasadas(db):
+    hoy = date.today()
+    suscripcion = _suscripcion(db, hoy - timedelta(days=60), fecha_fin=hoy + timedelta(days=60))
+    _materializar_hasta(db, suscripcion, suscripcion.fecha_fin)
+    pasadas = [f for f in _fechas(db, suscripcion.id) if f < hoy]
+
+    suscripcion.estado = "cancelada"
+    sincronizar_ocurrencias(db, suscripcion)
+    db.commit()
+
+    assert _fechas(db, suscripcion.id) == pasadas
+
+
+def test_editar_no_reescribe_el_pasado(db):
+    hoy = date.today()
+    suscripcion = _suscripcion(db, hoy - timedelta(days=60), fecha_fin=hoy + timedelta(days=60))
+    _materializar_hasta(db, suscripcion, suscripcion.fecha_fin)
+    pasadas = {
+        f: (inicio, fin) for f, inicio, fin in db.query(
+            OcurrenciaSuscripcion.fecha, OcurrenciaSuscripcion.hora_inicio, OcurrenciaSuscripcion.hora_fin
+        ).filter(OcurrenciaSuscripcion.suscripcion_id == suscripcion.id, OcurrenciaSuscripcion.fecha < hoy).all()
+    }
+
+    suscripcion.dia_semana = (suscripcion.dia_semana + 1) % 7
+    suscripcion.hora_inicio, suscripcion.hora_fin = time(20), time(21)
+    sincronizar_ocurrencias(db, suscripcion)
+    db.commit()
+
+    ocurrencias = db.query(OcurrenciaSuscripcion).filter(OcurrenciaSuscripcion.suscripcion_id == suscripcion.id).all()
+    antes = {o.fecha: (o.hora_inicio, o.hora_fin) for o in ocurrencias if o.fecha < hoy}
+    despues = [o for o in ocurrencias if o.fecha >= hoy]
+    assert antes == pasadas
+    assert despues and all(o.fecha.weekday() == suscripcion.dia_semana and o.hora_inicio == time(20) for o in despues)
+    assert min(o.fecha for o in despues) == primera_fecha(hoy, suscripcion.dia_semana)
+
+
+def test_vencer_conserva_las_sesiones_pasadas(db):
+    hoy = date.today()
+    suscripcion = _suscripcion(db, hoy - timedelta(days=60), fecha_fin=hoy - timedelta(days=1))
+    _materializar_hasta(db, suscripcion, suscripcion.fecha_fin)
+    pasadas = _fechas(db, suscripcion.id)
+
+    assert [s.id for s in procesar_suscripciones_vencidas(db)] == [suscripcion.id]
+    assert pasadas and _fechas(db, suscripcion.id) == pasadas
@@ -0,0 +1,119 @@
+# test_proveedores_email.py
+# Proveedores de email compartidos: circuit breaker y fallback de SendGrid a SMTP contra stubs locales
+
+import smtplib
+
+import httpx
+import pytest
+
+from app.config.settings import settings
+from app.services import email_service, proveedores_email
+from app.services.proveedores_email import CircuitoProveedor, ProveedorSendGrid, ProveedorSMTP, enviar_con_proveedor
+
+
+class SMTPStub:
+    """Servidor SMTP falso: registra los envíos y puede cortar la sesión una vez"""
+
+    conexiones = 0
+    enviados = []
+    cortar_proxima = False
+
+    def __init__(self, host, port, timeout=None):
+        SMTPStub.conexiones += 1
+
+    def starttls(self):
+        pass
+
+    def login(self, usuario, clave):
+        pass
+
+    def sendmail(self, remitente, destinatario, contenido):
+        if SMTPStub.cortar_proxima:
+            SMTPStub.cortar_proxima = False
+            raise smtplib.SMTPServerDisconnected("inactiva")
+        SMTPStub.enviados.append(destinatario)
+
+    def close(self):
+        pass
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def proveedores(monkeypatch):
+    """SendGrid contra un MockTransport de httpx y SMTP contra SMTPStub, con circuitos nuevos"""
+    monkeypatch.setattr(settings, "SENDGRID_API_KEY", "clave")
+    monkeypatch.setattr(settings, "GMAIL_APP_PASSWORD", "clave")
+    monkeypatch.setattr(settings, "EMAIL_CIRCUITO_UMBRAL_FALLOS", 2)
+    monkeypatch.setattr(smtplib, "SMTP", SMTPStub)
+    SMTPStub.conexiones, SMTPStub.enviados, SMTPStub.cortar_proxima = 0, [], False
+
+    respuestas = {"codigo": 202, "requests": 0}
+
+    def responder(request):
+        respuestas["requests"] += 1
+        return httpx.Response(respuestas["codigo"])
+
+    sendgrid = ProveedorSendGrid()
+    sendgrid._cliente = httpx.Client(base_url="http://sendgrid.local", transport=httpx.MockTransport(responder))
+    smtp = ProveedorSMTP()
+    monkeypatch.setattr(email_service, "proveedor_sendgrid", sendgrid)
+    monkeypatch.setattr(email_service, "proveedor_smtp", smtp)
+    yield sendgrid, smtp, respuestas
+    sendgrid.cerrar()
+    smtp.cerrar()
+
+
+def test_circuito_abre_y_deja_pasar_una_prueba(monkeypatch):
+    reloj = [100.0]
+    monkeypatch.setattr(proveedores_email.time, "monotonic", lambda: reloj[0])
+    circuito = CircuitoProveedor("prueba", umbral_fallos=2, segundos_abierto=30)
+
+    circuito.registrar_fallo()
+    assert circuito.permitir()
+    circuito.registrar_fallo()
+    assert circuito.estado == "abierto"
+    assert not circuito.permitir()
+
+    reloj[0] += 31
+    assert circuito.estado == "semiabierto"
+    assert circuito.permitir()
+    assert not circuito.permitir()  # solo un intento de prueba a la vez
+    circuito.registrar_exito()
+    assert circuito.estado == "cerrado"
+
+
+def test_sendgrid_caido_pasa_a_smtp_sin_reintentar(proveedores):
+    sendgrid, smtp, respuestas = proveedores
+    respuestas["codigo"] = 503
+
+    for _ in range(3):
+        assert email_service.send_email("cliente@example.com", "Reserva cancelada", "Tu reserva fue cancelada")
+
+    # Tras dos fallos el circuito se abre y el tercer envío va directo a SMTP
+    assert respuestas["requests"] == 2
+    assert sendgrid.circuito.estado == "abierto"
+    assert SMTPStub.enviados == ["cliente@example.com"] * 3
+    assert SMTPStub.conexiones == 1  # la sesión SMTP se reutiliza
+
+
+def test_rechazo_de_destinatario_no_abre_el_circuito(proveedores):
+    sendgrid, _, respuestas = proveedores
+    respuestas["codigo"] = 400
+
+    for _ in range(3):
+        assert not enviar_con_proveedor(sendgrid, "mal@example", "Asunto", "texto", "<p>texto</p>")
+    assert respuestas["requests"] == 3
+    assert sendgrid.circuito.estado == "cerrado"
+
+
+def test_smtp_reconecta_si_el_servidor_corto_la_sesion(proveedores):
+    _, smtp, _ = proveedores
+    assert enviar_con_proveedor(smtp, "a@example.com", "Asunto", "texto", "<p>texto</p>")
+    SMTPStub.cortar_proxima = True
+    assert enviar_con_proveedor(smtp, "b@example.com", "Asunto", "texto", "<p>texto</p>")
+
+    assert SMTPStub.enviados == ["a@example.com", "b@example.com"]
+    assert SMTPStub.conexiones == 2
+    assert smtp.circuito.estado == "cerrado"
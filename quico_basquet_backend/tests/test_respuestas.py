@@ -0,0 +1,66 @@
+# test_respuestas.py
+# Listados en json, columnar y msgpack: todos los caminos declaran Vary: Accept
+
+from typing import List
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from app.config.settings import settings
+from app.utils import respuestas
+from app.utils.respuestas import formato_listado, respuesta_listado
+
+
+class Item(BaseModel):
+    id: int
+    nombre: str
+
+
+FILAS = [{"id": 1, "nombre": "Cancha 1"}, {"id": 2, "nombre": "Cancha 2"}]
+
+app = FastAPI()
+
+
+@app.get("/items", response_model=List[Item])
+def listar(formato: str = Depends(formato_listado)):
+    return respuesta_listado(FILAS, Item, formato)
+
+
+@app.get("/items-propios", response_model=List[Item])
+def listar_sin_respuesta_listado(formato: str = Depends(formato_listado)):
+    # Como /admin/usuarios: en json sin camino rápido el endpoint arma la lista él mismo
+    return [Item(**fila) for fila in FILAS]
+
+
+cliente = TestClient(app)
+
+
+@pytest.mark.parametrize("rapidas", [False, True])
+def test_json_por_defecto_declara_vary(monkeypatch, rapidas):
+    monkeypatch.setattr(settings, "RESPUESTAS_RAPIDAS", rapidas)
+    respuesta = cliente.get("/items")
+    assert respuesta.json() == FILAS
+    assert respuesta.headers["vary"] == "Accept"
+
+
+def test_endpoint_que_no_usa_respuesta_listado_declara_vary():
+    respuesta = cliente.get("/items-propios")
+    assert respuesta.json() == FILAS
+    assert respuesta.headers["vary"] == "Accept"
+
+
+def test_columnar_declara_vary():
+    respuesta = cliente.get("/items", params={"format": "columnar"})
+    assert respuesta.json() == {"campos": ["id", "nombre"], "columnas": [[1, 2], ["Cancha 1", "Cancha 2"]], "total": 2}
+    assert respuesta.headers["vary"] == "Accept"
+
+
+def test_msgpack_por_accept_declara_vary():
+    if respuestas.msgpack is None:
+        pytest.skip("msgpack no instalado")
+    respuesta = cliente.get("/items", headers={"Accept": "application/msgpack"})
+    assert respuesta.headers["content-type"] == "application/msgpack"
+    assert respuestas.msgpack.unpackb(respuesta.content)["total"] == 2
+    assert respuesta.headers["vary"] == "Accept"